@@ -1,18 +1,336 @@
-from typing import Dict, List
+import asyncio
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi import Query as QueryParameter
+from prometheus_client import CONTENT_TYPE_LATEST
 
+from ..core.cancellation import (
+    CLIENT_DISCONNECTED,
+    DEADLINE_EXCEEDED,
+    TIMEOUT_HEADER,
+    CancellationToken,
+    cancellation_scope,
+)
 from ..core.constants import APIRoutes, StatusCodes
-from ..core.dependencies import similarity_service
+from ..core.dependencies import inference_executor, model_registry
+from ..core.exceptions import (
+    CatalogNotFoundError,
+    EmbeddingMismatchError,
+    ModelNotFoundError,
+    QueueFullError,
+    RequestCancelledError,
+)
 from ..core.logging import get_logger
+from ..core.metrics import HANDLER_END, REQUEST_START, observe_stage, render_metrics
+from ..services.catalog import Catalog
+from ..services.executor import InferenceExecutor
 from ..services.product_similarity import SimilarityService
-from .models import Query, SimilarityResult
+from ..services.shards import track_missed_shards
+from .formats import (
+    body_decoder,
+    decode_vectors,
+    encode_results,
+    encode_vectors,
+    negotiate,
+    request_body,
+)
+from .models import (
+    CatalogCreate,
+    CatalogInfo,
+    CatalogUpdate,
+    EmbedRequest,
+    EmbedResponse,
+    IndexCreate,
+    IndexInfo,
+    ModelInfo,
+    ModelLoad,
+    ProductsDelete,
+    ProductsUpsert,
+    Query,
+    SimilarityIndexResult,
+    SimilarityResult,
+    VectorQuery,
+    VectorSimilarityResult,
+)
 
 logger = get_logger(__name__)
 router = APIRouter(prefix=APIRoutes.PREFIX, tags=["Product Similarity"])
+metrics_router = APIRouter(tags=["Monitoring"])
 
 
-similarity_service_dependency = Depends(lambda: similarity_service)
+async def _model_service(
+    model: Optional[str] = QueryParameter(
+        None, description="Model serving the request, the default one when omitted"
+    ),
+) -> AsyncIterator[SimilarityService]:
+    """Lease the service of the model a request selects for its duration.
+
+    Args:
+        model (Optional[str]): Name of the model, None for the default one.
+
+    Yields:
+        SimilarityService: The service of the model, loaded if needed.
+
+    Raises:
+        HTTPException: If the model is unknown or cannot be loaded.
+    """
+    try:
+        service = await model_registry.acquire(model)
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=StatusCodes.NOT_FOUND, detail=str(e)) from e
+    except Exception as e:
+        raise HTTPException(
+            status_code=StatusCodes.SERVICE_UNAVAILABLE,
+            detail=f"Model '{model}' could not be loaded: {str(e)}",
+        ) from e
+    try:
+        yield service
+    finally:
+        await model_registry.release(service)
+
+
+similarity_service_dependency = Depends(_model_service)
+query_dependency = Depends(body_decoder(Query))
+vector_query_dependency = Depends(body_decoder(VectorQuery))
+inference_executor_dependency = Depends(lambda: inference_executor)
+
+
+def _require_model(service: SimilarityService) -> None:
+    """Raise a 503 error if the model of the service is not loaded.
+
+    Args:
+        service (SimilarityService): The similarity service instance.
+
+    Raises:
+        HTTPException: If the model is not loaded.
+    """
+    if not service.model:
+        raise HTTPException(
+            status_code=StatusCodes.SERVICE_UNAVAILABLE, detail="Model not loaded"
+        )
+
+
+def _overloaded(request: Request, error: QueueFullError) -> HTTPException:
+    """Build the 503 error of a request rejected by the inference executor.
+
+    Args:
+        request (Request): The rejected request.
+        error (QueueFullError): The rejection.
+
+    Returns:
+        HTTPException: The error, with a Retry-After header.
+    """
+    logger.warning(f"Rejecting request: {str(error)}")
+    return HTTPException(
+        status_code=StatusCodes.SERVICE_UNAVAILABLE,
+        detail="Server is overloaded, retry later",
+        headers={
+            "Retry-After": str(request.app.state.settings.inference_retry_after_seconds)
+        },
+    )
+
+
+def _request_token(request: Request, timeout_ms: Optional[float]) -> CancellationToken:
+    """Build the cancellation token of a request from its time budget.
+
+    The budget is the smallest of the ``X-Request-Timeout-Ms`` header, the
+    ``timeout_ms`` of the body and the ``REQUEST_TIMEOUT_MS`` setting of the
+    application, counted from the arrival of the request.
+
+    Args:
+        request (Request): The request.
+        timeout_ms (Optional[float]): Time budget given in the body.
+
+    Returns:
+        CancellationToken: The token, without deadline if no budget is given.
+
+    Raises:
+        HTTPException: If the header is not a positive number.
+    """
+    budgets = [timeout_ms, request.app.state.settings.request_timeout_ms]
+    header = request.headers.get(TIMEOUT_HEADER)
+    if header is not None:
+        try:
+            budget = float(header)
+        except ValueError:
+            budget = 0.0
+        if not budget > 0:
+            raise HTTPException(
+                status_code=StatusCodes.BAD_REQUEST,
+                detail=f"{TIMEOUT_HEADER} must be a positive number of milliseconds",
+            )
+        budgets.append(budget)
+    given = [budget for budget in budgets if budget is not None]
+    return CancellationToken.with_timeout(
+        min(given) if given else None, getattr(request.state, REQUEST_START, None)
+    )
+
+
+async def _watch_disconnect(request: Request, token: CancellationToken) -> None:
+    """Cancel a token when the client of its request disconnects.
+
+    Args:
+        request (Request): The request.
+        token (CancellationToken): The token of the request.
+    """
+    poll_seconds = request.app.state.settings.disconnect_poll_ms / 1000
+    while not token.cancelled:
+        if await request.is_disconnected():
+            token.cancel(CLIENT_DISCONNECTED)
+            return
+        await asyncio.sleep(poll_seconds)
+
+
+async def _run_cancellable(
+    request: Request,
+    executor: InferenceExecutor,
+    token: CancellationToken,
+    fn: Callable[..., Any],
+    *args: Any,
+    **kwargs: Any,
+) -> Any:
+    """Run the work of a request on the executor until it stops being wanted.
+
+    The work checks the token between chunks, and stops once the client
+    disconnected or the deadline of the request passed.
+
+    Args:
+        request (Request): The request.
+        executor (InferenceExecutor): The inference executor instance.
+        token (CancellationToken): The token of the request.
+        fn (Callable[..., Any]): The work.
+        *args (Any): Positional arguments of the work.
+        **kwargs (Any): Keyword arguments of the work.
+
+    Returns:
+        Any: The result of the work.
+
+    Raises:
+        RequestCancelledError: If the work stopped early.
+    """
+    watcher = asyncio.ensure_future(_watch_disconnect(request, token))
+    try:
+        with cancellation_scope(token):
+            return await executor.run(fn, *args, **kwargs)
+    finally:
+        watcher.cancel()
+
+
+def _abandoned(error: RequestCancelledError) -> HTTPException:
+    """Build the error of a request whose work stopped early.
+
+    Args:
+        error (RequestCancelledError): Why and where the work stopped.
+
+    Returns:
+        HTTPException: A 504 error past the deadline, or a 499 error, which
+            nobody receives, once the client disconnected.
+    """
+    logger.info(str(error))
+    if error.reason == DEADLINE_EXCEEDED:
+        return HTTPException(status_code=StatusCodes.GATEWAY_TIMEOUT, detail=str(error))
+    return HTTPException(
+        status_code=StatusCodes.CLIENT_CLOSED_REQUEST, detail=str(error)
+    )
+
+
+def _observe_validation(request: Request) -> None:
+    """Record the time spent reading and validating the body of a request.
+
+    Args:
+        request (Request): The request, whose state carries the start timestamp
+            of the metrics middleware.
+    """
+    # Reading and validating the body happens before the handler is called.
+    request_start = getattr(request.state, REQUEST_START, None)
+    if request_start is not None:
+        observe_stage("validation", time.perf_counter() - request_start)
+
+
+def _catalog_info(catalog: Catalog) -> CatalogInfo:
+    """Build the API representation of a catalog.
+
+    Args:
+        catalog (Catalog): The registered catalog.
+
+    Returns:
+        CatalogInfo: The catalog description.
+    """
+    return CatalogInfo(
+        catalog_id=catalog.catalog_id,
+        size=catalog.size,
+        version=catalog.version,
+        pending=catalog.pending,
+        index=catalog.index.info() if catalog.index is not None else None,
+    )
+
+
+def _search_version(
+    service: SimilarityService,
+    search: Callable[..., List[List[dict]]],
+    catalog_id: Optional[str],
+    **kwargs: Any,
+) -> Tuple[List[List[dict]], Optional[int], bool]:
+    """Run a search on the current version of a catalog and report that version.
+
+    The catalog is looked up once, so that the version returned is the one the
+    matches come from even if the catalog is updated during the search. The
+    matches are partial when shards of the catalog missed their deadline.
+
+    Args:
+        service (SimilarityService): The similarity service instance.
+        search (Callable[..., List[List[dict]]]): ``find_similar`` or
+            ``find_similar_by_vector`` of the service.
+        catalog_id (Optional[str]): Name of the catalog searched, if any.
+        **kwargs (Any): Other arguments of the search.
+
+    Returns:
+        Tuple[List[List[dict]], Optional[int], bool]: The matches per query, the
+            version of the catalog, None for products given in the request, and
+            whether shards were left out of the matches.
+    """
+    catalog = service.get_catalog(catalog_id) if catalog_id is not None else None
+    with track_missed_shards() as missed:
+        hits = search(catalog_id=catalog_id, catalog=catalog, **kwargs)
+    return hits, catalog.version if catalog is not None else None, bool(missed)
+
+
+def _results(
+    texts: Sequence[Optional[str]],
+    hits: List[List[dict]],
+    version: Optional[int],
+    partial: bool = False,
+) -> List[Dict[str, Any]]:
+    """Build the similarity results of a request.
+
+    Args:
+        texts (Sequence[Optional[str]]): The query texts, None for embeddings.
+        hits (List[List[dict]]): The matches per query.
+        version (Optional[int]): Version of the searched catalog, if any.
+        partial (bool): Whether shards were left out of the matches.
+
+    Returns:
+        List[Dict[str, Any]]: One result per query, in query order.
+    """
+    extra: Dict[str, Any] = {} if version is None else {"version": version}
+    if partial:
+        extra["partial"] = True
+    return [
+        {"query": text, "matches": matches, **extra}
+        for text, matches in zip(texts, hits, strict=True)
+    ]
 
 
 @router.get(APIRoutes.HEALTH)
@@ -25,37 +343,639 @@ def health_check() -> Dict[str, str]:
     return {"status": "healthy"}
 
 
-@router.post(APIRoutes.SIMILARITY, response_model=List[SimilarityResult])
-def get_similarity(
-    query: Query,
+@router.get(APIRoutes.LIVENESS)
+def liveness_check() -> Dict[str, str]:
+    """Liveness probe, answering as long as the process serves requests.
+
+    Returns:
+        Dict[str, str]: A dictionary with a "status" key set to "alive".
+    """
+    return {"status": "alive"}
+
+
+@router.get(APIRoutes.READINESS)
+def readiness_check(
+    response: Response, service: SimilarityService = similarity_service_dependency
+) -> Dict[str, Any]:
+    """Readiness probe, answering 503 until the model is loaded and warmed up.
+
+    Args:
+        response (Response): The response, whose status code is set to 503
+            while the service is not ready.
+        service (SimilarityService): The similarity service instance.
+
+    Returns:
+        Dict[str, Any]: The readiness status with the load and warmup timings.
+    """
+    ready = service.ready
+    if not ready:
+        response.status_code = StatusCodes.SERVICE_UNAVAILABLE
+    return {"status": "ready" if ready else "not ready", **service.startup_stats()}
+
+
+@router.get(APIRoutes.STATS)
+def get_stats(
     service: SimilarityService = similarity_service_dependency,
-) -> List[SimilarityResult]:
+    executor: InferenceExecutor = inference_executor_dependency,
+) -> Dict[str, Any]:
+    """Get runtime statistics of the similarity service.
+
+    Args:
+        service (SimilarityService): The similarity service instance.
+        executor (InferenceExecutor): The inference executor instance.
+
+    Returns:
+        Dict[str, Any]: Statistics such as embedding cache hits and misses.
+    """
+    return {
+        **service.stats(),
+        "executor": executor.stats(),
+        "models": model_registry.stats(),
+    }
+
+
+@metrics_router.get(APIRoutes.METRICS)
+def get_metrics(
+    service: SimilarityService = similarity_service_dependency,
+    executor: InferenceExecutor = inference_executor_dependency,
+) -> Response:
+    """Expose the metrics in the Prometheus text format.
+
+    Args:
+        service (SimilarityService): The similarity service instance.
+        executor (InferenceExecutor): The inference executor instance.
+
+    Returns:
+        Response: The metrics exposition.
+    """
+    return Response(
+        content=render_metrics(
+            lambda: {**service.stats(), "executor": executor.stats()}
+        ),
+        media_type=CONTENT_TYPE_LATEST,
+    )
+
+
+@router.post(
+    APIRoutes.SIMILARITY,
+    response_model=Union[List[SimilarityResult], List[SimilarityIndexResult]],
+    openapi_extra=request_body(Query),
+)
+async def get_similarity(
+    request: Request,
+    query: Query = query_dependency,
+    service: SimilarityService = similarity_service_dependency,
+    executor: InferenceExecutor = inference_executor_dependency,
+) -> Response:
     """Get similar products for given queries.
 
+    The search runs on the dedicated inference executor. When its queue is
+    full the request is rejected right away with a 503 and a Retry-After header.
+
+    The query is sent as JSON, MessagePack or Arrow IPC, per its Content-Type,
+    and the results are returned in the format preferred by the Accept header.
+    The results built by the service already have the shape of the response
+    model, so they are serialized directly instead of being converted to models
+    and validated again by FastAPI. The response model only documents them.
+
     Args:
-        query (Query): The query object containing the text and products.
+        request (Request): The request, whose state carries the timestamps of
+            the metrics middleware.
+        query (Query): The query object containing the text and either the
+            products or the id of a registered catalog.
         service (SimilarityService): The similarity service instance.
+        executor (InferenceExecutor): The inference executor instance.
 
     Returns:
-        List[SimilarityResult]: A list of similarity results.
+        Response: The similarity results, one per query, with the product text
+            or only the product index of each match.
     """
-    if not service.model:
-        raise HTTPException(
-            status_code=StatusCodes.SERVICE_UNAVAILABLE, detail="Model not loaded"
-        )
+    _observe_validation(request)
+    _require_model(service)
+    token = _request_token(request, query.timeout_ms)
 
     try:
-        hits = service.find_similar(
+        hits, version, partial = await _run_cancellable(
+            request,
+            executor,
+            token,
+            _search_version,
+            service,
+            service.find_similar,
+            query.catalog_id,
             queries=query.text,
             products=query.products,
             top_k=query.top_k,
+            nprobe=query.nprobe,
+            return_products=query.return_products,
+            filters=query.filter,
+            metadata=query.metadata,
         )
 
-        return [
-            SimilarityResult(query=query.text[i], matches=hits[i])
-            for i in range(len(query.text))
-        ]
+        setattr(request.state, HANDLER_END, time.perf_counter())
+        return encode_results(
+            _results(query.text, hits, version, partial),
+            negotiate(request.headers.get("accept")),
+        )
 
+    except CatalogNotFoundError as e:
+        raise HTTPException(status_code=StatusCodes.NOT_FOUND, detail=str(e)) from e
+    except ValueError as e:
+        raise HTTPException(status_code=StatusCodes.BAD_REQUEST, detail=str(e)) from e
+    except QueueFullError as e:
+        raise _overloaded(request, e) from e
+    except RequestCancelledError as e:
+        raise _abandoned(e) from e
     except Exception as e:
         logger.error(f"Error processing request: {str(e)}")
         raise HTTPException(status_code=StatusCodes.SERVER_ERROR, detail=str(e)) from e
+
+
+@router.post(
+    APIRoutes.SIMILARITY_VECTORS,
+    response_model=List[VectorSimilarityResult],
+    openapi_extra=request_body(VectorQuery),
+)
+async def get_similarity_by_vector(
+    request: Request,
+    query: VectorQuery = vector_query_dependency,
+    service: SimilarityService = similarity_service_dependency,
+    executor: InferenceExecutor = inference_executor_dependency,
+) -> Response:
+    """Get similar products for queries and products given as embeddings.
+
+    Embeddings returned by the embed endpoint are searched without running the
+    model, which only encodes the sides given as texts. Like the similarity
+    endpoint, the body can be JSON, MessagePack or Arrow IPC and the results
+    follow the Accept header.
+
+    Args:
+        request (Request): The request.
+        query (VectorQuery): The query and product embeddings or texts.
+        service (SimilarityService): The similarity service instance.
+        executor (InferenceExecutor): The inference executor instance.
+
+    Returns:
+        Response: The similarity results, one per query, in query order. The
+            query text is null for query embeddings.
+    """
+    _observe_validation(request)
+    if query.text is not None or (
+        query.products is not None and query.product_vectors is None
+    ):
+        _require_model(service)
+
+    try:
+        query_embeddings = (
+            decode_vectors(query.vectors, query.dtype)
+            if query.vectors is not None
+            else None
+        )
+        product_embeddings = (
+            decode_vectors(query.product_vectors, query.dtype)
+            if query.product_vectors is not None
+            else None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=StatusCodes.BAD_REQUEST, detail=str(e)) from e
+    token = _request_token(request, query.timeout_ms)
+
+    try:
+        hits, version, partial = await _run_cancellable(
+            request,
+            executor,
+            token,
+            _search_version,
+            service,
+            service.find_similar_by_vector,
+            query.catalog_id,
+            top_k=query.top_k,
+            query_embeddings=query_embeddings,
+            queries=query.text,
+            product_embeddings=product_embeddings,
+            products=query.products,
+            nprobe=query.nprobe,
+            return_products=query.return_products,
+            model_name=query.model_name,
+            filters=query.filter,
+            metadata=query.metadata,
+        )
+    except CatalogNotFoundError as e:
+        raise HTTPException(status_code=StatusCodes.NOT_FOUND, detail=str(e)) from e
+    except (EmbeddingMismatchError, ValueError) as e:
+        raise HTTPException(status_code=StatusCodes.BAD_REQUEST, detail=str(e)) from e
+    except QueueFullError as e:
+        raise _overloaded(request, e) from e
+    except RequestCancelledError as e:
+        raise _abandoned(e) from e
+    except Exception as e:
+        logger.error(f"Error processing request: {str(e)}")
+        raise HTTPException(status_code=StatusCodes.SERVER_ERROR, detail=str(e)) from e
+
+    setattr(request.state, HANDLER_END, time.perf_counter())
+    texts = query.text or [None] * len(hits)
+    return encode_results(
+        _results(texts, hits, version, partial),
+        negotiate(request.headers.get("accept")),
+    )
+
+
+@router.post(APIRoutes.EMBED, response_model=EmbedResponse)
+async def embed(
+    request: Request,
+    body: EmbedRequest,
+    service: SimilarityService = similarity_service_dependency,
+    executor: InferenceExecutor = inference_executor_dependency,
+) -> EmbedResponse:
+    """Encode texts into embeddings that can be stored and searched later.
+
+    Args:
+        request (Request): The incoming request.
+        body (EmbedRequest): The texts and the format of the embeddings.
+        service (SimilarityService): The similarity service instance.
+        executor (InferenceExecutor): The inference executor instance.
+
+    Returns:
+        EmbedResponse: The model name, the dimension and the base64 encoded
+            embeddings, one per text.
+    """
+    _require_model(service)
+
+    try:
+        embeddings = await executor.run(
+            service.embed, body.texts, normalized=body.normalize
+        )
+    except QueueFullError as e:
+        raise _overloaded(request, e) from e
+    except Exception as e:
+        logger.error(f"Error encoding texts: {str(e)}")
+        raise HTTPException(status_code=StatusCodes.SERVER_ERROR, detail=str(e)) from e
+
+    return EmbedResponse(
+        model_name=service.model_name,
+        dimension=int(embeddings.shape[1]),
+        dtype=body.dtype,
+        embeddings=encode_vectors(embeddings, body.dtype),
+    )
+
+
+@router.post(
+    APIRoutes.CATALOGS,
+    response_model=CatalogInfo,
+    status_code=StatusCodes.CREATED,
+)
+async def create_catalog(
+    request: Request,
+    catalog: CatalogCreate,
+    service: SimilarityService = similarity_service_dependency,
+    executor: InferenceExecutor = inference_executor_dependency,
+) -> CatalogInfo:
+    """Register a product catalog whose embeddings are reused by later queries.
+
+    The products are encoded on the inference executor, within its queue
+    limit, and the registration is skipped if the client disconnects while
+    it waits.
+
+    Args:
+        request (Request): The incoming request.
+        catalog (CatalogCreate): The catalog id and its products.
+        service (SimilarityService): The similarity service instance.
+        executor (InferenceExecutor): The inference executor instance.
+
+    Returns:
+        CatalogInfo: The registered catalog.
+    """
+    _require_model(service)
+
+    try:
+        registered = await _run_cancellable(
+            request,
+            executor,
+            CancellationToken(),
+            service.register_catalog,
+            catalog_id=catalog.catalog_id,
+            products=catalog.products,
+            ids=catalog.ids,
+            metadata=catalog.metadata,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=StatusCodes.BAD_REQUEST, detail=str(e)) from e
+    except QueueFullError as e:
+        raise _overloaded(request, e) from e
+    except RequestCancelledError as e:
+        raise _abandoned(e) from e
+    except Exception as e:
+        logger.error(f"Error registering catalog: {str(e)}")
+        raise HTTPException(status_code=StatusCodes.SERVER_ERROR, detail=str(e)) from e
+
+    return _catalog_info(registered)
+
+
+@router.get(APIRoutes.CATALOGS, response_model=List[CatalogInfo])
+def list_catalogs(
+    service: SimilarityService = similarity_service_dependency,
+) -> List[CatalogInfo]:
+    """List the registered catalogs.
+
+    Args:
+        service (SimilarityService): The similarity service instance.
+
+    Returns:
+        List[CatalogInfo]: The registered catalogs.
+    """
+    return [_catalog_info(catalog) for catalog in list(service.catalogs.values())]
+
+
+@router.get(APIRoutes.CATALOG, response_model=CatalogInfo)
+def get_catalog(
+    catalog_id: str,
+    service: SimilarityService = similarity_service_dependency,
+) -> CatalogInfo:
+    """Get a registered catalog.
+
+    Args:
+        catalog_id (str): Name of the catalog.
+        service (SimilarityService): The similarity service instance.
+
+    Returns:
+        CatalogInfo: The registered catalog.
+    """
+    try:
+        return _catalog_info(service.get_catalog(catalog_id))
+    except CatalogNotFoundError as e:
+        raise HTTPException(status_code=StatusCodes.NOT_FOUND, detail=str(e)) from e
+
+
+@router.delete(APIRoutes.CATALOG, status_code=StatusCodes.NO_CONTENT)
+def delete_catalog(
+    catalog_id: str,
+    service: SimilarityService = similarity_service_dependency,
+) -> Response:
+    """Delete a registered catalog.
+
+    Args:
+        catalog_id (str): Name of the catalog.
+        service (SimilarityService): The similarity service instance.
+
+    Returns:
+        Response: An empty response.
+    """
+    try:
+        service.delete_catalog(catalog_id)
+    except CatalogNotFoundError as e:
+        raise HTTPException(status_code=StatusCodes.NOT_FOUND, detail=str(e)) from e
+    return Response(status_code=StatusCodes.NO_CONTENT)
+
+
+@router.put(APIRoutes.CATALOG_PRODUCTS, response_model=CatalogUpdate)
+async def upsert_products(
+    request: Request,
+    catalog_id: str,
+    update: ProductsUpsert,
+    service: SimilarityService = similarity_service_dependency,
+    executor: InferenceExecutor = inference_executor_dependency,
+) -> CatalogUpdate:
+    """Add or replace products of a catalog without re-encoding the others.
+
+    Only new products and products whose description changed are encoded;
+    products whose metadata alone changed keep their embedding. The update is
+    searchable as soon as the response is sent.
+
+    Args:
+        request (Request): The incoming request.
+        catalog_id (str): Name of the catalog.
+        update (ProductsUpsert): The products, their ids and their metadata.
+        service (SimilarityService): The similarity service instance.
+        executor (InferenceExecutor): The inference executor instance.
+
+    Returns:
+        CatalogUpdate: The new version of the catalog and the number of
+            products added or replaced.
+    """
+    _require_model(service)
+
+    try:
+        catalog, changed = await _run_cancellable(
+            request,
+            executor,
+            CancellationToken(),
+            service.upsert_products,
+            catalog_id,
+            update.products,
+            update.ids,
+            update.metadata,
+        )
+    except CatalogNotFoundError as e:
+        raise HTTPException(status_code=StatusCodes.NOT_FOUND, detail=str(e)) from e
+    except ValueError as e:
+        raise HTTPException(status_code=StatusCodes.BAD_REQUEST, detail=str(e)) from e
+    except QueueFullError as e:
+        raise _overloaded(request, e) from e
+    except RequestCancelledError as e:
+        raise _abandoned(e) from e
+    except Exception as e:
+        logger.error(f"Error updating catalog: {str(e)}")
+        raise HTTPException(status_code=StatusCodes.SERVER_ERROR, detail=str(e)) from e
+
+    return CatalogUpdate(
+        catalog_id=catalog_id,
+        version=catalog.version,
+        size=catalog.size,
+        changed=changed,
+    )
+
+
+@router.post(APIRoutes.CATALOG_PRODUCTS_DELETE, response_model=CatalogUpdate)
+async def delete_products(
+    request: Request,
+    catalog_id: str,
+    update: ProductsDelete,
+    service: SimilarityService = similarity_service_dependency,
+    executor: InferenceExecutor = inference_executor_dependency,
+) -> CatalogUpdate:
+    """Delete products of a catalog, effective for the next search.
+
+    Args:
+        request (Request): The incoming request.
+        catalog_id (str): Name of the catalog.
+        update (ProductsDelete): The ids of the products. Unknown ids are ignored.
+        service (SimilarityService): The similarity service instance.
+        executor (InferenceExecutor): The inference executor instance.
+
+    Returns:
+        CatalogUpdate: The new version of the catalog and the number of
+            products deleted.
+    """
+    try:
+        catalog, changed = await _run_cancellable(
+            request,
+            executor,
+            CancellationToken(),
+            service.delete_products,
+            catalog_id,
+            update.ids,
+        )
+    except CatalogNotFoundError as e:
+        raise HTTPException(status_code=StatusCodes.NOT_FOUND, detail=str(e)) from e
+    except QueueFullError as e:
+        raise _overloaded(request, e) from e
+    except RequestCancelledError as e:
+        raise _abandoned(e) from e
+
+    return CatalogUpdate(
+        catalog_id=catalog_id,
+        version=catalog.version,
+        size=catalog.size,
+        changed=changed,
+    )
+
+
+@router.post(APIRoutes.CATALOG_COMPACT, response_model=CatalogInfo)
+async def compact_catalog(
+    request: Request,
+    catalog_id: str,
+    service: SimilarityService = similarity_service_dependency,
+    executor: InferenceExecutor = inference_executor_dependency,
+) -> CatalogInfo:
+    """Compact a catalog now instead of waiting for the background compaction.
+
+    Args:
+        request (Request): The incoming request.
+        catalog_id (str): Name of the catalog.
+        service (SimilarityService): The similarity service instance.
+        executor (InferenceExecutor): The inference executor instance.
+
+    Returns:
+        CatalogInfo: The compacted catalog.
+    """
+    try:
+        compacted = await _run_cancellable(
+            request, executor, CancellationToken(), service.compact_catalog, catalog_id
+        )
+    except CatalogNotFoundError as e:
+        raise HTTPException(status_code=StatusCodes.NOT_FOUND, detail=str(e)) from e
+    except QueueFullError as e:
+        raise _overloaded(request, e) from e
+    except RequestCancelledError as e:
+        raise _abandoned(e) from e
+    return _catalog_info(compacted)
+
+
+@router.post(APIRoutes.CATALOG_INDEX, response_model=IndexInfo)
+async def create_catalog_index(
+    request: Request,
+    catalog_id: str,
+    index: IndexCreate,
+    service: SimilarityService = similarity_service_dependency,
+    executor: InferenceExecutor = inference_executor_dependency,
+) -> IndexInfo:
+    """Build the nearest-neighbour index of a catalog and measure its recall.
+
+    The recall@k is measured against exact search on a sample of the catalog,
+    so that nlist and nprobe can be tuned before serving traffic.
+
+    Args:
+        request (Request): The incoming request.
+        catalog_id (str): Name of the catalog.
+        index (IndexCreate): The index kind and parameters.
+        service (SimilarityService): The similarity service instance.
+        executor (InferenceExecutor): The inference executor instance.
+
+    Returns:
+        IndexInfo: The built index and its recall@k.
+    """
+    params = (
+        index.model_dump(include={"nlist", "nprobe"}, exclude_none=True)
+        if index.kind == "ivf"
+        else {}
+    )
+    token = CancellationToken()
+    try:
+        built = await _run_cancellable(
+            request,
+            executor,
+            token,
+            service.build_index,
+            catalog_id,
+            index.kind,
+            **params,
+        )
+        recall = await _run_cancellable(
+            request,
+            executor,
+            token,
+            service.evaluate_index,
+            catalog_id,
+            top_k=index.top_k,
+            sample_size=index.sample_size,
+        )
+    except CatalogNotFoundError as e:
+        raise HTTPException(status_code=StatusCodes.NOT_FOUND, detail=str(e)) from e
+    except QueueFullError as e:
+        raise _overloaded(request, e) from e
+    except RequestCancelledError as e:
+        raise _abandoned(e) from e
+
+    return IndexInfo(
+        catalog_id=catalog_id,
+        index=built.info(),
+        top_k=index.top_k,
+        recall_at_k=round(recall, 4),
+    )
+
+
+@router.get(APIRoutes.MODELS, response_model=List[ModelInfo])
+def list_models() -> List[ModelInfo]:
+    """List the models that can be served and whether they are loaded.
+
+    Returns:
+        List[ModelInfo]: The models, the default one first.
+    """
+    return [ModelInfo(**info) for info in model_registry.info()]
+
+
+@router.put(APIRoutes.MODEL, response_model=ModelInfo, status_code=StatusCodes.ACCEPTED)
+async def load_model(name: str, load: ModelLoad) -> ModelInfo:
+    """Load a model under a name in the background.
+
+    The model serving the name, if any, keeps serving until the new one is
+    loaded and warmed up, and is then swapped out atomically. Only the names
+    and models configured with ``MODEL_NAME`` and ``MODELS`` can be loaded.
+
+    Args:
+        name (str): Name requests select the model with.
+        load (ModelLoad): The model to load.
+
+    Returns:
+        ModelInfo: The model, being loaded.
+
+    Raises:
+        HTTPException: If the name or the model is not configured.
+    """
+    try:
+        model_registry.load_in_background(name, load.model_name)
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=StatusCodes.NOT_FOUND, detail=str(e)) from e
+    except ValueError as e:
+        raise HTTPException(status_code=StatusCodes.BAD_REQUEST, detail=str(e)) from e
+    return next(
+        ModelInfo(**info) for info in model_registry.info() if info["name"] == name
+    )
+
+
+@router.delete(APIRoutes.MODEL, status_code=StatusCodes.NO_CONTENT)
+async def unload_model(name: str) -> None:
+    """Unload a model, which is loaded again by its next request if configured.
+
+    Args:
+        name (str): Name of the model.
+
+    Raises:
+        HTTPException: If the model is not loaded or is the default one.
+    """
+    try:
+        await model_registry.unload(name)
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=StatusCodes.NOT_FOUND, detail=str(e)) from e
+    except ValueError as e:
+        raise HTTPException(status_code=StatusCodes.BAD_REQUEST, detail=str(e)) from e
@@ -0,0 +1,327 @@
+import base64
+from importlib.util import find_spec
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type, TypeVar
+
+import numpy as np
+from fastapi import HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+
+from ..core.constants import StatusCodes
+from .responses import FastJSONResponse
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+MSGPACK_ALIASES = (MSGPACK, "application/x-msgpack", "application/vnd.msgpack")
+MEDIA_TYPES = (JSON, MSGPACK, ARROW)
+# Optional package encoding each binary media type.
+CODECS = {MSGPACK: "msgpack", ARROW: "pyarrow"}
+# Byte order of the base64 encoded embeddings, independent of the host.
+VECTOR_DTYPES = {"float32": np.dtype("<f4"), "float16": np.dtype("<f2")}
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def request_body(model: Type[BaseModel]) -> Dict[str, Any]:
+    """Describe in OpenAPI the bodies accepted by a ``body_decoder``.
+
+    Args:
+        model (Type[BaseModel]): The request model.
+
+    Returns:
+        Dict[str, Any]: The ``openapi_extra`` of the route.
+    """
+    schema = model.model_json_schema()
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                JSON: {"schema": schema},
+                MSGPACK: {"schema": schema},
+                ARROW: {
+                    "schema": {
+                        "type": "string",
+                        "format": "binary",
+                        "description": "Arrow IPC stream of a single row whose "
+                        "columns are the fields of the request, lists of strings "
+                        "being list<string> columns",
+                    }
+                },
+            },
+        }
+    }
+
+
+def _media_type(content_type: str) -> str:
+    """Strip the parameters of a media type and normalize its aliases.
+
+    Args:
+        content_type (str): A Content-Type or Accept entry, e.g.
+            ``"application/json; charset=utf-8"``.
+
+    Returns:
+        str: The bare, lower-case media type.
+    """
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return MSGPACK if media_type in MSGPACK_ALIASES else media_type
+
+
+def _import_codec(media_type: str) -> Any:
+    """Import the optional package encoding a binary media type.
+
+    Args:
+        media_type (str): ``MSGPACK`` or ``ARROW``.
+
+    Returns:
+        Any: The ``msgpack`` or ``pyarrow`` module.
+
+    Raises:
+        HTTPException: If the package is not installed.
+    """
+    try:
+        if media_type == MSGPACK:
+            import msgpack
+
+            return msgpack
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+
+        return pyarrow
+    except ImportError as e:
+        raise HTTPException(
+            status_code=StatusCodes.UNSUPPORTED_MEDIA_TYPE,
+            detail=f"{media_type} is not available, install the binary extra",
+        ) from e
+
+
+def _available(media_type: str) -> bool:
+    """Whether a media type can be encoded with the installed packages.
+
+    Args:
+        media_type (str): One of ``MEDIA_TYPES``.
+
+    Returns:
+        bool: True for JSON and for binary types whose package is installed.
+    """
+    codec = CODECS.get(media_type)
+    return codec is None or find_spec(codec) is not None
+
+
+def _decode_arrow(pa: Any, body: bytes) -> Dict[str, Any]:
+    """Decode a query sent as a single row Arrow IPC stream.
+
+    Args:
+        pa (Any): The ``pyarrow`` module.
+        body (bytes): The request body.
+
+    Returns:
+        Dict[str, Any]: The query fields, null columns left out.
+
+    Raises:
+        ValueError: If the stream does not hold exactly one row.
+    """
+    table = pa.ipc.open_stream(body).read_all()
+    if table.num_rows != 1:
+        raise ValueError(f"expected a single row, got {table.num_rows}")
+    data: Dict[str, Any] = {}
+    for name, column in zip(table.column_names, table.columns, strict=True):
+        array = column.combine_chunks()
+        if array.null_count:
+            continue
+        # The values of a list column are converted from its flat child array
+        # in one call, rather than through a row of Python scalars.
+        if pa.types.is_list(array.type) or pa.types.is_large_list(array.type):
+            data[name] = array.flatten().to_pylist()
+        else:
+            data[name] = array[0].as_py()
+    return data
+
+
+def body_decoder(model: Type[ModelT]) -> Callable[[Request], Awaitable[ModelT]]:
+    """Build a dependency parsing a request model from JSON, MessagePack or Arrow.
+
+    JSON bodies are parsed and validated in one pass by pydantic-core. Binary
+    bodies are decoded by msgpack or pyarrow, both implemented in C, before
+    validation. Errors are raised as validation errors, as for a JSON body.
+
+    Args:
+        model (Type[ModelT]): The request model.
+
+    Returns:
+        Callable[[Request], Awaitable[ModelT]]: The dependency.
+    """
+
+    async def decode(request: Request) -> ModelT:
+        """Parse and validate the request body.
+
+        Args:
+            request (Request): The request.
+
+        Returns:
+            ModelT: The validated request model.
+
+        Raises:
+            HTTPException: If the Content-Type is not supported.
+            RequestValidationError: If the body cannot be decoded or is invalid.
+        """
+        media_type = _media_type(request.headers.get("content-type", JSON))
+        if media_type not in MEDIA_TYPES:
+            raise HTTPException(
+                status_code=StatusCodes.UNSUPPORTED_MEDIA_TYPE,
+                detail=f"Unsupported content type {media_type}, expected one of "
+                f"{', '.join(MEDIA_TYPES)}",
+            )
+        body = await request.body()
+
+        try:
+            if media_type == JSON:
+                return model.model_validate_json(body)
+            codec = _import_codec(media_type)
+            try:
+                data = (
+                    codec.unpackb(body)
+                    if media_type == MSGPACK
+                    else _decode_arrow(codec, body)
+                )
+            except Exception as e:
+                raise RequestValidationError(
+                    [
+                        {
+                            "loc": ("body",),
+                            "msg": f"Invalid {media_type} body: {str(e)}",
+                            "type": "value_error",
+                        }
+                    ]
+                ) from e
+            return model.model_validate(data)
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**error, "loc": ("body", *error["loc"])} for error in e.errors()]
+            ) from e
+
+    return decode
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """Choose the response media type from an Accept header.
+
+    Media types are tried by decreasing quality, in header order on ties. JSON
+    is used when the header is missing or names no binary type whose package
+    is installed.
+
+    Args:
+        accept (Optional[str]): The Accept header of the request.
+
+    Returns:
+        str: One of ``MEDIA_TYPES``.
+    """
+    candidates: List[Tuple[float, int, str]] = []
+    for position, entry in enumerate((accept or "").split(",")):
+        media_type, _, params = entry.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        candidates.append((-quality, position, _media_type(media_type)))
+    for negative_quality, _, media_type in sorted(candidates):
+        if (
+            negative_quality < 0
+            and media_type in MEDIA_TYPES
+            and _available(media_type)
+        ):
+            return media_type
+    return JSON
+
+
+def _encode_arrow(pa: Any, results: List[Dict[str, Any]]) -> bytes:
+    """Encode results as an Arrow IPC stream of one row per query.
+
+    Args:
+        pa (Any): The ``pyarrow`` module.
+        results (List[Dict[str, Any]]): The results, as returned as JSON.
+
+    Returns:
+        bytes: The IPC stream.
+    """
+    first = next((match for result in results for match in result["matches"]), {})
+    if "index" in first:
+        match_fields = [("index", pa.int64())]
+    elif "product_id" in first:
+        match_fields = [("product_id", pa.string())]
+    else:
+        match_fields = [("product", pa.string())]
+    fields = [
+        ("query", pa.string()),
+        ("matches", pa.list_(pa.struct(match_fields + [("score", pa.float64())]))),
+    ]
+    if results and "version" in results[0]:
+        fields.append(("version", pa.int64()))
+    if results and "partial" in results[0]:
+        fields.append(("partial", pa.bool_()))
+    schema = pa.schema(fields)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        writer.write_table(pa.Table.from_pylist(results, schema=schema))
+    return bytes(sink.getvalue())
+
+
+def encode_results(results: List[Dict[str, Any]], media_type: str) -> Response:
+    """Serialize similarity results in the negotiated format.
+
+    Every format decodes back to the same queries, matches and scores.
+
+    Args:
+        results (List[Dict[str, Any]]): The results, one per query.
+        media_type (str): One of ``MEDIA_TYPES``.
+
+    Returns:
+        Response: The serialized results.
+    """
+    if media_type == JSON:
+        return FastJSONResponse(results)
+    codec = _import_codec(media_type)
+    content = (
+        codec.packb(results) if media_type == MSGPACK else _encode_arrow(codec, results)
+    )
+    return Response(content=content, media_type=media_type)
+
+
+def encode_vectors(embeddings: np.ndarray, dtype: str) -> List[str]:
+    """Encode embeddings as base64 strings, one per row.
+
+    Args:
+        embeddings (np.ndarray): Embeddings of shape (n, dim).
+        dtype (str): Element type, one of ``VECTOR_DTYPES``.
+
+    Returns:
+        List[str]: The base64 encoded little-endian rows.
+    """
+    rows = np.ascontiguousarray(embeddings, dtype=VECTOR_DTYPES[dtype])
+    return [base64.b64encode(row.tobytes()).decode("ascii") for row in rows]
+
+
+def decode_vectors(values: List[str], dtype: str) -> np.ndarray:
+    """Decode base64 encoded embeddings into a float32 matrix.
+
+    Args:
+        values (List[str]): The base64 encoded rows.
+        dtype (str): Element type of the rows, one of ``VECTOR_DTYPES``.
+
+    Returns:
+        np.ndarray: float32 embeddings of shape (len(values), dim).
+
+    Raises:
+        ValueError: If a row is not valid base64 or the rows differ in size.
+    """
+    rows = [base64.b64decode(value, validate=True) for value in values]
+    itemsize = VECTOR_DTYPES[dtype].itemsize
+    sizes = {len(row) for row in rows}
+    if len(sizes) != 1 or not rows[0] or len(rows[0]) % itemsize:
+        raise ValueError(f"vectors must be non-empty {dtype} arrays of equal size")
+    matrix = np.frombuffer(b"".join(rows), dtype=VECTOR_DTYPES[dtype])
+    return matrix.reshape(len(rows), -1).astype(np.float32)
@@ -1,6 +1,41 @@
-from typing import List
+from typing import Any, Dict, List, Literal, Optional, Union
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+from ..services.filters import validate_filters
+
+Metadata = Optional[List[Optional[Dict[str, Any]]]]
+
+
+def _check_filter(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Validate the syntax of a filter expression.
+
+    Args:
+        filters (Optional[Dict[str, Any]]): The filter expression.
+
+    Returns:
+        Optional[Dict[str, Any]]: The validated filter expression.
+
+    Raises:
+        ValueError: If an operator is unknown or has an invalid operand.
+    """
+    if filters is not None:
+        validate_filters(filters)
+    return filters
+
+
+def _check_metadata(metadata: Metadata, products: Optional[List[Any]]) -> None:
+    """Validate that metadata, when given, are aligned with products.
+
+    Args:
+        metadata (Metadata): Metadata of each product.
+        products (Optional[List[Any]]): The products, texts or embeddings.
+
+    Raises:
+        ValueError: If metadata are given without products or do not match them.
+    """
+    if metadata is not None and (products is None or len(metadata) != len(products)):
+        raise ValueError("metadata must have one entry per product")
 
 
 class Query(BaseModel):
@@ -8,15 +43,48 @@ class Query(BaseModel):
 
     Attributes:
         text (List[str]): List of query texts to search for.
-        products (List[str]): List of product descriptions to search in.
+        products (Optional[List[str]]): List of product descriptions to search in.
         top_k (int): Number of top matches to return.
+        catalog_id (Optional[str]): Registered catalog to search in instead of
+            products.
+        nprobe (Optional[int]): Number of index clusters to scan when the catalog
+            has an approximate index. Higher is slower and more accurate.
+        return_products (bool): Whether matches carry the product text. When
+            False, matches only carry the product index, or the product id for a
+            catalog, and the score.
+        filter (Optional[Dict[str, Any]]): Metadata conditions the matched
+            products must satisfy, e.g. ``{"category": "tools", "price":
+            {"lt": 50}}``.
+        metadata (Optional[List[Optional[Dict[str, Any]]]]): Metadata of each
+            of ``products``, filtered on.
+        timeout_ms (Optional[float]): Time budget of the request in
+            milliseconds, after which its work stops and it fails with a 504.
     """
 
     text: List[str] = Field(..., description="List of query texts to search for")
-    products: List[str] = Field(
-        ..., description="List of product descriptions to search in"
+    products: Optional[List[str]] = Field(
+        None, description="List of product descriptions to search in"
     )
     top_k: int = Field(..., description="Number of top matches to return")
+    catalog_id: Optional[str] = Field(
+        None, description="Registered catalog to search in instead of products"
+    )
+    nprobe: Optional[int] = Field(
+        None, description="Number of index clusters to scan", ge=1
+    )
+    return_products: bool = Field(
+        True,
+        description="Return the product text of each match, or only its index or id",
+    )
+    filter: Optional[Dict[str, Any]] = Field(
+        None, description="Metadata conditions the matched products must satisfy"
+    )
+    metadata: Metadata = Field(None, description="Metadata of each product")
+    timeout_ms: Optional[float] = Field(
+        None, description="Time budget of the request in milliseconds", gt=0
+    )
+
+    _validate_filter = field_validator("filter")(_check_filter)
 
     @field_validator("text")  # type: ignore[misc]
     def validate_text(cls, v: List[str]) -> List[str]:
@@ -36,19 +104,19 @@ class Query(BaseModel):
         return v
 
     @field_validator("products")  # type: ignore[misc]
-    def validate_products(cls, v: List[str]) -> List[str]:
+    def validate_products(cls, v: Optional[List[str]]) -> Optional[List[str]]:
         """Validate products field.
 
         Args:
-            v (List[str]): The products list to validate.
+            v (Optional[List[str]]): The products list to validate.
 
         Returns:
-            List[str]: The validated products list.
+            Optional[List[str]]: The validated products list.
 
         Raises:
             ValueError: If the products list is empty.
         """
-        if not v:
+        if v is not None and not v:
             raise ValueError("products list cannot be empty")
         return v
 
@@ -70,12 +138,394 @@ class Query(BaseModel):
             raise ValueError("top_k must be greater than 0")
 
         # Check if top_k exceeds number of products
-        if "products" in values.data and v > len(values.data["products"]):
+        if values.data.get("products") and v > len(values.data["products"]):
             raise ValueError(
                 f"top_k ({v}) cannot be greater than number of products ({len(values.data['products'])})"
             )
         return v
 
+    @model_validator(mode="after")  # type: ignore[misc]
+    def validate_product_source(self) -> "Query":
+        """Validate that exactly one of products and catalog_id is given.
+
+        Returns:
+            Query: The validated query.
+
+        Raises:
+            ValueError: If both or neither of products and catalog_id are given,
+                or if metadata do not match the products.
+        """
+        if (self.products is None) == (self.catalog_id is None):
+            raise ValueError("exactly one of products or catalog_id must be provided")
+        _check_metadata(self.metadata, self.products)
+        return self
+
+
+class VectorQuery(BaseModel):
+    """Request model for similarity search with precomputed embeddings.
+
+    Embeddings are base64 encoded little-endian float32 or float16 arrays, one
+    per query or product, as returned by the embed endpoint. Either side can
+    also be given as texts, which are encoded by the model.
+
+    Attributes:
+        text (Optional[List[str]]): Query texts, instead of ``vectors``.
+        vectors (Optional[List[str]]): Query embeddings.
+        products (Optional[List[str]]): Product texts. Encoded when no
+            ``product_vectors`` are given, otherwise only returned in matches.
+        product_vectors (Optional[List[str]]): Product embeddings.
+        catalog_id (Optional[str]): Registered catalog to search in instead of
+            products.
+        top_k (int): Number of top matches to return.
+        dtype (str): Element type of the embeddings, "float32" or "float16".
+        model_name (Optional[str]): Model the embeddings were computed with,
+            checked against the model of the service.
+        nprobe (Optional[int]): Number of index clusters to scan.
+        return_products (bool): Whether matches carry the product text. When
+            False, matches only carry the product index, or the product id for a
+            catalog, and the score.
+        filter (Optional[Dict[str, Any]]): Metadata conditions the matched
+            products must satisfy.
+        metadata (Optional[List[Optional[Dict[str, Any]]]]): Metadata of each
+            product given in the request, filtered on.
+        timeout_ms (Optional[float]): Time budget of the request in
+            milliseconds, after which its work stops and it fails with a 504.
+    """
+
+    text: Optional[List[str]] = Field(None, description="Query texts")
+    vectors: Optional[List[str]] = Field(
+        None, description="Base64 encoded query embeddings"
+    )
+    products: Optional[List[str]] = Field(None, description="Product texts")
+    product_vectors: Optional[List[str]] = Field(
+        None, description="Base64 encoded product embeddings"
+    )
+    catalog_id: Optional[str] = Field(
+        None, description="Registered catalog to search in instead of products"
+    )
+    top_k: int = Field(..., description="Number of top matches to return", ge=1)
+    dtype: Literal["float32", "float16"] = Field(
+        "float32", description="Element type of the embeddings"
+    )
+    model_name: Optional[str] = Field(
+        None, description="Model the embeddings were computed with"
+    )
+    nprobe: Optional[int] = Field(
+        None, description="Number of index clusters to scan", ge=1
+    )
+    return_products: bool = Field(
+        True,
+        description="Return the product text of each match, or only its index or id",
+    )
+    filter: Optional[Dict[str, Any]] = Field(
+        None, description="Metadata conditions the matched products must satisfy"
+    )
+    metadata: Metadata = Field(None, description="Metadata of each product")
+    timeout_ms: Optional[float] = Field(
+        None, description="Time budget of the request in milliseconds", gt=0
+    )
+
+    _validate_filter = field_validator("filter")(_check_filter)
+
+    @model_validator(mode="after")  # type: ignore[misc]
+    def validate_sources(self) -> "VectorQuery":
+        """Validate that queries and products are each given exactly once.
+
+        Returns:
+            VectorQuery: The validated query.
+
+        Raises:
+            ValueError: If the queries or the products are missing, given twice,
+                empty or fewer than top_k, or if metadata do not match them.
+        """
+        queries = self.text if self.text is not None else self.vectors
+        if (self.text is None) == (self.vectors is None) or not queries:
+            raise ValueError("exactly one of text or vectors must be a non-empty list")
+        products = (
+            self.product_vectors if self.product_vectors is not None else self.products
+        )
+        if (products is None) == (self.catalog_id is None):
+            raise ValueError(
+                "exactly one of products, product_vectors or catalog_id must be provided"
+            )
+        if products is not None:
+            if not products:
+                raise ValueError("products cannot be empty")
+            if self.top_k > len(products):
+                raise ValueError(
+                    f"top_k ({self.top_k}) cannot be greater than number of products ({len(products)})"
+                )
+        if self.product_vectors is not None and self.products is not None:
+            if len(self.products) != len(self.product_vectors):
+                raise ValueError("products must have one text per product vector")
+        if self.product_vectors is not None and self.products is None:
+            if self.return_products:
+                raise ValueError(
+                    "products are required with product_vectors unless return_products is false"
+                )
+        _check_metadata(self.metadata, products)
+        return self
+
+
+class EmbedRequest(BaseModel):
+    """Request model for encoding texts into embeddings.
+
+    Attributes:
+        texts (List[str]): Texts to encode.
+        dtype (str): Element type of the returned embeddings, "float32" or
+            "float16".
+        normalize (bool): Whether to scale the embeddings to unit norm.
+    """
+
+    texts: List[str] = Field(..., description="Texts to encode", min_length=1)
+    dtype: Literal["float32", "float16"] = Field(
+        "float32", description="Element type of the returned embeddings"
+    )
+    normalize: bool = Field(False, description="Scale embeddings to unit norm")
+
+
+class EmbedResponse(BaseModel):
+    """Response model of the embed endpoint.
+
+    Attributes:
+        model_name (str): Model the embeddings were computed with.
+        dimension (int): Number of elements of each embedding.
+        dtype (str): Element type of the embeddings.
+        embeddings (List[str]): Base64 encoded little-endian embeddings, one per
+            text.
+    """
+
+    model_name: str = Field(..., description="Model the embeddings come from")
+    dimension: int = Field(..., description="Number of elements per embedding")
+    dtype: str = Field(..., description="Element type of the embeddings")
+    embeddings: List[str] = Field(
+        ..., description="Base64 encoded little-endian embeddings, one per text"
+    )
+
+
+class CatalogCreate(BaseModel):
+    """Request model for registering a product catalog.
+
+    Attributes:
+        catalog_id (str): Unique name of the catalog.
+        products (List[str]): Product descriptions to encode and store.
+        ids (Optional[List[str]]): Product identifiers, one per product.
+        metadata (Optional[List[Optional[Dict[str, Any]]]]): Metadata of each
+            product, searches can filter on.
+    """
+
+    catalog_id: str = Field(
+        ...,
+        description="Unique name of the catalog",
+        min_length=1,
+        pattern=r"^[A-Za-z0-9_-][A-Za-z0-9_.-]*$",
+    )
+    products: List[str] = Field(..., description="Product descriptions to store")
+    ids: Optional[List[str]] = Field(
+        None, description="Product identifiers, one per product"
+    )
+    metadata: Metadata = Field(None, description="Metadata of each product")
+
+    @field_validator("products")  # type: ignore[misc]
+    def validate_products(cls, v: List[str]) -> List[str]:
+        """Validate products field.
+
+        Args:
+            v (List[str]): The products list to validate.
+
+        Returns:
+            List[str]: The validated products list.
+
+        Raises:
+            ValueError: If the products list is empty.
+        """
+        if not v:
+            raise ValueError("products list cannot be empty")
+        return v
+
+    @model_validator(mode="after")  # type: ignore[misc]
+    def validate_ids(self) -> "CatalogCreate":
+        """Validate that ids, when given, are unique and aligned with products.
+
+        Returns:
+            CatalogCreate: The validated catalog.
+
+        Raises:
+            ValueError: If ids are duplicated or ids or metadata do not match the
+                products.
+        """
+        _check_metadata(self.metadata, self.products)
+        if self.ids is not None:
+            if len(self.ids) != len(self.products):
+                raise ValueError(
+                    f"number of ids ({len(self.ids)}) must match number of products ({len(self.products)})"
+                )
+            if len(set(self.ids)) != len(self.ids):
+                raise ValueError("ids must be unique")
+        return self
+
+
+class ProductsUpsert(BaseModel):
+    """Request model for adding or replacing products of a catalog.
+
+    Attributes:
+        products (List[str]): Product descriptions.
+        ids (List[str]): Product identifiers, one per product.
+        metadata (Optional[List[Optional[Dict[str, Any]]]]): Metadata of each
+            product. When omitted, replaced products keep their metadata.
+    """
+
+    products: List[str] = Field(
+        ..., description="Product descriptions to add or replace", min_length=1
+    )
+    ids: List[str] = Field(..., description="Product identifiers, one per product")
+    metadata: Metadata = Field(None, description="Metadata of each product")
+
+    @model_validator(mode="after")  # type: ignore[misc]
+    def validate_ids(self) -> "ProductsUpsert":
+        """Validate that ids are unique and aligned with products.
+
+        Returns:
+            ProductsUpsert: The validated update.
+
+        Raises:
+            ValueError: If ids are duplicated or ids or metadata do not match the
+                products.
+        """
+        _check_metadata(self.metadata, self.products)
+        if len(self.ids) != len(self.products):
+            raise ValueError(
+                f"number of ids ({len(self.ids)}) must match number of products ({len(self.products)})"
+            )
+        if len(set(self.ids)) != len(self.ids):
+            raise ValueError("ids must be unique")
+        return self
+
+
+class ProductsDelete(BaseModel):
+    """Request model for deleting products of a catalog.
+
+    Attributes:
+        ids (List[str]): Identifiers of the products to delete.
+    """
+
+    ids: List[str] = Field(
+        ..., description="Identifiers of the products to delete", min_length=1
+    )
+
+
+class CatalogUpdate(BaseModel):
+    """Response model describing an update of a catalog.
+
+    Attributes:
+        catalog_id (str): Unique name of the catalog.
+        version (int): Version of the catalog after the update.
+        size (int): Number of products in the catalog after the update.
+        changed (int): Number of products encoded or deleted by the update.
+    """
+
+    catalog_id: str = Field(..., description="Unique name of the catalog")
+    version: int = Field(..., description="Version of the catalog after the update")
+    size: int = Field(..., description="Number of products in the catalog")
+    changed: int = Field(
+        ..., description="Number of products added, replaced or deleted"
+    )
+
+
+class CatalogInfo(BaseModel):
+    """Response model describing a registered catalog.
+
+    Attributes:
+        catalog_id (str): Unique name of the catalog.
+        size (int): Number of products in the catalog.
+        version (int): Version of the catalog, increased by every update.
+        pending (int): Number of updated or deleted rows not compacted yet.
+        index (Optional[Dict[str, Any]]): Kind and parameters of the catalog's
+            nearest-neighbour index, if any.
+    """
+
+    catalog_id: str = Field(..., description="Unique name of the catalog")
+    size: int = Field(..., description="Number of products in the catalog")
+    version: int = Field(1, description="Version of the catalog")
+    pending: int = Field(0, description="Updated or deleted rows not compacted yet")
+    index: Optional[Dict[str, Any]] = Field(
+        None, description="Nearest-neighbour index of the catalog"
+    )
+
+
+class IndexCreate(BaseModel):
+    """Request model for building the nearest-neighbour index of a catalog.
+
+    Attributes:
+        kind (str): Index kind, "ivf" for approximate or "exact" for brute force.
+        nlist (Optional[int]): Number of IVF clusters.
+        nprobe (Optional[int]): Default number of IVF clusters scanned per query.
+        top_k (int): Number of neighbours used to measure the recall.
+        sample_size (int): Number of sampled queries used to measure the recall.
+    """
+
+    kind: Literal["exact", "ivf"] = Field("ivf", description="Index kind")
+    nlist: Optional[int] = Field(None, description="Number of IVF clusters", ge=1)
+    nprobe: Optional[int] = Field(
+        None, description="Default number of IVF clusters scanned per query", ge=1
+    )
+    top_k: int = Field(10, description="Neighbours used to measure recall", ge=1)
+    sample_size: int = Field(
+        100, description="Sampled queries used to measure recall", ge=1
+    )
+
+
+class IndexInfo(BaseModel):
+    """Response model describing a built index and its measured recall.
+
+    Attributes:
+        catalog_id (str): Unique name of the catalog.
+        index (Dict[str, Any]): Kind and parameters of the index.
+        top_k (int): Number of neighbours used to measure the recall.
+        recall_at_k (float): Fraction of the exact top-k found by the index.
+    """
+
+    catalog_id: str = Field(..., description="Unique name of the catalog")
+    index: Dict[str, Any] = Field(..., description="Kind and parameters of the index")
+    top_k: int = Field(..., description="Neighbours used to measure recall")
+    recall_at_k: float = Field(..., description="Recall@k against exact search")
+
+
+class ModelLoad(BaseModel):
+    """Request model for loading a model under a name.
+
+    Attributes:
+        model_name (Optional[str]): Model to load, one of the configured
+            models. Defaults to the model configured for the name.
+    """
+
+    model_name: Optional[str] = Field(
+        None,
+        description="Configured model to load, that of the name by default",
+        min_length=1,
+    )
+
+
+class ModelInfo(BaseModel):
+    """Response model describing a model that can be served.
+
+    Attributes:
+        name (str): Name requests select the model with.
+        model_name (Optional[str]): Model served under the name, or loaded on
+            its first request.
+        default (bool): Whether requests without a model use this one.
+        loaded (bool): Whether the model is loaded.
+        loading (Optional[str]): Model being loaded to replace it, if any.
+        memory_bytes (int): Estimated memory taken by the loaded model.
+    """
+
+    name: str = Field(..., description="Name requests select the model with")
+    model_name: Optional[str] = Field(None, description="Model served under the name")
+    default: bool = Field(False, description="Whether this is the default model")
+    loaded: bool = Field(False, description="Whether the model is loaded")
+    loading: Optional[str] = Field(None, description="Model being loaded, if any")
+    memory_bytes: int = Field(0, description="Estimated memory of the loaded model")
+
 
 class SimilarityMatch(BaseModel):
     """Model for a single similarity match.
@@ -95,7 +545,86 @@ class SimilarityResult(BaseModel):
     Attributes:
         query (str): Original query text.
         matches (List[SimilarityMatch]): List of matching products with scores.
+        version (Optional[int]): Version of the searched catalog, None for
+            products given in the request.
+        partial (bool): Whether shards of the catalog missed their deadline
+            and were left out of the matches.
     """
 
     query: str = Field(..., description="Original query text")
     matches: List[SimilarityMatch] = Field(..., description="List of matching products")
+    version: Optional[int] = Field(None, description="Version of the searched catalog")
+    partial: bool = Field(
+        False, description="Whether shards were left out of the matches"
+    )
+
+
+class SimilarityIndexMatch(BaseModel):
+    """Model for a single similarity match returned without the product text.
+
+    Attributes:
+        index (int): Position of the matched product in the request products.
+        score (float): Similarity score between 0 and 1.
+    """
+
+    index: int = Field(..., description="Position of the matched product")
+    score: float = Field(..., description="Similarity score", ge=0, le=1)
+
+
+class SimilarityIdMatch(BaseModel):
+    """Model for a single catalog match returned without the product text.
+
+    Attributes:
+        product_id (str): Identifier of the matched catalog product.
+        score (float): Similarity score between 0 and 1.
+    """
+
+    product_id: str = Field(..., description="Identifier of the matched product")
+    score: float = Field(..., description="Similarity score", ge=0, le=1)
+
+
+class SimilarityIndexResult(BaseModel):
+    """Response model for similarity search results without product texts.
+
+    Attributes:
+        query (str): Original query text.
+        matches (List[Union[SimilarityIndexMatch, SimilarityIdMatch]]): List of
+            matching product indices, or catalog product ids, with scores.
+        version (Optional[int]): Version of the searched catalog, None for
+            products given in the request.
+        partial (bool): Whether shards of the catalog missed their deadline
+            and were left out of the matches.
+    """
+
+    query: str = Field(..., description="Original query text")
+    matches: List[Union[SimilarityIndexMatch, SimilarityIdMatch]] = Field(
+        ..., description="List of matching product indices or ids"
+    )
+    version: Optional[int] = Field(None, description="Version of the searched catalog")
+    partial: bool = Field(
+        False, description="Whether shards were left out of the matches"
+    )
+
+
+class VectorSimilarityResult(BaseModel):
+    """Response model for similarity search results with precomputed embeddings.
+
+    Attributes:
+        query (Optional[str]): Original query text, None for query embeddings.
+        matches (List[Union[SimilarityMatch, SimilarityIndexMatch,
+            SimilarityIdMatch]]): List of matching products, product indices or
+            catalog product ids, with scores.
+        version (Optional[int]): Version of the searched catalog, None for
+            products given in the request.
+        partial (bool): Whether shards of the catalog missed their deadline
+            and were left out of the matches.
+    """
+
+    query: Optional[str] = Field(None, description="Original query text")
+    matches: List[Union[SimilarityMatch, SimilarityIndexMatch, SimilarityIdMatch]] = (
+        Field(..., description="List of matching products, product indices or ids")
+    )
+    version: Optional[int] = Field(None, description="Version of the searched catalog")
+    partial: bool = Field(
+        False, description="Whether shards were left out of the matches"
+    )
@@ -0,0 +1,17 @@
+from typing import Any
+
+import orjson
+from fastapi import Response
+
+
+class FastJSONResponse(Response):
+    """JSON response serialized with orjson.
+
+    Content is dumped as is, without being validated against a response model,
+    so it must already be made of JSON compatible types.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
@@ -0,0 +1,552 @@
+"""Offline batch similarity search of large query files against a catalog.
+
+Usage::
+
+    python -m similarity_search.batch queries.parquet matches.jsonl \\
+        --catalog products.csv --top-k 10
+
+Queries are streamed from a CSV, JSONL or Parquet file in chunks of
+``--chunk-size`` rows, so memory stays bounded by the catalog and a couple of
+chunks whatever the size of the input. The catalog is encoded once, or opened
+from the embedding store with ``--catalog-id`` alone: with
+``EMBEDDING_STORE_DIR`` set, a catalog encoded by a first run is opened by the
+next ones, resumed runs included, without encoding it again, as long as the
+``--catalog`` file still holds the same products. Encoding a chunk
+overlaps with reading the next one and writing the matches of the previous
+one, and is spread over ``--model-workers`` processes.
+
+Matches are appended to a JSONL or CSV file as chunks complete. After each
+chunk, the number of queries done and the size of the output are saved to
+``<output>.checkpoint``: running the same command again after an interruption
+drops the output written past the checkpoint and resumes with the next query.
+The checkpoint identifies the catalog by its product ids and texts, so a run
+against an edited catalog or with another model starts over only with
+``--restart``. The service is configured by the same environment variables as
+the API.
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from .core.dependencies import get_similarity_service
+from .core.exceptions import CatalogNotFoundError
+from .core.logging import get_logger, setup_logging
+from .services.catalog import Catalog
+from .services.product_similarity import SimilarityService
+from .services.shards import track_missed_shards
+
+logger = get_logger(__name__)
+
+OUTPUT_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+INPUT_FORMATS = {**OUTPUT_FORMATS, ".parquet": "parquet"}
+CSV_COLUMNS = ("query_id", "query", "rank", "product_id", "product", "score")
+CHECKPOINT_SUFFIX = ".checkpoint"
+DEFAULT_CATALOG_ID = "batch"
+DEFAULT_CHUNK_SIZE = 1024
+
+Record = Dict[str, Any]
+
+
+def file_format(path: str, formats: Dict[str, str]) -> str:
+    """Get the format of a file from its extension.
+
+    Args:
+        path (str): Path of the file.
+        formats (Dict[str, str]): Format of each supported extension.
+
+    Returns:
+        str: The format.
+
+    Raises:
+        ValueError: If the extension is not supported.
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix not in formats:
+        raise ValueError(
+            f"Unsupported file '{path}', expected one of {', '.join(sorted(formats))}"
+        )
+    return formats[suffix]
+
+
+def read_records(
+    path: str, columns: Sequence[str], batch_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[Record]:
+    """Stream the records of a CSV, JSONL or Parquet file.
+
+    Only ``batch_size`` rows of a Parquet file are decoded at a time; CSV and
+    JSONL files are read line by line.
+
+    Args:
+        path (str): Path of the file.
+        columns (Sequence[str]): Columns read from Parquet files.
+        batch_size (int): Rows decoded at a time from Parquet files.
+
+    Yields:
+        Record: One dict per row.
+
+    Raises:
+        ValueError: If the file format is not supported.
+        ImportError: If a Parquet file is read without ``pyarrow``.
+    """
+    fmt = file_format(path, INPUT_FORMATS)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        available = [name for name in columns if name in parquet.schema_arrow.names]
+        for batch in parquet.iter_batches(batch_size=batch_size, columns=available):
+            yield from batch.to_pylist()
+    elif fmt == "csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def chunked(records: Iterable[Record], size: int) -> Iterator[List[Record]]:
+    """Group records into lists of at most ``size``.
+
+    Args:
+        records (Iterable[Record]): The records.
+        size (int): Records per chunk.
+
+    Yields:
+        List[Record]: The chunks, in order.
+    """
+    iterator = iter(records)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def _field(record: Record, name: str, path: str, row: int) -> str:
+    value = record.get(name)
+    if value is None:
+        raise ValueError(f"Row {row} of '{path}' has no '{name}' field")
+    return str(value)
+
+
+def load_catalog(
+    service: SimilarityService,
+    catalog_id: str,
+    path: Optional[str],
+    text_field: str = "text",
+    id_field: str = "id",
+) -> Catalog:
+    """Encode the catalog searched by a batch, or open it if already encoded.
+
+    Args:
+        service (SimilarityService): The service, with its model loaded.
+        catalog_id (str): Name of the catalog.
+        path (Optional[str]): File of the products to encode. When None, the
+            catalog is opened from the embedding store.
+        text_field (str): Field of the product texts.
+        id_field (str): Field of the product identifiers. Products without it
+            are identified by their row number.
+
+    A stored catalog holding the same products as ``path`` is opened rather
+    than encoded again.
+
+    Returns:
+        Catalog: The catalog.
+
+    Raises:
+        CatalogNotFoundError: If ``path`` is None and the catalog is not stored.
+    """
+    if path is None:
+        service.load_catalogs()
+        return service.get_catalog(catalog_id)
+
+    products: List[str] = []
+    ids: List[str] = []
+    for row, record in enumerate(read_records(path, (text_field, id_field))):
+        products.append(_field(record, text_field, path, row))
+        product_id = record.get(id_field)
+        ids.append(str(row) if product_id is None else str(product_id))
+    if service.embedding_store is not None:
+        try:
+            stored = service.get_catalog(catalog_id)
+        except CatalogNotFoundError:
+            pass
+        else:
+            if catalog_fingerprint(stored) == _fingerprint(ids, products):
+                logger.info(f"Opened stored catalog '{catalog_id}' of {path}")
+                return stored
+    start = time.perf_counter()
+    catalog = service.register_catalog(catalog_id, products, ids)
+    logger.info(
+        f"Encoded {catalog.size} products in {time.perf_counter() - start:.1f}s"
+    )
+    return catalog
+
+
+def _fingerprint(ids: List[str], products: List[str]) -> str:
+    """Hash product ids and texts, in order.
+
+    Args:
+        ids (List[str]): Product identifiers.
+        products (List[str]): Product texts, one per identifier.
+
+    Returns:
+        str: The hex digest.
+    """
+    payload = json.dumps([ids, products], ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def catalog_fingerprint(catalog: Catalog) -> str:
+    """Identify the content of a catalog, whichever run encoded or stored it.
+
+    Args:
+        catalog (Catalog): The catalog.
+
+    Returns:
+        str: Hash of the ids and texts of its live products, in row order.
+    """
+    rows = sorted(catalog.rows.values())
+    return _fingerprint(
+        [catalog.ids[row] for row in rows], [catalog.products[row] for row in rows]
+    )
+
+
+class BatchWriter:
+    """Writes matches to a JSONL or CSV file and checkpoints its progress.
+
+    The checkpoint records the number of queries whose matches are written
+    and the size of the output at that point, and is replaced atomically
+    after each chunk, so that an interrupted job resumes exactly where its
+    last complete chunk ended.
+    """
+
+    def __init__(self, path: str, job: Dict[str, Any], restart: bool = False):
+        """Open the output, resuming from its checkpoint if there is one.
+
+        Args:
+            path (str): Path of the output file.
+            job (Dict[str, Any]): Parameters of the job, such as the input, the
+                catalog, the model and ``top_k``, that a resumed job must match.
+            restart (bool): Whether to ignore an existing checkpoint and start
+                over.
+
+        Raises:
+            ValueError: If the output format is not supported, or the
+                checkpoint was written by a job with different parameters.
+        """
+        self.path = Path(path)
+        self.format = file_format(path, OUTPUT_FORMATS)
+        self.checkpoint_path = Path(f"{path}{CHECKPOINT_SUFFIX}")
+        self.job = job
+        self.rows = 0
+        offset = 0
+        if not restart and self.checkpoint_path.exists():
+            checkpoint = json.loads(self.checkpoint_path.read_text(encoding="utf-8"))
+            if checkpoint["job"] != job:
+                raise ValueError(
+                    f"'{self.checkpoint_path}' belongs to another job, pass "
+                    "--restart to start over"
+                )
+            self.rows, offset = checkpoint["rows"], checkpoint["output_bytes"]
+
+        self._file: IO[bytes] = open(path, "r+b" if offset else "wb")
+        # Drop what was written after the last checkpoint.
+        self._file.truncate(offset)
+        self._file.seek(offset)
+        if self.format == "csv" and not offset:
+            self._write_csv([CSV_COLUMNS])
+        self._save_checkpoint()
+
+    def _write_csv(self, rows: Iterable[Sequence[Any]]) -> None:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(rows)
+        self._file.write(buffer.getvalue().encode("utf-8"))
+
+    def _save_checkpoint(self) -> None:
+        checkpoint = {
+            "job": self.job,
+            "rows": self.rows,
+            "output_bytes": self._file.tell(),
+        }
+        temporary = self.checkpoint_path.with_name(self.checkpoint_path.name + ".tmp")
+        with open(temporary, "wb") as f:
+            f.write(json.dumps(checkpoint).encode("utf-8"))
+            f.flush()
+            # Otherwise a crash could leave the renamed checkpoint empty.
+            os.fsync(f.fileno())
+        os.replace(temporary, self.checkpoint_path)
+
+    def write(self, results: List[Record]) -> None:
+        """Append the matches of a chunk of queries and checkpoint them.
+
+        Args:
+            results (List[Record]): Per query, its ``query_id``, ``query``
+                text, ``matches`` and whether they are ``partial``.
+        """
+        if self.format == "jsonl":
+            self._file.write(
+                b"".join(
+                    json.dumps(result, ensure_ascii=False).encode("utf-8") + b"\n"
+                    for result in results
+                )
+            )
+        else:
+            self._write_csv(
+                (
+                    result["query_id"],
+                    result["query"],
+                    rank,
+                    match["product_id"],
+                    match["product"],
+                    match["score"],
+                )
+                for result in results
+                for rank, match in enumerate(result["matches"], start=1)
+            )
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.rows += len(results)
+        self._save_checkpoint()
+
+    def close(self) -> None:
+        """Close the output file."""
+        self._file.close()
+
+
+def search_chunk(
+    service: SimilarityService,
+    catalog: Catalog,
+    records: List[Record],
+    first_row: int,
+    top_k: int,
+    text_field: str = "text",
+    id_field: str = "id",
+    path: str = "",
+) -> List[Record]:
+    """Search the catalog for a chunk of queries.
+
+    Args:
+        service (SimilarityService): The service, with its model loaded.
+        catalog (Catalog): The catalog searched.
+        records (List[Record]): The query rows.
+        first_row (int): Row number of the first query in the input.
+        top_k (int): Number of matches per query.
+        text_field (str): Field of the query texts.
+        id_field (str): Field of the query identifiers. Queries without it are
+            identified by their row number.
+        path (str): Path of the input, for error messages.
+
+    Returns:
+        List[Record]: Per query, its ``query_id``, ``query`` text and
+            ``matches``, plus ``partial`` when shards missed their deadline.
+    """
+    queries = [
+        _field(record, text_field, path, row)
+        for row, record in enumerate(records, start=first_row)
+    ]
+    with track_missed_shards() as missed:
+        hits = service.find_similar(
+            queries,
+            None,
+            top_k,
+            catalog_id=catalog.catalog_id,
+            return_products=False,
+            catalog=catalog,
+        )
+    results = []
+    for row, (record, query, matches) in enumerate(
+        zip(records, queries, hits, strict=True), start=first_row
+    ):
+        query_id = record.get(id_field)
+        result: Record = {
+            "query_id": str(row) if query_id is None else str(query_id),
+            "query": query,
+            "matches": [
+                {
+                    "product_id": match["product_id"],
+                    "product": catalog.products[catalog.rows[match["product_id"]]],
+                    "score": match["score"],
+                }
+                for match in matches
+            ],
+        }
+        if missed:
+            result["partial"] = True
+        results.append(result)
+    return results
+
+
+def run_batch(
+    service: SimilarityService,
+    catalog: Catalog,
+    input_path: str,
+    output_path: str,
+    top_k: int = 10,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    text_field: str = "text",
+    id_field: str = "id",
+    restart: bool = False,
+) -> Dict[str, Any]:
+    """Search a catalog for every query of a file and write their matches.
+
+    While a chunk is encoded and searched, the next one is read and the
+    matches of the previous one are written, so at most three chunks are in
+    memory at a time.
+
+    Args:
+        service (SimilarityService): The service, with its model loaded.
+        catalog (Catalog): The catalog searched.
+        input_path (str): CSV, JSONL or Parquet file of the queries.
+        output_path (str): JSONL or CSV file the matches are written to.
+        top_k (int): Number of matches per query.
+        chunk_size (int): Queries encoded and searched at a time.
+        text_field (str): Field of the query texts.
+        id_field (str): Field of the query identifiers.
+        restart (bool): Whether to ignore the checkpoint of a previous run.
+
+    Returns:
+        Dict[str, Any]: Queries skipped as already done, queries searched,
+            queries with partial matches and the duration in seconds.
+    """
+    job = {
+        "input": str(Path(input_path).resolve()),
+        "catalog_id": catalog.catalog_id,
+        "catalog": catalog_fingerprint(catalog),
+        "model_name": service.model_name,
+        "top_k": top_k,
+        "text_field": text_field,
+        "id_field": id_field,
+    }
+    writer = BatchWriter(output_path, job, restart=restart)
+    skipped = writer.rows
+    if skipped:
+        logger.info(f"Resuming after {skipped} queries done by a previous run")
+    records = itertools.islice(
+        read_records(input_path, (text_field, id_field), chunk_size), skipped, None
+    )
+    stats = {"skipped": skipped, "searched": 0, "partial": 0}
+    start = time.perf_counter()
+    pending: Optional["Future[List[Record]]"] = None
+
+    def flush(future: "Future[List[Record]]") -> None:
+        results = future.result()
+        writer.write(results)
+        stats["searched"] += len(results)
+        stats["partial"] += sum(1 for result in results if result.get("partial"))
+        logger.info(f"Wrote matches of {writer.rows} queries")
+
+    try:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            first_row = skipped
+            for chunk in chunked(records, chunk_size):
+                future = executor.submit(
+                    search_chunk,
+                    service,
+                    catalog,
+                    chunk,
+                    first_row,
+                    top_k,
+                    text_field,
+                    id_field,
+                    input_path,
+                )
+                first_row += len(chunk)
+                if pending is not None:
+                    flush(pending)
+                pending = future
+            if pending is not None:
+                flush(pending)
+    finally:
+        writer.close()
+    return {**stats, "seconds": round(time.perf_counter() - start, 3)}
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse the command line arguments of the batch search."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("input", help="CSV, JSONL or Parquet file of the queries.")
+    parser.add_argument("output", help="JSONL or CSV file the matches go to.")
+    parser.add_argument(
+        "--catalog",
+        help="CSV, JSONL or Parquet file of the products. When omitted, "
+        "--catalog-id is opened from EMBEDDING_STORE_DIR.",
+    )
+    parser.add_argument("--catalog-id", default=DEFAULT_CATALOG_ID)
+    parser.add_argument("--catalog-text-field", default="text")
+    parser.add_argument("--catalog-id-field", default="id")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--model-name", help="Defaults to MODEL_NAME.")
+    parser.add_argument(
+        "--model-workers",
+        type=int,
+        help="Model processes encoding in parallel, defaults to MODEL_WORKERS.",
+    )
+    parser.add_argument(
+        "--restart", action="store_true", help="Ignore the checkpoint of the output."
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run a batch search from the command line.
+
+    Args:
+        argv (Optional[Sequence[str]]): Command line arguments.
+
+    Returns:
+        int: 0 on success, 2 if the inputs or the catalog are invalid.
+    """
+    args = parse_args(argv)
+    setup_logging()
+    service = get_similarity_service(args.model_name)
+    if args.model_workers is not None:
+        service.model_workers = args.model_workers
+    # Every query is searched once, caching their results only costs memory.
+    service.result_cache = None
+    asyncio.run(service.load_model())
+    try:
+        catalog = load_catalog(
+            service,
+            args.catalog_id,
+            args.catalog,
+            text_field=args.catalog_text_field,
+            id_field=args.catalog_id_field,
+        )
+        stats = run_batch(
+            service,
+            catalog,
+            args.input,
+            args.output,
+            top_k=args.top_k,
+            chunk_size=args.chunk_size,
+            text_field=args.text_field,
+            id_field=args.id_field,
+            restart=args.restart,
+        )
+    except (ValueError, CatalogNotFoundError, OSError) as e:
+        print(f"Batch failed: {e}", file=sys.stderr)
+        return 2
+    finally:
+        asyncio.run(service.cleanup())
+    if stats["partial"]:
+        logger.warning(f"{stats['partial']} queries are missing shard matches")
+    print(json.dumps(stats), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+import zlib
+from typing import List, Optional
+
+import numpy as np
+
+WORDS = (
+    "cordless drill battery hammer saw wooden table chair lamp steel pan "
+    "kettle garden hose rake shovel ladder paint brush roller screw nail "
+    "bolt wrench plier tape measure level glue sander grinder vacuum fan "
+    "heater shelf cabinet drawer mirror rug pillow blanket mattress desk"
+).split()
+
+
+class HashingEncoder:
+    """Deterministic stand-in for a sentence transformer.
+
+    Each token is hashed into one of ``dimension`` buckets, so texts sharing
+    words get similar embeddings. Encoding costs a few microseconds per text,
+    which keeps benchmarks focused on the code around the model and runs them
+    without downloading it.
+    """
+
+    def __init__(self, dimension: int = 64):
+        """Initialize the encoder.
+
+        Args:
+            dimension (int): Dimension of the embeddings.
+        """
+        self.dimension: int = dimension
+
+    def get_sentence_embedding_dimension(self) -> int:
+        """Get the dimension of the embeddings."""
+        return self.dimension
+
+    def encode(self, texts: List[str], **kwargs: object) -> np.ndarray:
+        """Encode texts into bag-of-hashed-words embeddings.
+
+        Args:
+            texts (List[str]): Texts to encode.
+            **kwargs (object): Ignored, accepted for compatibility with
+                ``SentenceTransformer.encode``.
+
+        Returns:
+            np.ndarray: float32 embeddings, one row per text.
+        """
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in text.lower().split():
+                embeddings[row, zlib.crc32(token.encode()) % self.dimension] += 1.0
+            embeddings[row, 0] += 0.1
+        return embeddings
+
+
+def make_texts(count: int, words: int, seed: Optional[int] = 0) -> List[str]:
+    """Generate product-like texts from a small vocabulary.
+
+    Args:
+        count (int): Number of texts.
+        words (int): Number of words per text.
+        seed (Optional[int]): Seed of the generator, for reproducible runs.
+
+    Returns:
+        List[str]: The generated texts.
+    """
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(WORDS), size=(count, words))
+    return [" ".join(WORDS[i] for i in row) for row in picks]
@@ -0,0 +1,516 @@
+"""Load generator for the similarity API, in-process or against a server.
+
+Usage::
+
+    # Closed loop: 16 clients sending back to back for 10 seconds
+    python -m similarity_search.benchmarks.loadgen --mode closed --concurrency 16
+
+    # Open loop: 200 requests per second against a local uvicorn
+    python -m similarity_search.benchmarks.loadgen --mode open --rate 200 \\
+        --url http://127.0.0.1:8000
+
+Without ``--url`` the app runs in-process on the deterministic stand-in
+encoder. Requests are drawn from a weighted mix of query shapes, see
+``--mix``. The report holds an HDR-style latency histogram, the error counts
+per status and the achieved throughput.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+import numpy as np
+
+from ..core.constants import APIRoutes, StatusCodes
+from ..services.executor import InferenceExecutor
+from .encoders import make_texts
+from .suite import build_app, build_service
+
+DEFAULT_MIX = '[{"texts": 1, "products": 20, "top_k": 5}]'
+REPORT_PERCENTILES = (50.0, 90.0, 95.0, 99.0, 99.9, 99.99, 100.0)
+
+
+class LatencyHistogram:
+    """Log-linear histogram of latencies in microseconds, as in HdrHistogram.
+
+    Values below ``2 ** significant_bits`` microseconds are counted exactly.
+    Larger values fall in buckets whose width doubles with every power of two,
+    so each value is known within ``1 / 2 ** (significant_bits - 1)`` of its
+    magnitude (about 1.6% by default) whatever the range, in constant memory.
+    """
+
+    def __init__(self, significant_bits: int = 7):
+        """Initialize an empty histogram.
+
+        Args:
+            significant_bits (int): Number of bits of precision kept per value.
+        """
+        self.significant_bits: int = significant_bits
+        self.counts: Counter[Tuple[int, int]] = Counter()
+        self.count: int = 0
+        self.total_us: int = 0
+        self.min_us: Optional[int] = None
+        self.max_us: int = 0
+
+    def _bucket(self, value_us: int) -> Tuple[int, int]:
+        shift = max(value_us.bit_length() - self.significant_bits, 0)
+        return shift, value_us >> shift
+
+    @staticmethod
+    def _highest_equivalent(bucket: Tuple[int, int]) -> int:
+        shift, sub_bucket = bucket
+        return ((sub_bucket + 1) << shift) - 1
+
+    def record(self, seconds: float) -> None:
+        """Record one latency.
+
+        Args:
+            seconds (float): The latency in seconds.
+        """
+        value_us = max(int(round(seconds * 1_000_000)), 0)
+        self.counts[self._bucket(value_us)] += 1
+        self.count += 1
+        self.total_us += value_us
+        self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+        self.max_us = max(self.max_us, value_us)
+
+    def value_at_percentile(self, percentile: float) -> float:
+        """Get the latency at or below which a percentage of the values fall.
+
+        Args:
+            percentile (float): The percentile, between 0 and 100.
+
+        Returns:
+            float: The latency in milliseconds, 0 for an empty histogram.
+        """
+        if not self.count:
+            return 0.0
+        target = max(math.ceil(percentile / 100 * self.count), 1)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= target:
+                return min(self._highest_equivalent(bucket), self.max_us) / 1000
+        return self.max_us / 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summarize the histogram.
+
+        Returns:
+            Dict[str, Any]: Count, min, mean, max and percentiles in milliseconds,
+                and the non-empty buckets as ``[upper bound ms, count]`` pairs.
+        """
+        return {
+            "count": self.count,
+            "min_ms": (self.min_us or 0) / 1000,
+            "mean_ms": round(self.total_us / self.count / 1000, 3) if self.count else 0,
+            "max_ms": self.max_us / 1000,
+            "percentiles_ms": {
+                f"p{p:g}": self.value_at_percentile(p) for p in REPORT_PERCENTILES
+            },
+            "buckets": [
+                [self._highest_equivalent(bucket) / 1000, self.counts[bucket]]
+                for bucket in sorted(self.counts)
+            ],
+        }
+
+
+class RequestMix:
+    """Weighted mix of ``Query`` shapes the load is drawn from.
+
+    Each entry gives the number of query ``texts``, the ``top_k`` and either a
+    number of inline ``products`` or a ``catalog_id``, with an optional
+    ``weight`` and ``return_products`` flag. A few payload variants are generated per entry up front so
+    that generating text never competes with sending requests.
+    """
+
+    def __init__(
+        self, entries: List[Dict[str, Any]], variants: int = 32, seed: int = 0
+    ):
+        """Generate the payloads of the mix.
+
+        Args:
+            entries (List[Dict[str, Any]]): The request shapes.
+            variants (int): Number of payloads generated per shape.
+            seed (int): Seed of the generated texts and of the draws.
+
+        Raises:
+            ValueError: If an entry has neither products nor a catalog id.
+        """
+        self.entries: List[Dict[str, Any]] = entries
+        self.payloads: List[List[Dict[str, Any]]] = []
+        for i, entry in enumerate(entries):
+            if not entry.get("products") and not entry.get("catalog_id"):
+                raise ValueError(f"Mix entry {i} needs products or a catalog_id")
+            words = entry.get("words", 8)
+            payloads = []
+            for variant in range(variants):
+                payload: Dict[str, Any] = {
+                    "text": make_texts(entry.get("texts", 1), words, seed + variant),
+                    "top_k": entry.get("top_k", 5),
+                }
+                if "return_products" in entry:
+                    payload["return_products"] = entry["return_products"]
+                if entry.get("catalog_id"):
+                    payload["catalog_id"] = entry["catalog_id"]
+                else:
+                    payload["products"] = make_texts(
+                        entry["products"], words, seed + variants + variant
+                    )
+                payloads.append(payload)
+            self.payloads.append(payloads)
+        weights = np.array([entry.get("weight", 1.0) for entry in entries])
+        self.probabilities: np.ndarray = weights / weights.sum()
+        self._rng = np.random.default_rng(seed)
+
+    @classmethod
+    def parse(cls, spec: str, **kwargs: Any) -> "RequestMix":
+        """Build a mix from its JSON description.
+
+        Args:
+            spec (str): A JSON list of request shapes.
+            **kwargs (Any): Keyword arguments of the constructor.
+
+        Returns:
+            RequestMix: The mix.
+        """
+        return cls(json.loads(spec), **kwargs)
+
+    def catalog_ids(self) -> List[str]:
+        """Get the catalogs referenced by the mix."""
+        return sorted({e["catalog_id"] for e in self.entries if e.get("catalog_id")})
+
+    def next_payload(self) -> Dict[str, Any]:
+        """Draw the next request payload."""
+        entry = self._rng.choice(len(self.entries), p=self.probabilities)
+        payloads = self.payloads[entry]
+        return payloads[self._rng.integers(len(payloads))]
+
+
+class LoadReport:
+    """Outcome of a load run: latencies, status counts and throughput."""
+
+    def __init__(self, mode: str):
+        """Initialize an empty report.
+
+        Args:
+            mode (str): The load mode, ``"open"`` or ``"closed"``.
+        """
+        self.mode: str = mode
+        self.latency: LatencyHistogram = LatencyHistogram()
+        self.error_latency: LatencyHistogram = LatencyHistogram()
+        self.statuses: Counter[str] = Counter()
+        self.sent: int = 0
+        self.dropped: int = 0
+        self.duration: float = 0.0
+
+    def record(self, status: str, seconds: float) -> None:
+        """Record the outcome of one request.
+
+        Args:
+            status (str): The HTTP status code, or the exception name when no
+                response was received.
+            seconds (float): The latency of the request.
+        """
+        self.statuses[status] += 1
+        if status == str(int(StatusCodes.OK)):
+            self.latency.record(seconds)
+        else:
+            self.error_latency.record(seconds)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summarize the run.
+
+        Returns:
+            Dict[str, Any]: Request counts, error rate, achieved throughput and
+                the latency histograms of successful and failed requests.
+        """
+        completed = sum(self.statuses.values())
+        ok = self.latency.count
+        duration = self.duration or 1e-9
+        return {
+            "mode": self.mode,
+            "duration_s": round(self.duration, 3),
+            "sent": self.sent,
+            "completed": completed,
+            "dropped": self.dropped,
+            "statuses": dict(sorted(self.statuses.items())),
+            "error_rate": round((completed - ok) / completed, 4) if completed else 0.0,
+            "achieved_qps": round(completed / duration, 2),
+            "goodput_qps": round(ok / duration, 2),
+            "latency": self.latency.to_dict(),
+            "error_latency": self.error_latency.to_dict(),
+        }
+
+
+async def _send(
+    client: httpx.AsyncClient,
+    payload: Dict[str, Any],
+    started: float,
+    report: LoadReport,
+) -> None:
+    """Send one similarity request and record its outcome.
+
+    Args:
+        client (httpx.AsyncClient): Client of the app.
+        payload (Dict[str, Any]): The ``Query`` body.
+        started (float): ``perf_counter`` time the latency is measured from.
+        report (LoadReport): Report the outcome is recorded in.
+    """
+    try:
+        response = await client.post(APIRoutes.get_similarity_route(), json=payload)
+        status = str(response.status_code)
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    report.record(status, time.perf_counter() - started)
+
+
+async def run_closed_loop(
+    client: httpx.AsyncClient,
+    mix: RequestMix,
+    concurrency: int,
+    duration: float,
+) -> LoadReport:
+    """Run clients that each send their next request when the previous returns.
+
+    The offered load adapts to the server, so this measures the throughput
+    reachable at a given concurrency.
+
+    Args:
+        client (httpx.AsyncClient): Client of the app.
+        mix (RequestMix): The request mix.
+        concurrency (int): Number of concurrent clients.
+        duration (float): Duration of the run in seconds.
+
+    Returns:
+        LoadReport: The outcome of the run.
+    """
+    report = LoadReport("closed")
+    start = time.perf_counter()
+    end = start + duration
+
+    async def worker() -> None:
+        while time.perf_counter() < end:
+            report.sent += 1
+            await _send(client, mix.next_payload(), time.perf_counter(), report)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    report.duration = time.perf_counter() - start
+    return report
+
+
+async def run_open_loop(
+    client: httpx.AsyncClient,
+    mix: RequestMix,
+    rate: float,
+    duration: float,
+    poisson: bool = False,
+    max_outstanding: int = 10_000,
+    seed: int = 0,
+) -> LoadReport:
+    """Send requests at a fixed arrival rate, whether or not earlier ones returned.
+
+    Latencies are measured from the time each request was scheduled, not sent,
+    so a stalled server shows up in the tail instead of slowing the load down.
+
+    Args:
+        client (httpx.AsyncClient): Client of the app.
+        mix (RequestMix): The request mix.
+        rate (float): Arrival rate in requests per second.
+        duration (float): Duration of the arrivals in seconds.
+        poisson (bool): Draw exponential inter-arrival times instead of
+            evenly spaced ones.
+        max_outstanding (int): Requests in flight above which new arrivals
+            are dropped and counted instead of sent.
+        seed (int): Seed of the Poisson arrivals.
+
+    Returns:
+        LoadReport: The outcome of the run.
+    """
+    report = LoadReport("open")
+    rng = np.random.default_rng(seed)
+    tasks: "set[asyncio.Task[None]]" = set()
+    start = time.perf_counter()
+    scheduled = start
+    while scheduled < start + duration:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(tasks) >= max_outstanding:
+            report.dropped += 1
+        else:
+            report.sent += 1
+            task = asyncio.create_task(
+                _send(client, mix.next_payload(), scheduled, report)
+            )
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        scheduled += rng.exponential(1 / rate) if poisson else 1 / rate
+    if tasks:
+        await asyncio.gather(*tasks)
+    report.duration = time.perf_counter() - start
+    return report
+
+
+async def _register_catalogs(
+    client: httpx.AsyncClient, catalog_ids: Sequence[str], size: int, words: int
+) -> None:
+    """Register the catalogs referenced by the mix before the run."""
+    for catalog_id in catalog_ids:
+        response = await client.post(
+            APIRoutes.get_catalogs_route(),
+            json={"catalog_id": catalog_id, "products": make_texts(size, words)},
+        )
+        response.raise_for_status()
+
+
+async def run_load(
+    mix: RequestMix,
+    mode: str,
+    duration: float,
+    concurrency: int = 8,
+    rate: float = 100.0,
+    poisson: bool = False,
+    url: Optional[str] = None,
+    catalog_size: int = 1000,
+    timeout: float = 30.0,
+    workers: int = 4,
+    queue_size: int = 64,
+    **service_options: Any,
+) -> LoadReport:
+    """Run a load test against a server or the in-process app.
+
+    Args:
+        mix (RequestMix): The request mix.
+        mode (str): ``"closed"`` or ``"open"``.
+        duration (float): Duration of the run in seconds.
+        concurrency (int): Number of clients in closed loop.
+        rate (float): Arrival rate in open loop, in requests per second.
+        poisson (bool): Use Poisson arrivals in open loop.
+        url (Optional[str]): Base URL of a running server. None runs the app
+            in-process on the stand-in encoder.
+        catalog_size (int): Size of the catalogs registered for the mix.
+        timeout (float): Request timeout in seconds.
+        workers (int): Inference workers of the in-process app.
+        queue_size (int): Inference queue size of the in-process app.
+        **service_options (Any): Keyword arguments of the in-process
+            ``SimilarityService``.
+
+    Returns:
+        LoadReport: The outcome of the run.
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+    if mode not in ("closed", "open"):
+        raise ValueError(f"Unknown load mode '{mode}', expected 'closed' or 'open'")
+    executor: Optional[InferenceExecutor] = None
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    if url is None:
+        executor = InferenceExecutor(max_workers=workers, max_queue_size=queue_size)
+        executor.start()
+        app = build_app(build_service("stub", **service_options), executor)
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://loadgen",
+            timeout=timeout,
+        )
+    else:
+        client = httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits)
+    try:
+        async with client:
+            await _register_catalogs(client, mix.catalog_ids(), catalog_size, 8)
+            if mode == "closed":
+                return await run_closed_loop(client, mix, concurrency, duration)
+            return await run_open_loop(client, mix, rate, duration, poisson)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Render a report as text, with the latency percentile distribution.
+
+    Args:
+        report (Dict[str, Any]): The report, as returned by ``to_dict``.
+
+    Returns:
+        str: The human readable report.
+    """
+    lines = [
+        f"mode={report['mode']} duration={report['duration_s']}s "
+        f"sent={report['sent']} completed={report['completed']} "
+        f"dropped={report['dropped']}",
+        f"achieved={report['achieved_qps']} req/s "
+        f"goodput={report['goodput_qps']} req/s "
+        f"error_rate={report['error_rate']:.2%} statuses={report['statuses']}",
+        "latency of successful requests (ms):",
+    ]
+    for name, value in report["latency"]["percentiles_ms"].items():
+        lines.append(f"  {name:>7} {value:10.3f}")
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse the command line arguments of the load generator."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--mode", choices=("closed", "open"), default="closed")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=100.0)
+    parser.add_argument("--poisson", action="store_true")
+    parser.add_argument(
+        "--mix",
+        default=DEFAULT_MIX,
+        help="JSON list of request shapes with texts, products or catalog_id, "
+        "top_k, words and weight.",
+    )
+    parser.add_argument("--url", help="Base URL of a running server.")
+    parser.add_argument("--catalog-size", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run the load generator from the command line.
+
+    Args:
+        argv (Optional[Sequence[str]]): Command line arguments.
+
+    Returns:
+        int: 0 once the run completes.
+    """
+    args = parse_args(argv)
+    report = asyncio.run(
+        run_load(
+            RequestMix.parse(args.mix),
+            args.mode,
+            args.duration,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            poisson=args.poisson,
+            url=args.url,
+            catalog_size=args.catalog_size,
+            timeout=args.timeout,
+            workers=args.workers,
+            queue_size=args.queue_size,
+        )
+    ).to_dict()
+    print(format_report(report))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
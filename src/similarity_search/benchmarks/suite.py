@@ -0,0 +1,425 @@
+"""Latency benchmarks of the similarity search, offline or on the real model.
+
+Usage::
+
+    python -m similarity_search.benchmarks.suite --output results.json
+    python -m similarity_search.benchmarks.suite --baseline baseline.json \\
+        --max-regression 0.2
+
+Each case runs ``find_similar`` (on a registered catalog or inline products)
+or the HTTP route a number of times and records latency percentiles,
+throughput and the peak RSS of the process. With ``--baseline`` the run fails
+when a case is slower than in the baseline by more than ``--max-regression``.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import resource
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..core.constants import APIRoutes, AppDefaults, AppSettings, StatusCodes
+from ..services.executor import InferenceExecutor
+from ..services.product_similarity import SimilarityService
+from .encoders import HashingEncoder, make_texts
+
+PATHS = ("catalog", "inline", "http")
+CASE_KEYS = ("path", "queries", "catalog_size", "text_words", "top_k")
+BENCH_CATALOG_ID = "bench"
+
+
+def peak_rss_mb() -> float:
+    """Get the peak resident set size of the process so far.
+
+    Returns:
+        float: The peak RSS in MiB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(latencies: Sequence[float], queries_per_call: int) -> Dict[str, float]:
+    """Summarize the latencies of repeated calls.
+
+    Args:
+        latencies (Sequence[float]): Duration of each call in seconds.
+        queries_per_call (int): Number of queries searched per call.
+
+    Returns:
+        Dict[str, float]: Latency percentiles and mean in milliseconds and the
+            throughput in queries per second.
+    """
+    millis = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(millis, [50, 95, 99])
+    total = float(np.sum(latencies))
+    return {
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "mean_ms": round(float(millis.mean()), 4),
+        "throughput_qps": (
+            round(queries_per_call * len(latencies) / total, 2) if total else 0.0
+        ),
+    }
+
+
+def measure(call: Callable[[], Any], repeats: int, warmup: int = 1) -> List[float]:
+    """Time repeated calls of a function.
+
+    Args:
+        call (Callable[[], Any]): The function to time.
+        repeats (int): Number of timed calls.
+        warmup (int): Number of untimed calls made first.
+
+    Returns:
+        List[float]: Duration of each timed call in seconds.
+    """
+    for _ in range(warmup):
+        call()
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def build_service(
+    encoder: str, model_name: str = AppSettings.MODEL_NAME, **options: Any
+) -> SimilarityService:
+    """Build a similarity service for benchmarking.
+
+    Args:
+        encoder (str): ``"stub"`` for the deterministic stand-in encoder or
+            ``"model"`` for the real model, which must already be cached
+            locally since nothing is downloaded.
+        model_name (str): Name of the real model.
+        **options (Any): Keyword arguments of ``SimilarityService``.
+
+    Returns:
+        SimilarityService: The service, with its model loaded and warmed up.
+
+    Raises:
+        OSError: If the real model is not cached locally.
+    """
+    options.setdefault("warmup_batch_sizes", list(AppDefaults.WARMUP_BATCH_SIZES))
+    service = SimilarityService(model_name, **options)
+    if encoder == "stub":
+        service.model = HashingEncoder()
+    else:
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        from ..services.inference_backend import load_model
+
+        service.model = load_model(model_name, service.inference_backend)
+    service.warmup()
+    return service
+
+
+def build_app(service: SimilarityService, executor: InferenceExecutor) -> Any:
+    """Build the app with its routes bound to the given service and executor.
+
+    The lifespan is not run, so the caller provides a service with its model
+    loaded and a started executor.
+
+    Args:
+        service (SimilarityService): The service the routes use.
+        executor (InferenceExecutor): The started executor the routes use.
+
+    Returns:
+        Any: The ``FastAPI`` application.
+    """
+    from ..api.endpoints import (
+        inference_executor_dependency,
+        similarity_service_dependency,
+    )
+    from ..main import create_app
+
+    app = create_app()
+    app.dependency_overrides[similarity_service_dependency.dependency] = lambda: service
+    app.dependency_overrides[inference_executor_dependency.dependency] = (
+        lambda: executor
+    )
+    # One log line per benchmark request would drown the results.
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    return app
+
+
+def build_client(service: SimilarityService, executor: InferenceExecutor) -> Any:
+    """Build an in-process HTTP client of the app serving ``service``.
+
+    Args:
+        service (SimilarityService): The service the routes use.
+        executor (InferenceExecutor): The started executor the routes use.
+
+    Returns:
+        Any: A ``fastapi.testclient.TestClient`` of the app.
+    """
+    from fastapi.testclient import TestClient
+
+    return TestClient(build_app(service, executor))
+
+
+def run_case(
+    service: SimilarityService,
+    path: str,
+    queries: int,
+    catalog_size: int,
+    text_words: int,
+    top_k: int,
+    repeats: int,
+    warmup: int = 1,
+    client: Any = None,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Benchmark one combination of the sweep.
+
+    Catalog registration happens before timing; only searches are timed.
+
+    Args:
+        service (SimilarityService): The service to benchmark.
+        path (str): One of ``PATHS``: search a registered catalog, inline
+            products, or a registered catalog through the HTTP route.
+        queries (int): Number of queries per call.
+        catalog_size (int): Number of products searched.
+        text_words (int): Number of words per query and product text.
+        top_k (int): Number of matches per query.
+        repeats (int): Number of timed calls.
+        warmup (int): Number of untimed calls made first.
+        client (Any): HTTP client of the app, required for the ``http`` path.
+        seed (int): Seed of the generated texts.
+
+    Returns:
+        Dict[str, Any]: The case parameters with its latency summary and the
+            peak RSS of the process.
+
+    Raises:
+        ValueError: If the path is unknown or the client is missing.
+    """
+    query_texts = make_texts(queries, text_words, seed + 1)
+    products = make_texts(catalog_size, text_words, seed)
+    call: Callable[[], Any]
+    if path in ("catalog", "http"):
+        service.register_catalog(BENCH_CATALOG_ID, products)
+    if path == "catalog":
+
+        def call() -> Any:
+            return service.find_similar(
+                query_texts, None, top_k, catalog_id=BENCH_CATALOG_ID
+            )
+
+    elif path == "inline":
+
+        def call() -> Any:
+            return service.find_similar(query_texts, products, top_k)
+
+    elif path == "http":
+        if client is None:
+            raise ValueError("The http path requires a client")
+        payload = {"text": query_texts, "catalog_id": BENCH_CATALOG_ID, "top_k": top_k}
+
+        def call() -> Any:
+            response = client.post(APIRoutes.get_similarity_route(), json=payload)
+            if response.status_code != StatusCodes.OK:
+                raise RuntimeError(f"HTTP {response.status_code}: {response.text}")
+            return response
+
+    else:
+        raise ValueError(f"Unknown benchmark path '{path}', expected one of {PATHS}")
+
+    latencies = measure(call, repeats, warmup)
+    return {
+        "path": path,
+        "queries": queries,
+        "catalog_size": catalog_size,
+        "text_words": text_words,
+        "top_k": top_k,
+        "repeats": repeats,
+        **summarize(latencies, queries),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def run_suite(
+    service: SimilarityService,
+    paths: Sequence[str],
+    queries: Sequence[int],
+    catalog_sizes: Sequence[int],
+    text_words: Sequence[int],
+    top_ks: Sequence[int],
+    repeats: int,
+    warmup: int = 1,
+) -> List[Dict[str, Any]]:
+    """Benchmark every combination of the sweep.
+
+    Args:
+        service (SimilarityService): The service to benchmark.
+        paths (Sequence[str]): Paths to benchmark, see ``PATHS``.
+        queries (Sequence[int]): Numbers of queries per call.
+        catalog_sizes (Sequence[int]): Numbers of products searched.
+        text_words (Sequence[int]): Numbers of words per text.
+        top_ks (Sequence[int]): Numbers of matches per query.
+        repeats (int): Number of timed calls per case.
+        warmup (int): Number of untimed calls per case.
+
+    Returns:
+        List[Dict[str, Any]]: One result per case.
+    """
+    executor: Optional[InferenceExecutor] = None
+    client = None
+    if "http" in paths:
+        executor = InferenceExecutor(max_workers=4, max_queue_size=64)
+        executor.start()
+        client = build_client(service, executor)
+    try:
+        results = []
+        for path, n, size, words, top_k in itertools.product(
+            paths, queries, catalog_sizes, text_words, top_ks
+        ):
+            result = run_case(
+                service, path, n, size, words, top_k, repeats, warmup, client
+            )
+            print(json.dumps(result), file=sys.stderr)
+            results.append(result)
+        return results
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def case_key(result: Dict[str, Any]) -> tuple:
+    """Get the sweep parameters identifying a result."""
+    return tuple(result[key] for key in CASE_KEYS)
+
+
+def compare_to_baseline(
+    results: List[Dict[str, Any]],
+    baseline: List[Dict[str, Any]],
+    max_regression: float,
+    metric: str = "p95_ms",
+) -> List[str]:
+    """Find the cases that are slower than in a baseline run.
+
+    Args:
+        results (List[Dict[str, Any]]): Results of the current run.
+        baseline (List[Dict[str, Any]]): Results of the baseline run. Cases
+            missing from it are not compared.
+        max_regression (float): Tolerated relative slowdown, e.g. 0.2 for 20%.
+        metric (str): Latency metric compared.
+
+    Returns:
+        List[str]: A description of each regressed case.
+    """
+    reference = {case_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        base = reference.get(case_key(result))
+        if base is None or not base[metric]:
+            continue
+        ratio = result[metric] / base[metric]
+        if ratio > 1 + max_regression:
+            params = ", ".join(f"{key}={result[key]}" for key in CASE_KEYS)
+            regressions.append(
+                f"{params}: {metric} {base[metric]} -> {result[metric]} "
+                f"(+{(ratio - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse the command line arguments of the benchmark suite."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--encoder", choices=("stub", "model"), default="stub")
+    parser.add_argument("--model-name", default=AppSettings.MODEL_NAME)
+    parser.add_argument(
+        "--paths", default=",".join(PATHS), help="Comma separated paths to run."
+    )
+    parser.add_argument("--queries", type=_int_list, default=[1, 16])
+    parser.add_argument("--catalog-sizes", type=_int_list, default=[1000, 10000])
+    parser.add_argument("--text-words", type=_int_list, default=[8, 32])
+    parser.add_argument("--top-k", type=_int_list, default=[1, 10])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument(
+        "--search-backend",
+        choices=("sentence_transformers", "numpy"),
+        default="sentence_transformers",
+    )
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="Results of a previous run to gate on.")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    parser.add_argument("--metric", default="p95_ms")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run the benchmark suite from the command line.
+
+    Args:
+        argv (Optional[Sequence[str]]): Command line arguments.
+
+    Returns:
+        int: 0 on success, 1 on regression, 2 if the model is not available.
+    """
+    args = parse_args(argv)
+    try:
+        service = build_service(
+            args.encoder, args.model_name, search_backend=args.search_backend
+        )
+    except OSError as e:
+        print(f"Model '{args.model_name}' is not available: {e}", file=sys.stderr)
+        return 2
+
+    results = run_suite(
+        service,
+        paths=args.paths.split(","),
+        queries=args.queries,
+        catalog_sizes=args.catalog_sizes,
+        text_words=args.text_words,
+        top_ks=args.top_k,
+        repeats=args.repeats,
+        warmup=args.warmup,
+    )
+    report = {
+        "meta": {
+            "encoder": args.encoder,
+            "model_name": args.model_name if args.encoder == "model" else None,
+            "search_backend": args.search_backend,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare_to_baseline(
+            results, baseline, args.max_regression, args.metric
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional, TypeVar
+
+from .exceptions import RequestCancelledError
+
+T = TypeVar("T")
+
+# Request header carrying the time budget of a request in milliseconds.
+TIMEOUT_HEADER = "x-request-timeout-ms"
+
+DEADLINE_EXCEEDED = "deadline"
+CLIENT_DISCONNECTED = "disconnected"
+
+# Time between two checks of a token while waiting on work it cannot interrupt.
+_POLL_SECONDS = 0.05
+
+
+class CancellationToken:
+    """Deadline and cancellation state of a request, checked by its work.
+
+    Work is not interrupted: it calls ``check`` between chunks, so a request
+    whose client disconnected or whose deadline passed stops at the next chunk
+    instead of running to the end.
+    """
+
+    def __init__(self, deadline: Optional[float] = None):
+        """Initialize the token.
+
+        Args:
+            deadline (Optional[float]): ``time.perf_counter`` value after which
+                the work is abandoned. None for no deadline.
+        """
+        self.deadline: Optional[float] = deadline
+        self.reason: Optional[str] = None
+
+    @classmethod
+    def with_timeout(
+        cls, timeout_ms: Optional[float], start: Optional[float] = None
+    ) -> "CancellationToken":
+        """Build a token expiring a time after the start of a request.
+
+        Args:
+            timeout_ms (Optional[float]): Time budget in milliseconds, None for
+                no deadline.
+            start (Optional[float]): ``time.perf_counter`` value the budget
+                starts at. Defaults to now.
+
+        Returns:
+            CancellationToken: The token.
+        """
+        if timeout_ms is None:
+            return cls()
+        start = time.perf_counter() if start is None else start
+        return cls(start + timeout_ms / 1000)
+
+    def cancel(self, reason: str) -> None:
+        """Ask the work to stop at its next check.
+
+        Args:
+            reason (str): Why the work is abandoned, e.g. ``CLIENT_DISCONNECTED``.
+        """
+        if self.reason is None:
+            self.reason = reason
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the work is cancelled or past its deadline."""
+        if (
+            self.reason is None
+            and self.deadline is not None
+            and time.perf_counter() >= self.deadline
+        ):
+            self.reason = DEADLINE_EXCEEDED
+        return self.reason is not None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, None without a deadline."""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.perf_counter(), 0.0)
+
+    def check(self, stage: str) -> None:
+        """Raise if the work should stop.
+
+        Args:
+            stage (str): Stage of the work, reported with the cancellation.
+
+        Raises:
+            RequestCancelledError: If the work is cancelled or past its deadline.
+        """
+        if self.cancelled:
+            raise RequestCancelledError(self.reason or DEADLINE_EXCEEDED, stage)
+
+
+_current_token: ContextVar[Optional[CancellationToken]] = ContextVar(
+    "cancellation_token", default=None
+)
+
+
+def current_token() -> Optional[CancellationToken]:
+    """Get the cancellation token of the current request, if any.
+
+    Returns:
+        Optional[CancellationToken]: The token, None outside of a request scope.
+    """
+    return _current_token.get()
+
+
+@contextmanager
+def cancellation_scope(token: CancellationToken) -> Iterator[CancellationToken]:
+    """Make a token the one checked by the work started in a block.
+
+    Work handed to the inference executor runs in a copy of the context and
+    checks the token too.
+
+    Args:
+        token (CancellationToken): The token.
+
+    Yields:
+        CancellationToken: The token.
+    """
+    context_token = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(context_token)
+
+
+def check_cancelled(stage: str) -> None:
+    """Raise if the work of the current request should stop.
+
+    Args:
+        stage (str): Stage of the work, reported with the cancellation.
+
+    Raises:
+        RequestCancelledError: If the request is cancelled or past its deadline.
+    """
+    token = _current_token.get()
+    if token is not None:
+        token.check(stage)
+
+
+def remaining_seconds() -> Optional[float]:
+    """Seconds left before the deadline of the current request, if any."""
+    token = _current_token.get()
+    return token.remaining() if token is not None else None
+
+
+def wait_cancellable(future: "Future[T]", stage: str) -> T:
+    """Wait for work done elsewhere, giving up when the current request stops.
+
+    Args:
+        future (Future[T]): The work.
+        stage (str): Stage of the work, reported with the cancellation.
+
+    Returns:
+        T: The result of the work.
+
+    Raises:
+        RequestCancelledError: If the request is cancelled or past its deadline
+            before the work is done.
+    """
+    token = _current_token.get()
+    if token is None:
+        return future.result()
+    while True:
+        token.check(stage)
+        try:
+            return future.result(timeout=_POLL_SECONDS)
+        except TimeoutError:
+            continue
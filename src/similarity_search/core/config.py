@@ -1,3 +1,5 @@
+from typing import Dict, List, Literal, Optional
+
 from pydantic_settings import BaseSettings
 
 from .constants import AppDefaults, AppSettings
@@ -8,7 +10,47 @@ class Settings(BaseSettings):
 
     app_name: str = AppSettings.APP_NAME
     model_name: str = AppSettings.MODEL_NAME
+    models: Dict[str, str] = {}
+    model_memory_budget_bytes: int = 0
     debug: bool = AppDefaults.DEBUG
+    profiling_token: Optional[str] = None
+    profiling_sample_every: int = 0
+    profiling_dir: str = AppDefaults.PROFILING_DIR
+    profiling_interval_ms: float = AppDefaults.PROFILING_INTERVAL_MS
+    inference_backend: Literal["torch", "onnx", "onnx-int8"] = "torch"
+    model_cache_dir: Optional[str] = None
+    model_workers: int = 0
+    model_worker_threads: Optional[int] = None
+    onnx_quantization_config: Literal["arm64", "avx2", "avx512", "avx512_vnni"] = "avx2"
+    warmup_batch_sizes: List[int] = list(AppDefaults.WARMUP_BATCH_SIZES)
+    embedding_cache_max_bytes: int = AppDefaults.EMBEDDING_CACHE_MAX_BYTES
+    result_cache_max_entries: int = AppDefaults.RESULT_CACHE_MAX_ENTRIES
+    result_cache_ttl_seconds: float = AppDefaults.RESULT_CACHE_TTL_SECONDS
+    request_timeout_ms: Optional[float] = None
+    encode_chunk_size: int = AppDefaults.ENCODE_CHUNK_SIZE
+    disconnect_poll_ms: float = AppDefaults.DISCONNECT_POLL_MS
+    embedding_store_dir: Optional[str] = None
+    embedding_store_dtype: Literal["float32", "float16"] = "float32"
+    batch_max_size: int = AppDefaults.BATCH_MAX_SIZE
+    batch_max_wait_ms: float = AppDefaults.BATCH_MAX_WAIT_MS
+    inference_workers: int = AppDefaults.INFERENCE_WORKERS
+    inference_queue_size: int = AppDefaults.INFERENCE_QUEUE_SIZE
+    inference_retry_after_seconds: int = AppDefaults.INFERENCE_RETRY_AFTER_SECONDS
+    torch_threads: Optional[int] = None
+    ann_index: Optional[Literal["exact", "ivf"]] = None
+    ann_min_catalog_size: int = AppDefaults.ANN_MIN_CATALOG_SIZE
+    ann_nlist: Optional[int] = None
+    ann_nprobe: int = AppDefaults.ANN_NPROBE
+    embedding_quantization: Optional[Literal["float16", "int8", "pq"]] = None
+    pq_subspaces: int = AppDefaults.PQ_SUBSPACES
+    rescore_factor: int = AppDefaults.RESCORE_FACTOR
+    search_backend: Literal["sentence_transformers", "numpy"] = "sentence_transformers"
+    search_block_size: int = AppDefaults.SEARCH_BLOCK_SIZE
+    compaction_threshold: float = AppDefaults.COMPACTION_THRESHOLD
+    shards: int = 0
+    shard_min_catalog_size: int = AppDefaults.SHARD_MIN_CATALOG_SIZE
+    shard_timeout_ms: float = AppDefaults.SHARD_TIMEOUT_MS
+    shard_max_pending: int = AppDefaults.SHARD_MAX_PENDING
 
 
 def get_settings() -> Settings:
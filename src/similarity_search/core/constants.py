@@ -1,5 +1,5 @@
 from enum import IntEnum, StrEnum
-from typing import Final
+from typing import Final, Tuple
 
 
 class ModelProvider(StrEnum):
@@ -12,10 +12,16 @@ class StatusCodes(IntEnum):
     """Enum for HTTP status codes."""
 
     OK = 200
+    CREATED = 201
+    ACCEPTED = 202
+    NO_CONTENT = 204
     BAD_REQUEST = 400
     NOT_FOUND = 404
+    UNSUPPORTED_MEDIA_TYPE = 415
+    CLIENT_CLOSED_REQUEST = 499
     SERVER_ERROR = 500
     SERVICE_UNAVAILABLE = 503
+    GATEWAY_TIMEOUT = 504
 
 
 class APIRoutes(StrEnum):
@@ -23,19 +29,103 @@ class APIRoutes(StrEnum):
 
     PREFIX = "/api/v1"
     HEALTH = "/health"
+    LIVENESS = "/health/live"
+    READINESS = "/health/ready"
     SIMILARITY = "/similarity"
+    SIMILARITY_VECTORS = "/similarity/vectors"
+    EMBED = "/embed"
+    CATALOGS = "/catalogs"
+    CATALOG = "/catalogs/{catalog_id}"
+    CATALOG_INDEX = "/catalogs/{catalog_id}/index"
+    CATALOG_PRODUCTS = "/catalogs/{catalog_id}/products"
+    CATALOG_PRODUCTS_DELETE = "/catalogs/{catalog_id}/products/delete"
+    CATALOG_COMPACT = "/catalogs/{catalog_id}/compact"
+    MODELS = "/models"
+    MODEL = "/models/{name:path}"
+    STATS = "/stats"
     API_DOCS = "/docs"
+    METRICS = "/metrics"
 
     @classmethod
     def get_health_route(cls) -> str:
         """Get the health API route."""
         return cls.PREFIX + cls.HEALTH
 
+    @classmethod
+    def get_liveness_route(cls) -> str:
+        """Get the liveness probe API route."""
+        return cls.PREFIX + cls.LIVENESS
+
+    @classmethod
+    def get_readiness_route(cls) -> str:
+        """Get the readiness probe API route."""
+        return cls.PREFIX + cls.READINESS
+
+    @classmethod
+    def get_metrics_route(cls) -> str:
+        """Get the Prometheus metrics route, served outside the API prefix."""
+        return cls.METRICS
+
     @classmethod
     def get_similarity_route(cls) -> str:
         """Get the similarity API route."""
         return cls.PREFIX + cls.SIMILARITY
 
+    @classmethod
+    def get_similarity_vectors_route(cls) -> str:
+        """Get the API route of the similarity search with embeddings."""
+        return cls.PREFIX + cls.SIMILARITY_VECTORS
+
+    @classmethod
+    def get_embed_route(cls) -> str:
+        """Get the embed API route."""
+        return cls.PREFIX + cls.EMBED
+
+    @classmethod
+    def get_stats_route(cls) -> str:
+        """Get the service statistics API route."""
+        return cls.PREFIX + cls.STATS
+
+    @classmethod
+    def get_catalogs_route(cls) -> str:
+        """Get the catalogs API route."""
+        return cls.PREFIX + cls.CATALOGS
+
+    @classmethod
+    def get_catalog_route(cls, catalog_id: str) -> str:
+        """Get the API route of a single catalog."""
+        return cls.PREFIX + cls.CATALOG.format(catalog_id=catalog_id)
+
+    @classmethod
+    def get_catalog_index_route(cls, catalog_id: str) -> str:
+        """Get the API route of the index of a catalog."""
+        return cls.PREFIX + cls.CATALOG_INDEX.format(catalog_id=catalog_id)
+
+    @classmethod
+    def get_catalog_products_route(cls, catalog_id: str) -> str:
+        """Get the API route upserting products of a catalog."""
+        return cls.PREFIX + cls.CATALOG_PRODUCTS.format(catalog_id=catalog_id)
+
+    @classmethod
+    def get_catalog_products_delete_route(cls, catalog_id: str) -> str:
+        """Get the API route deleting products of a catalog."""
+        return cls.PREFIX + cls.CATALOG_PRODUCTS_DELETE.format(catalog_id=catalog_id)
+
+    @classmethod
+    def get_catalog_compact_route(cls, catalog_id: str) -> str:
+        """Get the API route compacting a catalog."""
+        return cls.PREFIX + cls.CATALOG_COMPACT.format(catalog_id=catalog_id)
+
+    @classmethod
+    def get_models_route(cls) -> str:
+        """Get the models API route."""
+        return cls.PREFIX + cls.MODELS
+
+    @classmethod
+    def get_model_route(cls, name: str) -> str:
+        """Get the API route of a single model."""
+        return cls.PREFIX + cls.MODEL.replace("{name:path}", name)
+
 
 class AppSettings(StrEnum):
     """Enum for application settings."""
@@ -48,3 +138,26 @@ class AppDefaults:
     """Default values for application settings."""
 
     DEBUG: Final[bool] = False
+    EMBEDDING_CACHE_MAX_BYTES: Final[int] = 256 * 1024 * 1024
+    RESULT_CACHE_MAX_ENTRIES: Final[int] = 10_000
+    RESULT_CACHE_TTL_SECONDS: Final[float] = 300.0
+    ENCODE_CHUNK_SIZE: Final[int] = 1024
+    DISCONNECT_POLL_MS: Final[float] = 50.0
+    BATCH_MAX_SIZE: Final[int] = 64
+    BATCH_MAX_WAIT_MS: Final[float] = 2.0
+    INFERENCE_WORKERS: Final[int] = 4
+    INFERENCE_QUEUE_SIZE: Final[int] = 64
+    INFERENCE_RETRY_AFTER_SECONDS: Final[int] = 1
+    ANN_MIN_CATALOG_SIZE: Final[int] = 10_000
+    ANN_NPROBE: Final[int] = 8
+    PQ_SUBSPACES: Final[int] = 192
+    RESCORE_FACTOR: Final[int] = 4
+    SEARCH_BLOCK_SIZE: Final[int] = 16384
+    COMPACTION_THRESHOLD: Final[float] = 0.1
+    SHARD_MIN_CATALOG_SIZE: Final[int] = 100_000
+    SHARD_TIMEOUT_MS: Final[float] = 500.0
+    SHARD_MAX_PENDING: Final[int] = 4
+    WARMUP_BATCH_SIZES: Final[Tuple[int, ...]] = (1, 8, 32)
+    WARMUP_TEXT: Final[str] = "cordless drill with two batteries and a carrying case"
+    PROFILING_DIR: Final[str] = "profiles"
+    PROFILING_INTERVAL_MS: Final[float] = 5.0
@@ -1,12 +1,86 @@
+from typing import Optional
+
+from ..services.embedding_store import EmbeddingStore
+from ..services.executor import InferenceExecutor
+from ..services.model_registry import ModelRegistry
 from ..services.product_similarity import SimilarityService
 from .config import get_settings
 
 
-def get_similarity_service() -> SimilarityService:
-    """Get similarity service instance."""
+def get_similarity_service(model_name: Optional[str] = None) -> SimilarityService:
+    """Get similarity service instance.
+
+    Args:
+        model_name (Optional[str]): Model of the service, the configured model
+            by default.
+    """
+    settings = get_settings()
+    embedding_store = (
+        EmbeddingStore(settings.embedding_store_dir, settings.embedding_store_dtype)
+        if settings.embedding_store_dir
+        else None
+    )
+    return SimilarityService(
+        model_name or settings.model_name,
+        inference_backend=settings.inference_backend,
+        model_cache_dir=settings.model_cache_dir,
+        onnx_quantization_config=settings.onnx_quantization_config,
+        model_workers=settings.model_workers,
+        model_worker_threads=settings.model_worker_threads,
+        warmup_batch_sizes=settings.warmup_batch_sizes,
+        embedding_cache_max_bytes=settings.embedding_cache_max_bytes,
+        embedding_store=embedding_store,
+        batch_max_size=settings.batch_max_size,
+        batch_max_wait_ms=settings.batch_max_wait_ms,
+        ann_index=settings.ann_index,
+        ann_min_catalog_size=settings.ann_min_catalog_size,
+        ann_params=(
+            {"nlist": settings.ann_nlist, "nprobe": settings.ann_nprobe}
+            if settings.ann_index == "ivf"
+            else None
+        ),
+        quantization=settings.embedding_quantization,
+        quantization_params=(
+            {"subspaces": settings.pq_subspaces}
+            if settings.embedding_quantization == "pq"
+            else None
+        ),
+        rescore_factor=settings.rescore_factor,
+        search_backend=settings.search_backend,
+        search_block_size=settings.search_block_size,
+        compaction_threshold=settings.compaction_threshold,
+        shards=settings.shards,
+        shard_min_catalog_size=settings.shard_min_catalog_size,
+        shard_timeout_ms=settings.shard_timeout_ms,
+        shard_max_pending=settings.shard_max_pending,
+        result_cache_max_entries=settings.result_cache_max_entries,
+        result_cache_ttl_seconds=settings.result_cache_ttl_seconds,
+        encode_chunk_size=settings.encode_chunk_size,
+    )
+
+
+def get_model_registry(default: SimilarityService) -> ModelRegistry:
+    """Get model registry instance serving the default service."""
+    settings = get_settings()
+    return ModelRegistry(
+        default,
+        get_similarity_service,
+        models=settings.models,
+        memory_budget_bytes=settings.model_memory_budget_bytes,
+    )
+
+
+def get_inference_executor() -> InferenceExecutor:
+    """Get inference executor instance."""
     settings = get_settings()
-    return SimilarityService(settings.model_name)
+    return InferenceExecutor(
+        max_workers=settings.inference_workers,
+        max_queue_size=settings.inference_queue_size,
+        torch_threads=settings.torch_threads,
+    )
 
 
-# Global instance
+# Global instances
 similarity_service = get_similarity_service()
+model_registry = get_model_registry(similarity_service)
+inference_executor = get_inference_executor()
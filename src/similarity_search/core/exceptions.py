@@ -7,6 +7,47 @@ from fastapi.responses import JSONResponse
 from .constants import StatusCodes
 
 
+class CatalogNotFoundError(Exception):
+    """Raised when a catalog id does not match any registered catalog."""
+
+    def __init__(self, catalog_id: str):
+        self.catalog_id = catalog_id
+        super().__init__(f"Catalog '{catalog_id}' not found")
+
+
+class ModelNotFoundError(Exception):
+    """Raised when a model name does not match any model that can be served."""
+
+    def __init__(self, name: str):
+        self.name = name
+        super().__init__(f"Model '{name}' not found")
+
+
+class QueueFullError(Exception):
+    """Raised when the inference executor cannot admit more work."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        super().__init__(f"Inference queue is full ({capacity} requests admitted)")
+
+
+class RequestCancelledError(Exception):
+    """Raised when the work of a request stops early.
+
+    This happens when the client disconnected or the deadline of the request
+    passed.
+    """
+
+    def __init__(self, reason: str, stage: str):
+        self.reason = reason
+        self.stage = stage
+        super().__init__(f"Request abandoned during {stage} ({reason})")
+
+
+class EmbeddingMismatchError(Exception):
+    """Raised when embeddings come from another model or have another dimension."""
+
+
 class ValidationErrorDetail(TypedDict):
     loc: List[str]
     msg: str
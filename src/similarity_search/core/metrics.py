@@ -0,0 +1,304 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+from .profiling import current_profile
+
+REGISTRY = CollectorRegistry()
+
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384)
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Duration of HTTP requests.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests being processed.",
+    registry=REGISTRY,
+)
+STAGE_SECONDS = Histogram(
+    "similarity_stage_seconds",
+    "Duration of each stage of a similarity request: validation, queue, "
+    "query_encoding, product_encoding, filtering, search and serialization.",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+MODEL_BATCH_SIZE = Histogram(
+    "similarity_model_batch_size",
+    "Number of texts per model forward pass.",
+    buckets=SIZE_BUCKETS,
+    registry=REGISTRY,
+)
+TEXTS_PER_REQUEST = Histogram(
+    "similarity_texts_per_request",
+    "Number of query or product texts per similarity request.",
+    ["kind"],
+    buckets=SIZE_BUCKETS,
+    registry=REGISTRY,
+)
+ABANDONED_REQUESTS = Counter(
+    "similarity_abandoned_requests",
+    "Requests whose work stopped early, by reason (deadline or disconnected) "
+    "and by the stage it stopped in.",
+    ["reason", "stage"],
+    registry=REGISTRY,
+)
+MODEL_LOAD_SECONDS = Gauge(
+    "similarity_model_load_seconds",
+    "Time taken to load the model.",
+    registry=REGISTRY,
+)
+MODEL_WARMUP_SECONDS = Gauge(
+    "similarity_model_warmup_seconds",
+    "Time taken to warm up the model.",
+    registry=REGISTRY,
+)
+
+# Keys of the ASGI scope state shared by the middleware and the endpoints.
+REQUEST_START = "metrics_request_start"
+HANDLER_END = "metrics_handler_end"
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """Record the duration of a stage of the request pipeline.
+
+    The duration is also added to the profile of the request when it is
+    profiled.
+
+    Args:
+        stage (str): Name of the stage.
+        seconds (float): Duration of the stage in seconds.
+    """
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    profile = current_profile()
+    if profile is not None:
+        profile.record(stage, seconds)
+
+
+@contextmanager
+def time_stage(stage: str) -> Iterator[None]:
+    """Record the duration of a block as a stage of the request pipeline.
+
+    Args:
+        stage (str): Name of the stage.
+    """
+    profile = current_profile()
+    if profile is not None:
+        profile.track_current_thread()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+class ServiceCollector(Collector):
+    """Export the counters the services already keep, read at scrape time.
+
+    Attributes:
+        stats (Callable[[], Dict[str, Any]]): Function returning the combined
+            statistics of the similarity service and inference executor, as
+            served by the stats endpoint.
+    """
+
+    def __init__(self, stats: Callable[[], Dict[str, Any]]):
+        self.stats = stats
+
+    def collect(self) -> Iterator[Any]:
+        stats = self.stats()
+        yield GaugeMetricFamily(
+            "similarity_catalogs", "Registered catalogs.", value=stats["catalogs"]
+        )
+        executor = stats.get("executor")
+        if executor is not None:
+            yield GaugeMetricFamily(
+                "inference_in_flight",
+                "Calls running on the inference workers.",
+                value=executor["in_flight"],
+            )
+            yield GaugeMetricFamily(
+                "inference_queued",
+                "Calls waiting for an inference worker.",
+                value=executor["queued"],
+            )
+            yield CounterMetricFamily(
+                "inference_completed",
+                "Calls completed by the inference workers.",
+                value=executor["completed"],
+            )
+            yield CounterMetricFamily(
+                "inference_abandoned",
+                "Inference calls stopped early by a disconnect or a deadline.",
+                value=executor["abandoned"],
+            )
+            yield CounterMetricFamily(
+                "inference_abandoned_seconds",
+                "Worker time spent on inference calls before they were stopped.",
+                value=executor["abandoned_seconds"],
+            )
+            yield CounterMetricFamily(
+                "inference_rejected",
+                "Calls rejected because the inference queue was full.",
+                value=executor["rejected"],
+            )
+        cache = stats.get("embedding_cache")
+        if cache is not None:
+            yield CounterMetricFamily(
+                "embedding_cache_hits", "Embedding cache hits.", value=cache["hits"]
+            )
+            yield CounterMetricFamily(
+                "embedding_cache_misses",
+                "Embedding cache misses.",
+                value=cache["misses"],
+            )
+            lookups = cache["hits"] + cache["misses"]
+            yield GaugeMetricFamily(
+                "embedding_cache_hit_ratio",
+                "Fraction of embedding cache lookups that hit.",
+                value=cache["hits"] / lookups if lookups else 0.0,
+            )
+            yield GaugeMetricFamily(
+                "embedding_cache_bytes",
+                "Memory used by the embedding cache.",
+                value=cache["bytes"],
+            )
+        results = stats.get("result_cache")
+        if results is not None:
+            yield CounterMetricFamily(
+                "result_cache_hits",
+                "Catalog queries answered from the result cache.",
+                value=results["hits"],
+            )
+            yield CounterMetricFamily(
+                "result_cache_misses",
+                "Catalog queries encoded and searched.",
+                value=results["misses"],
+            )
+            yield CounterMetricFamily(
+                "result_cache_coalesced",
+                "Catalog queries that waited for the same query of another request.",
+                value=results["coalesced"],
+            )
+            yield GaugeMetricFamily(
+                "result_cache_entries",
+                "Query results held by the result cache.",
+                value=results["entries"],
+            )
+        shards = stats.get("shards")
+        if shards is not None:
+            yield CounterMetricFamily(
+                "similarity_shard_searches",
+                "Catalog searches scattered across the shards.",
+                value=shards["searches"],
+            )
+            yield CounterMetricFamily(
+                "similarity_shard_timeouts",
+                "Shard searches left out of the results after their deadline.",
+                value=shards["timeouts"],
+            )
+            yield CounterMetricFamily(
+                "similarity_shard_errors",
+                "Shard searches left out of the results after a failure.",
+                value=shards["errors"],
+            )
+            yield CounterMetricFamily(
+                "similarity_shard_overloaded",
+                "Shard searches left out of the results as the shard had too "
+                "many pending searches.",
+                value=shards["overloaded"],
+            )
+            yield CounterMetricFamily(
+                "similarity_shard_restarts",
+                "Shard processes started again after they exited.",
+                value=shards["restarts"],
+            )
+
+
+def render_metrics(stats: Callable[[], Dict[str, Any]]) -> bytes:
+    """Render the metrics in the Prometheus text format.
+
+    Args:
+        stats (Callable[[], Dict[str, Any]]): Function returning the service
+            statistics exported by ``ServiceCollector``.
+
+    Returns:
+        bytes: The metrics exposition.
+    """
+    services = CollectorRegistry()
+    services.register(ServiceCollector(stats))
+    return generate_latest(REGISTRY) + generate_latest(services)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing HTTP requests and their serialization.
+
+    Requests are labelled with their route template rather than their path, to
+    keep the number of series bounded. The time between the end of the handler,
+    marked by the endpoint in the scope state, and the start of the response is
+    recorded as the serialization stage.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        state = scope.setdefault("state", {})
+        state[REQUEST_START] = start
+        status = 500
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                handler_end = state.get(HANDLER_END)
+                if handler_end is not None:
+                    observe_stage("serialization", time.perf_counter() - handler_end)
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            REQUEST_SECONDS.labels(
+                scope.get("method", ""),
+                getattr(route, "path", "unmatched"),
+                str(status),
+            ).observe(time.perf_counter() - start)
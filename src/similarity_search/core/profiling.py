@@ -0,0 +1,298 @@
+import hmac
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Set
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+# Request header opting a request into profiling, with the value ``timing`` for
+# the Server-Timing header only or ``profile`` to also capture a stack profile.
+PROFILE_HEADER = "x-profile"
+PROFILE_TOKEN_HEADER = "x-profile-token"
+PROFILE_FILE_HEADER = "x-profile-file"
+PROFILE_MODES = ("timing", "profile")
+
+
+class StackSampler:
+    """Sampling profiler collecting the Python stacks of a set of threads.
+
+    A background thread snapshots the frames of the tracked threads every
+    ``interval_ms`` and counts identical stacks. The result is written in the
+    collapsed stack format read by flamegraph.pl and speedscope. Unlike a
+    tracing profiler it does not hook every call of the profiled code, and it
+    follows work handed to other threads, such as the inference executor.
+    """
+
+    def __init__(self, interval_ms: float):
+        """Initialize the sampler.
+
+        Args:
+            interval_ms (float): Time between two samples in milliseconds.
+        """
+        self.interval_ms: float = interval_ms
+        self.threads: Set[int] = set()
+        self.stacks: "Counter[str]" = Counter()
+        self.samples: int = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def track(self, thread_id: int) -> None:
+        """Add a thread to the sampled threads.
+
+        Args:
+            thread_id (int): Identifier of the thread, from ``threading.get_ident``.
+        """
+        self.threads.add(thread_id)
+
+    def start(self) -> None:
+        """Start sampling."""
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampling thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        """Sampling loop executed by the background thread."""
+        while not self._stop.wait(self.interval_ms / 1000):
+            frames = sys._current_frames()
+            for thread_id in list(self.threads):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.stacks[self._collapse(frame)] += 1
+            self.samples += 1
+
+    @staticmethod
+    def _collapse(frame: Any) -> str:
+        """Format a stack, outermost frame first, as semicolon separated frames.
+
+        Args:
+            frame (Any): The innermost frame of the stack.
+
+        Returns:
+            str: The collapsed stack.
+        """
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(
+                f"{code.co_name} ({os.path.basename(code.co_filename)}:"
+                f"{frame.f_lineno})"
+            )
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def dump(self, path: str) -> None:
+        """Write the sampled stacks in the collapsed stack format.
+
+        Args:
+            path (str): Path of the output file.
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+
+class RequestProfile:
+    """Stage timings and optional stack samples of one request.
+
+    Attributes:
+        timings (Dict[str, float]): Total seconds spent per pipeline stage.
+        sampler (Optional[StackSampler]): Stack sampler of the request threads.
+    """
+
+    def __init__(self, sampler: Optional[StackSampler] = None):
+        self.timings: Dict[str, float] = {}
+        self.sampler: Optional[StackSampler] = sampler
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Add the duration of a stage.
+
+        Args:
+            stage (str): Name of the stage.
+            seconds (float): Duration of the stage in seconds.
+        """
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def track_current_thread(self) -> None:
+        """Sample the calling thread for the rest of the request."""
+        if self.sampler is not None:
+            self.sampler.track(threading.get_ident())
+
+    def server_timing(self, total: float) -> str:
+        """Format the timings as a Server-Timing header value.
+
+        Args:
+            total (float): Duration of the whole request in seconds.
+
+        Returns:
+            str: One metric per stage plus ``total``, in milliseconds.
+        """
+        timings = itertools.chain(self.timings.items(), [("total", total)])
+        return ", ".join(
+            f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in timings
+        )
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar(
+    "request_profile", default=None
+)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    """Get the profile of the request being handled, if it is profiled.
+
+    Returns:
+        Optional[RequestProfile]: The active profile, None for most requests.
+    """
+    return _current_profile.get()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling opted-in and sampled requests.
+
+    A request sending ``X-Profile: timing`` gets a ``Server-Timing`` header with
+    the duration of each pipeline stage, and ``X-Profile: profile`` also writes a
+    stack profile of the request to ``output_dir``, named in the
+    ``X-Profile-File`` response header. The header is honoured in debug mode or
+    when ``X-Profile-Token`` matches the configured token, and ignored otherwise.
+    Independently, one request in every ``sample_every`` is profiled to
+    ``output_dir`` for continuous profiling, without changing its response.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        allow_header: bool = False,
+        token: Optional[str] = None,
+        sample_every: int = 0,
+        output_dir: str = "profiles",
+        interval_ms: float = 5.0,
+    ):
+        """Initialize the middleware.
+
+        Args:
+            app (Any): The wrapped ASGI application.
+            allow_header (bool): Whether the profile header is honoured without
+                a token, as in debug mode.
+            token (Optional[str]): Token enabling the profile header outside
+                debug mode. None only allows it in debug mode.
+            sample_every (int): Profile one request in every ``sample_every``.
+                A value of 0 disables sampling.
+            output_dir (str): Directory the stack profiles are written to.
+            interval_ms (float): Time between two stack samples.
+        """
+        self.app = app
+        self.allow_header: bool = allow_header
+        self.token: Optional[str] = token
+        self.sample_every: int = sample_every
+        self.output_dir: str = output_dir
+        self.interval_ms: float = interval_ms
+        self._requests = itertools.count(1)
+
+    def _requested_mode(self, headers: Headers) -> Optional[str]:
+        """Get the profiling mode requested by an authorized caller.
+
+        Args:
+            headers (Headers): The request headers.
+
+        Returns:
+            Optional[str]: ``timing``, ``profile`` or None when profiling is not
+                requested or not allowed.
+        """
+        mode = headers.get(PROFILE_HEADER, "").lower()
+        if mode not in PROFILE_MODES:
+            return None
+        if self.allow_header:
+            return mode
+        token = headers.get(PROFILE_TOKEN_HEADER, "")
+        if self.token and hmac.compare_digest(token.encode(), self.token.encode()):
+            return mode
+        return None
+
+    def _profile_path(self, scope: Dict[str, Any]) -> str:
+        """Build a unique path for the stack profile of a request.
+
+        Args:
+            scope (Dict[str, Any]): The ASGI scope of the request.
+
+        Returns:
+            str: Path of the profile file in ``output_dir``.
+        """
+        path = re.sub(r"[^A-Za-z0-9]+", "_", scope.get("path", "")).strip("_")
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{path}-{uuid.uuid4().hex[:8]}"
+        return os.path.join(self.output_dir, f"{name}.collapsed")
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        mode = self._requested_mode(Headers(scope=scope))
+        sampled = (
+            self.sample_every > 0 and next(self._requests) % self.sample_every == 0
+        )
+        if mode is None and not sampled:
+            await self.app(scope, receive, send)
+            return
+
+        capture = sampled or mode == "profile"
+        sampler = StackSampler(self.interval_ms) if capture else None
+        profile = RequestProfile(sampler)
+        path = self._profile_path(scope) if capture else None
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start" and mode is not None:
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    profile.server_timing(time.perf_counter() - start),
+                )
+                if path is not None:
+                    headers.append(PROFILE_FILE_HEADER, os.path.basename(path))
+            await send(message)
+
+        context_token = _current_profile.set(profile)
+        if sampler is not None:
+            profile.track_current_thread()
+            sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(context_token)
+            if sampler is not None and path is not None:
+                sampler.stop()
+                self._dump(sampler, path)
+
+    def _dump(self, sampler: StackSampler, path: str) -> None:
+        """Write a stack profile, logging instead of failing the request.
+
+        Args:
+            sampler (StackSampler): The stopped sampler of the request.
+            path (str): Path of the output file.
+        """
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            sampler.dump(path)
+        except OSError as e:
+            logger.error(f"Error writing profile {path}: {str(e)}")
+            return
+        logger.info(f"Wrote profile of {sampler.samples} samples to {path}")
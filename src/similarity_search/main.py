@@ -3,12 +3,14 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
 
-from .api.endpoints import router
+from .api.endpoints import metrics_router, router
 from .core.config import get_settings
 from .core.constants import APIRoutes
-from .core.dependencies import similarity_service
+from .core.dependencies import inference_executor, model_registry
 from .core.exceptions import validation_exception_handler
 from .core.logging import setup_logging
+from .core.metrics import MetricsMiddleware
+from .core.profiling import ProfilingMiddleware
 
 
 def create_app() -> FastAPI:
@@ -19,10 +21,12 @@ def create_app() -> FastAPI:
     @asynccontextmanager
     async def lifespan(app: FastAPI):
         try:
-            await similarity_service.load_model()
+            await model_registry.start()
+            inference_executor.start()
             yield
         finally:
-            await similarity_service.cleanup()
+            inference_executor.shutdown()
+            await model_registry.cleanup()
 
     app = FastAPI(
         title=settings.app_name,
@@ -32,12 +36,27 @@ def create_app() -> FastAPI:
         debug=settings.debug,
         docs_url=APIRoutes.API_DOCS,
     )
+    # Read by the request handlers, which must not parse the environment again.
+    app.state.settings = settings
 
     # Add exception handlers
     app.add_exception_handler(RequestValidationError, validation_exception_handler)
 
+    app.add_middleware(MetricsMiddleware)
+    # Added last to wrap the metrics middleware, whose serialization timing
+    # must be recorded before the Server-Timing header is sent.
+    app.add_middleware(
+        ProfilingMiddleware,
+        allow_header=settings.debug,
+        token=settings.profiling_token,
+        sample_every=settings.profiling_sample_every,
+        output_dir=settings.profiling_dir,
+        interval_ms=settings.profiling_interval_ms,
+    )
+
     # Include routers
     app.include_router(router)
+    app.include_router(metrics_router)
 
     return app
 
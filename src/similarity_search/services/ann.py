@@ -0,0 +1,263 @@
+import abc
+import math
+from typing import Any, Dict, List, Optional, Type
+
+import numpy as np
+
+from ..core.cancellation import check_cancelled
+from .search import SearchResult, exact_search, normalize, top_k_indices
+
+
+class VectorIndex(abc.ABC):
+    """Base class of the nearest-neighbour indexes of a catalog.
+
+    Indexes score queries with the cosine similarity. They keep a reference to
+    the catalog embeddings, possibly memory-mapped, rather than a normalized
+    copy: the rows a search scores are read and normalized as it scans them.
+    Subclasses register themselves in ``INDEX_TYPES`` under their ``kind``.
+    """
+
+    kind: str = ""
+
+    def __init__(self, embeddings: np.ndarray, normalized: bool = False):
+        """Build the index.
+
+        Args:
+            embeddings (np.ndarray): Catalog embeddings of shape (n, dim).
+            normalized (bool): Whether the embedding rows have unit norm.
+        """
+        self.embeddings: np.ndarray = embeddings
+        self.normalized: bool = normalized
+        self.size: int = len(embeddings)
+
+    @abc.abstractmethod
+    def search(
+        self, queries: np.ndarray, top_k: int, **params: Any
+    ) -> List[SearchResult]:
+        """Find the nearest catalog rows of each query.
+
+        Args:
+            queries (np.ndarray): Query embeddings of shape (n_queries, dim).
+            top_k (int): Number of rows to return per query.
+            **params (Any): Index specific search parameters. Every index
+                accepts ``selection``, the sorted rows eligible for the search,
+                which are the only rows scored.
+
+        Returns:
+            List[SearchResult]: Per query, the row ids and their cosine scores,
+                best first.
+        """
+
+    def info(self) -> Dict[str, Any]:
+        """Describe the index and its parameters.
+
+        Returns:
+            Dict[str, Any]: The index kind and parameters.
+        """
+        return {"kind": self.kind, "size": self.size}
+
+
+class ExactIndex(VectorIndex):
+    """Brute-force index scoring every catalog row."""
+
+    kind = "exact"
+
+    def search(
+        self, queries: np.ndarray, top_k: int, **params: Any
+    ) -> List[SearchResult]:
+        return exact_search(
+            normalize(queries),
+            self.embeddings,
+            top_k,
+            normalized=self.normalized,
+            selection=params.get("selection"),
+        )
+
+
+class IVFIndex(VectorIndex):
+    """Inverted-file index for approximate search on large catalogs.
+
+    Catalog rows are clustered around ``nlist`` centroids with spherical k-means
+    and stored contiguously per cluster. A query is only scored against the rows
+    of the ``nprobe`` clusters whose centroids are closest to it, trading recall
+    for latency: a larger ``nprobe`` gives a higher recall and a slower search.
+    Only the row ids are stored per cluster, in ascending order so that the rows
+    of a probed cluster are read from the catalog embeddings front to back.
+    """
+
+    kind = "ivf"
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        normalized: bool = False,
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        iterations: int = 10,
+        seed: int = 0,
+    ):
+        """Build the index.
+
+        Args:
+            embeddings (np.ndarray): Catalog embeddings of shape (n, dim).
+            normalized (bool): Whether the embedding rows have unit norm.
+            nlist (Optional[int]): Number of clusters. Defaults to ``4 * sqrt(n)``.
+            nprobe (int): Default number of clusters scanned per query.
+            iterations (int): Number of k-means iterations.
+            seed (int): Seed of the k-means initialization.
+        """
+        super().__init__(embeddings, normalized)
+        self.nlist: int = max(1, min(nlist or int(4 * math.sqrt(self.size)), self.size))
+        self.nprobe: int = nprobe
+        self.centroids: np.ndarray = self._train(iterations, seed)
+
+        # The closest centroid does not depend on the norm of the row.
+        assignments = self._assign(embeddings)
+        self.ids: np.ndarray = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=self.nlist)
+        self.offsets: np.ndarray = np.concatenate(([0], np.cumsum(counts)))
+
+    def _assign(self, vectors: np.ndarray, block_size: int = 65536) -> np.ndarray:
+        """Assign each vector to its closest centroid.
+
+        Args:
+            vectors (np.ndarray): Vectors, possibly memory-mapped.
+            block_size (int): Number of vectors read and scored at once.
+
+        Returns:
+            np.ndarray: The centroid index of each vector.
+        """
+        return np.concatenate(
+            [
+                np.argmax(
+                    np.asarray(vectors[start : start + block_size], dtype=np.float32)
+                    @ self.centroids.T,
+                    1,
+                )
+                for start in range(0, len(vectors), block_size)
+            ]
+        )
+
+    def _train(self, iterations: int, seed: int) -> np.ndarray:
+        """Compute the centroids with spherical k-means on a sample of the rows.
+
+        Args:
+            iterations (int): Number of k-means iterations.
+            seed (int): Seed of the initialization.
+
+        Returns:
+            np.ndarray: The normalized centroids of shape (nlist, dim).
+        """
+        rng = np.random.default_rng(seed)
+        sample_size = min(self.size, 256 * self.nlist)
+        rows = np.sort(rng.choice(self.size, sample_size, replace=False))
+        sample = normalize(np.asarray(self.embeddings[rows], dtype=np.float32))
+        self.centroids = sample[: self.nlist].copy()
+        for _ in range(iterations):
+            assignments = self._assign(sample)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, assignments, sample)
+            empty = ~np.any(sums, axis=1)
+            # Re-seed empty clusters with random rows so that none stays unused.
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            self.centroids = normalize(sums)
+        return self.centroids
+
+    def search(
+        self, queries: np.ndarray, top_k: int, **params: Any
+    ) -> List[SearchResult]:
+        """Find the approximate nearest catalog rows of each query.
+
+        Args:
+            queries (np.ndarray): Query embeddings of shape (n_queries, dim).
+            top_k (int): Number of rows to return per query.
+            **params (Any): ``nprobe`` overrides the default number of scanned
+                clusters. More clusters are scanned if the probed ones hold fewer
+                than ``top_k`` rows. ``selection`` restricts the search to the
+                given rows, the others being dropped from the probed clusters
+                before scoring.
+
+        Returns:
+            List[SearchResult]: Per query, the row ids and their cosine scores.
+        """
+        nprobe = min(params.get("nprobe") or self.nprobe, self.nlist)
+        selection = params.get("selection")
+        eligible: Optional[np.ndarray] = None
+        if selection is not None:
+            # Eligibility by position in the cluster-ordered row ids.
+            allowed = np.zeros(self.size, dtype=bool)
+            allowed[selection] = True
+            eligible = allowed[self.ids]
+        queries = normalize(queries)
+        centroid_order = np.argsort(-(queries @ self.centroids.T), axis=1)
+        results = []
+        for query, lists in zip(queries, centroid_order, strict=True):
+            check_cancelled("search")
+            probed: List[np.ndarray] = []
+            found = 0
+            for probes, i in enumerate(lists, start=1):
+                positions = np.arange(self.offsets[i], self.offsets[i + 1])
+                if eligible is not None:
+                    positions = positions[eligible[positions]]
+                probed.append(positions)
+                found += len(positions)
+                if probes >= nprobe and found >= top_k:
+                    break
+            rows = self.ids[np.concatenate(probed)]
+            vectors = np.asarray(self.embeddings[rows], dtype=np.float32)
+            if not self.normalized:
+                vectors = normalize(vectors)
+            scores = vectors @ query
+            best = top_k_indices(scores, top_k)
+            results.append((rows[best], scores[best]))
+        return results
+
+    def info(self) -> Dict[str, Any]:
+        return {**super().info(), "nlist": self.nlist, "nprobe": self.nprobe}
+
+
+INDEX_TYPES: Dict[str, Type[VectorIndex]] = {
+    ExactIndex.kind: ExactIndex,
+    IVFIndex.kind: IVFIndex,
+}
+
+
+def build_index(
+    kind: str, embeddings: np.ndarray, normalized: bool = False, **params: Any
+) -> VectorIndex:
+    """Build a nearest-neighbour index of the given kind.
+
+    Args:
+        kind (str): The index kind, one of ``INDEX_TYPES``.
+        embeddings (np.ndarray): Catalog embeddings of shape (n, dim).
+        normalized (bool): Whether the embedding rows have unit norm.
+        **params (Any): Parameters of the index constructor.
+
+    Returns:
+        VectorIndex: The built index.
+
+    Raises:
+        ValueError: If the kind is unknown.
+    """
+    if kind not in INDEX_TYPES:
+        raise ValueError(
+            f"Unknown index kind '{kind}', expected one of {sorted(INDEX_TYPES)}"
+        )
+    return INDEX_TYPES[kind](embeddings, normalized, **params)
+
+
+def recall_at_k(approximate: List[np.ndarray], exact: List[np.ndarray]) -> float:
+    """Compute the mean recall@k of approximate results against exact ones.
+
+    Args:
+        approximate (List[np.ndarray]): Row ids returned by the index per query.
+        exact (List[np.ndarray]): Row ids of the exact top-k per query.
+
+    Returns:
+        float: Fraction of the exact top-k rows found by the index.
+    """
+    found = sum(
+        len(np.intersect1d(a, e)) for a, e in zip(approximate, exact, strict=True)
+    )
+    total = sum(len(e) for e in exact)
+    return found / total if total else 1.0
@@ -0,0 +1,227 @@
+import queue
+import time
+from concurrent.futures import Future
+from threading import Lock, Thread
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..core.cancellation import wait_cancellable
+from ..core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class _EncodeRequest:
+    """Texts submitted by one caller and the future its embeddings are sent to."""
+
+    def __init__(self, texts: List[str]):
+        self.texts: List[str] = texts
+        self.future: "Future[np.ndarray]" = Future()
+
+
+class MicroBatcher:
+    """Coalesce concurrent encode calls into a single model forward pass.
+
+    Callers from any thread submit their texts and block until their embeddings
+    are ready. A background thread takes the first pending request, then keeps
+    collecting requests until the batch holds ``max_batch_size`` texts or
+    ``max_wait_ms`` have passed, encodes the whole batch in one call and hands
+    each caller back its own rows. Requests queued while a batch is encoding are
+    picked up by the next batch without waiting, and a request with nothing
+    queued behind it is encoded at once, so the wait only applies when the
+    queue runs dry after concurrent requests were coalesced.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], Any],
+        max_batch_size: int,
+        max_wait_ms: float,
+    ):
+        """Initialize the batcher.
+
+        Args:
+            encode_fn (Callable[[List[str]], Any]): Function encoding a list of
+                texts into one embedding row per text.
+            max_batch_size (int): Maximum number of texts per encode call. A
+                single request larger than this is encoded on its own.
+            max_wait_ms (float): Maximum time to wait for more requests once a
+                batch holds several.
+        """
+        self.encode_fn = encode_fn
+        self.max_batch_size: int = max_batch_size
+        self.max_wait_ms: float = max_wait_ms
+        self._queue: "queue.Queue[Optional[_EncodeRequest]]" = queue.Queue()
+        self._thread: Optional[Thread] = None
+        self._pending: Optional[_EncodeRequest] = None
+        self._stats_lock = Lock()
+        self._batches: int = 0
+        self._requests: int = 0
+        self._texts: int = 0
+        self._largest_batch: int = 0
+        self._histogram: Dict[str, int] = {}
+
+    @property
+    def running(self) -> bool:
+        """Whether the batching thread is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the batching thread."""
+        if self.running:
+            return
+        self._thread = Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the batching thread after the pending requests are served."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts as part of the next batch.
+
+        Args:
+            texts (List[str]): Texts to encode.
+
+        Returns:
+            np.ndarray: The embeddings, one row per text.
+
+        Raises:
+            RuntimeError: If the batcher is not running.
+            RequestCancelledError: If the request of the caller stops before its
+                batch is encoded.
+        """
+        if not self.running:
+            raise RuntimeError("Micro-batcher is not running")
+        request = _EncodeRequest(texts)
+        self._queue.put(request)
+        # A cancelled request stops waiting; its texts are still encoded.
+        return wait_cancellable(request.future, "encoding")
+
+    def _collect(self, first: _EncodeRequest) -> Tuple[List[_EncodeRequest], bool]:
+        """Collect requests into a batch, starting with ``first``.
+
+        Args:
+            first (_EncodeRequest): The request opening the batch.
+
+        Returns:
+            Tuple[List[_EncodeRequest], bool]: The batch and whether a stop was
+                requested while collecting it.
+        """
+        batch = [first]
+        size = len(first.texts)
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while size < self.max_batch_size:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                if len(batch) == 1:
+                    # A lone request has no concurrent traffic to wait for.
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if request is None:
+                return batch, True
+            if size + len(request.texts) > self.max_batch_size:
+                # Keep the request for the next batch instead of overflowing.
+                self._pending = request
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch, False
+
+    def _run(self) -> None:
+        """Batching loop executed by the background thread."""
+        stopping = False
+        while not stopping or self._pending is not None:
+            if self._pending is not None:
+                first, self._pending = self._pending, None
+            else:
+                first = self._queue.get()
+                if first is None:
+                    break
+            batch, stop_requested = self._collect(first)
+            stopping = stopping or stop_requested
+            self._encode_batch(batch)
+
+        # Fail requests that raced with the stop instead of leaving them blocked.
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                request.future.set_exception(RuntimeError("Micro-batcher stopped"))
+
+    def _encode_batch(self, batch: List[_EncodeRequest]) -> None:
+        """Encode a batch in one call and resolve the futures of its requests.
+
+        Args:
+            batch (List[_EncodeRequest]): The requests of the batch.
+        """
+        texts = [text for request in batch for text in request.texts]
+        try:
+            embeddings = np.asarray(self.encode_fn(texts))
+        except Exception as e:
+            logger.error(f"Error encoding batch of {len(texts)} texts: {str(e)}")
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        offset = 0
+        for request in batch:
+            request.future.set_result(embeddings[offset : offset + len(request.texts)])
+            offset += len(request.texts)
+        self._record(len(batch), len(texts))
+
+    def _record(self, requests: int, texts: int) -> None:
+        """Record the size of an encoded batch.
+
+        Args:
+            requests (int): Number of requests in the batch.
+            texts (int): Number of texts in the batch.
+        """
+        bucket = 1
+        while bucket < texts:
+            bucket *= 2
+        with self._stats_lock:
+            self._batches += 1
+            self._requests += requests
+            self._texts += texts
+            self._largest_batch = max(self._largest_batch, texts)
+            self._histogram[str(bucket)] = self._histogram.get(str(bucket), 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get batching statistics.
+
+        Returns:
+            Dict[str, Any]: Batch counts, mean and largest batch size in texts and
+                a histogram of batch sizes keyed by power-of-two upper bound.
+        """
+        with self._stats_lock:
+            return {
+                "batches": self._batches,
+                "requests": self._requests,
+                "texts": self._texts,
+                "mean_batch_size": (
+                    round(self._texts / self._batches, 2) if self._batches else 0.0
+                ),
+                "max_batch_size": self._largest_batch,
+                "batch_size_histogram": dict(
+                    sorted(self._histogram.items(), key=lambda item: int(item[0]))
+                ),
+                "config": {
+                    "max_batch_size": self.max_batch_size,
+                    "max_wait_ms": self.max_wait_ms,
+                },
+            }
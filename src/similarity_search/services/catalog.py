@@ -0,0 +1,293 @@
+from typing import AbstractSet, Any, Dict, List, Mapping, Optional
+
+import numpy as np
+
+from .ann import VectorIndex
+from .filters import MetadataIndex
+from .quantization import QuantizedEmbeddings
+
+
+class Catalog:
+    """A named set of products whose embeddings are computed once and reused.
+
+    A catalog is an immutable snapshot: updates build a new version of it. Rows
+    are split between a main segment, which is indexed, compressed and stored
+    memory-mapped, and a small delta segment of rows added since the last
+    compaction, scanned exactly. Deleted rows are tombstoned until compaction
+    rewrites the main segment without them.
+
+    Attributes:
+        catalog_id (str): Unique name of the catalog.
+        products (List[str]): Product descriptions of every row, main segment
+            first.
+        ids (List[str]): Product identifiers, aligned with ``products``.
+        metadata (Optional[List[Optional[Dict[str, Any]]]]): Product metadata
+            filtered on, aligned with ``products``. None when no product has
+            metadata.
+        embeddings (np.ndarray): Embeddings of the main segment, of shape
+            (n_main, dim).
+        delta (np.ndarray): float32 embeddings of the delta segment, of shape
+            (n_delta, dim).
+        deleted (AbstractSet[int]): Tombstoned rows, excluded from searches.
+        normalized (bool): Whether the embedding rows have unit norm.
+        version (int): Version of the catalog, increased by every update.
+        base_version (int): Version at which the main segment was written.
+        index (Optional[VectorIndex]): Nearest-neighbour index of the main
+            segment.
+        quantized (Optional[QuantizedEmbeddings]): Compressed main segment
+            scanned instead of the full precision one.
+        shard_key (Optional[str]): Key of the main segment in the shard pool
+            searching it, None when it is searched in process.
+    """
+
+    def __init__(
+        self,
+        catalog_id: str,
+        products: List[str],
+        ids: List[str],
+        embeddings: np.ndarray,
+        normalized: bool = False,
+        version: int = 1,
+        delta: Optional[np.ndarray] = None,
+        deleted: AbstractSet[int] = frozenset(),
+        base_version: Optional[int] = None,
+        metadata: Optional[List[Optional[Dict[str, Any]]]] = None,
+        main_filters: Optional[MetadataIndex] = None,
+        delta_filters: Optional[MetadataIndex] = None,
+    ):
+        """Initialize the catalog.
+
+        Args:
+            catalog_id (str): Unique name of the catalog.
+            products (List[str]): Product descriptions.
+            ids (List[str]): Product identifiers, one per product.
+            embeddings (np.ndarray): Main segment embeddings, one row per product
+                not in ``delta``.
+            normalized (bool): Whether the embedding rows have unit norm.
+            version (int): Version of the catalog.
+            delta (Optional[np.ndarray]): Embeddings of the rows following the
+                main segment. None for a catalog without a delta segment.
+            deleted (AbstractSet[int]): Tombstoned rows.
+            base_version (Optional[int]): Version of the main segment. Defaults
+                to ``version``.
+            metadata (Optional[List[Optional[Dict[str, Any]]]]): Metadata of
+                each product, None for products without metadata.
+            main_filters (Optional[MetadataIndex]): Filter columns of the main
+                segment, shared with another version. Built from ``metadata``
+                when None.
+            delta_filters (Optional[MetadataIndex]): Filter columns of the delta
+                segment. Built from ``metadata`` when None.
+
+        Raises:
+            ValueError: If products, ids, metadata and embeddings are not aligned.
+        """
+        if delta is None:
+            dimension = embeddings.shape[1] if embeddings.ndim == 2 else 0
+            delta = np.zeros((0, dimension), dtype=np.float32)
+        if not (len(products) == len(ids) == len(embeddings) + len(delta)):
+            raise ValueError("products, ids and embeddings must have the same length")
+        if metadata is not None and len(metadata) != len(products):
+            raise ValueError("metadata must have one entry per product")
+        self.catalog_id: str = catalog_id
+        self.products: List[str] = products
+        self.ids: List[str] = ids
+        self.metadata: Optional[List[Optional[Dict[str, Any]]]] = metadata
+        self.embeddings: np.ndarray = embeddings
+        self.delta: np.ndarray = delta
+        self.deleted: AbstractSet[int] = frozenset(deleted)
+        self.normalized: bool = normalized
+        self.version: int = version
+        self.base_version: int = version if base_version is None else base_version
+        self.index: Optional[VectorIndex] = None
+        self.quantized: Optional[QuantizedEmbeddings] = None
+        self.shard_key: Optional[str] = None
+        # Filter columns of each segment, built with the catalog so that the
+        # searches sharing it only read them.
+        fields = [None] * len(products) if metadata is None else metadata
+        if main_filters is None:
+            main_filters = MetadataIndex(fields[: len(embeddings)])
+        if delta_filters is None:
+            delta_filters = MetadataIndex(fields[len(embeddings) :])
+        self.main_filters: MetadataIndex = main_filters
+        self.delta_filters: MetadataIndex = delta_filters
+        self.rows: Dict[str, int] = {
+            product_id: row
+            for row, product_id in enumerate(ids)
+            if row not in self.deleted
+        }
+
+    @property
+    def size(self) -> int:
+        """Number of products in the catalog, tombstoned rows excluded."""
+        return len(self.products) - len(self.deleted)
+
+    @property
+    def dimension(self) -> int:
+        """Dimension of the product embeddings."""
+        return int(self.embeddings.shape[1]) if self.embeddings.ndim == 2 else 0
+
+    @property
+    def pending(self) -> int:
+        """Number of delta and tombstoned rows a compaction would fold in."""
+        return len(self.delta) + len(self.deleted)
+
+    def metadata_of(self, row: int) -> Optional[Dict[str, Any]]:
+        """Get the metadata of a row.
+
+        Args:
+            row (int): The row.
+
+        Returns:
+            Optional[Dict[str, Any]]: The metadata, None if the row has none.
+        """
+        return self.metadata[row] if self.metadata is not None else None
+
+    def vectors(self, rows: List[int]) -> np.ndarray:
+        """Get the float32 embeddings of rows of either segment.
+
+        Args:
+            rows (List[int]): The rows.
+
+        Returns:
+            np.ndarray: The embeddings, one per row.
+        """
+        main_rows = len(self.embeddings)
+        return np.array(
+            [
+                self.embeddings[row] if row < main_rows else self.delta[row - main_rows]
+                for row in rows
+            ],
+            dtype=np.float32,
+        ).reshape(-1, self.dimension)
+
+    def filter_mask(self, filters: Mapping[str, Any]) -> np.ndarray:
+        """Get the rows matching a filter expression, tombstoned rows excluded.
+
+        Args:
+            filters (Mapping[str, Any]): The filter expression, see
+                ``MetadataIndex.mask``.
+
+        Returns:
+            np.ndarray: Boolean mask over the rows of both segments.
+
+        Raises:
+            ValueError: If the expression is invalid.
+        """
+        mask = np.concatenate(
+            [self.main_filters.mask(filters), self.delta_filters.mask(filters)]
+        )
+        mask[list(self.deleted)] = False
+        return mask
+
+    def updated(
+        self,
+        products: List[str],
+        ids: List[str],
+        embeddings: np.ndarray,
+        deleted: AbstractSet[int],
+        metadata: Optional[List[Optional[Dict[str, Any]]]] = None,
+    ) -> "Catalog":
+        """Build the next version of the catalog.
+
+        The main segment, its index, its compressed form and its shards are
+        shared with this version; only the delta segment and the tombstones are copied.
+
+        Args:
+            products (List[str]): Descriptions of the rows to append.
+            ids (List[str]): Identifiers of the rows to append.
+            embeddings (np.ndarray): Embeddings of the rows to append.
+            deleted (AbstractSet[int]): Rows to tombstone.
+            metadata (Optional[List[Optional[Dict[str, Any]]]]): Metadata of the
+                rows to append.
+
+        Returns:
+            Catalog: The new version.
+        """
+        merged: Optional[List[Optional[Dict[str, Any]]]] = None
+        if self.metadata is not None or metadata is not None:
+            merged = (self.metadata or [None] * len(self.products)) + (
+                metadata or [None] * len(products)
+            )
+        catalog = Catalog(
+            catalog_id=self.catalog_id,
+            products=self.products + products,
+            ids=self.ids + ids,
+            embeddings=self.embeddings,
+            normalized=self.normalized,
+            version=self.version + 1,
+            delta=np.concatenate(
+                [self.delta, np.asarray(embeddings, dtype=np.float32)]
+            ).reshape(-1, self.dimension),
+            deleted=self.deleted | deleted,
+            base_version=self.base_version,
+            metadata=merged,
+            main_filters=self.main_filters,
+        )
+        catalog.index = self.index
+        catalog.quantized = self.quantized
+        catalog.shard_key = self.shard_key
+        return catalog
+
+    def with_index(self, index: VectorIndex) -> "Catalog":
+        """Build a copy of this version searched through another index.
+
+        Every segment is shared with this version. The compressed form is not
+        carried over, an indexed main segment being searched through its index.
+
+        Args:
+            index (VectorIndex): The index of the main segment.
+
+        Returns:
+            Catalog: The copy, with the same version.
+        """
+        catalog = Catalog(
+            catalog_id=self.catalog_id,
+            products=self.products,
+            ids=self.ids,
+            embeddings=self.embeddings,
+            normalized=self.normalized,
+            version=self.version,
+            delta=self.delta,
+            deleted=self.deleted,
+            base_version=self.base_version,
+            metadata=self.metadata,
+            main_filters=self.main_filters,
+            delta_filters=self.delta_filters,
+        )
+        catalog.index = index
+        catalog.shard_key = self.shard_key
+        return catalog
+
+    def compacted(self) -> "Catalog":
+        """Build the next version of the catalog with a single main segment.
+
+        Tombstoned rows are dropped and the delta segment is appended to the
+        main one. The index, compressed form and shards are not carried
+        over.
+
+        Returns:
+            Catalog: The new version, without delta rows or tombstones.
+        """
+        keep = np.ones(len(self.products), dtype=bool)
+        keep[list(self.deleted)] = False
+        main_rows = len(self.embeddings)
+        rows = np.flatnonzero(keep)
+        embeddings = np.concatenate(
+            [
+                np.asarray(self.embeddings[rows[rows < main_rows]], dtype=np.float32),
+                self.delta[rows[rows >= main_rows] - main_rows],
+            ]
+        ).reshape(-1, self.dimension)
+        return Catalog(
+            catalog_id=self.catalog_id,
+            products=[self.products[row] for row in rows],
+            ids=[self.ids[row] for row in rows],
+            embeddings=embeddings,
+            normalized=self.normalized,
+            version=self.version + 1,
+            metadata=(
+                [self.metadata[row] for row in rows]
+                if self.metadata is not None
+                else None
+            ),
+        )
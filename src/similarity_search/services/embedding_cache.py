@@ -0,0 +1,111 @@
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+CacheKey = Tuple[str, str]
+
+
+class EmbeddingCache:
+    """Content-addressed LRU cache of text embeddings with a memory cap in bytes.
+
+    Entries are keyed by the model name and the SHA-256 digest of the text, so the
+    same text encoded by different models never collides.
+    """
+
+    def __init__(self, max_bytes: int):
+        """Initialize the cache.
+
+        Args:
+            max_bytes (int): Maximum number of bytes of embedding data to keep.
+        """
+        self.max_bytes: int = max_bytes
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self._entries: "OrderedDict[CacheKey, np.ndarray]" = OrderedDict()
+        self._bytes: int = 0
+        self._lock = Lock()
+
+    @staticmethod
+    def key(model_name: str, text: str) -> CacheKey:
+        """Build the cache key of a text.
+
+        Args:
+            model_name (str): Name of the model producing the embedding.
+            text (str): The encoded text.
+
+        Returns:
+            CacheKey: The (model name, text hash) key.
+        """
+        return model_name, hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, key: CacheKey) -> Optional[np.ndarray]:
+        """Look up an embedding and mark it as most recently used.
+
+        Args:
+            key (CacheKey): The cache key.
+
+        Returns:
+            Optional[np.ndarray]: The cached embedding, or None on a miss.
+        """
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, key: CacheKey, embedding: np.ndarray) -> None:
+        """Store an embedding, evicting least recently used entries if needed.
+
+        Embeddings larger than the whole cache are not stored.
+
+        Args:
+            key (CacheKey): The cache key.
+            embedding (np.ndarray): The embedding to store.
+        """
+        embedding = np.array(embedding, dtype=np.float32)
+        embedding.setflags(write=False)
+        if embedding.nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            while self._entries and self._bytes + embedding.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+            self._entries[key] = embedding
+            self._bytes += embedding.nbytes
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Get cache statistics.
+
+        Returns:
+            Dict[str, int]: Hit, miss and eviction counts and the memory in use.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
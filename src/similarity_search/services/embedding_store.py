@@ -0,0 +1,267 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+import numpy as np
+
+from ..core.logging import get_logger
+from .catalog import Catalog
+
+logger = get_logger(__name__)
+
+EMBEDDINGS_FILE = "embeddings.npy"
+INDEX_FILE = "index.json"
+DELTA_EMBEDDINGS_FILE = "delta.npy"
+DELTA_FILE = "delta.json"
+SUPPORTED_DTYPES = ("float32", "float16")
+CATALOG_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9_.-]*$")
+
+
+def _atomic_write(path: Path, write: Any) -> None:
+    """Write a file through a temporary sibling and rename it into place.
+
+    Readers in other processes therefore see either the old or the new file,
+    never a partially written one.
+
+    Args:
+        path (Path): Destination of the file.
+        write (Any): Callable receiving the open binary file object.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class EmbeddingStore:
+    """Disk-backed store of catalog embeddings, opened with mmap.
+
+    Catalogs are grouped by the model that encoded them, so that models
+    sharing the store can serve catalogs of the same name without overwriting
+    each other. Each catalog is kept in its own directory holding an ``embeddings.npy``
+    matrix and an ``index.json`` file with the product ids and descriptions;
+    row ``i`` of the matrix is the embedding of ``ids[i]``. Matrices are opened
+    copy-on-write with ``mmap``, so every worker process on the same host shares
+    the same page-cache pages and a restarted process can serve without
+    re-encoding. Updates since the last compaction are kept next to them in
+    ``delta.npy`` and ``delta.json``, so that an update only writes the changed
+    rows.
+    """
+
+    def __init__(self, root_dir: str, dtype: str = "float32"):
+        """Initialize the store.
+
+        Args:
+            root_dir (str): Directory holding one sub-directory per model,
+                itself holding one sub-directory per catalog.
+            dtype (str): On-disk dtype of the embeddings, float32 or float16.
+
+        Raises:
+            ValueError: If the dtype is not supported.
+        """
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(
+                f"Unsupported embedding dtype '{dtype}', expected one of {SUPPORTED_DTYPES}"
+            )
+        self.root_dir: Path = Path(root_dir)
+        self.dtype: str = dtype
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+
+    def _model_dir(self, model_name: str) -> Path:
+        # Model names such as "org/model" or local paths become a single,
+        # reversible path component.
+        name = quote(model_name, safe="")
+        if name in ("", ".", ".."):
+            raise ValueError(f"Invalid model name '{model_name}'")
+        return self.root_dir / name
+
+    def _catalog_dir(self, catalog_id: str, model_name: str) -> Path:
+        if not CATALOG_ID_PATTERN.match(catalog_id):
+            raise ValueError(f"Invalid catalog id '{catalog_id}'")
+        return self._model_dir(model_name) / catalog_id
+
+    def catalog_ids(self, model_name: str) -> List[str]:
+        """List the catalogs of a model present in the store.
+
+        Args:
+            model_name (str): Name of the model.
+
+        Returns:
+            List[str]: The stored catalog ids.
+        """
+        return sorted(
+            path.parent.name
+            for path in self._model_dir(model_name).glob(f"*/{INDEX_FILE}")
+        )
+
+    def save(self, catalog: Catalog, model_name: str) -> None:
+        """Persist a catalog's main segment and index.
+
+        The catalog must not have delta rows or tombstones, as after
+        registration or compaction. Any stored delta is discarded.
+
+        Args:
+            catalog (Catalog): The catalog to persist.
+            model_name (str): Name of the model that produced the embeddings.
+        """
+        catalog_dir = self._catalog_dir(catalog.catalog_id, model_name)
+        catalog_dir.mkdir(parents=True, exist_ok=True)
+        embeddings = np.ascontiguousarray(catalog.embeddings, dtype=self.dtype)
+        index: Dict[str, Any] = {
+            "catalog_id": catalog.catalog_id,
+            "model_name": model_name,
+            "dtype": self.dtype,
+            "count": catalog.size,
+            "dimension": catalog.dimension,
+            "normalized": catalog.normalized,
+            "version": catalog.version,
+            "ids": catalog.ids,
+            "products": catalog.products,
+            "metadata": catalog.metadata,
+        }
+
+        # The matrix goes first so that a published index never points at a
+        # matrix with fewer rows than it lists.
+        _atomic_write(
+            catalog_dir / EMBEDDINGS_FILE,
+            lambda f: np.save(f, embeddings, allow_pickle=False),
+        )
+        _atomic_write(
+            catalog_dir / INDEX_FILE,
+            lambda f: f.write(json.dumps(index).encode("utf-8")),
+        )
+        # A delta left over is ignored on load since its base version no longer
+        # matches the index; removing it only reclaims the space.
+        for name in (DELTA_FILE, DELTA_EMBEDDINGS_FILE):
+            (catalog_dir / name).unlink(missing_ok=True)
+        logger.info(f"Stored catalog '{catalog.catalog_id}' in {catalog_dir}")
+
+    def save_delta(self, catalog: Catalog, model_name: str) -> None:
+        """Persist the delta segment and tombstones of a catalog.
+
+        Args:
+            catalog (Catalog): The catalog, whose main segment was stored with
+                ``save`` at its ``base_version``.
+            model_name (str): Name of the model that produced the embeddings.
+        """
+        catalog_dir = self._catalog_dir(catalog.catalog_id, model_name)
+        main_rows = len(catalog.embeddings)
+        delta = np.ascontiguousarray(catalog.delta, dtype=self.dtype)
+        state: Dict[str, Any] = {
+            "base_version": catalog.base_version,
+            "version": catalog.version,
+            "ids": catalog.ids[main_rows:],
+            "products": catalog.products[main_rows:],
+            "metadata": (
+                catalog.metadata[main_rows:] if catalog.metadata is not None else None
+            ),
+            "deleted": sorted(catalog.deleted),
+        }
+        _atomic_write(
+            catalog_dir / DELTA_EMBEDDINGS_FILE,
+            lambda f: np.save(f, delta, allow_pickle=False),
+        )
+        _atomic_write(
+            catalog_dir / DELTA_FILE,
+            lambda f: f.write(json.dumps(state).encode("utf-8")),
+        )
+
+    def load(self, catalog_id: str, model_name: str) -> Optional[Catalog]:
+        """Open a stored catalog with its embeddings memory-mapped.
+
+        The mapping is copy-on-write: it is writable for libraries such as torch
+        that refuse read-only buffers, but writes never reach the file.
+
+        Args:
+            catalog_id (str): Name of the catalog.
+            model_name (str): Name of the model the caller encodes queries with.
+
+        Returns:
+            Optional[Catalog]: The catalog, or None if it is not stored or was
+                encoded with a different model.
+        """
+        if not CATALOG_ID_PATTERN.match(catalog_id):
+            return None
+        catalog_dir = self._catalog_dir(catalog_id, model_name)
+        try:
+            index = json.loads((catalog_dir / INDEX_FILE).read_text(encoding="utf-8"))
+            embeddings = np.load(
+                catalog_dir / EMBEDDINGS_FILE, mmap_mode="c", allow_pickle=False
+            )
+        except FileNotFoundError:
+            return None
+
+        if index["model_name"] != model_name:
+            logger.warning(
+                f"Skipping stored catalog '{catalog_id}' encoded with "
+                f"'{index['model_name']}' instead of '{model_name}'"
+            )
+            return None
+
+        version = index.get("version", 1)
+        catalog = Catalog(
+            catalog_id=catalog_id,
+            products=index["products"],
+            ids=index["ids"],
+            embeddings=embeddings[: index["count"]],
+            normalized=index.get("normalized", False),
+            version=version,
+            metadata=index.get("metadata"),
+        )
+        return self._load_delta(catalog_dir, catalog)
+
+    def _load_delta(self, catalog_dir: Path, catalog: Catalog) -> Catalog:
+        """Apply the stored delta segment and tombstones to a main segment.
+
+        Args:
+            catalog_dir (Path): Directory of the catalog.
+            catalog (Catalog): The catalog loaded from the main segment.
+
+        Returns:
+            Catalog: The catalog at its latest stored version.
+        """
+        try:
+            state = json.loads((catalog_dir / DELTA_FILE).read_text(encoding="utf-8"))
+            delta = np.load(catalog_dir / DELTA_EMBEDDINGS_FILE, allow_pickle=False)
+        except FileNotFoundError:
+            return catalog
+        if state["base_version"] != catalog.version:
+            return catalog
+        delta_metadata = state.get("metadata")
+        metadata = None
+        if catalog.metadata is not None or delta_metadata is not None:
+            metadata = (catalog.metadata or [None] * len(catalog.products)) + (
+                delta_metadata or [None] * len(state["ids"])
+            )
+        return Catalog(
+            catalog_id=catalog.catalog_id,
+            products=catalog.products + state["products"],
+            ids=catalog.ids + state["ids"],
+            embeddings=catalog.embeddings,
+            normalized=catalog.normalized,
+            version=state["version"],
+            delta=np.asarray(delta[: len(state["ids"])], dtype=np.float32),
+            deleted=frozenset(state["deleted"]),
+            base_version=catalog.version,
+            metadata=metadata,
+        )
+
+    def delete(self, catalog_id: str, model_name: str) -> None:
+        """Remove a stored catalog of a model.
+
+        Args:
+            catalog_id (str): Name of the catalog.
+            model_name (str): Name of the model that encoded it.
+        """
+        if not CATALOG_ID_PATTERN.match(catalog_id):
+            return
+        shutil.rmtree(self._catalog_dir(catalog_id, model_name), ignore_errors=True)
@@ -0,0 +1,167 @@
+import asyncio
+import contextvars
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, TypeVar, Union
+
+from ..core.cancellation import check_cancelled
+from ..core.exceptions import QueueFullError, RequestCancelledError
+from ..core.logging import get_logger
+from ..core.metrics import ABANDONED_REQUESTS, observe_stage
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class InferenceExecutor:
+    """Dedicated thread pool for CPU-bound inference with bounded admission.
+
+    At most ``max_workers`` calls run at once and at most ``max_queue_size``
+    more wait for a worker. Calls beyond that are rejected immediately with
+    :class:`QueueFullError`, so that under overload callers get a fast error
+    instead of an ever-growing queue and collapsing latency.
+
+    Calls run in the context of their caller, whose cancellation token they
+    check. Calls whose request stopped while they were queued are skipped, and
+    those stopped while running are counted as abandoned, with the worker time
+    they took.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_queue_size: int,
+        torch_threads: Optional[int] = None,
+    ):
+        """Initialize the executor.
+
+        Args:
+            max_workers (int): Number of worker threads running inference.
+            max_queue_size (int): Number of calls allowed to wait for a worker.
+            torch_threads (Optional[int]): Number of intra-op threads torch uses
+                per call. Leave unset to keep the torch default.
+        """
+        self.max_workers: int = max_workers
+        self.max_queue_size: int = max_queue_size
+        self.torch_threads: Optional[int] = torch_threads
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = Lock()
+        self._admitted: int = 0
+        self._completed: int = 0
+        self._rejected: int = 0
+        self._abandoned: int = 0
+        self._abandoned_seconds: float = 0.0
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of calls admitted at the same time."""
+        return self.max_workers + self.max_queue_size
+
+    def start(self) -> None:
+        """Start the worker threads."""
+        if self._pool is not None:
+            return
+        if self.torch_threads:
+            import torch
+
+            torch.set_num_threads(self.torch_threads)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="inference"
+        )
+        logger.info(
+            f"Inference executor started with {self.max_workers} workers "
+            f"and a queue of {self.max_queue_size}"
+        )
+
+    def shutdown(self) -> None:
+        """Stop the worker threads after the admitted calls complete."""
+        if self._pool is None:
+            return
+        self._pool.shutdown(wait=True)
+        self._pool = None
+
+    def _release(self, _: "Future[Any]") -> None:
+        with self._lock:
+            self._admitted -= 1
+            self._completed += 1
+
+    def _abandon(self, error: RequestCancelledError, seconds: float) -> None:
+        """Count a call stopped early.
+
+        Args:
+            error (RequestCancelledError): Why and where the call stopped.
+            seconds (float): Worker time the call took before stopping.
+        """
+        ABANDONED_REQUESTS.labels(error.reason, error.stage).inc()
+        with self._lock:
+            self._abandoned += 1
+            self._abandoned_seconds += seconds
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a function on a worker thread and await its result.
+
+        Args:
+            fn (Callable[..., T]): The function to run.
+            *args (Any): Positional arguments of the function.
+            **kwargs (Any): Keyword arguments of the function.
+
+        Returns:
+            T: The return value of the function.
+
+        Raises:
+            RuntimeError: If the executor is not started.
+            QueueFullError: If the executor is at capacity.
+            RequestCancelledError: If the request of the caller stopped before
+                the call completed.
+        """
+        pool = self._pool
+        if pool is None:
+            raise RuntimeError("Inference executor is not running")
+
+        with self._lock:
+            if self._admitted >= self.capacity:
+                self._rejected += 1
+                raise QueueFullError(self.capacity)
+            self._admitted += 1
+
+        # Admission is released when the work finishes, not when the caller
+        # stops waiting, so abandoned calls still count against the capacity.
+        submitted = time.perf_counter()
+
+        def call() -> T:
+            started = time.perf_counter()
+            observe_stage("queue", started - submitted)
+            try:
+                check_cancelled("queue")
+                return fn(*args, **kwargs)
+            except RequestCancelledError as e:
+                self._abandon(e, time.perf_counter() - started)
+                raise
+
+        # Run in a copy of the caller's context, like asyncio.to_thread, so that
+        # request scoped state such as the active profile follows the call.
+        future = pool.submit(contextvars.copy_context().run, call)
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Get executor statistics.
+
+        Returns:
+            Dict[str, Union[int, float]]: Configuration, admitted, completed,
+                rejected and abandoned calls, and the worker seconds taken by
+                abandoned calls.
+        """
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "queue_size": self.max_queue_size,
+                "in_flight": min(self._admitted, self.max_workers),
+                "queued": max(self._admitted - self.max_workers, 0),
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "abandoned": self._abandoned,
+                "abandoned_seconds": self._abandoned_seconds,
+            }
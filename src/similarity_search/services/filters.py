@@ -0,0 +1,199 @@
+import numbers
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Operators of a field condition, e.g. {"price": {"gte": 10, "lt": 50}}. A bare
+# value, e.g. {"category": "tools"}, is a shorthand for {"eq": value}.
+SET_OPERATORS = ("in", "nin")
+RANGE_OPERATORS = {
+    "gt": np.greater,
+    "gte": np.greater_equal,
+    "lt": np.less,
+    "lte": np.less_equal,
+}
+OPERATORS = ("eq", "ne", *SET_OPERATORS, *RANGE_OPERATORS)
+
+
+def _is_number(value: Any) -> bool:
+    """Whether a metadata value is numeric; booleans are categories.
+
+    Args:
+        value (Any): The value.
+
+    Returns:
+        bool: True for ints and floats.
+    """
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
+def _conditions(filters: Mapping[str, Any]) -> List[Tuple[str, str, Any]]:
+    """Flatten a filter expression into (field, operator, operand) conditions.
+
+    Args:
+        filters (Mapping[str, Any]): Field conditions, all of which must hold.
+
+    Returns:
+        List[Tuple[str, str, Any]]: The conditions.
+
+    Raises:
+        ValueError: If an operator is unknown or has an invalid operand.
+    """
+    conditions = []
+    for field, condition in filters.items():
+        if not isinstance(condition, Mapping):
+            condition = {"eq": condition}
+        if not condition:
+            raise ValueError(f"filter on '{field}' has no operator")
+        for operator, operand in condition.items():
+            if operator not in OPERATORS:
+                raise ValueError(
+                    f"unknown filter operator '{operator}' on '{field}', expected "
+                    f"one of {', '.join(OPERATORS)}"
+                )
+            if operator in SET_OPERATORS and not isinstance(operand, list):
+                raise ValueError(f"'{operator}' filter on '{field}' needs a list")
+            if operator in RANGE_OPERATORS and not _is_number(operand):
+                raise ValueError(f"'{operator}' filter on '{field}' needs a number")
+            if operator not in SET_OPERATORS and isinstance(operand, (list, dict)):
+                raise ValueError(f"'{operator}' filter on '{field}' needs a value")
+            conditions.append((field, operator, operand))
+    return conditions
+
+
+def validate_filters(filters: Mapping[str, Any]) -> Mapping[str, Any]:
+    """Check the syntax of a filter expression.
+
+    Args:
+        filters (Mapping[str, Any]): The filter expression.
+
+    Returns:
+        Mapping[str, Any]: The same filter expression.
+
+    Raises:
+        ValueError: If the expression is invalid.
+    """
+    _conditions(filters)
+    return filters
+
+
+class MetadataIndex:
+    """Column arrays and bitmaps of product metadata, evaluated before scoring.
+
+    Fields whose values are all numbers are kept as a float64 column, NaN where
+    a product has no value, and compared with vectorized range checks. Other
+    fields are dictionary encoded into an int32 column of value codes, -1 where
+    a product has no value; values of different types, such as ``True`` and
+    ``1``, get different codes. Fields with at most ``bitmap_max_values`` distinct
+    values also get one precomputed bitmap per value, packed eight rows per
+    byte, so that equality and set conditions combine with bitwise operations
+    on an eighth of the rows. A product without a value never matches a
+    condition on that field; list and object values, which cannot be compared
+    to an operand, are left out of the columns like missing ones.
+    """
+
+    def __init__(
+        self,
+        metadata: Sequence[Optional[Mapping[str, Any]]],
+        bitmap_max_values: int = 256,
+    ):
+        """Build the columns and bitmaps.
+
+        Args:
+            metadata (Sequence[Optional[Mapping[str, Any]]]): Metadata of each
+                product, None for a product without metadata.
+            bitmap_max_values (int): Maximum number of distinct values of a
+                field that gets per-value bitmaps.
+        """
+        self.size: int = len(metadata)
+        values: Dict[str, Dict[int, Any]] = {}
+        for row, fields in enumerate(metadata):
+            for field, value in (fields or {}).items():
+                if value is not None and not isinstance(value, (list, dict)):
+                    values.setdefault(field, {})[row] = value
+
+        self.numeric: Dict[str, np.ndarray] = {}
+        self.codes: Dict[str, Tuple[Dict[Tuple[type, Any], int], np.ndarray]] = {}
+        self.bitmaps: Dict[str, Dict[int, np.ndarray]] = {}
+        for field, field_values in values.items():
+            rows = np.fromiter(field_values, dtype=np.int64, count=len(field_values))
+            if all(_is_number(value) for value in field_values.values()):
+                column = np.full(self.size, np.nan)
+                column[rows] = list(field_values.values())
+                self.numeric[field] = column
+                continue
+            categories: Dict[Tuple[type, Any], int] = {}
+            codes = np.full(self.size, -1, dtype=np.int32)
+            codes[rows] = [
+                categories.setdefault((type(value), value), len(categories))
+                for value in field_values.values()
+            ]
+            self.codes[field] = (categories, codes)
+            if len(categories) <= bitmap_max_values:
+                self.bitmaps[field] = {
+                    code: np.packbits(codes == code) for code in categories.values()
+                }
+
+    def _bitmap(self, field: str, operator: str, operand: Any) -> np.ndarray:
+        """Evaluate one condition into a packed bitmap.
+
+        Args:
+            field (str): The metadata field.
+            operator (str): One of ``OPERATORS``.
+            operand (Any): The value, list of values or bound.
+
+        Returns:
+            np.ndarray: The packed bitmap of the matching rows.
+
+        Raises:
+            ValueError: If a range operator is applied to a non-numeric field.
+        """
+        if field in self.numeric:
+            column = self.numeric[field]
+            if operator in RANGE_OPERATORS:
+                return np.packbits(RANGE_OPERATORS[operator](column, operand))
+            operands = operand if operator in SET_OPERATORS else [operand]
+            wanted = [value for value in operands if _is_number(value)]
+            matches = np.isin(column, wanted)
+            if operator in ("ne", "nin"):
+                matches = ~matches & ~np.isnan(column)
+            return np.packbits(matches)
+
+        if operator in RANGE_OPERATORS:
+            if field not in self.codes:
+                return np.packbits(np.zeros(self.size, dtype=bool))
+            raise ValueError(f"'{operator}' filter on non-numeric field '{field}'")
+        categories, codes = self.codes.get(field, ({}, np.full(self.size, -1)))
+        operands = operand if operator in SET_OPERATORS else [operand]
+        keys = [(type(value), value) for value in operands]
+        wanted = [categories[key] for key in keys if key in categories]
+        bitmaps = self.bitmaps.get(field)
+        if bitmaps is not None:
+            matches = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+            for code in wanted:
+                matches |= bitmaps[code]
+        else:
+            matches = np.packbits(np.isin(codes, wanted))
+        if operator in ("ne", "nin"):
+            matches = ~matches & np.packbits(codes >= 0)
+        return matches
+
+    def mask(self, filters: Mapping[str, Any]) -> np.ndarray:
+        """Evaluate a filter expression.
+
+        Args:
+            filters (Mapping[str, Any]): Field conditions, all of which must
+                hold. A condition is a value, for equality, or a mapping of
+                operators to operands, e.g. ``{"gte": 10, "lt": 50}`` or
+                ``{"in": ["tools", "garden"]}``.
+
+        Returns:
+            np.ndarray: Boolean mask of the matching rows.
+
+        Raises:
+            ValueError: If the expression is invalid.
+        """
+        matches = np.full((self.size + 7) // 8, 0xFF, dtype=np.uint8)
+        for field, operator, operand in _conditions(filters):
+            matches &= self._bitmap(field, operator, operand)
+        return np.unpackbits(matches, count=self.size).astype(bool)
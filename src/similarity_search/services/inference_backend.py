@@ -0,0 +1,146 @@
+import contextlib
+import itertools
+import re
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional
+
+import numpy as np
+
+from ..core.logging import get_logger
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+logger = get_logger(__name__)
+
+INFERENCE_BACKENDS = ("torch", "onnx", "onnx-int8")
+ONNX_FILE = "onnx/model.onnx"
+QUANTIZED_SUFFIX = "qint8"
+QUANTIZED_ONNX_FILE = f"onnx/model_{QUANTIZED_SUFFIX}.onnx"
+
+
+def _cached_model_dir(cache_dir: str, model_name: str, backend: str) -> Path:
+    """Get the directory a converted model is cached in.
+
+    Args:
+        cache_dir (str): Root directory of the converted models.
+        model_name (str): Name of the sentence transformer model.
+        backend (str): The inference backend the model was converted for.
+
+    Returns:
+        Path: The model directory, one per model and backend.
+    """
+    return Path(cache_dir) / re.sub(r"[^A-Za-z0-9_.-]", "--", model_name) / backend
+
+
+def load_model(
+    model_name: str,
+    backend: str = "torch",
+    cache_dir: Optional[str] = None,
+    quantization_config: str = "avx2",
+) -> "SentenceTransformer":
+    """Load a sentence transformer model for the given inference backend.
+
+    The ``onnx`` backend exports the model to an ONNX Runtime graph and
+    ``onnx-int8`` additionally quantizes its weights to int8 with dynamic
+    quantization. Converted models are saved under ``cache_dir`` and loaded from
+    there on the next start instead of being converted again.
+
+    sentence-transformers, and torch with it, is only imported here so that
+    importing the application stays fast.
+
+    Args:
+        model_name (str): Name of the sentence transformer model.
+        backend (str): One of ``INFERENCE_BACKENDS``.
+        cache_dir (Optional[str]): Directory converted models are cached in.
+            None converts the model on every load.
+        quantization_config (str): Target instruction set of the int8 graph,
+            ``"arm64"``, ``"avx2"``, ``"avx512"`` or ``"avx512_vnni"``.
+
+    Returns:
+        SentenceTransformer: The loaded model.
+
+    Raises:
+        ValueError: If the backend is unknown.
+        ImportError: If an ONNX backend is requested without optimum and
+            onnxruntime installed.
+    """
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(
+            f"Unknown inference backend '{backend}', expected one of {INFERENCE_BACKENDS}"
+        )
+    from sentence_transformers import (
+        SentenceTransformer,
+        export_dynamic_quantized_onnx_model,
+    )
+
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+
+    file_name = QUANTIZED_ONNX_FILE if backend == "onnx-int8" else ONNX_FILE
+    model_dir = _cached_model_dir(cache_dir, model_name, backend) if cache_dir else None
+    if model_dir is not None and (model_dir / file_name).exists():
+        logger.info(f"Loading cached {backend} model from {model_dir}")
+        return SentenceTransformer(
+            str(model_dir), backend="onnx", model_kwargs={"file_name": file_name}
+        )
+
+    logger.info(f"Converting model '{model_name}' for the {backend} backend")
+    model = SentenceTransformer(model_name, backend="onnx")
+    if backend == "onnx":
+        if model_dir is not None:
+            model.save_pretrained(str(model_dir))
+        return model
+
+    # The quantized graph is written next to a saved model. When converted
+    # models are not cached, it goes to a temporary directory removed once
+    # ONNX Runtime has loaded the graph into memory.
+    with contextlib.ExitStack() as stack:
+        if model_dir is None:
+            model_dir = Path(
+                stack.enter_context(tempfile.TemporaryDirectory(prefix="onnx-model-"))
+            )
+        model.save_pretrained(str(model_dir))
+        export_dynamic_quantized_onnx_model(
+            model, quantization_config, str(model_dir), file_suffix=QUANTIZED_SUFFIX
+        )
+        return SentenceTransformer(
+            str(model_dir), backend="onnx", model_kwargs={"file_name": file_name}
+        )
+
+
+def model_memory_bytes(model: Any) -> int:
+    """Estimate the memory taken by the weights of a loaded model.
+
+    The parameters and buffers of torch modules are counted. Models without
+    them, such as ONNX Runtime graphs or worker pools whose weights live in
+    other processes, count for 0.
+
+    Args:
+        model (Any): The loaded model, None if no model is loaded.
+
+    Returns:
+        int: The size of the weights in bytes.
+    """
+    tensors = itertools.chain(
+        getattr(model, "parameters", tuple)(), getattr(model, "buffers", tuple)()
+    )
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+
+def cosine_agreement(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Measure how closely two backends agree on the same embeddings.
+
+    Args:
+        expected (np.ndarray): Reference embeddings of shape (n, dim).
+        actual (np.ndarray): Embeddings of the same texts from another backend.
+
+    Returns:
+        float: The smallest row-wise cosine similarity between the two.
+    """
+    expected = np.asarray(expected, dtype=np.float32)
+    actual = np.asarray(actual, dtype=np.float32)
+    dots = np.einsum("ij,ij->i", expected, actual)
+    norms = np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1)
+    return float(np.min(dots / np.maximum(norms, 1e-12)))
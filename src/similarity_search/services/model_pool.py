@@ -0,0 +1,355 @@
+import math
+import multiprocessing
+import os
+import queue
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+from multiprocessing.shared_memory import SharedMemory
+from threading import Lock, Thread
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from ..core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def _worker_main(
+    conn: Connection, model_factory: Callable[[], Any], torch_threads: Optional[int]
+) -> None:
+    """Entry point of a model worker process.
+
+    The worker loads its own copy of the model, reports the embedding dimension,
+    attaches to the shared output buffer created by the parent and then encodes
+    the texts it receives into that buffer until it gets ``None``.
+
+    Args:
+        conn (Connection): Pipe to the parent process.
+        model_factory (Callable[[], Any]): Picklable callable loading the model.
+        torch_threads (Optional[int]): Number of intra-op threads torch uses.
+    """
+    try:
+        model = model_factory()
+        # Only models that run on torch have imported it by now.
+        if torch_threads and "torch" in sys.modules:
+            sys.modules["torch"].set_num_threads(torch_threads)
+        dimension = int(model.get_sentence_embedding_dimension())
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+        return
+    conn.send(("ready", dimension))
+
+    buffer = SharedMemory(name=conn.recv())
+    try:
+        while True:
+            texts = conn.recv()
+            if texts is None:
+                break
+            try:
+                embeddings = np.asarray(model.encode(texts), dtype=np.float32)
+                out = np.ndarray(embeddings.shape, dtype=np.float32, buffer=buffer.buf)
+                out[:] = embeddings
+                del out
+                conn.send(("ok", len(embeddings)))
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        buffer.close()
+
+
+class _Worker:
+    """Parent side handle of a model worker process."""
+
+    def __init__(self, index: int, process: BaseProcess, conn: Connection):
+        self.index: int = index
+        self.process: BaseProcess = process
+        self.conn: Connection = conn
+        self.buffer: Optional[SharedMemory] = None
+        self.dimension: int = 0
+
+
+class ModelWorkerPool:
+    """Pool of model processes encoding texts in parallel, past the GIL.
+
+    Each worker process holds one copy of the model and uses ``torch_threads``
+    intra-op threads, so memory grows by one model per worker and the cores are
+    split between workers instead of being oversubscribed. Texts are sent to the
+    workers over a pipe; embeddings come back through a shared memory buffer per
+    worker, created by this process, instead of being pickled.
+
+    An encode call is split into chunks spread over the idle workers and the
+    pool exposes the same ``encode`` method as a sentence transformer, so it can
+    stand in for the model. A worker process that exits fails the chunk it was
+    given and is replaced in the background by a new one.
+    """
+
+    def __init__(
+        self,
+        model_factory: Callable[[], Any],
+        workers: int,
+        torch_threads: Optional[int] = None,
+        max_texts: int = 256,
+    ):
+        """Initialize the pool.
+
+        Args:
+            model_factory (Callable[[], Any]): Picklable callable loading the
+                model in each worker, e.g. a ``functools.partial`` of
+                ``inference_backend.load_model``.
+            workers (int): Number of worker processes.
+            torch_threads (Optional[int]): Intra-op threads per worker. Defaults
+                to the CPU count divided by the number of workers.
+            max_texts (int): Maximum number of texts encoded per worker call,
+                which sizes the shared output buffers.
+        """
+        self.model_factory = model_factory
+        self.workers: int = workers
+        self.torch_threads: int = torch_threads or max(
+            1, (os.cpu_count() or 1) // workers
+        )
+        self.max_texts: int = max_texts
+        self.dimension: int = 0
+        self._workers: List[_Worker] = []
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._dispatcher: Optional[ThreadPoolExecutor] = None
+        self._stats_lock = Lock()
+        self._calls: int = 0
+        self._chunks: int = 0
+        self._texts: int = 0
+        self._restarts: int = 0
+
+    @property
+    def running(self) -> bool:
+        """Whether the worker processes are running."""
+        return self._dispatcher is not None
+
+    def start(self) -> None:
+        """Start the worker processes and wait until their model is loaded.
+
+        Raises:
+            RuntimeError: If a worker fails to load the model.
+        """
+        if self.running:
+            return
+        self._workers = [self._spawn(i) for i in range(self.workers)]
+        try:
+            for worker in self._workers:
+                self._attach(worker)
+                self._idle.put(worker)
+        except BaseException:
+            self._terminate()
+            raise
+
+        self.dimension = self._workers[0].dimension
+        self._dispatcher = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="model-dispatch"
+        )
+        logger.info(
+            f"Model worker pool started with {self.workers} processes "
+            f"of {self.torch_threads} torch threads"
+        )
+
+    def _spawn(self, index: int) -> _Worker:
+        """Start a worker process, which then loads its model.
+
+        Args:
+            index (int): Index of the worker.
+
+        Returns:
+            _Worker: The worker, not attached yet.
+        """
+        context = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = context.Pipe()
+        process = context.Process(
+            target=_worker_main,
+            args=(child_conn, self.model_factory, self.torch_threads),
+            name=f"model-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return _Worker(index, process, parent_conn)
+
+    def _attach(self, worker: _Worker) -> None:
+        """Wait until a worker loaded its model and give it its output buffer.
+
+        Args:
+            worker (_Worker): The started worker.
+
+        Raises:
+            RuntimeError: If the worker fails to load the model.
+        """
+        try:
+            status, value = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            raise RuntimeError("Model worker exited while starting") from e
+        if status != "ready":
+            raise RuntimeError(f"Model worker failed to start: {value}")
+        worker.dimension = value
+        worker.buffer = SharedMemory(create=True, size=self.max_texts * value * 4)
+        worker.conn.send(worker.buffer.name)
+
+    def _respawn(self, worker: _Worker) -> None:
+        """Replace a worker whose process exited.
+
+        The replacement is only made idle if the pool is still running; a
+        worker that cannot be replaced is left out of the pool.
+
+        Args:
+            worker (_Worker): The worker that exited.
+        """
+        logger.warning(f"Model worker {worker.index} exited, restarting it")
+        self._close(worker)
+        replacement = self._spawn(worker.index)
+        try:
+            self._attach(replacement)
+        except RuntimeError as e:
+            logger.error(f"Error restarting model worker {worker.index}: {str(e)}")
+            self._close(replacement)
+            return
+        with self._stats_lock:
+            replaced = self.running and worker in self._workers
+            if replaced:
+                self._workers[self._workers.index(worker)] = replacement
+                self._restarts += 1
+        if not replaced:
+            self._close(replacement)
+            return
+        self._idle.put(replacement)
+
+    def stop(self) -> None:
+        """Stop the worker processes after their current call."""
+        if self._dispatcher is None:
+            return
+        self._dispatcher.shutdown(wait=True)
+        self._dispatcher = None
+        for worker in self._workers:
+            try:
+                worker.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            worker.process.join(timeout=10)
+        self._terminate()
+
+    def _terminate(self) -> None:
+        """Kill the remaining processes and release the shared buffers."""
+        with self._stats_lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            self._close(worker)
+        self._idle = queue.Queue()
+
+    @staticmethod
+    def _close(worker: _Worker) -> None:
+        """Kill a worker process if it still runs and release its buffer.
+
+        Args:
+            worker (_Worker): The worker.
+        """
+        if worker.process.is_alive():
+            worker.process.terminate()
+            worker.process.join()
+        worker.conn.close()
+        if worker.buffer is not None:
+            worker.buffer.close()
+            worker.buffer.unlink()
+            worker.buffer = None
+
+    def get_sentence_embedding_dimension(self) -> int:
+        """Get the dimension of the embeddings produced by the workers."""
+        return self.dimension
+
+    def encode(self, texts: List[str], **kwargs: Any) -> np.ndarray:
+        """Encode texts on the worker processes.
+
+        Args:
+            texts (List[str]): Texts to encode.
+            **kwargs (Any): Ignored, accepted for compatibility with
+                ``SentenceTransformer.encode``.
+
+        Returns:
+            np.ndarray: float32 embeddings, one row per text.
+
+        Raises:
+            RuntimeError: If the pool is not running or a worker fails.
+        """
+        dispatcher = self._dispatcher
+        if dispatcher is None:
+            raise RuntimeError("Model worker pool is not running")
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        chunk_size = min(self.max_texts, math.ceil(len(texts) / self.workers))
+        chunks = [
+            texts[start : start + chunk_size]
+            for start in range(0, len(texts), chunk_size)
+        ]
+        with self._stats_lock:
+            self._calls += 1
+            self._chunks += len(chunks)
+            self._texts += len(texts)
+        if len(chunks) == 1:
+            return self._encode_chunk(chunks[0])
+        return np.concatenate(list(dispatcher.map(self._encode_chunk, chunks)))
+
+    def _encode_chunk(self, texts: List[str]) -> np.ndarray:
+        """Encode one chunk on the next idle worker.
+
+        Args:
+            texts (List[str]): At most ``max_texts`` texts.
+
+        Returns:
+            np.ndarray: The embeddings, copied out of the shared buffer.
+
+        Raises:
+            RuntimeError: If the worker fails to encode the texts.
+        """
+        worker = self._idle.get()
+        exited = False
+        try:
+            try:
+                worker.conn.send(texts)
+                status, value = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                exited = True
+                raise RuntimeError("Model worker exited") from e
+            if status != "ok":
+                raise RuntimeError(f"Model worker failed to encode: {value}")
+            if worker.buffer is None:
+                raise RuntimeError("Model worker has no output buffer")
+            return np.ndarray(
+                (value, worker.dimension), dtype=np.float32, buffer=worker.buffer.buf
+            ).copy()
+        finally:
+            if exited:
+                # Replaced in the background instead of being made idle again.
+                Thread(
+                    target=self._respawn,
+                    args=(worker,),
+                    name=f"model-worker-{worker.index}-restart",
+                    daemon=True,
+                ).start()
+            else:
+                self._idle.put(worker)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get worker pool statistics.
+
+        Returns:
+            Dict[str, Any]: Worker configuration, encode call counts and the
+                number of workers restarted.
+        """
+        with self._stats_lock:
+            return {
+                "workers": self.workers,
+                "torch_threads": self.torch_threads,
+                "max_texts": self.max_texts,
+                "idle": self._idle.qsize(),
+                "calls": self._calls,
+                "chunks": self._chunks,
+                "texts": self._texts,
+                "restarts": self._restarts,
+            }
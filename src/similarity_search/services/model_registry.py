@@ -0,0 +1,374 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Mapping, Optional, Set, Tuple
+
+from ..core.exceptions import ModelNotFoundError
+from ..core.logging import get_logger
+from .product_similarity import SimilarityService
+
+logger = get_logger(__name__)
+
+
+class ModelRegistry:
+    """Similarity services of several models, selected per request by name.
+
+    Every model is served by its own ``SimilarityService``, with its own
+    catalogs, caches and warm state. The default model is loaded at startup and
+    always kept. Other models are loaded on their first request, or ahead of
+    time with ``load``, and the least recently used of them are unloaded while
+    the loaded models take more than ``memory_budget_bytes``.
+
+    Loading a name that is already served swaps its model without downtime: the
+    new service is loaded, warmed up and given the catalogs of the current one
+    in a worker thread while the current one keeps serving, and then replaces
+    it in a single assignment. Services swapped out or evicted are cleaned up
+    once the requests still using them are done.
+
+    The registry is only used from the event loop, which serializes its state
+    changes without a lock.
+
+    Attributes:
+        default_name (str): Name of the default model.
+        factory (Callable[[str], SimilarityService]): Builds an unloaded service
+            for a model name.
+        models (Dict[str, str]): Model loaded for each name that can be served.
+        allowed_models (Set[str]): Models that can be loaded, the default one
+            and the configured ones. Nothing else is ever downloaded or read.
+        memory_budget_bytes (int): Memory the loaded models may take before the
+            least recently used ones are unloaded. 0 disables eviction.
+        services (OrderedDict[str, SimilarityService]): Loaded services by name,
+            least recently used first.
+        swaps (int): Number of models replaced while being served.
+        evictions (int): Number of models unloaded to stay within the budget.
+    """
+
+    def __init__(
+        self,
+        default: SimilarityService,
+        factory: Callable[[str], SimilarityService],
+        models: Optional[Mapping[str, str]] = None,
+        memory_budget_bytes: int = 0,
+    ):
+        """Initialize the registry.
+
+        Args:
+            default (SimilarityService): Service of the default model, served
+                under its model name.
+            factory (Callable[[str], SimilarityService]): Builds an unloaded
+                service for a model name.
+            models (Optional[Mapping[str, str]]): Models that can be loaded on
+                demand, by the name requests select them with.
+            memory_budget_bytes (int): Memory budget of the loaded models, 0 for
+                no budget.
+        """
+        self.default_name: str = default.model_name
+        self.factory: Callable[[str], SimilarityService] = factory
+        self.models: Dict[str, str] = {self.default_name: self.default_name}
+        self.models.update(models or {})
+        self.allowed_models: Set[str] = set(self.models.values())
+        self.memory_budget_bytes: int = memory_budget_bytes
+        self.services: "OrderedDict[str, SimilarityService]" = OrderedDict(
+            [(self.default_name, default)]
+        )
+        self.swaps: int = 0
+        self.evictions: int = 0
+        # Model being loaded and pending load of each name.
+        self._loads: Dict[str, Tuple[str, "asyncio.Future[SimilarityService]"]] = {}
+        self._active: Dict[SimilarityService, int] = {}
+        self._retired: Set[SimilarityService] = set()
+
+    @property
+    def default(self) -> SimilarityService:
+        """Service of the default model."""
+        return self.services[self.default_name]
+
+    async def start(self) -> None:
+        """Load, warm up and open the catalogs of the default model."""
+        await self.default.load_model()
+        self.default.warmup()
+        self.default.load_catalogs()
+
+    async def acquire(self, name: Optional[str] = None) -> SimilarityService:
+        """Get the service of a model for a request, loading it if needed.
+
+        Every acquired service must be given back with ``release`` once the
+        request is done, so that it is not cleaned up while in use.
+
+        Args:
+            name (Optional[str]): Name of the model, None for the default one.
+
+        Returns:
+            SimilarityService: The service of the model.
+
+        Raises:
+            ModelNotFoundError: If the model is neither loaded nor configured.
+        """
+        name = name or self.default_name
+        service = self.services.get(name)
+        if service is None:
+            if name not in self.models:
+                raise ModelNotFoundError(name)
+            service = await self.load(name)
+        else:
+            self.services.move_to_end(name)
+        self._active[service] = self._active.get(service, 0) + 1
+        return service
+
+    async def release(self, service: SimilarityService) -> None:
+        """Give back a service acquired for a request.
+
+        Args:
+            service (SimilarityService): The service returned by ``acquire``.
+        """
+        self._active[service] -= 1
+        if not self._active[service]:
+            del self._active[service]
+            if service in self._retired:
+                self._retired.discard(service)
+                await service.cleanup()
+
+    async def load(
+        self, name: str, model_name: Optional[str] = None
+    ) -> SimilarityService:
+        """Load a model under a name and wait until it is served.
+
+        Args:
+            name (str): Name requests select the model with.
+            model_name (Optional[str]): Model to load. Defaults to the model
+                configured for ``name``.
+
+        Returns:
+            SimilarityService: The loaded service, serving ``name``.
+
+        Raises:
+            ModelNotFoundError: If ``name`` is not configured.
+            ValueError: If ``model_name`` is not a configured model.
+        """
+        # A cancelled request must not cancel a load other requests wait for.
+        return await asyncio.shield(self.load_in_background(name, model_name))
+
+    def load_in_background(
+        self, name: str, model_name: Optional[str] = None
+    ) -> "asyncio.Future[SimilarityService]":
+        """Start loading a model under a name, swapping out the model it serves.
+
+        Only configured names can be loaded, with one of the configured
+        models. Concurrent loads of the same name share a single load, whose
+        model is the one asked for first. Failed loads are logged and leave the
+        current model, if any, in place.
+
+        Args:
+            name (str): Name requests select the model with.
+            model_name (Optional[str]): Model to load. Defaults to the model
+                configured for ``name``.
+
+        Returns:
+            asyncio.Future[SimilarityService]: The load, resolving to the
+                published service.
+
+        Raises:
+            ModelNotFoundError: If ``name`` is not configured.
+            ValueError: If ``model_name`` is not a configured model.
+        """
+        if name not in self.models:
+            raise ModelNotFoundError(name)
+        if model_name is not None and model_name not in self.allowed_models:
+            raise ValueError(f"model '{model_name}' is not configured")
+        if name in self._loads:
+            return self._loads[name][1]
+        model_name = model_name or self.models[name]
+        load = asyncio.ensure_future(self._load(name, model_name))
+        self._loads[name] = (model_name, load)
+        load.add_done_callback(lambda _: self._finish_load(name, model_name, load))
+        return load
+
+    def _finish_load(
+        self, name: str, model_name: str, load: "asyncio.Future[SimilarityService]"
+    ) -> None:
+        """Forget a finished load and log its failure.
+
+        Args:
+            name (str): Name the model was loaded under.
+            model_name (str): The loaded model.
+            load (asyncio.Future[SimilarityService]): The finished load.
+        """
+        self._loads.pop(name, None)
+        if not load.cancelled() and load.exception() is not None:
+            logger.error(
+                f"Error loading model '{model_name}' as '{name}': {load.exception()}"
+            )
+
+    async def _load(self, name: str, model_name: str) -> SimilarityService:
+        """Load a service in a worker thread and publish it under a name.
+
+        Args:
+            name (str): Name requests select the model with.
+            model_name (str): Model to load.
+
+        Returns:
+            SimilarityService: The published service.
+        """
+        logger.info(f"Loading model '{model_name}' as '{name}'")
+        service = self.factory(model_name)
+        try:
+            await asyncio.to_thread(self._prepare, service, self.services.get(name))
+        except BaseException:
+            await service.cleanup()
+            raise
+
+        previous = self.services.get(name)
+        self.models[name] = model_name
+        self.services[name] = service
+        self.services.move_to_end(name)
+        if previous is not None:
+            self.swaps += 1
+            logger.info(f"Swapped model '{name}' to '{model_name}'")
+            await self._retire(previous)
+        await self._evict(keep=name)
+        return service
+
+    @staticmethod
+    def _prepare(
+        service: SimilarityService, previous: Optional[SimilarityService]
+    ) -> None:
+        """Load and warm up a service, and give it the catalogs it replaces.
+
+        Runs in a worker thread. Catalogs of a previous service of the same
+        model are shared as they are; those of another model are encoded
+        again. Updates made to them while the service is prepared are not
+        carried over.
+
+        Args:
+            service (SimilarityService): The unloaded service.
+            previous (Optional[SimilarityService]): The service it replaces.
+        """
+        asyncio.run(service.load_model())
+        service.warmup()
+        service.load_catalogs()
+        if previous is None:
+            return
+        for catalog_id, catalog in list(previous.catalogs.items()):
+            if catalog_id in service.catalogs:
+                continue
+            if previous.model_name == service.model_name:
+                service.adopt_catalog(catalog)
+                continue
+            rows = sorted(catalog.rows.values())
+            service.register_catalog(
+                catalog_id,
+                [catalog.products[row] for row in rows],
+                [catalog.ids[row] for row in rows],
+                (
+                    [catalog.metadata_of(row) for row in rows]
+                    if catalog.metadata is not None
+                    else None
+                ),
+            )
+
+    async def _retire(self, service: SimilarityService) -> None:
+        """Clean up a service that is no longer served, once it is unused.
+
+        Args:
+            service (SimilarityService): The swapped out or evicted service.
+        """
+        if service in self._active:
+            self._retired.add(service)
+        else:
+            await service.cleanup()
+
+    async def _evict(self, keep: str) -> None:
+        """Unload least recently used models until the budget is met.
+
+        The default model and the model just loaded are never unloaded.
+
+        Args:
+            keep (str): Name of the model just loaded.
+        """
+        while self.memory_budget_bytes and self.memory_bytes > self.memory_budget_bytes:
+            name = next(
+                (
+                    name
+                    for name in self.services
+                    if name not in (self.default_name, keep)
+                ),
+                None,
+            )
+            if name is None:
+                logger.warning(
+                    f"Loaded models take {self.memory_bytes} bytes, more than the "
+                    f"budget of {self.memory_budget_bytes} bytes"
+                )
+                return
+            service = self.services.pop(name)
+            self.evictions += 1
+            logger.info(f"Unloaded model '{name}' to stay within the memory budget")
+            await self._retire(service)
+
+    async def unload(self, name: str) -> None:
+        """Unload a model, which is loaded again on its next request.
+
+        Args:
+            name (str): Name of the model.
+
+        Raises:
+            ModelNotFoundError: If the model is not loaded.
+            ValueError: If the model is the default one.
+        """
+        if name == self.default_name:
+            raise ValueError("the default model cannot be unloaded")
+        if name not in self.services:
+            raise ModelNotFoundError(name)
+        await self._retire(self.services.pop(name))
+
+    @property
+    def memory_bytes(self) -> int:
+        """Estimated memory taken by the loaded models."""
+        return sum(service.memory_bytes for service in self.services.values())
+
+    def info(self) -> List[Dict[str, Any]]:
+        """Describe every model that can be served.
+
+        Returns:
+            List[Dict[str, Any]]: Name, served or configured model, model being
+                loaded and memory of each model, the default one first.
+        """
+        names = set(self.models) | set(self._loads)
+        return [
+            {
+                "name": name,
+                "model_name": self.models.get(name),
+                "default": name == self.default_name,
+                "loaded": name in self.services,
+                "loading": self._loads[name][0] if name in self._loads else None,
+                "memory_bytes": (
+                    self.services[name].memory_bytes if name in self.services else 0
+                ),
+            }
+            for name in [self.default_name] + sorted(names - {self.default_name})
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get statistics of the registry.
+
+        Returns:
+            Dict[str, Any]: Loaded models, memory use and budget, and swap and
+                eviction counts.
+        """
+        return {
+            "loaded": list(self.services),
+            "memory_bytes": self.memory_bytes,
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "swaps": self.swaps,
+            "evictions": self.evictions,
+        }
+
+    async def cleanup(self) -> None:
+        """Clean up the services of every model."""
+        for _, load in list(self._loads.values()):
+            load.cancel()
+        services = list(self.services.values()) + list(self._retired)
+        # The default service stays registered, to be loaded again on start.
+        self.services = OrderedDict([(self.default_name, self.default)])
+        self._retired.clear()
+        for service in services:
+            await service.cleanup()
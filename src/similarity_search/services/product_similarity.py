@@ -1,8 +1,42 @@
-from typing import List, Optional
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Tuple, Union
 
-from sentence_transformers import SentenceTransformer, util
+import numpy as np
 
+from ..core.cancellation import check_cancelled, current_token, wait_cancellable
+from ..core.constants import AppDefaults
+from ..core.exceptions import (
+    CatalogNotFoundError,
+    EmbeddingMismatchError,
+    RequestCancelledError,
+)
 from ..core.logging import get_logger
+from ..core.metrics import (
+    MODEL_BATCH_SIZE,
+    MODEL_LOAD_SECONDS,
+    MODEL_WARMUP_SECONDS,
+    TEXTS_PER_REQUEST,
+    time_stage,
+)
+from .ann import VectorIndex, build_index, recall_at_k
+from .batching import MicroBatcher
+from .catalog import Catalog
+from .embedding_cache import EmbeddingCache
+from .embedding_store import EmbeddingStore
+from .filters import MetadataIndex
+from .inference_backend import load_model as load_inference_model
+from .inference_backend import model_memory_bytes
+from .model_pool import ModelWorkerPool
+from .quantization import QuantizedEmbeddings
+from .result_cache import ResultCache
+from .search import SearchResult, exact_search, normalize
+from .shards import ShardPool, report_missed_shards, track_missed_shards
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
 logger = get_logger(__name__)
 
@@ -10,61 +44,1662 @@ logger = get_logger(__name__)
 class SimilarityService:
     """Service for handling similarity product search operations."""
 
-    def __init__(self, model_name: str):
+    def __init__(
+        self,
+        model_name: str,
+        inference_backend: str = "torch",
+        model_cache_dir: Optional[str] = None,
+        onnx_quantization_config: str = "avx2",
+        model_workers: int = 0,
+        model_worker_threads: Optional[int] = None,
+        warmup_batch_sizes: Optional[List[int]] = None,
+        embedding_cache_max_bytes: int = 0,
+        embedding_store: Optional[EmbeddingStore] = None,
+        batch_max_size: int = 0,
+        batch_max_wait_ms: float = 0.0,
+        ann_index: Optional[str] = None,
+        ann_min_catalog_size: int = 0,
+        ann_params: Optional[Dict[str, Any]] = None,
+        quantization: Optional[str] = None,
+        quantization_params: Optional[Dict[str, Any]] = None,
+        rescore_factor: int = 0,
+        search_backend: str = "sentence_transformers",
+        search_block_size: int = 16384,
+        compaction_threshold: float = 0.0,
+        shards: int = 0,
+        shard_min_catalog_size: int = 0,
+        shard_timeout_ms: float = 1000.0,
+        shard_max_pending: int = 4,
+        result_cache_max_entries: int = 0,
+        result_cache_ttl_seconds: float = 0.0,
+        encode_chunk_size: int = 1024,
+    ):
         """Initialize the similarity service.
 
         Args:
             model_name (str): The name of the sentence transformer model to load.
+            inference_backend (str): Runtime of the model forward pass,
+                ``"torch"``, ``"onnx"`` or ``"onnx-int8"``.
+            model_cache_dir (Optional[str]): Directory models converted for the
+                ONNX backends are cached in.
+            onnx_quantization_config (str): Target instruction set of the int8
+                ONNX graph, e.g. ``"avx2"`` or ``"avx512_vnni"``.
+            model_workers (int): Number of model worker processes. A value of 0
+                runs the model in this process.
+            model_worker_threads (Optional[int]): Torch threads per worker
+                process. Defaults to the CPU count divided by the workers.
+            warmup_batch_sizes (Optional[List[int]]): Batch sizes encoded and
+                searched once by ``warmup`` before serving. None or empty skips
+                the warmup.
+            embedding_cache_max_bytes (int): Memory cap of the embedding cache in
+                bytes. A value of 0 disables the cache.
+            embedding_store (Optional[EmbeddingStore]): Disk store that catalogs
+                are persisted to and memory-mapped from.
+            batch_max_size (int): Maximum number of texts encoded together when
+                coalescing concurrent requests. A value below 2 disables batching.
+            batch_max_wait_ms (float): Maximum time a batch waits for more
+                requests before it is encoded.
+            ann_index (Optional[str]): Kind of nearest-neighbour index built for
+                large catalogs, e.g. ``"ivf"``. None searches catalogs exactly.
+            ann_min_catalog_size (int): Minimum catalog size to build an index for.
+            ann_params (Optional[Dict[str, Any]]): Parameters of the index, such
+                as ``nlist`` and ``nprobe``.
+            quantization (Optional[str]): Compressed form catalogs without an
+                index are scanned in, ``"float16"``, ``"int8"`` or ``"pq"``. None
+                scans full precision.
+            quantization_params (Optional[Dict[str, Any]]): Parameters of the
+                quantizer, such as ``subspaces`` for product quantization.
+            rescore_factor (int): Number of candidates per requested match that
+                are re-ranked in full precision after a compressed scan. A value
+                of 0 disables rescoring.
+            search_backend (str): Engine of the exact search, ``"numpy"`` or
+                ``"sentence_transformers"``. The numpy engine stores catalogs
+                normalized and scans them in blocks without torch.
+            search_block_size (int): Number of catalog rows scored per matrix
+                product by the numpy engine.
+            compaction_threshold (float): Fraction of delta and tombstoned rows,
+                relative to the catalog size, above which an updated catalog is
+                compacted in the background. A value of 0 disables automatic
+                compaction.
+            shards (int): Number of shard processes the main segment of large
+                catalogs is split across and searched by in parallel. A value of
+                0 searches every catalog in this process.
+            shard_min_catalog_size (int): Minimum catalog size to shard.
+            shard_timeout_ms (float): Time each shard has to answer a search
+                before the results are returned without its rows.
+            shard_max_pending (int): Number of unanswered searches above which
+                a shard is left out of new searches.
+            result_cache_max_entries (int): Maximum number of catalog search
+                results cached per query. A value of 0 disables the cache.
+            result_cache_ttl_seconds (float): Time cached search results are
+                served for, 0 for no limit.
+            encode_chunk_size (int): Number of texts encoded at a time for
+                larger requests that can be cancelled, which stop between
+                chunks. Smaller requests are encoded in a single call.
         """
         self.model_name: str = model_name
-        self.model: Optional[SentenceTransformer] = None
+        self.inference_backend: str = inference_backend
+        self.model_cache_dir: Optional[str] = model_cache_dir
+        self.onnx_quantization_config: str = onnx_quantization_config
+        self.model_workers: int = model_workers
+        self.model_worker_threads: Optional[int] = model_worker_threads
+        self.model: Optional[Union["SentenceTransformer", ModelWorkerPool]] = None
+        self.warmup_batch_sizes: List[int] = list(warmup_batch_sizes or [])
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self.warmed_up: bool = False
+        self.catalogs: Dict[str, Catalog] = {}
+        self._catalog_lock = Lock()
+        self.embedding_cache: Optional[EmbeddingCache] = (
+            EmbeddingCache(embedding_cache_max_bytes)
+            if embedding_cache_max_bytes > 0
+            else None
+        )
+        self.embedding_store: Optional[EmbeddingStore] = embedding_store
+        self.batcher: Optional[MicroBatcher] = (
+            MicroBatcher(self._model_encode, batch_max_size, batch_max_wait_ms)
+            if batch_max_size > 1
+            else None
+        )
+        self.ann_index: Optional[str] = ann_index
+        self.ann_min_catalog_size: int = ann_min_catalog_size
+        self.ann_params: Dict[str, Any] = ann_params or {}
+        self.quantization: Optional[str] = quantization
+        self.quantization_params: Dict[str, Any] = quantization_params or {}
+        self.rescore_factor: int = rescore_factor
+        self.search_backend: str = search_backend
+        self.search_block_size: int = search_block_size
+        self.compaction_threshold: float = compaction_threshold
+        self.encode_chunk_size: int = encode_chunk_size
+        self._update_locks: Dict[str, Lock] = {}
+        self._compactor: Optional[ThreadPoolExecutor] = None
+        self._compactions: Dict[str, Future] = {}
+        self.shard_min_catalog_size: int = shard_min_catalog_size
+        self.shard_pool: Optional[ShardPool] = (
+            ShardPool(shards, shard_timeout_ms, search_block_size, shard_max_pending)
+            if shards > 0
+            else None
+        )
+        self.result_cache: Optional[ResultCache] = (
+            ResultCache(result_cache_max_entries, result_cache_ttl_seconds)
+            if result_cache_max_entries > 0
+            else None
+        )
 
     async def load_model(self) -> None:
         """Load the sentence transformer model asynchronously.
 
         This method initializes the model and makes it ready for similarity computations.
         """
-        logger.info("Loading model...")
-        self.model = SentenceTransformer(self.model_name)
+        logger.info(f"Loading model with the {self.inference_backend} backend...")
+        start = time.perf_counter()
+        if self.model_workers > 0:
+            # The pool stands in for the model: each worker loads its own copy.
+            pool = ModelWorkerPool(
+                partial(
+                    load_inference_model,
+                    self.model_name,
+                    self.inference_backend,
+                    cache_dir=self.model_cache_dir,
+                    quantization_config=self.onnx_quantization_config,
+                ),
+                self.model_workers,
+                torch_threads=self.model_worker_threads,
+            )
+            pool.start()
+            self.model = pool
+        else:
+            self.model = load_inference_model(
+                self.model_name,
+                self.inference_backend,
+                cache_dir=self.model_cache_dir,
+                quantization_config=self.onnx_quantization_config,
+            )
+        if self.batcher is not None:
+            self.batcher.start()
+        self.load_seconds = time.perf_counter() - start
+        MODEL_LOAD_SECONDS.set(self.load_seconds)
+
+        logger.info(f"Model loaded successfully in {self.load_seconds:.2f}s")
+
+    def warmup(self) -> None:
+        """Run the encode and search paths once per warmup batch size.
+
+        The first calls of a model pay for graph, kernel and allocator
+        initialization; running them before serving keeps that cost out of the
+        first requests.
+
+        Raises:
+            RuntimeError: If the model is not loaded.
+        """
+        if not self.model:
+            raise RuntimeError("Model not loaded")
+        start = time.perf_counter()
+        for batch_size in self.warmup_batch_sizes:
+            embeddings = np.asarray(
+                self._model_encode([AppDefaults.WARMUP_TEXT] * batch_size),
+                dtype=np.float32,
+            )
+            self._search_embeddings(embeddings, embeddings, top_k=1)
+        self.warmup_seconds = time.perf_counter() - start
+        MODEL_WARMUP_SECONDS.set(self.warmup_seconds)
+        self.warmed_up = True
+        logger.info(
+            f"Warmed up batch sizes {self.warmup_batch_sizes} "
+            f"in {self.warmup_seconds:.2f}s"
+        )
+
+    @property
+    def ready(self) -> bool:
+        """Whether the model is loaded and warmed up."""
+        return bool(self.model) and self.warmed_up
+
+    def startup_stats(self) -> Dict[str, Any]:
+        """Get the readiness state and startup timings of the service.
+
+        Returns:
+            Dict[str, Any]: Whether the model is loaded and warmed up, and the
+                load and warmup durations in seconds.
+        """
+        return {
+            "model_loaded": bool(self.model),
+            "warmed_up": self.warmed_up,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "warmup_batch_sizes": self.warmup_batch_sizes,
+        }
+
+    @property
+    def dimension(self) -> Optional[int]:
+        """Dimension of the model embeddings, None while the model is not loaded."""
+        if not self.model:
+            return None
+        return int(self.model.get_sentence_embedding_dimension())
+
+    @property
+    def memory_bytes(self) -> int:
+        """Estimated memory taken by the model, catalogs and embedding cache.
+
+        Memory-mapped catalog embeddings live in the page cache, shared with the
+        other processes of the host, and are not counted.
+        """
+        catalog_bytes = sum(
+            (
+                0
+                if isinstance(catalog.embeddings, np.memmap)
+                else catalog.embeddings.nbytes
+            )
+            + catalog.delta.nbytes
+            + (catalog.quantized.nbytes if catalog.quantized is not None else 0)
+            for catalog in list(self.catalogs.values())
+        )
+        cache_bytes = (
+            self.embedding_cache.stats()["bytes"]
+            if self.embedding_cache is not None
+            else 0
+        )
+        return model_memory_bytes(self.model) + catalog_bytes + cache_bytes
+
+    def embed(self, texts: List[str], normalized: bool = False) -> np.ndarray:
+        """Encode texts into embeddings that can be searched later.
 
-        logger.info("Model loaded successfully")
+        Texts go through the embedding cache and the micro-batcher like queries.
+
+        Args:
+            texts (List[str]): Texts to encode.
+            normalized (bool): Whether to scale the embeddings to unit norm.
+
+        Returns:
+            np.ndarray: float32 embeddings of shape (len(texts), dimension).
+
+        Raises:
+            RuntimeError: If the model is not loaded.
+        """
+        TEXTS_PER_REQUEST.labels("embed").observe(len(texts))
+        with time_stage("query_encoding"):
+            embeddings = np.asarray(self._encode(texts), dtype=np.float32)
+        return normalize(embeddings) if normalized else embeddings
 
     async def cleanup(self) -> None:
         """Clean up model resources asynchronously.
 
         This method frees GPU memory if available and removes the model from memory.
         """
+        if self.batcher is not None:
+            self.batcher.stop()
+        if self._compactor is not None:
+            self._compactor.shutdown(wait=True)
+            self._compactor = None
+        if self.shard_pool is not None:
+            self.shard_pool.stop()
         if self.model:
             logger.info("Cleaning up model resources...")
+            if isinstance(self.model, ModelWorkerPool):
+                self.model.stop()
             del self.model  # Remove model from CPU memory
             self.model = None
+            self.warmed_up = False
             logger.info("Model cleanup complete")
+        if self.embedding_cache is not None:
+            self.embedding_cache.clear()
+        if self.result_cache is not None:
+            self.result_cache.clear()
+
+    def load_catalogs(self) -> None:
+        """Open every catalog of the embedding store encoded with this model.
+
+        Embeddings stay memory-mapped, so no catalog needs to be re-encoded
+        after a restart and workers on the same host share their pages.
+        """
+        if self.embedding_store is None:
+            return
+        for catalog_id in self.embedding_store.catalog_ids(self.model_name):
+            catalog = self.embedding_store.load(catalog_id, self.model_name)
+            if catalog is not None:
+                self._prepare_catalog(catalog)
+                with self._catalog_lock:
+                    self.catalogs[catalog_id] = catalog
+        logger.info(f"Loaded {len(self.catalogs)} catalogs from the embedding store")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get runtime statistics of the service.
+
+        Returns:
+            Dict[str, Any]: Statistics of the service components.
+        """
+        return {
+            "model_name": self.model_name,
+            "startup": self.startup_stats(),
+            "catalogs": len(self.catalogs),
+            "embedding_cache": (
+                self.embedding_cache.stats()
+                if self.embedding_cache is not None
+                else None
+            ),
+            "result_cache": (
+                self.result_cache.stats() if self.result_cache is not None else None
+            ),
+            "batching": self.batcher.stats() if self.batcher is not None else None,
+            "model_workers": (
+                self.model.stats() if isinstance(self.model, ModelWorkerPool) else None
+            ),
+            "quantized_catalog_bytes": sum(
+                catalog.quantized.nbytes
+                for catalog in list(self.catalogs.values())
+                if catalog.quantized is not None
+            ),
+            "shards": (
+                self.shard_pool.stats() if self.shard_pool is not None else None
+            ),
+        }
+
+    def _model_encode(self, texts: List[str]) -> Any:
+        """Encode texts with the loaded model.
+
+        Args:
+            texts (List[str]): Texts to encode.
+
+        Returns:
+            Any: The embeddings, one row per text.
+
+        Raises:
+            RuntimeError: If the model is not loaded.
+        """
+        if not self.model:
+            raise RuntimeError("Model not loaded")
+        MODEL_BATCH_SIZE.observe(len(texts))
+        return self.model.encode(texts)
+
+    def _batched_encode(self, texts: List[str]) -> Any:
+        """Encode texts together with those of concurrent requests when batching.
+
+        The token of a cancellable request is checked before and after the
+        encoding, and the texts of a request larger than ``encode_chunk_size``
+        are encoded that many at a time, stopping between two chunks once the
+        request is cancelled or past its deadline. Smaller requests go to the
+        model, the micro-batcher or the worker pool in a single call.
+
+        Args:
+            texts (List[str]): Texts to encode.
+
+        Returns:
+            Any: The embeddings, one row per text.
+
+        Raises:
+            RequestCancelledError: If the request stops before all the texts are
+                encoded.
+        """
+        encode = self._model_encode
+        if self.batcher is not None and self.batcher.running:
+            encode = self.batcher.encode
+        if current_token() is None:
+            return encode(texts)
+        if len(texts) <= self.encode_chunk_size:
+            check_cancelled("encoding")
+            embeddings = encode(texts)
+            check_cancelled("encoding")
+            return embeddings
+        chunks = []
+        for start in range(0, len(texts), self.encode_chunk_size):
+            check_cancelled("encoding")
+            chunk = encode(texts[start : start + self.encode_chunk_size])
+            chunks.append(np.asarray(chunk, dtype=np.float32))
+        check_cancelled("encoding")
+        return np.concatenate(chunks)
+
+    def _encode(self, texts: List[str], bulk: bool = False) -> Any:
+        """Encode texts, serving repeated texts from the embedding cache.
+
+        Only the texts missing from the cache are sent to the model, in a single
+        call and without duplicates, coalesced with concurrent requests when
+        batching is enabled.
+
+        Args:
+            texts (List[str]): Texts to encode.
+            bulk (bool): Whether this is a bulk encode, such as a catalog
+                registration, which goes straight to the model and bypasses the
+                cache and the batcher.
+
+        Returns:
+            Any: The embeddings, one row per text.
+
+        Raises:
+            RuntimeError: If the model is not loaded.
+        """
+        if not self.model:
+            raise RuntimeError("Model not loaded")
+
+        if bulk:
+            return self._model_encode(texts)
+        cache = self.embedding_cache
+        if cache is None:
+            return self._batched_encode(texts)
+
+        keys = [cache.key(self.model_name, text) for text in texts]
+        embeddings = [cache.get(key) for key in keys]
+        missing: Dict[str, int] = {}
+        for text, embedding in zip(texts, embeddings, strict=True):
+            if embedding is None and text not in missing:
+                missing[text] = len(missing)
+
+        if missing:
+            encoded = np.asarray(self._batched_encode(list(missing)), dtype=np.float32)
+            for text, row in missing.items():
+                cache.put(cache.key(self.model_name, text), encoded[row])
+            embeddings = [
+                encoded[missing[text]] if embedding is None else embedding
+                for text, embedding in zip(texts, embeddings, strict=True)
+            ]
+
+        return np.stack(embeddings)
+
+    def register_catalog(
+        self,
+        catalog_id: str,
+        products: List[str],
+        ids: Optional[List[str]] = None,
+        metadata: Optional[List[Optional[Dict[str, Any]]]] = None,
+    ) -> Catalog:
+        """Encode a set of products once and keep their embeddings for later queries.
+
+        Registering an existing catalog id replaces the previous catalog, with
+        a higher version.
+
+        Args:
+            catalog_id (str): Unique name of the catalog.
+            products (List[str]): Product descriptions to encode.
+            ids (Optional[List[str]]): Product identifiers. Defaults to the
+                position of each product in ``products``.
+            metadata (Optional[List[Optional[Dict[str, Any]]]]): Metadata of
+                each product, such as its category or price, that searches can
+                filter on.
+
+        Returns:
+            Catalog: The registered catalog.
+
+        Raises:
+            RuntimeError: If the model is not loaded.
+        """
+        if not self.model:
+            raise RuntimeError("Model not loaded")
+
+        if ids is None:
+            ids = [str(i) for i in range(len(products))]
+        embeddings = np.asarray(self._encode(products, bulk=True), dtype=np.float32)
+        normalized = self.search_backend == "numpy"
+        if normalized:
+            # Normalize once here so that searches are plain dot products.
+            embeddings = normalize(embeddings)
+        with self._update_lock(catalog_id):
+            previous = self.catalogs.get(catalog_id)
+            catalog = Catalog(
+                catalog_id=catalog_id,
+                products=list(products),
+                ids=list(ids),
+                embeddings=embeddings,
+                normalized=normalized,
+                metadata=list(metadata) if metadata is not None else None,
+                version=previous.version + 1 if previous is not None else 1,
+            )
+            catalog = self._store_catalog(catalog)
+            with self._catalog_lock:
+                self.catalogs[catalog_id] = catalog
+            self._invalidate_results(catalog_id)
+        logger.info(f"Registered catalog '{catalog_id}' with {catalog.size} products")
+        return catalog
+
+    def _update_lock(self, catalog_id: str) -> Lock:
+        """Get the lock serializing the updates of a catalog.
+
+        Searches never take it: they run on the catalog version they started
+        with while the next one is built.
+
+        Args:
+            catalog_id (str): Name of the catalog.
+
+        Returns:
+            Lock: The lock of the catalog.
+        """
+        with self._catalog_lock:
+            return self._update_locks.setdefault(catalog_id, Lock())
+
+    def _store_catalog(self, catalog: Catalog) -> Catalog:
+        """Persist a catalog without delta rows, then compress and index it.
+
+        Args:
+            catalog (Catalog): The catalog to store.
+
+        Returns:
+            Catalog: The catalog to serve, memory-mapped when there is a store.
+        """
+        if self.embedding_store is not None:
+            self.embedding_store.save(catalog, self.model_name)
+            catalog = (
+                self.embedding_store.load(catalog.catalog_id, self.model_name)
+                or catalog
+            )
+        self._prepare_catalog(catalog)
+        return catalog
+
+    def upsert_products(
+        self,
+        catalog_id: str,
+        products: List[str],
+        ids: List[str],
+        metadata: Optional[List[Optional[Dict[str, Any]]]] = None,
+    ) -> Tuple[Catalog, int]:
+        """Add or replace products of a registered catalog.
+
+        Only products whose id is new or whose description changed are encoded;
+        products whose metadata alone changed keep their embedding. They are
+        appended to the delta segment of the catalog, and the rows they replace
+        are tombstoned, so the update is searchable immediately.
+
+        Args:
+            catalog_id (str): Name of the catalog.
+            products (List[str]): Product descriptions.
+            ids (List[str]): Product identifiers, one per product. The last
+                description of a repeated id wins.
+            metadata (Optional[List[Optional[Dict[str, Any]]]]): Metadata of
+                each product. None keeps the metadata of replaced products.
+
+        Returns:
+            Tuple[Catalog, int]: The new catalog version and the number of
+                products added or replaced.
+
+        Raises:
+            RuntimeError: If the model is not loaded.
+            ValueError: If products, ids and metadata are not aligned.
+            CatalogNotFoundError: If ``catalog_id`` is not registered.
+        """
+        if not self.model:
+            raise RuntimeError("Model not loaded")
+        if len(products) != len(ids) or (
+            metadata is not None and len(metadata) != len(ids)
+        ):
+            raise ValueError("products, ids and metadata must have the same length")
+
+        with self._update_lock(catalog_id):
+            catalog = self.get_catalog(catalog_id)
+            changes = self._changed_products(catalog, products, ids, metadata)
+            if not changes:
+                return catalog, 0
+            changed_ids = list(changes)
+            replaced = {
+                catalog.rows[product_id]
+                for product_id in changed_ids
+                if product_id in catalog.rows
+            }
+            catalog = self._publish(
+                catalog.updated(
+                    [changes[product_id][0] for product_id in changed_ids],
+                    changed_ids,
+                    self._product_vectors(catalog, changes),
+                    replaced,
+                    [changes[product_id][1] for product_id in changed_ids],
+                )
+            )
+        logger.info(
+            f"Upserted {len(changes)} products in catalog '{catalog_id}' "
+            f"(version {catalog.version})"
+        )
+        return catalog, len(changes)
+
+    @staticmethod
+    def _changed_products(
+        catalog: Catalog,
+        products: List[str],
+        ids: List[str],
+        metadata: Optional[List[Optional[Dict[str, Any]]]],
+    ) -> Dict[str, Tuple[str, Optional[Dict[str, Any]]]]:
+        """Select the products of an upsert that differ from the catalog.
+
+        Args:
+            catalog (Catalog): The current catalog version.
+            products (List[str]): Product descriptions.
+            ids (List[str]): Product identifiers.
+            metadata (Optional[List[Optional[Dict[str, Any]]]]): Product
+                metadata, None to keep the metadata of replaced products.
+
+        Returns:
+            Dict[str, Tuple[str, Optional[Dict[str, Any]]]]: Description and
+                metadata of each new or changed product, by id.
+        """
+        changes = {}
+        for product_id, i in {
+            product_id: i for i, product_id in enumerate(ids)
+        }.items():
+            row = catalog.rows.get(product_id)
+            current = catalog.metadata_of(row) if row is not None else None
+            fields = metadata[i] if metadata is not None else current
+            if row is None or catalog.products[row] != products[i] or fields != current:
+                changes[product_id] = (products[i], fields)
+        return changes
+
+    def _product_vectors(
+        self,
+        catalog: Catalog,
+        changes: Dict[str, Tuple[str, Optional[Dict[str, Any]]]],
+    ) -> np.ndarray:
+        """Get the embeddings of upserted products, encoding changed texts only.
+
+        Args:
+            catalog (Catalog): The current catalog version.
+            changes (Dict[str, Tuple[str, Optional[Dict[str, Any]]]]): The
+                changed products, by id.
+
+        Returns:
+            np.ndarray: float32 embeddings in the order of ``changes``.
+        """
+        embeddings = np.zeros((len(changes), catalog.dimension), dtype=np.float32)
+        reused, encoded = [], []
+        for i, (product_id, (product, _)) in enumerate(changes.items()):
+            row = catalog.rows.get(product_id)
+            if row is not None and catalog.products[row] == product:
+                reused.append((i, row))
+            else:
+                encoded.append(i)
+        if reused:
+            positions, rows = zip(*reused, strict=True)
+            embeddings[list(positions)] = catalog.vectors(list(rows))
+        if encoded:
+            texts = [product for product, _ in changes.values()]
+            vectors = np.asarray(
+                self._encode([texts[i] for i in encoded], bulk=True), dtype=np.float32
+            )
+            embeddings[encoded] = normalize(vectors) if catalog.normalized else vectors
+        return embeddings
+
+    def delete_products(self, catalog_id: str, ids: List[str]) -> Tuple[Catalog, int]:
+        """Delete products of a registered catalog.
+
+        The rows are tombstoned, which excludes them from searches immediately;
+        their space is reclaimed by the next compaction.
+
+        Args:
+            catalog_id (str): Name of the catalog.
+            ids (List[str]): Identifiers of the products to delete. Unknown ids
+                are ignored.
+
+        Returns:
+            Tuple[Catalog, int]: The new catalog version and the number of
+                products deleted.
+
+        Raises:
+            CatalogNotFoundError: If ``catalog_id`` is not registered.
+        """
+        with self._update_lock(catalog_id):
+            catalog = self.get_catalog(catalog_id)
+            rows = {
+                catalog.rows[product_id]
+                for product_id in ids
+                if product_id in catalog.rows
+            }
+            if not rows:
+                return catalog, 0
+            catalog = self._publish(
+                catalog.updated([], [], np.zeros((0, catalog.dimension)), rows)
+            )
+        logger.info(
+            f"Deleted {len(rows)} products from catalog '{catalog_id}' "
+            f"(version {catalog.version})"
+        )
+        return catalog, len(rows)
+
+    def _publish(self, catalog: Catalog) -> Catalog:
+        """Persist the delta of an updated catalog and serve the new version.
+
+        Args:
+            catalog (Catalog): The new catalog version.
+
+        Returns:
+            Catalog: The published catalog.
+        """
+        if self.embedding_store is not None:
+            self.embedding_store.save_delta(catalog, self.model_name)
+        with self._catalog_lock:
+            self.catalogs[catalog.catalog_id] = catalog
+        self._invalidate_results(catalog.catalog_id)
+        if (
+            self.compaction_threshold > 0
+            and catalog.pending >= self.compaction_threshold * max(catalog.size, 1)
+        ):
+            self._schedule_compaction(catalog.catalog_id)
+        return catalog
+
+    def _invalidate_results(self, catalog_id: str) -> None:
+        """Drop the cached search results of a catalog that changed.
+
+        Args:
+            catalog_id (str): Name of the catalog.
+        """
+        if self.result_cache is not None:
+            self.result_cache.invalidate(catalog_id)
+
+    def _schedule_compaction(self, catalog_id: str) -> None:
+        """Compact a catalog in the background unless it is being compacted.
+
+        Args:
+            catalog_id (str): Name of the catalog.
+        """
+        with self._catalog_lock:
+            running = self._compactions.get(catalog_id)
+            if running is not None and not running.done():
+                return
+            if self._compactor is None:
+                self._compactor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="compaction"
+                )
+            self._compactions[catalog_id] = self._compactor.submit(
+                self._compact_in_background, catalog_id
+            )
+
+    def _compact_in_background(self, catalog_id: str) -> None:
+        """Compact a catalog, logging instead of raising errors.
+
+        Args:
+            catalog_id (str): Name of the catalog.
+        """
+        try:
+            self.compact_catalog(catalog_id)
+        except Exception as e:
+            logger.error(f"Error compacting catalog '{catalog_id}': {str(e)}")
+
+    def compact_catalog(self, catalog_id: str) -> Catalog:
+        """Fold the delta rows and tombstones of a catalog into its main segment.
+
+        The main segment is rewritten without the tombstoned rows, then stored,
+        compressed and indexed again. Searches keep using the previous version
+        until the compacted one replaces it; updates wait for the compaction.
+
+        Args:
+            catalog_id (str): Name of the catalog.
+
+        Returns:
+            Catalog: The compacted catalog, or the current one when there is
+                nothing to compact.
+
+        Raises:
+            CatalogNotFoundError: If ``catalog_id`` is not registered.
+        """
+        with self._update_lock(catalog_id):
+            catalog = self.get_catalog(catalog_id)
+            if not catalog.pending:
+                return catalog
+            start = time.perf_counter()
+            compacted = self._store_catalog(catalog.compacted())
+            with self._catalog_lock:
+                self.catalogs[catalog_id] = compacted
+            self._invalidate_results(catalog_id)
+        logger.info(
+            f"Compacted catalog '{catalog_id}' to {compacted.size} products "
+            f"(version {compacted.version}) in {time.perf_counter() - start:.2f}s"
+        )
+        return compacted
+
+    def get_catalog(self, catalog_id: str) -> Catalog:
+        """Get a registered catalog.
+
+        Catalogs missing from memory are looked up in the embedding store, so a
+        catalog registered by another worker process is picked up on first use.
+
+        Args:
+            catalog_id (str): Name of the catalog.
+
+        Returns:
+            Catalog: The registered catalog.
+
+        Raises:
+            CatalogNotFoundError: If no catalog is registered under ``catalog_id``.
+        """
+        catalog = self.catalogs.get(catalog_id)
+        if catalog is None and self.embedding_store is not None:
+            catalog = self.embedding_store.load(catalog_id, self.model_name)
+            if catalog is not None:
+                self._prepare_catalog(catalog)
+                with self._catalog_lock:
+                    catalog = self.catalogs.setdefault(catalog_id, catalog)
+        if catalog is None:
+            raise CatalogNotFoundError(catalog_id)
+        return catalog
+
+    def delete_catalog(self, catalog_id: str) -> None:
+        """Remove a registered catalog and free its embeddings.
+
+        Args:
+            catalog_id (str): Name of the catalog.
+
+        Raises:
+            CatalogNotFoundError: If no catalog is registered under ``catalog_id``.
+        """
+        with self._update_lock(catalog_id):
+            with self._catalog_lock:
+                removed = self.catalogs.pop(catalog_id, None) is not None
+            if self.embedding_store is not None:
+                stored = self.embedding_store.catalog_ids(self.model_name)
+                removed = catalog_id in stored or removed
+                self.embedding_store.delete(catalog_id, self.model_name)
+            if self.shard_pool is not None:
+                self.shard_pool.drop_group(catalog_id)
+            self._invalidate_results(catalog_id)
+        if not removed:
+            raise CatalogNotFoundError(catalog_id)
+        logger.info(f"Deleted catalog '{catalog_id}'")
+
+    def _prepare_catalog(self, catalog: Catalog) -> None:
+        """Compress a catalog or build its index according to the configuration.
+
+        Only what the search reads is built: catalogs large enough for an index
+        are searched through it, so they are not compressed too. Large catalogs
+        are sharded instead when there is a shard pool: the shards scan them
+        exactly, so they are neither compressed nor indexed.
+
+        Args:
+            catalog (Catalog): The catalog to prepare.
+        """
+        if not len(catalog.embeddings):
+            return
+        if self._shard_catalog(catalog):
+            return
+        indexed = bool(self.ann_index) and catalog.size >= self.ann_min_catalog_size
+        if self.quantization and not indexed:
+            catalog.quantized = QuantizedEmbeddings(
+                catalog.embeddings, self.quantization, **self.quantization_params
+            )
+            logger.info(
+                f"Quantized catalog '{catalog.catalog_id}' with {self.quantization} "
+                f"({catalog.quantized.compression_ratio:.1f}x smaller)"
+            )
+        if indexed:
+            catalog.index = build_index(
+                self.ann_index,
+                catalog.embeddings,
+                catalog.normalized,
+                **self.ann_params,
+            )
+            logger.info(
+                f"Built {self.ann_index} index for catalog '{catalog.catalog_id}'"
+            )
+
+    def _shard_catalog(self, catalog: Catalog) -> bool:
+        """Split the main segment of a large catalog across the shard pool.
+
+        Args:
+            catalog (Catalog): The catalog to shard.
+
+        Returns:
+            bool: Whether the catalog is now searched by the shards. Catalogs
+                the shards fail to load are searched in this process.
+        """
+        if self.shard_pool is None or catalog.size < self.shard_min_catalog_size:
+            return False
+        key = f"{catalog.catalog_id}@{catalog.base_version}"
+        try:
+            self.shard_pool.start()
+            self.shard_pool.load(
+                key, catalog.embeddings, catalog.normalized, group=catalog.catalog_id
+            )
+        except RuntimeError as e:
+            logger.error(f"Error sharding catalog '{catalog.catalog_id}': {str(e)}")
+            return False
+        catalog.shard_key = key
+        logger.info(
+            f"Sharded catalog '{catalog.catalog_id}' across "
+            f"{self.shard_pool.shards} processes"
+        )
+        return True
+
+    def adopt_catalog(self, catalog: Catalog) -> None:
+        """Serve a catalog prepared by another service of the same model.
+
+        The catalog is shared as it is, its main segment being loaded in the
+        shard pool of this service if it is sharded.
+
+        Args:
+            catalog (Catalog): The catalog.
+        """
+        if catalog.shard_key is not None:
+            self._shard_catalog(catalog)
+        with self._catalog_lock:
+            self.catalogs[catalog.catalog_id] = catalog
+
+    def build_index(self, catalog_id: str, kind: str, **params: Any) -> VectorIndex:
+        """Build a nearest-neighbour index for a registered catalog.
+
+        The catalog is not modified: a copy searched through the new index
+        replaces it, so that searches in flight keep the index they started with.
+
+        Args:
+            catalog_id (str): Name of the catalog.
+            kind (str): The index kind, e.g. ``"ivf"`` or ``"exact"``.
+            **params (Any): Parameters of the index, such as ``nlist``.
+
+        Returns:
+            VectorIndex: The index now used to search the catalog.
+
+        Raises:
+            CatalogNotFoundError: If ``catalog_id`` is not registered.
+            ValueError: If the index kind is unknown.
+        """
+        with self._update_lock(catalog_id):
+            catalog = self.get_catalog(catalog_id)
+            index = build_index(kind, catalog.embeddings, catalog.normalized, **params)
+            with self._catalog_lock:
+                self.catalogs[catalog_id] = catalog.with_index(index)
+            self._invalidate_results(catalog_id)
+        logger.info(f"Built {kind} index for catalog '{catalog_id}'")
+        return index
+
+    def evaluate_index(
+        self,
+        catalog_id: str,
+        top_k: int = 10,
+        sample_size: int = 100,
+        nprobe: Optional[int] = None,
+        seed: int = 0,
+    ) -> float:
+        """Measure the recall@k of a catalog's index against exact search.
+
+        A sample of the catalog embeddings is used as queries.
+
+        Args:
+            catalog_id (str): Name of the catalog.
+            top_k (int): Number of neighbours compared per query.
+            sample_size (int): Number of sampled queries.
+            nprobe (Optional[int]): Number of index clusters to scan.
+            seed (int): Seed of the query sample.
+
+        Returns:
+            float: The recall@k, 1.0 for catalogs without an index.
+
+        Raises:
+            CatalogNotFoundError: If ``catalog_id`` is not registered.
+        """
+        catalog = self.get_catalog(catalog_id)
+        if catalog.index is None:
+            return 1.0
+        rng = np.random.default_rng(seed)
+        size = len(catalog.embeddings)
+        rows = rng.choice(size, min(sample_size, size), replace=False)
+        queries = np.asarray(catalog.embeddings[rows], dtype=np.float32)
+        approximate = catalog.index.search(queries, top_k, nprobe=nprobe)
+        exact = exact_search(
+            normalize(queries),
+            catalog.embeddings,
+            top_k,
+            block_size=self.search_block_size,
+            normalized=catalog.normalized,
+        )
+        return recall_at_k([a[0] for a in approximate], [e[0] for e in exact])
+
+    def _search_catalog(
+        self,
+        catalog: Catalog,
+        query_embeddings: np.ndarray,
+        top_k: int,
+        nprobe: Optional[int] = None,
+        mask: Optional[np.ndarray] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """Search both segments of a catalog, skipping its tombstoned rows.
+
+        With a mask, only the rows it selects are scored. Otherwise each segment
+        is asked for as many extra candidates as it has tombstones, so that
+        ``top_k`` live rows remain once they are filtered out.
+
+        Args:
+            catalog (Catalog): The catalog to search.
+            query_embeddings (np.ndarray): float32 query embeddings.
+            top_k (int): Number of matches per query.
+            nprobe (Optional[int]): Number of index clusters to scan.
+            mask (Optional[np.ndarray]): Rows matching the filters of the
+                search, as returned by ``Catalog.filter_mask``.
+
+        Returns:
+            List[List[Dict[str, Any]]]: Per query, ``corpus_id`` and ``score``
+                dicts, best first.
+        """
+        main_rows = len(catalog.embeddings)
+        main_selection: Optional[np.ndarray] = None
+        delta_selection: Optional[np.ndarray] = None
+        main_extra = sum(1 for row in catalog.deleted if row < main_rows)
+        delta_extra = len(catalog.deleted)
+        if mask is not None:
+            main_selection = np.flatnonzero(mask[:main_rows])
+            delta_selection = np.flatnonzero(mask[main_rows:])
+            main_extra = delta_extra = 0
+
+        hits: List[List[Dict[str, Any]]] = [[] for _ in query_embeddings]
+        check_cancelled("search")
+        if main_rows and (main_selection is None or len(main_selection)):
+            hits = self._search_main(
+                catalog, query_embeddings, top_k + main_extra, nprobe, main_selection
+            )
+        if not catalog.pending:
+            return hits
+
+        delta_hits: List[List[Dict[str, Any]]] = [[] for _ in query_embeddings]
+        check_cancelled("search")
+        if len(catalog.delta) and (delta_selection is None or len(delta_selection)):
+            delta_hits = self._to_hits(
+                exact_search(
+                    normalize(query_embeddings),
+                    catalog.delta,
+                    top_k + delta_extra,
+                    block_size=self.search_block_size,
+                    normalized=catalog.normalized,
+                    selection=delta_selection,
+                )
+            )
+        return self._merge_segments(catalog, hits, delta_hits, top_k)
+
+    @staticmethod
+    def _merge_segments(
+        catalog: Catalog,
+        main_hits: List[List[Dict[str, Any]]],
+        delta_hits: List[List[Dict[str, Any]]],
+        top_k: int,
+    ) -> List[List[Dict[str, Any]]]:
+        """Merge the hits of both segments of a catalog without tombstoned rows.
+
+        Args:
+            catalog (Catalog): The searched catalog.
+            main_hits (List[List[Dict[str, Any]]]): Per query, the hits of the
+                main segment.
+            delta_hits (List[List[Dict[str, Any]]]): Per query, the hits of the
+                delta segment, numbered from its first row.
+            top_k (int): Number of matches per query.
+
+        Returns:
+            List[List[Dict[str, Any]]]: Per query, the ``top_k`` best hits.
+        """
+        main_rows = len(catalog.embeddings)
+        deleted = catalog.deleted
+        merged = []
+        for query_hits, query_delta_hits in zip(main_hits, delta_hits, strict=True):
+            candidates = [hit for hit in query_hits if hit["corpus_id"] not in deleted]
+            candidates.extend(
+                {"corpus_id": hit["corpus_id"] + main_rows, "score": hit["score"]}
+                for hit in query_delta_hits
+                if hit["corpus_id"] + main_rows not in deleted
+            )
+            candidates.sort(key=lambda hit: hit["score"], reverse=True)
+            merged.append(candidates[:top_k])
+        return merged
+
+    def _search_main(
+        self,
+        catalog: Catalog,
+        query_embeddings: np.ndarray,
+        top_k: int,
+        nprobe: Optional[int] = None,
+        selection: Optional[np.ndarray] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """Search the main segment through its index, its compressed form or exactly.
+
+        Sharded segments are searched by every shard in parallel.
+
+        Args:
+            catalog (Catalog): The catalog to search.
+            query_embeddings (np.ndarray): float32 query embeddings.
+            top_k (int): Number of matches per query.
+            nprobe (Optional[int]): Number of index clusters to scan.
+            selection (Optional[np.ndarray]): Sorted rows eligible for the
+                search, the only rows scored. None searches every row.
+
+        Returns:
+            List[List[Dict[str, Any]]]: Per query, ``corpus_id`` and ``score``
+                dicts, best first.
+        """
+        results: Optional[List[SearchResult]] = None
+        if self.shard_pool is not None and catalog.shard_key in self.shard_pool:
+            results = self.shard_pool.search(
+                catalog.shard_key, normalize(query_embeddings), top_k, selection
+            )
+        elif catalog.index is not None:
+            results = catalog.index.search(
+                query_embeddings, top_k, nprobe=nprobe, selection=selection
+            )
+        elif catalog.quantized is not None:
+            results = catalog.quantized.search(
+                query_embeddings,
+                top_k,
+                rescore_factor=self.rescore_factor,
+                full_precision=catalog.embeddings,
+                selection=selection,
+            )
+        elif self.search_backend == "numpy":
+            results = exact_search(
+                normalize(query_embeddings),
+                catalog.embeddings,
+                top_k,
+                block_size=self.search_block_size,
+                normalized=catalog.normalized,
+                selection=selection,
+            )
+        if results is not None:
+            return self._to_hits(results)
+
+        from sentence_transformers import util
+
+        corpus = (
+            catalog.embeddings if selection is None else catalog.embeddings[selection]
+        )
+        hits = util.semantic_search(
+            query_embeddings.astype(catalog.embeddings.dtype), corpus, top_k=top_k
+        )
+        return self._select_hits(hits, selection)
+
+    def _search_embeddings(
+        self, query_embeddings: Any, product_embeddings: Any, top_k: int
+    ) -> List[List[Dict[str, Any]]]:
+        """Exhaustively search product embeddings on the configured backend.
+
+        Args:
+            query_embeddings (Any): Query embeddings, one row per query.
+            product_embeddings (Any): Product embeddings, one row per product.
+            top_k (int): Number of matches per query.
+
+        Returns:
+            List[List[Dict[str, Any]]]: Per query, ``corpus_id`` and ``score``
+                dicts, best first.
+        """
+        if self.search_backend == "numpy":
+            return self._to_hits(
+                exact_search(
+                    normalize(query_embeddings),
+                    normalize(product_embeddings),
+                    top_k,
+                    block_size=self.search_block_size,
+                )
+            )
+        from sentence_transformers import util
+
+        return util.semantic_search(query_embeddings, product_embeddings, top_k=top_k)
+
+    @staticmethod
+    def _to_hits(results: List[SearchResult]) -> List[List[Dict[str, Any]]]:
+        """Convert search results to the hits format of ``util.semantic_search``.
+
+        Args:
+            results (List[SearchResult]): Per query, the row ids and scores.
+
+        Returns:
+            List[List[Dict[str, Any]]]: Per query, ``corpus_id`` and ``score`` dicts.
+        """
+        return [
+            [
+                {"corpus_id": int(row), "score": float(score)}
+                for row, score in zip(rows, scores, strict=True)
+            ]
+            for rows, scores in results
+        ]
 
     def find_similar(
-        self, queries: List[str], products: List[str], top_k: int
+        self,
+        queries: List[str],
+        products: Optional[List[str]],
+        top_k: int,
+        catalog_id: Optional[str] = None,
+        nprobe: Optional[int] = None,
+        return_products: bool = True,
+        catalog: Optional[Catalog] = None,
+        filters: Optional[Mapping[str, Any]] = None,
+        metadata: Optional[List[Optional[Dict[str, Any]]]] = None,
     ) -> List[List[dict]]:
         """Find similar products for given queries.
 
+        Products are either given inline, in which case they are encoded on every
+        call, or referenced through ``catalog_id``, in which case the embeddings
+        stored at registration time are reused and only the queries are encoded.
+        Catalogs with an approximate nearest-neighbour index are searched through
+        it instead of being scored exhaustively, and quantized catalogs are
+        scanned in compressed form. Exhaustive searches run on the configured
+        ``search_backend``. With ``filters``, only the products whose metadata
+        match are encoded or scored.
+
         Args:
             queries (List[str]): List of query texts to search for.
-            products (List[str]): List of product descriptions to search in.
+            products (Optional[List[str]]): List of product descriptions to search in.
             top_k (int): Number of top matches to return for each query.
+            catalog_id (Optional[str]): Name of a registered catalog to search in
+                instead of ``products``.
+            nprobe (Optional[int]): Number of index clusters to scan, overriding
+                the default of the catalog index.
+            return_products (bool): Whether matches carry the product text under
+                'product', or only its position under 'index', or its id under
+                'product_id' for a catalog.
+            catalog (Optional[Catalog]): A catalog version to search instead of
+                looking up ``catalog_id``, e.g. to report which version the
+                matches come from.
+            filters (Optional[Mapping[str, Any]]): Metadata filter expression,
+                see ``MetadataIndex.mask``.
+            metadata (Optional[List[Optional[Dict[str, Any]]]]): Metadata of
+                each of ``products``, required to filter them.
 
         Returns:
             List[List[dict]]: A list of lists where each inner list contains dictionaries
-                with 'product' and 'score' keys for the top_k matches for each query.
+                with 'product' (or 'index' or 'product_id') and 'score' keys for
+                the top_k matches
+                for each query.
 
         Raises:
             RuntimeError: If the model is not loaded.
+            ValueError: If neither products nor catalog_id is given.
+            CatalogNotFoundError: If ``catalog_id`` is not registered.
         """
         if not self.model:
             raise RuntimeError("Model not loaded")
+        if products is None and catalog_id is None and catalog is None:
+            raise ValueError("Either products or catalog_id must be provided")
+
+        return self.find_similar_by_vector(
+            top_k,
+            queries=queries,
+            products=products,
+            catalog_id=catalog_id,
+            nprobe=nprobe,
+            return_products=return_products,
+            catalog=catalog,
+            filters=filters,
+            metadata=metadata,
+        )
+
+    @staticmethod
+    def _as_vectors(embeddings: Any, dimension: Optional[int], name: str) -> np.ndarray:
+        """Convert caller embeddings to a float32 matrix and check its dimension.
+
+        Args:
+            embeddings (Any): Embeddings, one row per item.
+            dimension (Optional[int]): Expected dimension, None to skip the check.
+            name (str): Name of the embeddings in error messages.
+
+        Returns:
+            np.ndarray: The embeddings as a float32 matrix.
+
+        Raises:
+            EmbeddingMismatchError: If the embeddings are not a matrix of the
+                expected dimension.
+        """
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2:
+            raise EmbeddingMismatchError(
+                f"{name} must be a matrix, got {vectors.ndim} dimensions"
+            )
+        if dimension is not None and vectors.shape[1] != dimension:
+            raise EmbeddingMismatchError(
+                f"{name} have dimension {vectors.shape[1]}, expected {dimension}"
+            )
+        return vectors
+
+    def find_similar_by_vector(
+        self,
+        top_k: int,
+        query_embeddings: Optional[Any] = None,
+        queries: Optional[List[str]] = None,
+        product_embeddings: Optional[Any] = None,
+        products: Optional[List[str]] = None,
+        catalog_id: Optional[str] = None,
+        nprobe: Optional[int] = None,
+        return_products: bool = True,
+        model_name: Optional[str] = None,
+        catalog: Optional[Catalog] = None,
+        filters: Optional[Mapping[str, Any]] = None,
+        metadata: Optional[List[Optional[Dict[str, Any]]]] = None,
+    ) -> List[List[dict]]:
+        """Find similar products for queries given as texts or as embeddings.
+
+        Embeddings computed earlier, e.g. with ``embed``, are searched as is, so
+        the model only runs for the sides given as texts, and not at all when
+        both are embeddings. Products are either embeddings, optionally labelled
+        with their texts, texts encoded on every call, or a registered catalog.
+
+        Args:
+            top_k (int): Number of top matches to return for each query.
+            query_embeddings (Optional[Any]): Query embeddings, one row per query.
+            queries (Optional[List[str]]): Query texts, instead of embeddings.
+            product_embeddings (Optional[Any]): Product embeddings, one row per
+                product.
+            products (Optional[List[str]]): Product texts. Encoded when no
+                ``product_embeddings`` are given, otherwise only returned in the
+                matches.
+            catalog_id (Optional[str]): Name of a registered catalog to search in.
+            nprobe (Optional[int]): Number of index clusters to scan.
+            return_products (bool): Whether matches carry the product text under
+                'product', or only its position under 'index', or its id under
+                'product_id' for a catalog.
+            model_name (Optional[str]): Model the given embeddings were computed
+                with, checked against the model of the service.
+            catalog (Optional[Catalog]): A catalog version to search instead of
+                looking up ``catalog_id``.
+            filters (Optional[Mapping[str, Any]]): Metadata filter expression.
+                Only the matching products are encoded and scored.
+            metadata (Optional[List[Optional[Dict[str, Any]]]]): Metadata of
+                each product given in the request, required to filter them.
+
+        Returns:
+            List[List[dict]]: Per query, dictionaries with 'product' (or 'index'
+                or 'product_id') and 'score' keys for the top_k matches.
+
+        Raises:
+            RuntimeError: If texts are given and the model is not loaded.
+            ValueError: If the queries or the products are not given exactly once,
+                or if the filters are invalid.
+            EmbeddingMismatchError: If the embeddings come from another model or
+                have another dimension.
+            CatalogNotFoundError: If ``catalog_id`` is not registered.
+        """
+        if model_name is not None and model_name != self.model_name:
+            raise EmbeddingMismatchError(
+                f"Embeddings of model '{model_name}' cannot be searched with "
+                f"model '{self.model_name}'"
+            )
+        if (queries is None) == (query_embeddings is None):
+            raise ValueError("Exactly one of queries or query_embeddings is required")
+        has_products = product_embeddings is not None or products is not None
+        if (catalog_id is None and catalog is None) == (not has_products):
+            raise ValueError(
+                "Exactly one of products, product_embeddings or catalog_id is required"
+            )
+        if (
+            product_embeddings is not None
+            and products is not None
+            and len(products) != len(product_embeddings)
+        ):
+            raise ValueError("products must have one text per product embedding")
+
+        if catalog is None and catalog_id is not None:
+            catalog = self.get_catalog(catalog_id)
+        labels = catalog.products if catalog is not None else products
+        ids = catalog.ids if catalog is not None else None
+        if return_products and labels is None:
+            raise ValueError("products are required to return the product texts")
+
+        cache = self.result_cache
+        if catalog is not None and queries is not None and cache is not None:
+            hits = self._cached_search(cache, catalog, queries, top_k, nprobe, filters)
+            return self._format_hits(hits, labels if return_products else None, ids)
+
+        dimension = catalog.dimension if catalog is not None else self.dimension
+        if query_embeddings is not None:
+            query_vectors = self._as_vectors(query_embeddings, dimension, "Queries")
+        else:
+            query_vectors = self._encode_queries(queries or [])
+
+        if catalog is not None:
+            hits = self._filtered_search(catalog, query_vectors, top_k, nprobe, filters)
+        else:
+            hits = self._search_products(
+                query_vectors,
+                top_k,
+                product_embeddings,
+                products,
+                self._filter_products(filters, metadata, products, product_embeddings),
+            )
+
+        return self._format_hits(hits, labels if return_products else None, ids)
+
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Encode query texts.
+
+        Args:
+            queries (List[str]): The query texts.
+
+        Returns:
+            np.ndarray: float32 query embeddings.
+        """
+        TEXTS_PER_REQUEST.labels("queries").observe(len(queries))
+        with time_stage("query_encoding"):
+            return np.asarray(self._encode(queries), np.float32)
+
+    def _filtered_search(
+        self,
+        catalog: Catalog,
+        query_embeddings: np.ndarray,
+        top_k: int,
+        nprobe: Optional[int],
+        filters: Optional[Mapping[str, Any]],
+    ) -> List[List[Dict[str, Any]]]:
+        """Search the products of a catalog matching a filter expression.
+
+        Args:
+            catalog (Catalog): The catalog to search.
+            query_embeddings (np.ndarray): float32 query embeddings.
+            top_k (int): Number of matches per query.
+            nprobe (Optional[int]): Number of index clusters to scan.
+            filters (Optional[Mapping[str, Any]]): Metadata filter expression,
+                None to search every product.
+
+        Returns:
+            List[List[Dict[str, Any]]]: Per query, ``corpus_id`` and ``score``
+                dicts, best first.
+        """
+        mask = None
+        if filters is not None:
+            with time_stage("filtering"):
+                mask = catalog.filter_mask(filters)
+        with time_stage("search"):
+            return self._search_catalog(catalog, query_embeddings, top_k, nprobe, mask)
 
-        query_embeddings = self.model.encode(queries)
-        product_embeddings = self.model.encode(products)
+    def _cached_search(
+        self,
+        cache: ResultCache,
+        catalog: Catalog,
+        queries: List[str],
+        top_k: int,
+        nprobe: Optional[int],
+        filters: Optional[Mapping[str, Any]],
+    ) -> List[List[Dict[str, Any]]]:
+        """Search a catalog for query texts through the result cache.
 
-        hits = util.semantic_search(query_embeddings, product_embeddings, top_k=top_k)
+        Only the queries that are neither cached nor being searched by another
+        request are encoded and searched, together; the others wait for that
+        request, and search the query themselves if it stops early. Results
+        some shards were left out of are handed to the waiting requests but not
+        cached.
 
+        Args:
+            cache (ResultCache): The result cache.
+            catalog (Catalog): The catalog to search.
+            queries (List[str]): The query texts.
+            top_k (int): Number of matches per query.
+            nprobe (Optional[int]): Number of index clusters to scan.
+            filters (Optional[Mapping[str, Any]]): Metadata filter expression.
+
+        Returns:
+            List[List[Dict[str, Any]]]: Per query, ``corpus_id`` and ``score``
+                dicts, best first.
+        """
+        keys = [
+            cache.key(
+                query,
+                catalog.catalog_id,
+                catalog.version,
+                top_k,
+                nprobe=nprobe,
+                filters=filters,
+            )
+            for query in queries
+        ]
+        lookups = [cache.lookup(key) for key in keys]
+        claimed = {
+            key: query
+            for key, query, (_, owner) in zip(keys, queries, lookups, strict=True)
+            if owner
+        }
+        if claimed:
+            try:
+                with track_missed_shards() as missed:
+                    hits = self._filtered_search(
+                        catalog,
+                        self._encode_queries(list(claimed.values())),
+                        top_k,
+                        nprobe,
+                        filters,
+                    )
+            except BaseException as e:
+                for key in claimed:
+                    cache.fail(key, e)
+                raise
+            for key, query_hits in zip(claimed, hits, strict=True):
+                cache.complete(key, (query_hits, missed), store=not missed)
+
+        results = []
+        for query, (future, owner) in zip(queries, lookups, strict=True):
+            try:
+                query_hits, query_missed = wait_cancellable(future, "search")
+            except RequestCancelledError:
+                check_cancelled("search")
+                # The request searching the query stopped, not this one.
+                query_missed = []
+                query_hits = self._filtered_search(
+                    catalog, self._encode_queries([query]), top_k, nprobe, filters
+                )[0]
+            if not owner:
+                report_missed_shards(query_missed)
+            results.append(query_hits)
+        return results
+
+    @staticmethod
+    def _filter_products(
+        filters: Optional[Mapping[str, Any]],
+        metadata: Optional[List[Optional[Dict[str, Any]]]],
+        products: Optional[List[str]],
+        product_embeddings: Optional[Any],
+    ) -> Optional[np.ndarray]:
+        """Select the products given in a request that match the filters.
+
+        Args:
+            filters (Optional[Mapping[str, Any]]): Metadata filter expression.
+            metadata (Optional[List[Optional[Dict[str, Any]]]]): Metadata of
+                each product.
+            products (Optional[List[str]]): Product texts.
+            product_embeddings (Optional[Any]): Product embeddings.
+
+        Returns:
+            Optional[np.ndarray]: Sorted positions of the matching products, None
+                without filters.
+
+        Raises:
+            ValueError: If the metadata are missing or not aligned with the
+                products, or if the filters are invalid.
+        """
+        if filters is None:
+            return None
+        count = len(products) if products is not None else len(product_embeddings)
+        if metadata is None or len(metadata) != count:
+            raise ValueError("metadata must have one entry per product to filter")
+        with time_stage("filtering"):
+            return np.flatnonzero(MetadataIndex(metadata).mask(filters))
+
+    def _search_products(
+        self,
+        query_vectors: np.ndarray,
+        top_k: int,
+        product_embeddings: Optional[Any],
+        products: Optional[List[str]],
+        selection: Optional[np.ndarray],
+    ) -> List[List[Dict[str, Any]]]:
+        """Search the products given in a request, encoding their texts if needed.
+
+        Args:
+            query_vectors (np.ndarray): float32 query embeddings.
+            top_k (int): Number of matches per query.
+            product_embeddings (Optional[Any]): Product embeddings, searched
+                instead of encoding ``products``.
+            products (Optional[List[str]]): Product texts.
+            selection (Optional[np.ndarray]): Sorted positions of the products
+                eligible for the search, the only ones encoded and scored. None
+                searches every product.
+
+        Returns:
+            List[List[Dict[str, Any]]]: Per query, ``corpus_id`` and ``score``
+                dicts, best first, numbered by position in the request.
+        """
+        if selection is not None and not len(selection):
+            return [[] for _ in query_vectors]
+        if product_embeddings is not None:
+            product_vectors = self._as_vectors(
+                product_embeddings, query_vectors.shape[1], "Products"
+            )
+            if selection is not None:
+                product_vectors = product_vectors[selection]
+        else:
+            texts = products or []
+            if selection is not None:
+                texts = [texts[row] for row in selection]
+            TEXTS_PER_REQUEST.labels("products").observe(len(texts))
+            with time_stage("product_encoding"):
+                product_vectors = np.asarray(self._encode(texts), np.float32)
+        with time_stage("search"):
+            hits = self._search_embeddings(query_vectors, product_vectors, top_k)
+        return self._select_hits(hits, selection)
+
+    @staticmethod
+    def _select_hits(
+        hits: List[List[Dict[str, Any]]], selection: Optional[np.ndarray]
+    ) -> List[List[Dict[str, Any]]]:
+        """Number hits of a search on selected rows by their original row.
+
+        Args:
+            hits (List[List[Dict[str, Any]]]): Per query, ``corpus_id`` and
+                ``score`` dicts numbered by position in the selection.
+            selection (Optional[np.ndarray]): The searched rows, None when every
+                row was searched.
+
+        Returns:
+            List[List[Dict[str, Any]]]: The hits, numbered by original row.
+        """
+        if selection is None:
+            return hits
+        return [
+            [
+                {"corpus_id": int(selection[hit["corpus_id"]]), "score": hit["score"]}
+                for hit in query_hits
+            ]
+            for query_hits in hits
+        ]
+
+    @staticmethod
+    def _format_hits(
+        hits: List[List[Dict[str, Any]]],
+        products: Optional[List[str]],
+        ids: Optional[List[str]] = None,
+    ) -> List[List[dict]]:
+        """Format search hits as matches with a rounded score.
+
+        Args:
+            hits (List[List[Dict[str, Any]]]): Per query, ``corpus_id`` and
+                ``score`` dicts.
+            products (Optional[List[str]]): Product texts returned under
+                'product'. When None, the product id is returned under
+                'product_id' instead, or its position under 'index' without ids.
+            ids (Optional[List[str]]): Product ids of a catalog, by row.
+
+        Returns:
+            List[List[dict]]: Per query, the matches.
+        """
+        if products is None and ids is not None:
+            return [
+                [
+                    {
+                        "product_id": ids[hit["corpus_id"]],
+                        "score": round(float(hit["score"]), 4),
+                    }
+                    for hit in query_hits
+                ]
+                for query_hits in hits
+            ]
+        if products is None:
+            return [
+                [
+                    {
+                        "index": int(hit["corpus_id"]),
+                        "score": round(float(hit["score"]), 4),
+                    }
+                    for hit in query_hits
+                ]
+                for query_hits in hits
+            ]
         return [
             [
                 {
@@ -0,0 +1,313 @@
+import abc
+from typing import Any, Dict, List, Optional, Type
+
+import numpy as np
+
+from ..core.cancellation import check_cancelled
+from .search import SearchResult, normalize, top_k_indices
+
+
+class Quantizer(abc.ABC):
+    """Base class of the codecs compressing normalized catalog embeddings.
+
+    A quantizer is fitted on the catalog, encodes it into compact codes and
+    scores queries directly against those codes, approximating the dot product
+    with the original vectors. Subclasses register themselves in
+    ``QUANTIZER_TYPES`` under their ``kind``.
+    """
+
+    kind: str = ""
+
+    def fit(self, vectors: np.ndarray) -> "Quantizer":
+        """Learn the codec parameters.
+
+        Args:
+            vectors (np.ndarray): Normalized vectors of shape (n, dim).
+
+        Returns:
+            Quantizer: The fitted quantizer.
+        """
+        return self
+
+    @abc.abstractmethod
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Compress vectors into codes.
+
+        Args:
+            vectors (np.ndarray): Normalized vectors of shape (n, dim).
+
+        Returns:
+            np.ndarray: One row of codes per vector.
+        """
+
+    @abc.abstractmethod
+    def score(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Approximate the dot products of queries with encoded vectors.
+
+        Args:
+            queries (np.ndarray): Normalized queries of shape (n_queries, dim).
+            codes (np.ndarray): Codes of shape (n, ...).
+
+        Returns:
+            np.ndarray: Approximate scores of shape (n_queries, n).
+        """
+
+
+class Float16Quantizer(Quantizer):
+    """Half precision storage, 2x smaller than float32."""
+
+    kind = "float16"
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors.astype(np.float16)
+
+    def score(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        return queries @ codes.astype(np.float32).T
+
+
+class Int8Quantizer(Quantizer):
+    """Per-dimension scalar quantization to 8 bits, 4x smaller than float32.
+
+    Each dimension is mapped linearly from its [min, max] range onto 0..255, so
+    ``x ~ offset + scale * code`` and ``q . x ~ (q * scale) . code + q . offset``.
+    """
+
+    kind = "int8"
+
+    def __init__(self) -> None:
+        self.offset: np.ndarray = np.zeros(0, dtype=np.float32)
+        self.scale: np.ndarray = np.ones(0, dtype=np.float32)
+
+    def fit(self, vectors: np.ndarray) -> "Int8Quantizer":
+        self.offset = vectors.min(axis=0)
+        self.scale = np.maximum(vectors.max(axis=0) - self.offset, 1e-12) / 255
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.rint((vectors - self.offset) / self.scale)
+        return np.clip(codes, 0, 255).astype(np.uint8)
+
+    def score(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        bias = queries @ self.offset
+        return (queries * self.scale) @ codes.astype(np.float32).T + bias[:, None]
+
+
+class ProductQuantizer(Quantizer):
+    """Product quantization: one byte per sub-vector, up to dim/2x smaller.
+
+    Vectors are split into ``subspaces`` sub-vectors, each replaced by the index
+    of its nearest centroid among 256 learned with k-means. Queries are scored
+    with per-subspace lookup tables of query/centroid dot products.
+    """
+
+    kind = "pq"
+
+    def __init__(self, subspaces: int = 8, iterations: int = 10, seed: int = 0):
+        """Initialize the quantizer.
+
+        Args:
+            subspaces (int): Number of sub-vectors, must divide the dimension.
+            iterations (int): Number of k-means iterations per subspace.
+            seed (int): Seed of the k-means initialization.
+        """
+        self.subspaces: int = subspaces
+        self.iterations: int = iterations
+        self.seed: int = seed
+        self.centroids: np.ndarray = np.zeros((subspaces, 0, 0), dtype=np.float32)
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors.reshape(len(vectors), self.subspaces, -1)
+
+    @staticmethod
+    def _nearest(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        distances = -2 * points @ centroids.T + np.einsum(
+            "ij,ij->i", centroids, centroids
+        )
+        return np.argmin(distances, axis=1)
+
+    def fit(self, vectors: np.ndarray) -> "ProductQuantizer":
+        """Learn 256 centroids per subspace with k-means.
+
+        Args:
+            vectors (np.ndarray): Normalized vectors of shape (n, dim).
+
+        Returns:
+            ProductQuantizer: The fitted quantizer.
+
+        Raises:
+            ValueError: If the dimension is not divisible by the subspaces.
+        """
+        if vectors.shape[1] % self.subspaces:
+            raise ValueError(
+                f"Dimension {vectors.shape[1]} is not divisible by "
+                f"{self.subspaces} subspaces"
+            )
+        rng = np.random.default_rng(self.seed)
+        clusters = min(256, len(vectors))
+        sample = vectors[rng.choice(len(vectors), min(len(vectors), 256 * 64), False)]
+        centroids = []
+        for points in self._split(sample).transpose(1, 0, 2):
+            centers = points[rng.choice(len(points), clusters, replace=False)].copy()
+            for _ in range(self.iterations):
+                assignments = self._nearest(points, centers)
+                counts = np.bincount(assignments, minlength=clusters)[:, None]
+                sums = np.zeros_like(centers)
+                np.add.at(sums, assignments, points)
+                centers = np.where(counts > 0, sums / np.maximum(counts, 1), centers)
+            centroids.append(centers)
+        self.centroids = np.stack(centroids).astype(np.float32)
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.stack(
+            [
+                self._nearest(points, self.centroids[j])
+                for j, points in enumerate(self._split(vectors).transpose(1, 0, 2))
+            ],
+            axis=1,
+        ).astype(np.uint8)
+
+    def score(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        # tables[j] holds the dot products of every query with the centroids of
+        # subspace j, so a code row is scored by summing one entry per subspace.
+        tables = np.einsum("qjd,jkd->jqk", self._split(queries), self.centroids)
+        scores = np.zeros((len(queries), len(codes)), dtype=np.float32)
+        for j in range(self.subspaces):
+            scores += tables[j][:, codes[:, j]]
+        return scores
+
+
+QUANTIZER_TYPES: Dict[str, Type[Quantizer]] = {
+    Float16Quantizer.kind: Float16Quantizer,
+    Int8Quantizer.kind: Int8Quantizer,
+    ProductQuantizer.kind: ProductQuantizer,
+}
+
+
+class QuantizedEmbeddings:
+    """Compressed catalog embeddings scanned without decompressing the catalog.
+
+    Candidates are selected with the approximate scores of the quantizer and,
+    when rescoring is enabled, re-ranked with exact cosine scores computed on
+    the full precision rows of the candidates only.
+    """
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        kind: str,
+        block_size: int = 65536,
+        **params: Any,
+    ):
+        """Compress embeddings.
+
+        Args:
+            embeddings (np.ndarray): Catalog embeddings of shape (n, dim).
+            kind (str): The quantizer kind, one of ``QUANTIZER_TYPES``.
+            block_size (int): Number of rows encoded and scanned at once.
+            **params (Any): Parameters of the quantizer, such as ``subspaces``.
+
+        Raises:
+            ValueError: If the kind is unknown.
+        """
+        if kind not in QUANTIZER_TYPES:
+            raise ValueError(
+                f"Unknown quantization '{kind}', expected one of {sorted(QUANTIZER_TYPES)}"
+            )
+        self.kind: str = kind
+        self.block_size: int = block_size
+        self.size: int = len(embeddings)
+        self.dimension: int = int(embeddings.shape[1])
+        self.quantizer: Quantizer = QUANTIZER_TYPES[kind](**params)
+        self.quantizer.fit(normalize(embeddings[: 256 * 1024]))
+        self.codes: np.ndarray = np.concatenate(
+            [
+                self.quantizer.encode(normalize(embeddings[start : start + block_size]))
+                for start in range(0, self.size, block_size)
+            ]
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the codes in bytes."""
+        return int(self.codes.nbytes)
+
+    @property
+    def compression_ratio(self) -> float:
+        """Size of the float32 embeddings divided by the size of the codes."""
+        return self.size * self.dimension * 4 / max(self.nbytes, 1)
+
+    def search(
+        self,
+        queries: np.ndarray,
+        top_k: int,
+        rescore_factor: int = 0,
+        full_precision: Optional[np.ndarray] = None,
+        selection: Optional[np.ndarray] = None,
+    ) -> List[SearchResult]:
+        """Find the nearest catalog rows of each query on the compressed codes.
+
+        Args:
+            queries (np.ndarray): Query embeddings of shape (n_queries, dim).
+            top_k (int): Number of rows to return per query.
+            rescore_factor (int): When above 0 and ``full_precision`` is given,
+                ``top_k * rescore_factor`` candidates are re-ranked with exact
+                cosine scores.
+            full_precision (Optional[np.ndarray]): Original catalog embeddings,
+                possibly memory-mapped, used for rescoring.
+            selection (Optional[np.ndarray]): Sorted rows eligible for the
+                search, the only codes scanned. None scans every row.
+
+        Returns:
+            List[SearchResult]: Per query, the row ids and their scores.
+        """
+        queries = normalize(queries)
+        full = full_precision if rescore_factor > 0 else None
+        size = self.size if selection is None else len(selection)
+        candidates = min(top_k * max(rescore_factor, 1), size)
+        if full is None:
+            candidates = min(top_k, size)
+
+        # Keep the best candidates of each block, then select among them.
+        block_rows: List[np.ndarray] = []
+        block_scores: List[np.ndarray] = []
+        for start in range(0, size, self.block_size):
+            check_cancelled("search")
+            if selection is None:
+                codes = self.codes[start : start + self.block_size]
+                block_ids = np.arange(start, start + len(codes))
+            else:
+                block_ids = selection[start : start + self.block_size]
+                codes = self.codes[block_ids]
+            scores = self.quantizer.score(queries, codes)
+            rows = np.stack([top_k_indices(row, candidates) for row in scores])
+            block_rows.append(block_ids[rows])
+            block_scores.append(np.take_along_axis(scores, rows, axis=1))
+        all_rows = np.concatenate(block_rows, axis=1)
+        all_scores = np.concatenate(block_scores, axis=1)
+
+        results = []
+        for query, rows, scores in zip(queries, all_rows, all_scores, strict=True):
+            best = top_k_indices(scores, candidates)
+            rows, scores = rows[best], scores[best]
+            if full is not None:
+                # Rows are read in file order to keep memory-mapped reads local.
+                order = np.argsort(rows)
+                exact = normalize(full[rows[order]]) @ query
+                rows, scores = rows[order], exact
+                best = top_k_indices(scores, top_k)
+                rows, scores = rows[best], scores[best]
+            results.append((rows[:top_k], scores[:top_k]))
+        return results
+
+    def info(self) -> Dict[str, Any]:
+        """Describe the compressed embeddings.
+
+        Returns:
+            Dict[str, Any]: The quantizer kind, memory use and compression ratio.
+        """
+        return {
+            "kind": self.kind,
+            "bytes": self.nbytes,
+            "compression_ratio": round(self.compression_ratio, 2),
+        }
@@ -0,0 +1,177 @@
+import json
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import Lock
+from typing import Any, Dict, Tuple
+
+ResultKey = Tuple[str, int, int, int, str, str]
+
+
+class ResultCache:
+    """LRU cache of catalog search results with a time to live.
+
+    Entries hold the matches of one query on one catalog version, keyed by the
+    normalized query text, the catalog name, its version and the search
+    options such as ``top_k``. A cached query is answered without encoding or
+    searching it again.
+
+    Concurrent misses of the same key are computed once: the first caller
+    claims the key and the others wait for its result instead of repeating the
+    work. Updating a catalog changes its version and so the keys of its
+    searches; ``invalidate`` also drops the entries of a catalog right away, and
+    keeps results still being computed for it from being stored.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float = 0.0):
+        """Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum number of cached query results.
+            ttl_seconds (float): Time an entry is served for. A value of 0 keeps
+                entries until they are evicted or invalidated.
+        """
+        self.max_entries: int = max_entries
+        self.ttl_seconds: float = ttl_seconds
+        self.hits: int = 0
+        self.misses: int = 0
+        self.coalesced: int = 0
+        self.evictions: int = 0
+        self.expirations: int = 0
+        self._entries: "OrderedDict[ResultKey, Tuple[float, Any]]" = OrderedDict()
+        self._pending: Dict[ResultKey, Future] = {}
+        # Invalidation count of each catalog, part of the keys of its results.
+        self._generations: Dict[str, int] = {}
+        self._lock = Lock()
+
+    def key(
+        self, query: str, catalog_id: str, version: int, top_k: int, **options: Any
+    ) -> ResultKey:
+        """Build the cache key of a catalog search.
+
+        Queries are compared after Unicode NFKC normalization and whitespace
+        collapsing. Case is kept, since models may tell cases apart.
+
+        Args:
+            query (str): The query text.
+            catalog_id (str): Name of the searched catalog.
+            version (int): Version of the searched catalog.
+            top_k (int): Number of matches.
+            **options (Any): Other options changing the matches, such as
+                ``nprobe`` or ``filters``.
+
+        Returns:
+            ResultKey: The key.
+        """
+        normalized = " ".join(unicodedata.normalize("NFKC", query).split())
+        return (
+            catalog_id,
+            self._generations.get(catalog_id, 0),
+            version,
+            top_k,
+            json.dumps(options, sort_keys=True, default=str),
+            normalized,
+        )
+
+    def lookup(self, key: ResultKey) -> Tuple[Future, bool]:
+        """Look up the results of a key, claiming their computation on a miss.
+
+        Args:
+            key (ResultKey): The cache key.
+
+        Returns:
+            Tuple[Future, bool]: The future of the results, already done on a
+                hit, and whether the caller claimed the computation, in which
+                case it must call ``complete`` or ``fail``.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if not self.ttl_seconds or time.monotonic() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    future: Future = Future()
+                    future.set_result(value)
+                    return future, False
+                del self._entries[key]
+                self.expirations += 1
+            pending = self._pending.get(key)
+            if pending is not None:
+                self.coalesced += 1
+                return pending, False
+            self.misses += 1
+            future = Future()
+            self._pending[key] = future
+            return future, True
+
+    def complete(self, key: ResultKey, value: Any, store: bool = True) -> None:
+        """Publish the results of a claimed key.
+
+        Args:
+            key (ResultKey): The cache key.
+            value (Any): The results, shared with every caller of the key.
+            store (bool): Whether to cache the results, e.g. False for partial
+                results. Callers waiting for them get them either way.
+        """
+        with self._lock:
+            future = self._pending.pop(key)
+            catalog_id, generation = key[0], key[1]
+            if store and generation == self._generations.get(catalog_id, 0):
+                self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        future.set_result(value)
+
+    def fail(self, key: ResultKey, error: BaseException) -> None:
+        """Release a claimed key whose computation failed.
+
+        Args:
+            key (ResultKey): The cache key.
+            error (BaseException): The error, raised to the callers waiting for
+                the key.
+        """
+        with self._lock:
+            future = self._pending.pop(key)
+        future.set_exception(error)
+
+    def invalidate(self, catalog_id: str) -> None:
+        """Drop the cached results of a catalog.
+
+        Args:
+            catalog_id (str): Name of the catalog.
+        """
+        with self._lock:
+            self._generations[catalog_id] = self._generations.get(catalog_id, 0) + 1
+            for key in [key for key in self._entries if key[0] == catalog_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics.
+
+        Returns:
+            Dict[str, Any]: Hit, miss, coalesced miss, eviction and expiration
+                counts, and the entries in use.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+            }
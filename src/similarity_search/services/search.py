@@ -0,0 +1,106 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from ..core.cancellation import check_cancelled
+
+SearchResult = Tuple[np.ndarray, np.ndarray]
+
+
+def normalize(embeddings: np.ndarray) -> np.ndarray:
+    """L2-normalize embeddings row-wise so that dot products are cosine scores.
+
+    Args:
+        embeddings (np.ndarray): Embeddings of shape (n, dim).
+
+    Returns:
+        np.ndarray: float32 embeddings with unit norm rows. Zero rows stay zero.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Get the positions of the ``top_k`` highest scores, best first.
+
+    Args:
+        scores (np.ndarray): 1-d array of scores.
+        top_k (int): Number of positions to return.
+
+    Returns:
+        np.ndarray: Positions sorted by decreasing score.
+    """
+    top_k = min(top_k, len(scores))
+    if top_k < len(scores):
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def exact_search(
+    queries: np.ndarray,
+    corpus: np.ndarray,
+    top_k: int,
+    block_size: int = 16384,
+    normalized: bool = True,
+    selection: Optional[np.ndarray] = None,
+) -> List[SearchResult]:
+    """Exact cosine top-k search of normalized queries in a corpus.
+
+    The corpus is scanned in blocks with one matrix product per block. Each
+    block's candidates are selected with ``argpartition`` and merged into a
+    running top-k, so memory stays bounded by the block size whatever the
+    corpus size, and only the final ``top_k`` rows are sorted.
+
+    Args:
+        queries (np.ndarray): Normalized queries of shape (n_queries, dim).
+        corpus (np.ndarray): Corpus embeddings of shape (n, dim), possibly
+            memory-mapped.
+        top_k (int): Number of rows to return per query.
+        block_size (int): Number of corpus rows scored per matrix product.
+        normalized (bool): Whether the corpus rows are already normalized.
+            Otherwise each block is normalized as it is scanned.
+        selection (Optional[np.ndarray]): Sorted corpus rows eligible for the
+            search, e.g. those matching a filter. Only these rows are read and
+            scored. None searches every row.
+
+    Returns:
+        List[SearchResult]: Per query, the row ids and their cosine scores,
+            best first.
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    n_queries = len(queries)
+    size = len(corpus) if selection is None else len(selection)
+    top_k = min(top_k, size)
+    best_rows = np.zeros((n_queries, 0), dtype=np.int64)
+    best_scores = np.zeros((n_queries, 0), dtype=np.float32)
+
+    for start in range(0, size, block_size):
+        check_cancelled("search")
+        if selection is None:
+            block = corpus[start : start + block_size]
+            block_ids = np.arange(start, start + len(block))
+        else:
+            block_ids = selection[start : start + block_size]
+            block = corpus[block_ids]
+        block = np.asarray(block, dtype=np.float32) if normalized else normalize(block)
+        scores = queries @ block.T
+        if top_k < scores.shape[1]:
+            rows = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+            scores = np.take_along_axis(scores, rows, axis=1)
+        else:
+            rows = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        candidate_rows = np.concatenate([best_rows, block_ids[rows]], axis=1)
+        candidate_scores = np.concatenate([best_scores, scores], axis=1)
+        if top_k < candidate_scores.shape[1]:
+            keep = np.argpartition(-candidate_scores, top_k - 1, axis=1)[:, :top_k]
+            candidate_rows = np.take_along_axis(candidate_rows, keep, axis=1)
+            candidate_scores = np.take_along_axis(candidate_scores, keep, axis=1)
+        best_rows, best_scores = candidate_rows, candidate_scores
+
+    order = np.argsort(-best_scores, axis=1, kind="stable")
+    best_rows = np.take_along_axis(best_rows, order, axis=1)
+    best_scores = np.take_along_axis(best_scores, order, axis=1)
+    return list(zip(best_rows, best_scores, strict=True))
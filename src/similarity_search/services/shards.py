@@ -0,0 +1,645 @@
+import itertools
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, wait
+from contextlib import contextmanager
+from contextvars import ContextVar
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+from threading import Lock, RLock, Thread
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from ..core.cancellation import check_cancelled, remaining_seconds
+from ..core.exceptions import RequestCancelledError
+from ..core.logging import get_logger
+from .search import SearchResult, exact_search, top_k_indices
+
+logger = get_logger(__name__)
+
+# Device, inode, size and modification time of the file of memory-mapped rows.
+FileStamp = Tuple[int, int, int, int]
+
+# Shards left out of the searches of the current request, see track_missed_shards.
+_missed_shards: ContextVar[Optional[List[int]]] = ContextVar(
+    "missed_shards", default=None
+)
+
+
+@contextmanager
+def track_missed_shards() -> Iterator[List[int]]:
+    """Collect the shards left out of the searches run in a block.
+
+    Blocks can be nested, the shards missed in the inner block being reported
+    to the outer one too.
+
+    Yields:
+        List[int]: Indexes of the shards that missed their deadline or failed,
+            filled in as the searches of the block run in the current context.
+    """
+    missed: List[int] = []
+    token = _missed_shards.set(missed)
+    try:
+        yield missed
+    finally:
+        _missed_shards.reset(token)
+        report_missed_shards(missed)
+
+
+def report_missed_shards(missed: Sequence[int]) -> None:
+    """Record shards left out of a search for the enclosing tracking block.
+
+    Args:
+        missed (Sequence[int]): Indexes of the shards left out.
+    """
+    tracked = _missed_shards.get()
+    if tracked is not None:
+        tracked.extend(missed)
+
+
+def _file_stamp(path: str) -> Optional[FileStamp]:
+    """Identify the content of a file, which a rewrite or a replace changes.
+
+    Args:
+        path (str): Path of the file.
+
+    Returns:
+        Optional[FileStamp]: The stamp of the file, None if it is gone.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def _shard_main(conn: Connection, block_size: int) -> None:
+    """Entry point of a shard process.
+
+    The shard keeps the row ranges of catalog segments it is given, by key, and
+    answers exact top-k searches on them until it gets ``None``. Every request
+    carries an id that is sent back with its reply. Searches also carry the
+    time the parent stops waiting for them at; those still queued by then are
+    answered as expired without being run.
+
+    Args:
+        conn (Connection): Pipe to the parent process.
+        block_size (int): Number of rows scored per matrix product.
+    """
+    segments: Dict[str, Tuple[np.ndarray, bool]] = {}
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        request_id, command, key, *args = message
+        try:
+            result: Any
+            if command == "load":
+                rows, normalized = args
+                if isinstance(rows, tuple):
+                    path, start, stop, stamp = rows
+                    if _file_stamp(path) != stamp:
+                        raise ValueError(f"{path} changed since it was loaded")
+                    rows = np.load(path, mmap_mode="r")[start:stop]
+                segments[key] = (rows, normalized)
+                result = len(rows)
+            elif command == "drop":
+                result = segments.pop(key, None) is not None
+            else:
+                queries, top_k, selection, deadline = args
+                if time.time() > deadline:
+                    conn.send((request_id, "expired", None))
+                    continue
+                rows, normalized = segments[key]
+                result = exact_search(
+                    queries,
+                    rows,
+                    top_k,
+                    block_size=block_size,
+                    normalized=normalized,
+                    selection=selection,
+                )
+            conn.send((request_id, "ok", result))
+        except Exception as e:
+            conn.send((request_id, "error", f"{type(e).__name__}: {e}"))
+
+
+class _Shard:
+    """Parent side handle of a shard process."""
+
+    def __init__(self, index: int, process: BaseProcess, conn: Connection):
+        self.index: int = index
+        self.process: BaseProcess = process
+        self.conn: Connection = conn
+        # Guards the pipe and the futures of the requests awaiting a reply.
+        self.lock = Lock()
+        self.pending: Dict[int, Future] = {}
+        # Ids of the searches sent and not answered yet, abandoned ones included.
+        self.searching: Set[int] = set()
+        self.reader: Optional[Thread] = None
+
+
+class ShardPool:
+    """Local processes holding slices of catalog segments, searched in parallel.
+
+    A segment is split into contiguous row ranges, one per shard process. A
+    search is sent to every shard at once and the top-k of each shard, in
+    global row ids, are merged into the global top-k. Since each shard returns
+    its exact top-k, the merged top-k is exact too.
+
+    Every shard has ``timeout_ms`` to answer. Shards that miss the deadline,
+    fail or exited are left out of the merge and recorded for
+    ``track_missed_shards``, so that the results can be reported as partial;
+    their late replies are discarded. Searches still queued in a shard past
+    their deadline are skipped by the shard, and a shard with ``max_pending``
+    unanswered searches is left out of new ones until it catches up, so that
+    a slow shard does not accumulate an unbounded backlog. A shard process
+    that exits is started again and given its row ranges back.
+
+    Memory-mapped segments are opened by the shards from their file, sharing
+    the page cache with this process. Other segments are copied to the shards
+    once, when loaded. The two latest segments of each group, typically the
+    versions of one catalog, stay loaded so that searches of the version just
+    replaced complete.
+    """
+
+    def __init__(
+        self,
+        shards: int,
+        timeout_ms: float = 1000.0,
+        block_size: int = 16384,
+        max_pending: int = 4,
+    ):
+        """Initialize the pool.
+
+        Args:
+            shards (int): Number of shard processes.
+            timeout_ms (float): Time each shard has to answer a search.
+            block_size (int): Number of rows a shard scores per matrix product.
+            max_pending (int): Number of unanswered searches above which a
+                shard is left out of new searches.
+        """
+        self.shards: int = shards
+        self.timeout_ms: float = timeout_ms
+        self.block_size: int = block_size
+        self.max_pending: int = max_pending
+        self._shards: List[_Shard] = []
+        self._ids = itertools.count()
+        self._lock = Lock()
+        # Serializes loads with shard restarts, so that a restarted shard gets
+        # every segment.
+        self._load_lock = RLock()
+        # Row range of each shard and the rows given to the shards, by segment key.
+        self._segments: Dict[str, List[Tuple[int, int]]] = {}
+        self._sources: Dict[str, Tuple[np.ndarray, bool, Optional[FileStamp]]] = {}
+        self._groups: Dict[str, "OrderedDict[str, None]"] = {}
+        self._searches: int = 0
+        self._timeouts: int = 0
+        self._errors: int = 0
+        self._overloaded: int = 0
+        self._restarts: int = 0
+
+    def __contains__(self, key: object) -> bool:
+        """Whether a segment is loaded in the shards."""
+        return key in self._segments
+
+    @property
+    def running(self) -> bool:
+        """Whether the shard processes are running."""
+        return bool(self._shards)
+
+    def start(self) -> None:
+        """Start the shard processes, if they are not running yet."""
+        with self._lock:
+            if self._shards:
+                return
+            self._shards = [self._spawn(i) for i in range(self.shards)]
+        logger.info(f"Shard pool started with {self.shards} processes")
+
+    def _spawn(self, index: int) -> _Shard:
+        """Start a shard process and the thread reading its replies.
+
+        Args:
+            index (int): Index of the shard.
+
+        Returns:
+            _Shard: The shard, without any segment.
+        """
+        context = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = context.Pipe()
+        process = context.Process(
+            target=_shard_main,
+            args=(child_conn, self.block_size),
+            name=f"shard-{index}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        shard = _Shard(index, process, parent_conn)
+        shard.reader = Thread(
+            target=self._read,
+            args=(shard,),
+            name=f"shard-{index}-reader",
+            daemon=True,
+        )
+        shard.reader.start()
+        return shard
+
+    def _respawn(self, shard: _Shard) -> None:
+        """Replace a shard whose process exited, reloading its row ranges.
+
+        Searches leave the shard out until its replacement has every segment.
+        Nothing is done if the pool was stopped or the shard replaced already.
+
+        Args:
+            shard (_Shard): The shard that exited.
+        """
+        with self._load_lock:
+            with self._lock:
+                if shard not in self._shards:
+                    return
+                segments = [
+                    (key, ranges[shard.index], *self._sources[key])
+                    for key, ranges in self._segments.items()
+                ]
+            logger.warning(f"Shard {shard.index} exited, restarting it")
+            replacement = self._spawn(shard.index)
+            try:
+                for key, (start, stop), embeddings, normalized, stamp in segments:
+                    _, future = self._call(
+                        replacement,
+                        "load",
+                        key,
+                        self._slice(embeddings, start, stop, stamp),
+                        normalized,
+                    )
+                    future.result()
+            except RuntimeError as e:
+                logger.error(f"Error restarting shard {shard.index}: {str(e)}")
+                self._close([replacement])
+                return
+            with self._lock:
+                replaced = shard in self._shards
+                if replaced:
+                    self._shards[shard.index] = replacement
+                    self._restarts += 1
+        if not replaced:
+            self._close([replacement])
+
+    def stop(self) -> None:
+        """Stop the shard processes once they answered their current request."""
+        with self._lock:
+            shards, self._shards = self._shards, []
+            self._segments.clear()
+            self._sources.clear()
+            self._groups.clear()
+        self._close(shards)
+
+    @staticmethod
+    def _close(shards: List[_Shard]) -> None:
+        """Stop shard processes once they answered their current request.
+
+        Args:
+            shards (List[_Shard]): The shards.
+        """
+        for shard in shards:
+            try:
+                with shard.lock:
+                    shard.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            shard.process.join(timeout=10)
+            if shard.process.is_alive():
+                shard.process.terminate()
+                shard.process.join()
+            shard.conn.close()
+            if shard.reader is not None:
+                shard.reader.join(timeout=10)
+
+    def _read(self, shard: _Shard) -> None:
+        """Resolve the requests of a shard with its replies, until it exits.
+
+        A shard that exits while the pool runs is then restarted.
+
+        Args:
+            shard (_Shard): The shard.
+        """
+        while True:
+            try:
+                request_id, status, value = shard.conn.recv()
+            except (EOFError, OSError):
+                break
+            with shard.lock:
+                future = shard.pending.pop(request_id, None)
+                shard.searching.discard(request_id)
+            # Requests abandoned after their deadline have no future anymore.
+            if future is None:
+                continue
+            if status == "ok":
+                future.set_result(value)
+            elif status == "expired":
+                future.set_exception(
+                    RuntimeError(f"Shard {shard.index} skipped an expired search")
+                )
+            else:
+                future.set_exception(
+                    RuntimeError(f"Shard {shard.index} failed: {value}")
+                )
+        with shard.lock:
+            pending, shard.pending = list(shard.pending.values()), {}
+            shard.searching.clear()
+        for future in pending:
+            future.set_exception(RuntimeError(f"Shard {shard.index} exited"))
+        self._respawn(shard)
+
+    def _call(self, shard: _Shard, *message: Any) -> Tuple[int, Future]:
+        """Send a request to a shard.
+
+        Args:
+            shard (_Shard): The shard.
+            *message (Any): The command, the segment key and the arguments.
+
+        Returns:
+            Tuple[int, Future]: The request id and the future of the reply.
+        """
+        future: Future = Future()
+        with shard.lock:
+            request_id = next(self._ids)
+            shard.pending[request_id] = future
+            if message[0] == "search":
+                shard.searching.add(request_id)
+            try:
+                shard.conn.send((request_id, *message))
+            except (BrokenPipeError, OSError) as e:
+                shard.pending.pop(request_id, None)
+                shard.searching.discard(request_id)
+                future.set_exception(RuntimeError(f"Shard {shard.index} exited: {e}"))
+        return request_id, future
+
+    def load(
+        self,
+        key: str,
+        embeddings: np.ndarray,
+        normalized: bool,
+        group: Optional[str] = None,
+    ) -> None:
+        """Split a segment across the shards.
+
+        Args:
+            key (str): Unique key of the segment, searched by.
+            embeddings (np.ndarray): The segment rows, possibly memory-mapped.
+            normalized (bool): Whether the rows have unit norm.
+            group (Optional[str]): Group of the segment, e.g. its catalog. Only
+                the two latest segments of a group are kept.
+
+        Raises:
+            RuntimeError: If the pool is not running or a shard fails to load
+                its rows.
+        """
+        with self._load_lock:
+            if not self.running:
+                raise RuntimeError("Shard pool is not running")
+            path = getattr(embeddings, "filename", None)
+            stamp = None if path is None else _file_stamp(path)
+            bounds = np.linspace(0, len(embeddings), self.shards + 1).astype(int)
+            ranges = [
+                (int(start), int(stop))
+                for start, stop in zip(bounds, bounds[1:], strict=False)
+            ]
+            calls = [
+                self._call(
+                    shard,
+                    "load",
+                    key,
+                    self._slice(embeddings, start, stop, stamp),
+                    normalized,
+                )
+                for shard, (start, stop) in zip(self._shards, ranges, strict=True)
+            ]
+            for _, future in calls:
+                future.result()
+            with self._lock:
+                self._segments[key] = ranges
+                self._sources[key] = (embeddings, normalized, stamp)
+                if group is None:
+                    return
+                keys = self._groups.setdefault(group, OrderedDict())
+                keys[key] = None
+                stale = list(keys)[:-2]
+            for old in stale:
+                self.drop(old, group)
+
+    @staticmethod
+    def _slice(
+        embeddings: np.ndarray, start: int, stop: int, stamp: Optional[FileStamp]
+    ) -> Any:
+        """Get what a shard loads for a row range of a segment.
+
+        A newer catalog version may have replaced the file of memory-mapped
+        rows since they were loaded, e.g. when a shard is restarted after a
+        re-register or a compaction. The rows still mapped are then copied.
+
+        Args:
+            embeddings (np.ndarray): The segment rows, possibly memory-mapped.
+            start (int): First row of the range.
+            stop (int): Row following the range.
+            stamp (Optional[FileStamp]): Stamp of the file of memory-mapped
+                rows when they were loaded.
+
+        Returns:
+            Any: The file, range and stamp of memory-mapped rows whose file is
+                unchanged, a copy of the rows otherwise.
+        """
+        if stamp is not None and isinstance(embeddings, np.memmap):
+            if _file_stamp(embeddings.filename) == stamp:
+                return embeddings.filename, start, stop, stamp
+        return np.ascontiguousarray(embeddings[start:stop])
+
+    def drop(self, key: str, group: Optional[str] = None) -> None:
+        """Unload a segment from the shards.
+
+        Args:
+            key (str): Key of the segment.
+            group (Optional[str]): Group the segment was loaded in.
+        """
+        with self._lock:
+            self._segments.pop(key, None)
+            self._sources.pop(key, None)
+            if group is not None:
+                self._groups.get(group, OrderedDict()).pop(key, None)
+            shards = list(self._shards)
+        for shard in shards:
+            self._call(shard, "drop", key)
+
+    def drop_group(self, group: str) -> None:
+        """Unload every segment of a group.
+
+        Args:
+            group (str): The group.
+        """
+        with self._lock:
+            keys = list(self._groups.pop(group, {}))
+        for key in keys:
+            self.drop(key)
+
+    def search(
+        self,
+        key: str,
+        queries: np.ndarray,
+        top_k: int,
+        selection: Optional[np.ndarray] = None,
+    ) -> List[SearchResult]:
+        """Search a segment on every shard and merge their top-k.
+
+        Args:
+            key (str): Key of the segment.
+            queries (np.ndarray): Normalized float32 queries.
+            top_k (int): Number of rows to return per query.
+            selection (Optional[np.ndarray]): Sorted rows of the segment eligible
+                for the search. None searches every row.
+
+        Returns:
+            List[SearchResult]: Per query, the segment rows and their cosine
+                scores, best first, from the shards that answered in time.
+
+        Raises:
+            KeyError: If the segment is not loaded.
+            RequestCancelledError: If the request stops before the shards
+                answer.
+        """
+        with self._lock:
+            ranges = self._segments[key]
+            shards = list(self._shards)
+            self._searches += 1
+        # The deadline of the request, if sooner, bounds the wait too.
+        timeout = self.timeout_ms / 1000
+        remaining = remaining_seconds()
+        if remaining is not None:
+            timeout = min(timeout, remaining)
+        calls, missed = self._send_searches(
+            key, shards, ranges, queries, top_k, selection, time.time() + timeout
+        )
+        overloaded, timeouts, errors = len(missed), 0, 0
+        wait([future for *_, future in calls], timeout=timeout)
+        try:
+            check_cancelled("search")
+        except RequestCancelledError:
+            for shard, _, request_id, _ in calls:
+                with shard.lock:
+                    shard.pending.pop(request_id, None)
+            raise
+
+        found: List[List[SearchResult]] = [[] for _ in queries]
+        for shard, start, request_id, future in calls:
+            if not future.done():
+                with shard.lock:
+                    shard.pending.pop(request_id, None)
+                logger.warning(f"Shard {shard.index} missed its deadline")
+                timeouts += 1
+                missed.append(shard.index)
+                continue
+            try:
+                results = future.result()
+            except RuntimeError as e:
+                logger.error(str(e))
+                errors += 1
+                missed.append(shard.index)
+                continue
+            for query_found, (rows, scores) in zip(found, results, strict=True):
+                query_found.append((rows + start, scores))
+        with self._lock:
+            self._overloaded += overloaded
+            self._timeouts += timeouts
+            self._errors += errors
+
+        report_missed_shards(missed)
+        return [self._merge(query_found, top_k) for query_found in found]
+
+    def _send_searches(
+        self,
+        key: str,
+        shards: List[_Shard],
+        ranges: List[Tuple[int, int]],
+        queries: np.ndarray,
+        top_k: int,
+        selection: Optional[np.ndarray],
+        deadline: float,
+    ) -> Tuple[List[Tuple[_Shard, int, int, Future]], List[int]]:
+        """Send a search to the shards holding selected rows of a segment.
+
+        Shards with ``max_pending`` unanswered searches are left out.
+
+        Args:
+            key (str): Key of the segment.
+            shards (List[_Shard]): The shards.
+            ranges (List[Tuple[int, int]]): Row range of each shard.
+            queries (np.ndarray): Normalized float32 queries.
+            top_k (int): Number of rows to return per query.
+            selection (Optional[np.ndarray]): Sorted eligible rows of the segment.
+            deadline (float): Time the search is abandoned at, as ``time.time()``.
+
+        Returns:
+            Tuple[List[Tuple[_Shard, int, int, Future]], List[int]]: The shard,
+                first row, request id and reply of each search sent, and the
+                indexes of the shards left out.
+        """
+        calls = []
+        overloaded = []
+        for shard, (start, stop) in zip(shards, ranges, strict=True):
+            rows = None
+            if selection is not None:
+                first, last = np.searchsorted(selection, [start, stop])
+                if first == last:
+                    continue
+                rows = selection[first:last] - start
+            with shard.lock:
+                pending = len(shard.searching)
+            if pending >= self.max_pending:
+                logger.warning(f"Shard {shard.index} has {pending} pending searches")
+                overloaded.append(shard.index)
+                continue
+            request_id, future = self._call(
+                shard, "search", key, queries, top_k, rows, deadline
+            )
+            calls.append((shard, start, request_id, future))
+        return calls, overloaded
+
+    @staticmethod
+    def _merge(results: List[SearchResult], top_k: int) -> SearchResult:
+        """Merge the top-k of several shards into the global top-k.
+
+        Args:
+            results (List[SearchResult]): Rows and scores of each shard.
+            top_k (int): Number of rows to keep.
+
+        Returns:
+            SearchResult: The best rows and their scores, best first.
+        """
+        if not results:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        rows = np.concatenate([rows for rows, _ in results])
+        scores = np.concatenate([scores for _, scores in results])
+        best = top_k_indices(scores, top_k)
+        return rows[best], scores[best]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get shard pool statistics.
+
+        Returns:
+            Dict[str, Any]: Shard count, loaded segments and search, timeout,
+                error, overload and restart counts.
+        """
+        with self._lock:
+            return {
+                "shards": self.shards,
+                "timeout_ms": self.timeout_ms,
+                "segments": len(self._segments),
+                "searches": self._searches,
+                "timeouts": self._timeouts,
+                "errors": self._errors,
+                "overloaded": self._overloaded,
+                "restarts": self._restarts,
+            }
@@ -1,10 +1,16 @@
+import os
+import time
 from unittest.mock import patch
 
 import pytest
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
+from similarity_search.core.cancellation import check_cancelled
+from similarity_search.core.config import get_settings
 from similarity_search.core.constants import APIRoutes, StatusCodes
+from similarity_search.core.dependencies import model_registry
+from similarity_search.core.exceptions import QueueFullError
 from similarity_search.main import create_app
 from similarity_search.services.product_similarity import SimilarityService
 
@@ -26,6 +32,32 @@ def test_health_check(client: TestClient) -> None:
     assert response.json() == {"status": "healthy"}
 
 
+@pytest.mark.integration  # type: ignore[misc]
+def test_liveness_and_readiness(client: TestClient) -> None:
+    """Test that the app is ready with startup timings once warmed up."""
+    response = client.get(APIRoutes.get_liveness_route())
+    assert response.status_code == StatusCodes.OK
+    assert response.json() == {"status": "alive"}
+
+    response = client.get(APIRoutes.get_readiness_route())
+    assert response.status_code == StatusCodes.OK
+    body = response.json()
+    assert body["status"] == "ready"
+    assert body["warmed_up"] is True
+    assert body["load_seconds"] >= 0
+    assert body["warmup_seconds"] >= 0
+    assert body["warmup_batch_sizes"] == [1, 8, 32]
+
+
+@pytest.mark.integration  # type: ignore[misc]
+def test_readiness_model_not_loaded(client: TestClient) -> None:
+    """Test that readiness fails while the model is not loaded."""
+    with patch("similarity_search.core.dependencies.similarity_service.model", None):
+        response = client.get(APIRoutes.get_readiness_route())
+    assert response.status_code == StatusCodes.SERVICE_UNAVAILABLE
+    assert response.json()["status"] == "not ready"
+
+
 @pytest.mark.integration  # type: ignore[misc]
 def test_similarity_endpoint_success(client: TestClient) -> None:
     """Test similarity endpoint with valid input."""
@@ -70,7 +102,7 @@ def test_similarity_endpoint_validation_error(client: TestClient) -> None:
 @pytest.mark.integration  # type: ignore[misc]
 def test_similarity_endpoint_model_not_loaded(client: TestClient) -> None:
     """Test similarity endpoint when model is not loaded."""
-    with patch("similarity_search.main.similarity_service.model", None):
+    with patch("similarity_search.core.dependencies.similarity_service.model", None):
         payload = {
             "text": ["test query"],
             "products": ["test product"],
@@ -101,3 +133,622 @@ def test_docs_endpoint(client: TestClient) -> None:
     """Test OpenAPI documentation endpoint."""
     response = client.get(APIRoutes.API_DOCS)
     assert response.status_code == StatusCodes.OK
+
+
+@pytest.mark.integration  # type: ignore[misc]
+def test_catalog_lifecycle(client: TestClient) -> None:
+    """Test registering, querying, listing and deleting a catalog."""
+    payload = {
+        "catalog_id": "tools",
+        "products": ["Circular saw for cutting wood", "Claw hammer"],
+    }
+    response = client.post(APIRoutes.get_catalogs_route(), json=payload)
+    assert response.status_code == StatusCodes.CREATED
+    assert response.json() == {
+        "catalog_id": "tools",
+        "size": 2,
+        "version": 1,
+        "pending": 0,
+        "index": None,
+    }
+
+    with patch.object(SimilarityService, "find_similar") as mock_find_similar:
+        mock_find_similar.return_value = [[{"product": "Claw hammer", "score": 0.9}]]
+        query = {"text": ["hammer"], "catalog_id": "tools", "top_k": 1}
+        response = client.post(APIRoutes.get_similarity_route(), json=query)
+        assert response.status_code == StatusCodes.OK
+        assert mock_find_similar.call_args.kwargs["catalog_id"] == "tools"
+
+    response = client.get(APIRoutes.get_catalogs_route())
+    assert {
+        "catalog_id": "tools",
+        "size": 2,
+        "version": 1,
+        "pending": 0,
+        "index": None,
+    } in response.json()
+
+    response = client.delete(APIRoutes.get_catalog_route("tools"))
+    assert response.status_code == StatusCodes.NO_CONTENT
+    response = client.get(APIRoutes.get_catalog_route("tools"))
+    assert response.status_code == StatusCodes.NOT_FOUND
+
+
+@pytest.mark.integration  # type: ignore[misc]
+def test_catalog_updates(client: TestClient) -> None:
+    """Test upserting, deleting and compacting the products of a catalog."""
+    payload = {
+        "catalog_id": "updates",
+        "products": ["Circular saw", "Claw hammer"],
+        "ids": ["saw", "hammer"],
+    }
+    client.post(APIRoutes.get_catalogs_route(), json=payload)
+    query = {"text": ["hammer"], "catalog_id": "updates", "top_k": 5}
+
+    # Compact explicitly below rather than in the background.
+    with patch(
+        "similarity_search.core.dependencies.similarity_service.compaction_threshold", 0
+    ):
+        response = client.put(
+            APIRoutes.get_catalog_products_route("updates"),
+            json={
+                "products": ["Claw hammer", "Cordless drill"],
+                "ids": ["hammer", "drill"],
+            },
+        )
+        assert response.status_code == StatusCodes.OK
+        assert response.json() == {
+            "catalog_id": "updates",
+            "version": 2,
+            "size": 3,
+            "changed": 1,
+        }
+
+        response = client.post(
+            APIRoutes.get_catalog_products_delete_route("updates"),
+            json={"ids": ["saw"]},
+        )
+        assert response.json()["changed"] == 1
+    result = client.post(APIRoutes.get_similarity_route(), json=query).json()[0]
+    assert result["version"] == 3
+    assert sorted(match["product"] for match in result["matches"]) == [
+        "Claw hammer",
+        "Cordless drill",
+    ]
+
+    response = client.post(APIRoutes.get_catalog_compact_route("updates"))
+    assert response.json()["version"] == 4
+    assert response.json()["pending"] == 0
+    result = client.post(APIRoutes.get_similarity_route(), json=query).json()[0]
+    assert result["version"] == 4
+    assert len(result["matches"]) == 2
+
+    inline = {"text": ["hammer"], "products": ["Claw hammer"], "top_k": 1}
+    result = client.post(APIRoutes.get_similarity_route(), json=inline).json()[0]
+    assert "version" not in result
+    client.delete(APIRoutes.get_catalog_route("updates"))
+
+
+@pytest.mark.integration  # type: ignore[misc]
+def test_catalog_update_errors(client: TestClient) -> None:
+    """Test the errors of catalog updates."""
+    route = APIRoutes.get_catalog_products_route("missing")
+    response = client.put(route, json={"products": ["saw"], "ids": ["saw"]})
+    assert response.status_code == StatusCodes.NOT_FOUND
+    response = client.put(route, json={"products": ["saw", "saw"], "ids": ["a", "a"]})
+    assert response.status_code == StatusCodes.BAD_REQUEST
+    response = client.put(route, json={"products": ["saw"], "ids": []})
+    assert response.status_code == StatusCodes.BAD_REQUEST
+    response = client.post(
+        APIRoutes.get_catalog_products_delete_route("missing"), json={"ids": ["saw"]}
+    )
+    assert response.status_code == StatusCodes.NOT_FOUND
+    response = client.post(APIRoutes.get_catalog_compact_route("missing"))
+    assert response.status_code == StatusCodes.NOT_FOUND
+
+    with patch.object(
+        SimilarityService, "upsert_products", side_effect=OSError("disk full")
+    ):
+        response = client.put(route, json={"products": ["saw"], "ids": ["saw"]})
+    assert response.status_code == StatusCodes.SERVER_ERROR
+
+
+@pytest.mark.integration  # type: ignore[misc]
+def test_filtered_search(client: TestClient) -> None:
+    """Test metadata filters on catalog, inline and vector searches."""
+    payload = {
+        "catalog_id": "filtered",
+        "products": ["Circular saw", "Claw hammer", "Cordless drill"],
+        "metadata": [{"price": 120}, {"price": 15, "brand": "acme"}, None],
+    }
+    client.post(APIRoutes.get_catalogs_route(), json=payload)
+    client.put(
+        APIRoutes.get_catalog_products_route("filtered"),
+        json={"products": ["Rubber mallet"], "ids": ["3"], "metadata": [{"price": 9}]},
+    )
+    query = {"text": ["hammer"], "catalog_id": "filtered", "top_k": 5}
+
+    result = client.post(
+        APIRoutes.get_similarity_route(),
+        json={**query, "filter": {"price": {"lt": 100}}},
+    ).json()[0]
+    assert sorted(match["product"] for match in result["matches"]) == [
+        "Claw hammer",
+        "Rubber mallet",
+    ]
+
+    inline = {
+        "text": ["hammer"],
+        "products": ["Claw hammer", "Rubber mallet"],
+        "metadata": [{"brand": "acme"}, None],
+        "top_k": 2,
+        "filter": {"brand": "acme"},
+    }
+    result = client.post(APIRoutes.get_similarity_route(), json=inline).json()[0]
+    assert [match["product"] for match in result["matches"]] == ["Claw hammer"]
+
+    # List and object values are accepted and never match a filter.
+    tagged = [{"tags": ["tools", "hand"], "brand": "acme"}, {"size": {"w": 2}}]
+    response = client.post(
+        APIRoutes.get_catalogs_route(),
+        json={
+            "catalog_id": "tagged",
+            "products": inline["products"],
+            "metadata": tagged,
+        },
+    )
+    assert response.status_code == StatusCodes.CREATED
+    result = client.post(
+        APIRoutes.get_similarity_route(),
+        json={**query, "catalog_id": "tagged", "filter": {"brand": "acme"}},
+    ).json()[0]
+    assert [match["product"] for match in result["matches"]] == ["Claw hammer"]
+    response = client.post(
+        APIRoutes.get_similarity_route(),
+        json={**inline, "metadata": tagged, "filter": {"tags": "tools"}},
+    )
+    assert response.status_code == StatusCodes.OK
+    assert response.json()[0]["matches"] == []
+    response = client.post(APIRoutes.get_similarity_vectors_route(), json=inline)
+    assert response.json()[0]["matches"][0]["product"] == "Claw hammer"
+
+    response = client.post(
+        APIRoutes.get_similarity_route(),
+        json={**query, "filter": {"price": {"between": [1, 2]}}},
+    )
+    assert response.status_code == StatusCodes.BAD_REQUEST
+    response = client.post(
+        APIRoutes.get_similarity_route(),
+        json={**query, "filter": {"brand": {"gt": 1}}},
+    )
+    assert response.status_code == StatusCodes.BAD_REQUEST
+    response = client.post(
+        APIRoutes.get_similarity_route(), json={**inline, "metadata": [None]}
+    )
+    assert response.status_code == StatusCodes.BAD_REQUEST
+    client.delete(APIRoutes.get_catalog_route("filtered"))
+
+
+@pytest.mark.integration  # type: ignore[misc]
+def test_similarity_endpoint_unknown_catalog(client: TestClient) -> None:
+    """Test similarity endpoint with a catalog that is not registered."""
+    payload = {"text": ["test query"], "catalog_id": "missing", "top_k": 1}
+    response = client.post(APIRoutes.get_similarity_route(), json=payload)
+    assert response.status_code == StatusCodes.NOT_FOUND
+    assert response.json()["detail"] == "Catalog 'missing' not found"
+
+
+@pytest.mark.integration  # type: ignore[misc]
+def test_stats_endpoint(client: TestClient) -> None:
+    """Test that the stats endpoint reports embedding cache statistics."""
+    response = client.get(APIRoutes.get_stats_route())
+    assert response.status_code == StatusCodes.OK
+    assert set(response.json()["embedding_cache"]) >= {"hits", "misses", "evictions"}
+
+
+@pytest.mark.integration  # type: ignore[misc]
+def test_similarity_endpoint_overloaded(client: TestClient) -> None:
+    """Test that requests are shed with a 503 and Retry-After when overloaded."""
+    # The Retry-After delay comes from the settings read once by create_app.
+    with (
+        patch(
+            "similarity_search.main.inference_executor.run",
+            side_effect=QueueFullError(capacity=1),
+        ),
+        patch(
+            "similarity_search.core.config.Settings",
+            side_effect=AssertionError("settings read per request"),
+        ),
+    ):
+        payload = {"text": ["test query"], "products": ["test product"], "top_k": 1}
+        response = client.post(APIRoutes.get_similarity_route(), json=payload)
+        assert response.status_code == StatusCodes.SERVICE_UNAVAILABLE
+        assert response.headers["Retry-After"] == "1"
+
+
+@pytest.mark.integration  # type: ignore[misc]
+def test_catalog_writes_go_through_the_executor(client: TestClient) -> None:
+    """Test that catalog writes are shed when overloaded and report bad input."""
+    catalog = {"catalog_id": "tools", "products": ["saw"], "ids": ["a"]}
+    with patch(
+        "similarity_search.main.inference_executor.run",
+        side_effect=QueueFullError(capacity=1),
+    ):
+        response = client.post(APIRoutes.get_catalogs_route(), json=catalog)
+        assert response.status_code == StatusCodes.SERVICE_UNAVAILABLE
+        response = client.post(APIRoutes.get_catalog_compact_route("tools"))
+        assert response.status_code == StatusCodes.SERVICE_UNAVAILABLE
+        response = client.post(
+            APIRoutes.get_catalog_products_delete_route("tools"), json={"ids": ["a"]}
+        )
+        assert response.status_code == StatusCodes.SERVICE_UNAVAILABLE
+        assert response.headers["Retry-After"] == "1"
+
+    with patch.object(
+        SimilarityService,
+        "register_catalog",
+        side_effect=ValueError("Invalid catalog id 'tools'"),
+    ):
+        response = client.post(APIRoutes.get_catalogs_route(), json=catalog)
+    assert response.status_code == StatusCodes.BAD_REQUEST
+    assert response.json()["detail"] == "Invalid catalog id 'tools'"
+
+
+@pytest.mark.integration  # type: ignore[misc]
+def test_similarity_endpoint_deadline(client: TestClient) -> None:
+    """Test that work past the deadline of a request stops with a 504."""
+
+    def slow_search(*args: object, **kwargs: object) -> list:
+        time.sleep(0.3)
+        check_cancelled("search")
+        return [[]]
+
+    payload = {"text": ["test query"], "products": ["test product"], "top_k": 1}
+    # The settings are read once by create_app, not parsed again per request.
+    with (
+        patch.object(SimilarityService, "find_similar", side_effect=slow_search),
+        patch(
+            "similarity_search.core.config.Settings",
+            side_effect=AssertionError("settings read per request"),
+        ),
+    ):
+        response = client.post(
+            APIRoutes.get_similarity_route(), json={**payload, "timeout_ms": 150}
+        )
+        assert response.status_code == StatusCodes.GATEWAY_TIMEOUT
+        assert response.json()["detail"] == "Request abandoned during search (deadline)"
+
+        response = client.post(
+            APIRoutes.get_similarity_route(),
+            json=payload,
+            headers={"X-Request-Timeout-Ms": "5000"},
+        )
+        assert response.status_code == StatusCodes.OK
+
+        response = client.post(
+            APIRoutes.get_similarity_route(),
+            json=payload,
+            headers={"X-Request-Timeout-Ms": "soon"},
+        )
+        assert response.status_code == StatusCodes.BAD_REQUEST
+
+    metrics = client.get("/metrics").text
+    assert 'similarity_abandoned_requests_total{reason="deadline",stage="search"}' in (
+        metrics
+    )
+
+
+@pytest.mark.integration  # type: ignore[misc]
+def test_catalog_index_endpoint(client: TestClient) -> None:
+    """Test building a catalog index and reading back its recall."""
+    products = [f"product number {i} with feature {i % 7}" for i in range(50)]
+    payload = {"catalog_id": "indexed", "products": products}
+    assert client.post(APIRoutes.get_catalogs_route(), json=payload).status_code == 201
+
+    index = {"kind": "ivf", "nlist": 4, "nprobe": 4, "top_k": 5, "sample_size": 10}
+    response = client.post(APIRoutes.get_catalog_index_route("indexed"), json=index)
+    assert response.status_code == StatusCodes.OK
+    assert response.json()["index"]["kind"] == "ivf"
+    assert 0.0 <= response.json()["recall_at_k"] <= 1.0
+
+    query = {"text": ["product number 3"], "catalog_id": "indexed", "top_k": 2}
+    response = client.post(APIRoutes.get_similarity_route(), json=query)
+    assert response.status_code == StatusCodes.OK
+    assert len(response.json()[0]["matches"]) == 2
+
+    response = client.post(APIRoutes.get_catalog_index_route("missing"), json=index)
+    assert response.status_code == StatusCodes.NOT_FOUND
+    client.delete(APIRoutes.get_catalog_route("indexed"))
+
+
+@pytest.mark.integration  # type: ignore[misc]
+def test_metrics(client: TestClient) -> None:
+    """Test that a similarity request shows up in the Prometheus metrics."""
+    payload = {"text": ["cordless drill"], "products": ["drill", "table"], "top_k": 1}
+    assert client.post(APIRoutes.get_similarity_route(), json=payload).status_code == (
+        StatusCodes.OK
+    )
+
+    response = client.get(APIRoutes.get_metrics_route())
+
+    assert response.status_code == StatusCodes.OK
+    assert response.headers["content-type"].startswith("text/plain")
+    metrics = response.text
+    for stage in (
+        "validation",
+        "queue",
+        "query_encoding",
+        "product_encoding",
+        "search",
+        "serialization",
+    ):
+        assert f'similarity_stage_seconds_count{{stage="{stage}"}}' in metrics
+    assert 'similarity_texts_per_request_count{kind="products"}' in metrics
+    assert "similarity_model_batch_size_bucket" in metrics
+    assert "similarity_model_load_seconds" in metrics
+    assert "http_requests_in_flight" in metrics
+    assert "embedding_cache_hit_ratio" in metrics
+    assert "inference_rejected_total" in metrics
+    assert (
+        'http_request_duration_seconds_count{method="POST",'
+        'route="/api/v1/similarity",status="200"}'
+    ) in metrics
+
+
+@pytest.mark.integration  # type: ignore[misc]
+def test_server_timing() -> None:
+    """Test the per-stage Server-Timing header of an opted-in request."""
+    with patch.dict(os.environ, {"PROFILING_TOKEN": "secret"}):
+        app = create_app()
+    payload = {"text": ["cordless drill"], "products": ["drill", "table"], "top_k": 1}
+
+    with TestClient(app) as client:
+        plain = client.post(APIRoutes.get_similarity_route(), json=payload)
+        response = client.post(
+            APIRoutes.get_similarity_route(),
+            json=payload,
+            headers={"X-Profile": "timing", "X-Profile-Token": "secret"},
+        )
+
+    assert "server-timing" not in plain.headers
+    assert response.status_code == StatusCodes.OK
+    stages = [
+        metric.split(";")[0] for metric in response.headers["server-timing"].split(", ")
+    ]
+    assert stages == [
+        "validation",
+        "queue",
+        "query_encoding",
+        "product_encoding",
+        "search",
+        "serialization",
+        "total",
+    ]
+
+
+@pytest.mark.integration  # type: ignore[misc]
+def test_similarity_index_only(client: TestClient) -> None:
+    """Test that matches only carry the product index and score on request."""
+    payload = {
+        "text": ["cordless drill"],
+        "products": ["drill", "table", "saw"],
+        "top_k": 2,
+        "return_products": False,
+    }
+
+    response = client.post(APIRoutes.get_similarity_route(), json=payload)
+
+    assert response.status_code == StatusCodes.OK
+    assert response.headers["content-type"] == "application/json"
+    (result,) = response.json()
+    assert result["query"] == "cordless drill"
+    assert [set(match) for match in result["matches"]] == [{"index", "score"}] * 2
+    assert {match["index"] for match in result["matches"]} <= {0, 1, 2}
+
+
+@pytest.mark.integration  # type: ignore[misc]
+def test_similarity_binary_formats(client: TestClient) -> None:
+    """Test that MessagePack and Arrow queries give the same results as JSON."""
+    msgpack = pytest.importorskip("msgpack")
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc  # noqa: F401
+
+    payload = {
+        "text": ["cordless drill", "garden chair"],
+        "products": ["drill", "table", "saw", "chair"],
+        "top_k": 3,
+    }
+    expected = client.post(APIRoutes.get_similarity_route(), json=payload).json()
+
+    response = client.post(
+        APIRoutes.get_similarity_route(),
+        content=msgpack.packb(payload),
+        headers={
+            "Content-Type": "application/msgpack",
+            "Accept": "application/msgpack",
+        },
+    )
+    assert response.status_code == StatusCodes.OK
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content) == expected
+
+    sink = pa.BufferOutputStream()
+    table = pa.Table.from_pylist([payload])
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    response = client.post(
+        APIRoutes.get_similarity_route(),
+        content=sink.getvalue().to_pybytes(),
+        headers={
+            "Content-Type": "application/vnd.apache.arrow.stream",
+            "Accept": "application/vnd.apache.arrow.stream",
+        },
+    )
+    assert response.status_code == StatusCodes.OK
+    results = pa.ipc.open_stream(response.content).read_all().to_pylist()
+    assert results == expected
+
+
+@pytest.mark.integration  # type: ignore[misc]
+def test_similarity_body_errors(client: TestClient) -> None:
+    """Test the errors for unsupported, undecodable and invalid binary bodies."""
+    msgpack = pytest.importorskip("msgpack")
+    route = APIRoutes.get_similarity_route()
+
+    response = client.post(route, content=b"a", headers={"Content-Type": "text/csv"})
+    assert response.status_code == StatusCodes.UNSUPPORTED_MEDIA_TYPE
+
+    headers = {"Content-Type": "application/x-msgpack"}
+    response = client.post(route, content=b"\xc1", headers=headers)
+    assert response.status_code == StatusCodes.BAD_REQUEST
+    assert response.json()["detail"][0]["msg"].startswith("Invalid application/msgpack")
+
+    body = msgpack.packb({"text": [], "products": ["drill"], "top_k": 1})
+    response = client.post(route, content=body, headers=headers)
+    assert response.status_code == StatusCodes.BAD_REQUEST
+    assert response.json()["detail"][0]["loc"] == ["body", "text"]
+
+    schema = client.get("/openapi.json").json()
+    content = schema["paths"][route]["post"]["requestBody"]["content"]
+    assert set(content) == {
+        "application/json",
+        "application/msgpack",
+        "application/vnd.apache.arrow.stream",
+    }
+
+
+@pytest.mark.integration  # type: ignore[misc]
+def test_embed_and_search_by_vector(client: TestClient) -> None:
+    """Test that searching returned embeddings matches searching the texts."""
+    queries = ["cordless drill", "garden chair"]
+    products = ["drill", "table", "saw", "chair"]
+    expected = client.post(
+        APIRoutes.get_similarity_route(),
+        json={"text": queries, "products": products, "top_k": 2},
+    ).json()
+
+    responses = {
+        name: client.post(APIRoutes.get_embed_route(), json={"texts": texts})
+        for name, texts in (("queries", queries), ("products", products))
+    }
+    for response in responses.values():
+        assert response.status_code == StatusCodes.OK
+    embedded = {name: response.json() for name, response in responses.items()}
+    assert embedded["queries"]["dtype"] == "float32"
+    assert len(embedded["products"]["embeddings"]) == 4
+
+    response = client.post(
+        APIRoutes.get_similarity_vectors_route(),
+        json={
+            "vectors": embedded["queries"]["embeddings"],
+            "product_vectors": embedded["products"]["embeddings"],
+            "products": products,
+            "top_k": 2,
+            "model_name": embedded["queries"]["model_name"],
+        },
+    )
+    assert response.status_code == StatusCodes.OK
+    assert response.json() == [
+        {"query": None, "matches": result["matches"]} for result in expected
+    ]
+
+    response = client.post(
+        APIRoutes.get_similarity_vectors_route(),
+        json={
+            "text": queries,
+            "product_vectors": embedded["products"]["embeddings"],
+            "products": products,
+            "top_k": 2,
+        },
+    )
+    assert response.json() == expected
+
+
+@pytest.mark.integration  # type: ignore[misc]
+def test_search_by_vector_errors(client: TestClient) -> None:
+    """Test the errors for invalid, mismatched and unknown inputs."""
+    route = APIRoutes.get_similarity_vectors_route()
+    vectors = client.post(
+        APIRoutes.get_embed_route(), json={"texts": ["drill"], "dtype": "float16"}
+    ).json()["embeddings"]
+
+    response = client.post(
+        route, json={"vectors": ["%%%"], "catalog_id": "tools", "top_k": 1}
+    )
+    assert response.status_code == StatusCodes.BAD_REQUEST
+
+    response = client.post(
+        route,
+        json={
+            "vectors": vectors,
+            "catalog_id": "missing",
+            "top_k": 1,
+            "dtype": "float16",
+        },
+    )
+    assert response.status_code == StatusCodes.NOT_FOUND
+
+    response = client.post(
+        route,
+        json={
+            "vectors": vectors,
+            "product_vectors": vectors,
+            "top_k": 1,
+            "return_products": False,
+            "model_name": "another-model",
+        },
+    )
+    assert response.status_code == StatusCodes.BAD_REQUEST
+    assert "another-model" in response.json()["detail"]
+
+    with patch(
+        "similarity_search.main.inference_executor.run",
+        side_effect=QueueFullError(1),
+    ):
+        response = client.post(APIRoutes.get_embed_route(), json={"texts": ["a"]})
+    assert response.status_code == StatusCodes.SERVICE_UNAVAILABLE
+
+
+@pytest.mark.integration  # type: ignore[misc]
+def test_models_endpoints(client: TestClient) -> None:
+    """Test loading, selecting and unloading a model by name."""
+    default = get_settings().model_name
+    models = client.get(APIRoutes.get_models_route()).json()
+    assert models[0]["name"] == default
+    assert models[0]["default"] and models[0]["loaded"]
+
+    response = client.put(
+        APIRoutes.get_model_route("large"), json={"model_name": default}
+    )
+    assert response.status_code == StatusCodes.NOT_FOUND
+    with patch.dict(model_registry.models, {"small": default}):
+        response = client.put(
+            APIRoutes.get_model_route("small"), json={"model_name": "org/any-model"}
+        )
+        assert response.status_code == StatusCodes.BAD_REQUEST
+
+        response = client.put(
+            APIRoutes.get_model_route("small"), json={"model_name": default}
+        )
+        assert response.status_code == StatusCodes.ACCEPTED
+        assert response.json()["loading"] == default
+        for _ in range(100):
+            if client.get(APIRoutes.get_models_route()).json()[1]["loaded"]:
+                break
+            time.sleep(0.1)
+
+    query = {"text": ["saw"], "products": ["Circular saw"], "top_k": 1}
+    route = APIRoutes.get_similarity_route()
+    response = client.post(route, params={"model": "small"}, json=query)
+    assert response.status_code == StatusCodes.OK
+    response = client.post(route, params={"model": "large"}, json=query)
+    assert response.status_code == StatusCodes.NOT_FOUND
+    stats = client.get(APIRoutes.get_stats_route()).json()["models"]
+    assert sorted(stats["loaded"]) == sorted([default, "small"])
+
+    response = client.delete(APIRoutes.get_model_route("small"))
+    assert response.status_code == StatusCodes.NO_CONTENT
+    response = client.delete(APIRoutes.get_model_route("small"))
+    assert response.status_code == StatusCodes.NOT_FOUND
+    response = client.delete(APIRoutes.get_model_route(default))
+    assert response.status_code == StatusCodes.BAD_REQUEST
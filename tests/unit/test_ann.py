@@ -0,0 +1,113 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from similarity_search.services.ann import (
+    ExactIndex,
+    IVFIndex,
+    VectorIndex,
+    build_index,
+    normalize,
+    recall_at_k,
+)
+
+
+def _clustered_embeddings(n: int = 2000, dim: int = 16, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(20, dim))
+    return (centers[rng.integers(0, 20, n)] + 0.3 * rng.normal(size=(n, dim))).astype(
+        np.float32
+    )
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_exact_index_matches_cosine_ranking() -> None:
+    """Test that the exact index returns the cosine top-k, best first."""
+    embeddings = _clustered_embeddings(200)
+    query = embeddings[:1] * 3.0
+
+    [(rows, scores)] = ExactIndex(embeddings).search(query, top_k=5)
+
+    cosine = normalize(embeddings) @ normalize(query)[0]
+    np.testing.assert_array_equal(rows, np.argsort(-cosine)[:5])
+    np.testing.assert_allclose(scores, np.sort(cosine)[::-1][:5], rtol=1e-5)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_ivf_recall_improves_with_nprobe() -> None:
+    """Test IVF recall@k against exact search for a small and a full nprobe."""
+    embeddings = _clustered_embeddings()
+    queries = embeddings[:50]
+    exact = [rows for rows, _ in ExactIndex(embeddings).search(queries, top_k=10)]
+    index = IVFIndex(embeddings, nlist=32, nprobe=4)
+
+    low = recall_at_k([r for r, _ in index.search(queries, top_k=10)], exact)
+    full = recall_at_k([r for r, _ in index.search(queries, 10, nprobe=32)], exact)
+
+    assert low >= 0.8
+    assert full == 1.0
+    assert index.info() == {"kind": "ivf", "size": 2000, "nlist": 32, "nprobe": 4}
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_ivf_probes_more_lists_for_small_clusters() -> None:
+    """Test that IVF returns top_k rows even if the probed clusters are small."""
+    embeddings = _clustered_embeddings(100)
+    index = IVFIndex(embeddings, nlist=50, nprobe=1)
+
+    [(rows, scores)] = index.search(embeddings[:1], top_k=20)
+
+    assert len(rows) == 20
+    assert np.all(np.diff(scores) <= 0)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_build_index() -> None:
+    """Test building indexes by kind and rejecting unknown kinds."""
+    embeddings = _clustered_embeddings(100)
+    assert isinstance(build_index("exact", embeddings), ExactIndex)
+    assert isinstance(build_index("ivf", embeddings, nlist=4), IVFIndex)
+    with pytest.raises(ValueError, match="Unknown index kind 'hnsw'"):
+        build_index("hnsw", embeddings)
+    assert recall_at_k([], []) == 1.0
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_indexes_search_selected_rows_only() -> None:
+    """Test that both index kinds return top_k rows among the selected ones."""
+    embeddings = _clustered_embeddings(1000)
+    selection = np.arange(0, 1000, 7)
+    exact = ExactIndex(embeddings[selection]).search(embeddings[:5], top_k=10)
+    expected = [selection[rows] for rows, _ in exact]
+
+    for index in (ExactIndex(embeddings), IVFIndex(embeddings, nlist=16, nprobe=2)):
+        results = index.search(embeddings[:5], top_k=10, selection=selection)
+
+        assert all(len(rows) == 10 for rows, _ in results)
+        assert all(np.isin(rows, selection).all() for rows, _ in results)
+        assert recall_at_k([rows for rows, _ in results], expected) >= 0.9
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_indexes_read_memory_mapped_rows(tmp_path: Path) -> None:
+    """Test that indexes search the catalog rows in place, without a copy."""
+    vectors = normalize(_clustered_embeddings(500))
+    embeddings = np.lib.format.open_memmap(
+        tmp_path / "embeddings.npy", mode="w+", dtype=np.float32, shape=vectors.shape
+    )
+    embeddings[:] = vectors
+    exact = ExactIndex(vectors).search(vectors[:5], top_k=10)
+
+    for index in (
+        ExactIndex(embeddings, normalized=True),
+        IVFIndex(embeddings, normalized=True, nlist=8, nprobe=8),
+    ):
+        results = index.search(vectors[:5], top_k=10)
+
+        assert index.embeddings is embeddings
+        assert not hasattr(index, "vectors")
+        assert recall_at_k([r for r, _ in results], [r for r, _ in exact]) == 1.0
+        np.testing.assert_allclose(results[0][1], exact[0][1], rtol=1e-5)
+    with pytest.raises(TypeError):
+        VectorIndex(vectors)  # type: ignore[abstract]
@@ -0,0 +1,208 @@
+import csv
+import json
+from pathlib import Path
+from typing import Any, List
+from unittest.mock import patch
+
+import pytest
+
+from similarity_search.batch import (
+    load_catalog,
+    main,
+    read_records,
+    run_batch,
+    search_chunk,
+)
+from similarity_search.benchmarks.encoders import HashingEncoder, make_texts
+from similarity_search.core.exceptions import CatalogNotFoundError
+from similarity_search.services.catalog import Catalog
+from similarity_search.services.embedding_store import EmbeddingStore
+from similarity_search.services.product_similarity import SimilarityService
+
+
+def _service() -> SimilarityService:
+    service = SimilarityService("test-model", search_backend="numpy")
+    service.model = HashingEncoder(dimension=16)
+    return service
+
+
+def _write_jsonl(path: Path, records: List[Any]) -> Path:
+    path.write_text("".join(json.dumps(record) + "\n" for record in records))
+    return path
+
+
+def _catalog(service: SimilarityService, tmp_path: Path) -> Catalog:
+    products = [
+        {"id": f"p{i}", "text": text} for i, text in enumerate(make_texts(50, 4))
+    ]
+    return load_catalog(
+        service, "tools", str(_write_jsonl(tmp_path / "p.jsonl", products))
+    )
+
+
+def _queries(tmp_path: Path, count: int = 10) -> Path:
+    queries = [
+        {"id": f"q{i}", "text": text} for i, text in enumerate(make_texts(count, 4, 1))
+    ]
+    return _write_jsonl(tmp_path / "queries.jsonl", queries)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_batch_matches_service_search(tmp_path: Path) -> None:
+    """Test that the written matches are those of a single catalog search."""
+    service = _service()
+    catalog = _catalog(service, tmp_path)
+    queries = _queries(tmp_path)
+    output = tmp_path / "matches.jsonl"
+
+    stats = run_batch(service, catalog, str(queries), str(output), 3, chunk_size=4)
+
+    results = [json.loads(line) for line in output.read_text().splitlines()]
+    texts = [record["text"] for record in read_records(str(queries), ())]
+    expected = service.find_similar(texts, None, 3, catalog_id="tools")
+    assert [result["query_id"] for result in results] == [f"q{i}" for i in range(10)]
+    assert [
+        [match["product"] for match in result["matches"]] for result in results
+    ] == [[match["product"] for match in matches] for matches in expected]
+    assert results[0]["matches"][0]["product_id"].startswith("p")
+    assert (stats["skipped"], stats["searched"], stats["partial"]) == (0, 10, 0)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_interrupted_batch_resumes_from_checkpoint(tmp_path: Path) -> None:
+    """Test that a rerun keeps the checkpointed chunks and searches the rest."""
+    service = _service()
+    catalog = _catalog(service, tmp_path)
+    queries = str(_queries(tmp_path))
+    complete, output = tmp_path / "complete.jsonl", tmp_path / "matches.jsonl"
+    run_batch(service, catalog, queries, str(complete), 3, chunk_size=4)
+
+    calls: List[int] = []
+
+    def failing_search(*args: Any) -> List[Any]:
+        calls.append(args[3])
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        return search_chunk(*args)
+
+    with patch("similarity_search.batch.search_chunk", side_effect=failing_search):
+        with pytest.raises(KeyboardInterrupt):
+            run_batch(service, catalog, queries, str(output), 3, chunk_size=4)
+    checkpoint = json.loads((tmp_path / "matches.jsonl.checkpoint").read_text())
+    assert checkpoint["rows"] == 4
+    assert checkpoint["job"]["model_name"] == "test-model"
+    assert not (tmp_path / "matches.jsonl.checkpoint.tmp").exists()
+    # A chunk written after the last checkpoint is dropped on resume.
+    with open(output, "a") as f:
+        f.write('{"query_id": "torn')
+
+    stats = run_batch(service, catalog, queries, str(output), 3, chunk_size=4)
+
+    assert (stats["skipped"], stats["searched"]) == (4, 6)
+    assert output.read_text() == complete.read_text()
+    with pytest.raises(ValueError, match="another job"):
+        run_batch(service, catalog, queries, str(output), 5, chunk_size=4)
+    # Searching an edited catalog or with another model is another job too.
+    edited = load_catalog(
+        service, "tools", str(_write_jsonl(tmp_path / "e.jsonl", [{"text": "saw"}]))
+    )
+    with pytest.raises(ValueError, match="another job"):
+        run_batch(service, edited, queries, str(output), 3, chunk_size=4)
+    service.model_name = "other-model"
+    with pytest.raises(ValueError, match="another job"):
+        run_batch(service, catalog, queries, str(output), 3, chunk_size=4)
+    service.model_name = "test-model"
+    stats = run_batch(service, catalog, queries, str(output), 5, 4, restart=True)
+    assert (stats["skipped"], stats["searched"]) == (0, 10)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_stored_catalog_is_reused_on_resume(tmp_path: Path) -> None:
+    """Test that later runs open the stored catalog instead of encoding it."""
+    store = EmbeddingStore(str(tmp_path / "store"))
+    service = _service()
+    service.embedding_store = store
+    catalog = _catalog(service, tmp_path)
+    queries, output = str(_queries(tmp_path)), tmp_path / "matches.jsonl"
+    with patch("similarity_search.batch.search_chunk", side_effect=KeyboardInterrupt):
+        with pytest.raises(KeyboardInterrupt):
+            run_batch(service, catalog, queries, str(output), 3, chunk_size=4)
+
+    resumed = _service()
+    resumed.embedding_store = store
+    with patch.object(resumed, "register_catalog") as register:
+        reopened = _catalog(resumed, tmp_path)
+    register.assert_not_called()
+    stats = run_batch(resumed, reopened, queries, str(output), 3, chunk_size=4)
+    assert (stats["skipped"], stats["searched"]) == (0, 10)
+
+    # Opened by id alone, the stored catalog is the same job too.
+    stored = _service()
+    stored.embedding_store = store
+    stats = run_batch(
+        stored, load_catalog(stored, "tools", None), queries, str(output), 3, 4
+    )
+    assert (stats["skipped"], stats["searched"]) == (10, 0)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_csv_input_and_output(tmp_path: Path) -> None:
+    """Test CSV queries without ids and the one row per match CSV output."""
+    service = _service()
+    catalog = _catalog(service, tmp_path)
+    queries = tmp_path / "queries.csv"
+    queries.write_text('query\n"saw, blade"\nhammer\n')
+    output = tmp_path / "matches.csv"
+
+    run_batch(service, catalog, str(queries), str(output), 2, text_field="query")
+
+    with open(output, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [(row["query_id"], row["query"], row["rank"]) for row in rows] == [
+        ("0", "saw, blade", "1"),
+        ("0", "saw, blade", "2"),
+        ("1", "hammer", "1"),
+        ("1", "hammer", "2"),
+    ]
+    with pytest.raises(ValueError, match="Row 0 of .* has no 'text' field"):
+        run_batch(service, catalog, str(queries), str(output), 2, restart=True)
+    with pytest.raises(ValueError, match="Unsupported file"):
+        run_batch(service, catalog, str(queries), str(tmp_path / "out.xml"), 2)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_parquet_input_is_read_in_batches(tmp_path: Path) -> None:
+    """Test that Parquet queries are streamed with only the needed columns."""
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    path = tmp_path / "queries.parquet"
+    table = pa.table({"text": make_texts(5, 3), "id": range(5), "other": [0.5] * 5})
+    pq.write_table(table, path, row_group_size=2)
+
+    records = list(read_records(str(path), ("text", "id", "missing"), batch_size=2))
+
+    assert [record["id"] for record in records] == [0, 1, 2, 3, 4]
+    assert set(records[0]) == {"text", "id"}
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_main(tmp_path: Path) -> None:
+    """Test the command line run, including a catalog missing from the store."""
+
+    async def load_model(self: SimilarityService) -> None:
+        self.model = HashingEncoder(dimension=16)
+
+    catalog = tmp_path / "products.jsonl"
+    _write_jsonl(catalog, [{"text": text} for text in make_texts(20, 4)])
+    queries, output = _queries(tmp_path, 3), tmp_path / "matches.jsonl"
+
+    with patch.object(SimilarityService, "load_model", load_model):
+        assert main([str(queries), str(output), f"--catalog={catalog}"]) == 0
+        assert main([str(queries), str(output), "--catalog-id=unknown"]) == 2
+
+    results = [json.loads(line) for line in output.read_text().splitlines()]
+    assert len(results) == 3
+    assert len(results[0]["matches"]) == 10
+    with pytest.raises(CatalogNotFoundError):
+        load_catalog(_service(), "unknown", None)
@@ -0,0 +1,88 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from typing import List
+
+import numpy as np
+import pytest
+
+from similarity_search.services.batching import MicroBatcher
+
+
+def _encode(texts: List[str]) -> np.ndarray:
+    return np.array([[float(len(text))] for text in texts])
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_concurrent_requests_share_one_encode_call() -> None:
+    """Test that requests queued behind a running batch are encoded together."""
+    release = Event()
+    calls: List[List[str]] = []
+
+    def encode(texts: List[str]) -> np.ndarray:
+        calls.append(texts)
+        release.wait(timeout=5)
+        return _encode(texts)
+
+    batcher = MicroBatcher(encode, max_batch_size=8, max_wait_ms=0)
+    batcher.start()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        first = pool.submit(batcher.encode, ["a"])
+        while not calls:
+            time.sleep(0.001)
+        others = [pool.submit(batcher.encode, [text * 2]) for text in "bcd"]
+        while batcher._queue.qsize() < 3:
+            time.sleep(0.001)
+        release.set()
+        results = [first.result()] + [future.result() for future in others]
+    batcher.stop()
+
+    assert calls[0] == ["a"]
+    assert sorted(calls[1]) == ["bb", "cc", "dd"]
+    assert [result.tolist() for result in results] == [
+        [[1.0]],
+        [[2.0]],
+        [[2.0]],
+        [[2.0]],
+    ]
+    stats = batcher.stats()
+    assert stats["batches"] == 2
+    assert stats["requests"] == 4
+    assert stats["max_batch_size"] == 3
+    assert stats["batch_size_histogram"] == {"1": 1, "4": 1}
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_lone_request_does_not_wait() -> None:
+    """Test that a request with nothing queued behind it is encoded at once."""
+    batcher = MicroBatcher(_encode, max_batch_size=8, max_wait_ms=5000)
+    batcher.start()
+    start = time.monotonic()
+    assert batcher.encode(["abc"]).tolist() == [[3.0]]
+    assert time.monotonic() - start < 1
+    batcher.stop()
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_batch_size_limit_and_errors() -> None:
+    """Test that batches respect the size limit and encode errors propagate."""
+    calls: List[List[str]] = []
+
+    def encode(texts: List[str]) -> np.ndarray:
+        calls.append(texts)
+        if "boom" in texts:
+            raise ValueError("encode failed")
+        return _encode(texts)
+
+    batcher = MicroBatcher(encode, max_batch_size=2, max_wait_ms=50)
+    batcher.start()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(batcher.encode, ["x", "y"]) for _ in range(2)]
+        assert [future.result().shape for future in futures] == [(2, 1), (2, 1)]
+    with pytest.raises(ValueError, match="encode failed"):
+        batcher.encode(["boom"])
+    batcher.stop()
+
+    assert all(len(texts) <= 2 for texts in calls)
+    with pytest.raises(RuntimeError, match="Micro-batcher is not running"):
+        batcher.encode(["x"])
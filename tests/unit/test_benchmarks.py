@@ -0,0 +1,110 @@
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+import pytest
+
+from similarity_search.benchmarks.encoders import HashingEncoder, make_texts
+from similarity_search.benchmarks.suite import (
+    build_service,
+    compare_to_baseline,
+    main,
+    run_suite,
+    summarize,
+)
+
+
+def _result(p95_ms: float, **params: Any) -> Dict[str, Any]:
+    case = {
+        "path": "catalog",
+        "queries": 1,
+        "catalog_size": 100,
+        "text_words": 8,
+        "top_k": 5,
+    }
+    return {**case, **params, "p95_ms": p95_ms}
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_hashing_encoder_is_deterministic() -> None:
+    """Test that the stand-in encoder gives the same embedding for a text."""
+    texts = make_texts(3, 5, seed=1)
+    encoder = HashingEncoder(dimension=16)
+
+    embeddings = encoder.encode(texts + texts[:1])
+
+    assert embeddings.shape == (4, 16)
+    assert make_texts(3, 5, seed=1) == texts
+    np.testing.assert_array_equal(embeddings[0], embeddings[3])
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_summarize() -> None:
+    """Test latency percentiles in milliseconds and throughput."""
+    summary = summarize([0.001] * 99 + [0.101], queries_per_call=2)
+
+    assert summary["p50_ms"] == pytest.approx(1.0)
+    assert summary["p99_ms"] > summary["p95_ms"] >= summary["p50_ms"]
+    assert summary["throughput_qps"] == pytest.approx(200 / 0.2)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_run_suite_sweeps_every_case() -> None:
+    """Test that every combination of the sweep is measured on every path."""
+    service = build_service("stub")
+
+    results = run_suite(
+        service,
+        paths=["catalog", "inline", "http"],
+        queries=[1, 4],
+        catalog_sizes=[50],
+        text_words=[6],
+        top_ks=[3],
+        repeats=3,
+    )
+
+    assert len(results) == 6
+    assert {result["path"] for result in results} == {"catalog", "inline", "http"}
+    for result in results:
+        assert result["p50_ms"] > 0
+        assert result["throughput_qps"] > 0
+        assert result["peak_rss_mb"] > 0
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_compare_to_baseline() -> None:
+    """Test that only cases slower than the tolerated regression are reported."""
+    baseline = [_result(10.0), _result(10.0, top_k=10)]
+    results = [_result(11.0), _result(13.0, top_k=10), _result(50.0, queries=8)]
+
+    regressions = compare_to_baseline(results, baseline, max_regression=0.2)
+
+    assert len(regressions) == 1
+    assert "top_k=10" in regressions[0]
+    assert "+30%" in regressions[0]
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_main_fails_on_regression(tmp_path: Path) -> None:
+    """Test the command line run, its JSON report and the baseline gate."""
+    output = tmp_path / "results.json"
+    args = [
+        "--paths=catalog",
+        "--queries=2",
+        "--catalog-sizes=20",
+        "--text-words=4",
+        "--top-k=2",
+        "--repeats=2",
+        f"--output={output}",
+    ]
+
+    assert main(args) == 0
+    report = json.loads(output.read_text())
+    assert report["meta"]["encoder"] == "stub"
+    assert len(report["results"]) == 1
+
+    baseline = tmp_path / "baseline.json"
+    report["results"][0]["p95_ms"] = 1e-9
+    baseline.write_text(json.dumps(report))
+    assert main([*args, f"--baseline={baseline}"]) == 1
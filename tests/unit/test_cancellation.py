@@ -0,0 +1,89 @@
+import time
+from concurrent.futures import Future
+from threading import Timer
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Request
+
+from similarity_search.api.endpoints import _watch_disconnect
+from similarity_search.core.cancellation import (
+    CLIENT_DISCONNECTED,
+    CancellationToken,
+    cancellation_scope,
+    check_cancelled,
+    remaining_seconds,
+    wait_cancellable,
+)
+from similarity_search.core.config import Settings
+from similarity_search.core.exceptions import RequestCancelledError
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_token_deadline_and_cancel() -> None:
+    """Test that a token stops work past its deadline or once cancelled."""
+    token = CancellationToken.with_timeout(1000)
+    assert not token.cancelled
+    assert 0.9 < (token.remaining() or 0) <= 1.0
+
+    token.cancel(CLIENT_DISCONNECTED)
+    token.cancel("deadline")
+    with pytest.raises(RequestCancelledError, match="during encoding") as error:
+        token.check("encoding")
+    assert (error.value.reason, error.value.stage) == ("disconnected", "encoding")
+
+    expired = CancellationToken.with_timeout(5, start=time.perf_counter() - 1)
+    assert expired.cancelled
+    assert expired.reason == "deadline"
+    assert expired.remaining() == 0.0
+    assert CancellationToken.with_timeout(None).remaining() is None
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_scope_makes_checks_see_the_token() -> None:
+    """Test that checks only raise within the scope of a cancelled token."""
+    check_cancelled("search")
+    assert remaining_seconds() is None
+
+    with cancellation_scope(CancellationToken(time.perf_counter() - 1)):
+        assert remaining_seconds() == 0.0
+        with pytest.raises(RequestCancelledError):
+            check_cancelled("search")
+    check_cancelled("search")
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_wait_cancellable() -> None:
+    """Test that waiting for other work stops when the request is cancelled."""
+    done: Future = Future()
+    done.set_result(1)
+    assert wait_cancellable(done, "search") == 1
+
+    pending: Future = Future()
+    token = CancellationToken()
+    with cancellation_scope(token):
+        Timer(0.1, pending.set_result, [2]).start()
+        assert wait_cancellable(pending, "search") == 2
+
+        Timer(0.1, token.cancel, [CLIENT_DISCONNECTED]).start()
+        with pytest.raises(RequestCancelledError):
+            wait_cancellable(Future(), "search")
+
+
+@pytest.mark.unit  # type: ignore[misc]
+async def test_watch_disconnect_cancels_token() -> None:
+    """Test that a client disconnect cancels the token of its request."""
+    messages = [{"type": "http.request"}, {"type": "http.disconnect"}]
+
+    async def receive() -> dict:
+        return messages.pop(0)
+
+    token = CancellationToken()
+    app = SimpleNamespace(state=SimpleNamespace(settings=Settings()))
+    request = Request(
+        {"type": "http", "method": "POST", "headers": [], "app": app}, receive
+    )
+
+    await _watch_disconnect(request, token)
+
+    assert token.reason == CLIENT_DISCONNECTED
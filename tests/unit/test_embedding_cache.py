@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from similarity_search.services.embedding_cache import EmbeddingCache
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_key_includes_model_name() -> None:
+    """Test that the same text gets different keys for different models."""
+    assert EmbeddingCache.key("a", "text") != EmbeddingCache.key("b", "text")
+    assert EmbeddingCache.key("a", "text") == EmbeddingCache.key("a", "text")
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_get_and_put() -> None:
+    """Test cache hits, misses and stored values."""
+    cache = EmbeddingCache(max_bytes=1024)
+    key = EmbeddingCache.key("model", "text")
+
+    assert cache.get(key) is None
+    cache.put(key, np.array([1.0, 2.0]))
+
+    np.testing.assert_array_equal(cache.get(key), [1.0, 2.0])
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 1,
+        "evictions": 0,
+        "entries": 1,
+        "bytes": 8,
+        "max_bytes": 1024,
+    }
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_lru_eviction_by_bytes() -> None:
+    """Test that the least recently used entries are evicted past the byte cap."""
+    cache = EmbeddingCache(max_bytes=32)  # room for two 4-dim float32 vectors
+    keys = [EmbeddingCache.key("model", text) for text in ("a", "b", "c")]
+
+    cache.put(keys[0], np.zeros(4))
+    cache.put(keys[1], np.zeros(4))
+    cache.get(keys[0])  # "a" becomes the most recently used entry
+    cache.put(keys[2], np.zeros(4))
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 32
+
+    cache.put(keys[0], np.zeros(16))  # larger than the cache, not stored
+    assert len(cache) == 2
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,156 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from similarity_search.services.catalog import Catalog
+from similarity_search.services.embedding_store import EmbeddingStore
+
+
+def _catalog() -> Catalog:
+    return Catalog(
+        catalog_id="tools",
+        products=["saw", "hammer"],
+        ids=["sku-1", "sku-2"],
+        embeddings=np.array([[1.0, 0.0], [0.5, 0.5]], dtype=np.float32),
+    )
+
+
+@pytest.mark.unit  # type: ignore[misc]
+@pytest.mark.parametrize("dtype", ["float32", "float16"])  # type: ignore[misc]
+def test_save_and_load_mmap(tmp_path: Path, dtype: str) -> None:
+    """Test that a stored catalog is reopened memory-mapped in the stored dtype."""
+    store = EmbeddingStore(str(tmp_path), dtype=dtype)
+    store.save(_catalog(), "test-model")
+
+    catalog = store.load("tools", "test-model")
+
+    assert catalog is not None
+    assert store.catalog_ids("test-model") == ["tools"]
+    assert catalog.products == ["saw", "hammer"]
+    assert catalog.ids == ["sku-1", "sku-2"]
+    assert catalog.normalized is False
+    assert isinstance(catalog.embeddings, np.memmap)
+    assert catalog.embeddings.dtype == np.dtype(dtype)
+    np.testing.assert_allclose(catalog.embeddings, _catalog().embeddings)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_load_missing_or_other_model(tmp_path: Path) -> None:
+    """Test that unknown catalogs and catalogs of another model are not loaded."""
+    store = EmbeddingStore(str(tmp_path))
+    store.save(_catalog(), "test-model")
+
+    assert store.load("missing", "test-model") is None
+    assert store.load("..", "test-model") is None
+    assert store.load("tools", "other-model") is None
+
+    store.delete("tools", "test-model")
+    assert store.catalog_ids("test-model") == []
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_unsupported_dtype(tmp_path: Path) -> None:
+    """Test that unsupported on-disk dtypes are rejected."""
+    with pytest.raises(ValueError, match="Unsupported embedding dtype 'int8'"):
+        EmbeddingStore(str(tmp_path), dtype="int8")
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_invalid_catalog_id(tmp_path: Path) -> None:
+    """Test that catalog ids cannot escape the store directory."""
+    store = EmbeddingStore(str(tmp_path / "store"))
+    catalog = _catalog()
+    catalog.catalog_id = ".."
+    with pytest.raises(ValueError, match="Invalid catalog id"):
+        store.save(catalog, "test-model")
+    store.delete("..", "test-model")
+    assert tmp_path.exists()
+    with pytest.raises(ValueError, match="Invalid model name"):
+        store.save(_catalog(), "..")
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_delta_saved_and_discarded(tmp_path: Path) -> None:
+    """Test that a delta is reloaded on its main segment and dropped after it."""
+    store = EmbeddingStore(str(tmp_path))
+    store.save(_catalog(), "test-model")
+    updated = _catalog().updated(
+        ["drill"], ["sku-3"], np.array([[0.0, 1.0]], dtype=np.float32), {0}
+    )
+    store.save_delta(updated, "test-model")
+
+    catalog = store.load("tools", "test-model")
+    assert catalog is not None
+    assert (catalog.version, catalog.base_version) == (2, 1)
+    assert catalog.products == ["saw", "hammer", "drill"]
+    assert catalog.deleted == {0}
+    np.testing.assert_allclose(catalog.delta, [[0.0, 1.0]])
+
+    compacted = catalog.compacted()
+    assert compacted.products == ["hammer", "drill"]
+    store.save(compacted, "test-model")
+    assert not (tmp_path / "test-model" / "tools" / "delta.json").exists()
+    reloaded = store.load("tools", "test-model")
+    assert reloaded is not None
+    assert (reloaded.version, reloaded.pending) == (3, 0)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_stale_delta_ignored(tmp_path: Path) -> None:
+    """Test that a delta written for an older main segment is not applied."""
+    store = EmbeddingStore(str(tmp_path))
+    store.save(_catalog(), "test-model")
+    store.save_delta(_catalog().updated([], [], np.zeros((0, 2)), {1}), "test-model")
+    delta_file = tmp_path / "test-model" / "tools" / "delta.json"
+    stale = delta_file.read_text()
+    catalog = Catalog("tools", ["saw"], ["sku-1"], np.ones((1, 2)), version=3)
+    store.save(catalog, "test-model")
+    delta_file.write_text(stale)
+
+    catalog = store.load("tools", "test-model")
+
+    assert catalog is not None
+    assert (catalog.version, catalog.products, catalog.pending) == (3, ["saw"], 0)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_metadata_round_trip(tmp_path: Path) -> None:
+    """Test that metadata of both segments are saved and reloaded."""
+    store = EmbeddingStore(str(tmp_path))
+    catalog = _catalog()
+    catalog.metadata = [{"price": 10}, None]
+    store.save(catalog, "test-model")
+    store.save_delta(
+        catalog.updated(
+            ["drill"], ["sku-3"], np.ones((1, 2)), set(), [{"category": "power"}]
+        ),
+        "test-model",
+    )
+
+    loaded = store.load("tools", "test-model")
+
+    assert loaded is not None
+    assert loaded.metadata == [{"price": 10}, None, {"category": "power"}]
+    np.testing.assert_array_equal(
+        np.flatnonzero(loaded.filter_mask({"category": "power"})), [2]
+    )
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_models_keep_their_own_catalogs(tmp_path: Path) -> None:
+    """Test that catalogs of the same name encoded by two models are kept apart."""
+    store = EmbeddingStore(str(tmp_path))
+    store.save(_catalog(), "org/model-a")
+    other = _catalog()
+    other.products = ["drill", "nail"]
+    store.save(other, "model-b")
+
+    store.delete("tools", "model-b")
+
+    loaded = store.load("tools", "org/model-a")
+    assert loaded is not None
+    assert loaded.products == ["saw", "hammer"]
+    assert store.catalog_ids("org/model-a") == ["tools"]
+    assert store.catalog_ids("model-b") == []
+    assert (tmp_path / "org%2Fmodel-a" / "tools" / "index.json").exists()
@@ -0,0 +1,68 @@
+import asyncio
+from threading import Event
+
+import pytest
+
+from similarity_search.core.cancellation import (
+    CancellationToken,
+    cancellation_scope,
+    check_cancelled,
+)
+from similarity_search.core.exceptions import QueueFullError, RequestCancelledError
+from similarity_search.services.executor import InferenceExecutor
+
+
+@pytest.mark.unit  # type: ignore[misc]
+async def test_run_returns_result() -> None:
+    """Test that calls run on the executor and return their result."""
+    executor = InferenceExecutor(max_workers=2, max_queue_size=2)
+    executor.start()
+
+    assert await executor.run(sum, [1, 2, 3]) == 6
+    executor.shutdown()
+
+    assert executor.stats()["completed"] == 1
+    with pytest.raises(RuntimeError, match="Inference executor is not running"):
+        await executor.run(sum, [1])
+
+
+@pytest.mark.unit  # type: ignore[misc]
+async def test_rejects_calls_beyond_capacity() -> None:
+    """Test that calls beyond workers plus queue size are shed immediately."""
+    executor = InferenceExecutor(max_workers=1, max_queue_size=1)
+    executor.start()
+    release = Event()
+    running = [asyncio.ensure_future(executor.run(release.wait, 5)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(QueueFullError, match=r"Inference queue is full \(2"):
+        await executor.run(release.wait, 5)
+    stats = executor.stats()
+    assert (stats["in_flight"], stats["queued"], stats["rejected"]) == (1, 1, 1)
+
+    release.set()
+    assert await asyncio.gather(*running) == [True, True]
+    executor.shutdown()
+
+
+@pytest.mark.unit  # type: ignore[misc]
+async def test_counts_abandoned_calls() -> None:
+    """Test that calls stopped by their request are skipped or counted."""
+    executor = InferenceExecutor(max_workers=1, max_queue_size=1)
+    executor.start()
+    token = CancellationToken()
+
+    def work() -> None:
+        token.cancel("disconnected")
+        check_cancelled("search")
+
+    with cancellation_scope(token):
+        with pytest.raises(RequestCancelledError, match="during search"):
+            await executor.run(work)
+        with pytest.raises(RequestCancelledError, match="during queue"):
+            await executor.run(sum, [1])
+    executor.shutdown()
+
+    stats = executor.stats()
+    assert (stats["completed"], stats["abandoned"]) == (2, 2)
+    assert stats["abandoned_seconds"] >= 0
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from similarity_search.services.filters import MetadataIndex, validate_filters
+
+METADATA = [
+    {"category": "tools", "price": 12.5, "brand": "acme"},
+    {"category": "garden", "price": 40},
+    None,
+    {"category": "tools", "price": 80, "in_stock": True},
+    {"category": "kitchen", "in_stock": False},
+]
+
+
+@pytest.mark.unit  # type: ignore[misc]
+@pytest.mark.parametrize("bitmap_max_values", [256, 0])  # type: ignore[misc]
+@pytest.mark.parametrize(  # type: ignore[misc]
+    "filters, expected",
+    [
+        ({}, [0, 1, 2, 3, 4]),
+        ({"category": "tools"}, [0, 3]),
+        ({"category": {"ne": "tools"}}, [1, 4]),
+        ({"category": {"in": ["garden", "kitchen", "toys"]}}, [1, 4]),
+        ({"category": {"nin": ["garden"]}}, [0, 3, 4]),
+        ({"price": {"gte": 12.5, "lt": 80}}, [0, 1]),
+        ({"price": {"gt": 40}}, [3]),
+        ({"price": 40}, [1]),
+        ({"price": {"nin": [40, 80]}}, [0]),
+        ({"category": "tools", "price": {"lte": 50}}, [0]),
+        ({"in_stock": True}, [3]),
+        ({"brand": {"ne": "acme"}}, []),
+        ({"color": "red"}, []),
+        ({"color": {"gt": 1}}, []),
+    ],
+)
+def test_mask(filters: dict, expected: list, bitmap_max_values: int) -> None:
+    """Test filter operators with and without per-value bitmaps."""
+    index = MetadataIndex(METADATA, bitmap_max_values=bitmap_max_values)
+
+    np.testing.assert_array_equal(np.flatnonzero(index.mask(filters)), expected)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_columns() -> None:
+    """Test that numbers get a column and low cardinality fields get bitmaps."""
+    index = MetadataIndex(METADATA)
+
+    assert set(index.numeric) == {"price"}
+    np.testing.assert_array_equal(index.numeric["price"][:2], [12.5, 40])
+    assert np.isnan(index.numeric["price"][2])
+    categories, codes = index.codes["category"]
+    assert categories == {(str, "tools"): 0, (str, "garden"): 1, (str, "kitchen"): 2}
+    np.testing.assert_array_equal(codes, [0, 1, -1, 0, 2])
+    assert set(index.bitmaps["category"]) == {0, 1, 2}
+    assert index.bitmaps["category"][0].nbytes == 1
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_list_and_object_values_never_match() -> None:
+    """Test that unhashable values are left out of the columns."""
+    index = MetadataIndex(
+        [{"tags": ["a", "b"], "size": {"w": 1}}, {"tags": "a", "size": 2}, None]
+    )
+
+    assert np.flatnonzero(index.mask({"tags": "a"})).tolist() == [1]
+    assert np.flatnonzero(index.mask({"tags": {"ne": "b"}})).tolist() == [1]
+    assert np.flatnonzero(index.mask({"size": {"gt": 1}})).tolist() == [1]
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_values_of_different_types_are_different_categories() -> None:
+    """Test that True, 1 and "1" in a categorical field are told apart."""
+    index = MetadataIndex([{"flag": True}, {"flag": 1}, {"flag": "1"}, {"flag": 1.0}])
+
+    assert np.flatnonzero(index.mask({"flag": True})).tolist() == [0]
+    assert np.flatnonzero(index.mask({"flag": 1})).tolist() == [1]
+    assert np.flatnonzero(index.mask({"flag": {"ne": True}})).tolist() == [1, 2, 3]
+    assert len(index.codes["flag"][0]) == 4
+
+
+@pytest.mark.unit  # type: ignore[misc]
+@pytest.mark.parametrize(  # type: ignore[misc]
+    "filters, message",
+    [
+        ({"price": {"between": [1, 2]}}, "unknown filter operator 'between'"),
+        ({"price": {}}, "has no operator"),
+        ({"category": {"in": "tools"}}, "needs a list"),
+        ({"price": {"lt": "10"}}, "needs a number"),
+        ({"category": ["tools"]}, "needs a value"),
+    ],
+)
+def test_invalid_filters(filters: dict, message: str) -> None:
+    """Test that malformed filter expressions are rejected."""
+    with pytest.raises(ValueError, match=message):
+        validate_filters(filters)
+    assert validate_filters({"price": {"lt": 10}}) == {"price": {"lt": 10}}
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_range_on_categorical_field() -> None:
+    """Test that range operators are rejected on non-numeric fields."""
+    with pytest.raises(ValueError, match="non-numeric field 'category'"):
+        MetadataIndex(METADATA).mask({"category": {"gt": 1}})
@@ -0,0 +1,144 @@
+import json
+from typing import Any
+
+import numpy as np
+import pytest
+
+from similarity_search.api.formats import (
+    ARROW,
+    JSON,
+    MSGPACK,
+    _decode_arrow,
+    decode_vectors,
+    encode_results,
+    encode_vectors,
+    negotiate,
+)
+
+RESULTS = [
+    {"query": "drill", "matches": [{"product": "cordless drill", "score": 0.9512}]},
+    {"query": "saw ü", "matches": [{"product": "saw", "score": -0.1}]},
+]
+
+
+@pytest.mark.unit  # type: ignore[misc]
+@pytest.mark.parametrize(  # type: ignore[misc]
+    "accept, expected",
+    [
+        (None, JSON),
+        ("*/*", JSON),
+        ("text/html", JSON),
+        ("application/x-msgpack", MSGPACK),
+        (f"{JSON}, {ARROW}", JSON),
+        (f"{JSON};q=0.5, {ARROW}", ARROW),
+        (f"{MSGPACK};q=0, {JSON}", JSON),
+        (f"{ARROW};q=oops, {MSGPACK};q=0.9", MSGPACK),
+    ],
+)
+def test_negotiate(accept: str, expected: str) -> None:
+    """Test that the preferred supported media type is chosen."""
+    pytest.importorskip("msgpack")
+    pytest.importorskip("pyarrow")
+
+    assert negotiate(accept) == expected
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_json_results() -> None:
+    """Test that JSON results are dumped as is."""
+    response = encode_results(RESULTS, JSON)
+
+    assert response.media_type == JSON
+    assert json.loads(response.body) == RESULTS
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_msgpack_results_round_trip() -> None:
+    """Test that MessagePack results decode to the JSON results."""
+    msgpack = pytest.importorskip("msgpack")
+
+    response = encode_results(RESULTS, MSGPACK)
+
+    assert response.media_type == MSGPACK
+    assert msgpack.unpackb(response.body) == RESULTS
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_arrow_results_round_trip() -> None:
+    """Test that Arrow results decode to the JSON results, with any match shape."""
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc  # noqa: F401
+
+    index_results = [
+        {
+            "query": "drill",
+            "matches": [{"index": 3, "score": 0.5}],
+            "version": 7,
+            "partial": True,
+        }
+    ]
+    id_results = [{"query": "drill", "matches": [{"product_id": "p3", "score": 0.5}]}]
+    for results in (RESULTS, index_results, id_results):
+        response = encode_results(results, ARROW)
+
+        assert response.media_type == ARROW
+        assert pa.ipc.open_stream(response.body).read_all().to_pylist() == results
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_arrow_query_is_decoded_by_column() -> None:
+    """Test that a single row Arrow query decodes to its non-null fields."""
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc  # noqa: F401
+
+    rows = [
+        {"text": ["x"], "products": ["y"], "top_k": 1, "vectors": None},
+        {
+            "text": ["drill", "saw"],
+            "products": ["a", "b", "c"],
+            "top_k": 2,
+            "vectors": [[0.5, 1.0]],
+            "catalog_id": None,
+        },
+    ]
+
+    def stream(table: Any) -> bytes:
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return bytes(sink.getvalue())
+
+    # The second row of a table, so that its lists start at an offset.
+    assert _decode_arrow(pa, stream(pa.Table.from_pylist(rows).slice(1))) == {
+        "text": ["drill", "saw"],
+        "products": ["a", "b", "c"],
+        "top_k": 2,
+        "vectors": [[0.5, 1.0]],
+    }
+    with pytest.raises(ValueError, match="single row, got 2"):
+        _decode_arrow(pa, stream(pa.Table.from_pylist(rows)))
+
+
+@pytest.mark.unit  # type: ignore[misc]
+@pytest.mark.parametrize("dtype", ["float32", "float16"])  # type: ignore[misc]
+def test_vectors_round_trip(dtype: str) -> None:
+    """Test that base64 embeddings decode to the encoded values."""
+    embeddings = np.array([[0.5, -1.25, 3.0], [1.0, 0.0, 2.0]], dtype=np.float32)
+
+    encoded = encode_vectors(embeddings, dtype)
+    decoded = decode_vectors(encoded, dtype)
+
+    assert len(encoded) == 2
+    assert decoded.dtype == np.float32
+    np.testing.assert_array_equal(decoded, embeddings)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_invalid_vectors() -> None:
+    """Test that malformed or inconsistent embeddings are rejected."""
+    row = encode_vectors(np.ones((1, 2)), "float32")[0]
+    short = encode_vectors(np.ones((1, 1)), "float32")[0]
+
+    for values in ([], [row, short], ["not base64!"], ["AAA="]):
+        with pytest.raises(ValueError):
+            decode_vectors(values, "float32")
@@ -0,0 +1,114 @@
+import importlib.util
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from similarity_search.core.constants import AppSettings
+from similarity_search.services.inference_backend import (
+    QUANTIZED_ONNX_FILE,
+    cosine_agreement,
+    load_model,
+)
+from similarity_search.services.product_similarity import SimilarityService
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_cosine_agreement() -> None:
+    """Test that agreement is the worst row-wise cosine similarity."""
+    expected = np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+
+    assert cosine_agreement(expected, expected * 3) == pytest.approx(1.0)
+    assert cosine_agreement(expected, expected[::-1]) == pytest.approx(0.0)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_unknown_backend() -> None:
+    """Test that an unknown backend is rejected."""
+    with pytest.raises(ValueError, match="Unknown inference backend"):
+        load_model("test-model", backend="tensorrt")
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_onnx_int8_is_exported_then_cached(tmp_path: Path) -> None:
+    """Test that the quantized graph is exported once and reloaded from cache."""
+    with (
+        patch("sentence_transformers.SentenceTransformer") as model_cls,
+        patch("sentence_transformers.export_dynamic_quantized_onnx_model") as export,
+    ):
+        load_model("org/model", "onnx-int8", cache_dir=str(tmp_path))
+
+        model_dir = tmp_path / "org--model" / "onnx-int8"
+        model_cls.assert_any_call("org/model", backend="onnx")
+        model_cls.return_value.save_pretrained.assert_called_once_with(str(model_dir))
+        export.assert_called_once_with(
+            model_cls.return_value, "avx2", str(model_dir), file_suffix="qint8"
+        )
+
+        (model_dir / QUANTIZED_ONNX_FILE).parent.mkdir(parents=True)
+        (model_dir / QUANTIZED_ONNX_FILE).touch()
+        model_cls.reset_mock()
+        load_model("org/model", "onnx-int8", cache_dir=str(tmp_path))
+
+        model_cls.assert_called_once_with(
+            str(model_dir),
+            backend="onnx",
+            model_kwargs={"file_name": QUANTIZED_ONNX_FILE},
+        )
+        export.assert_called_once()
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_onnx_int8_without_cache_removes_its_export() -> None:
+    """Test that an uncached quantized export leaves no directory behind."""
+    with (
+        patch("sentence_transformers.SentenceTransformer") as model_cls,
+        patch("sentence_transformers.export_dynamic_quantized_onnx_model") as export,
+    ):
+        load_model("org/model", "onnx-int8")
+
+    export_dir = Path(export.call_args.args[2])
+    model_cls.assert_called_with(
+        str(export_dir), backend="onnx", model_kwargs={"file_name": QUANTIZED_ONNX_FILE}
+    )
+    assert export_dir.name.startswith("onnx-model-")
+    assert not export_dir.exists()
+
+
+@pytest.mark.unit  # type: ignore[misc]
+@pytest.mark.skipif(  # type: ignore[misc]
+    importlib.util.find_spec("onnxruntime") is None
+    or importlib.util.find_spec("optimum") is None,
+    reason="onnxruntime and optimum are not installed",
+)
+@pytest.mark.parametrize("backend", ["onnx", "onnx-int8"])  # type: ignore[misc]
+def test_onnx_backend_parity(tmp_path: Path, backend: str) -> None:
+    """Test that ONNX embeddings agree with the PyTorch ones on the real model."""
+    texts = ["cordless drill with two batteries", "wooden dining table"]
+    try:
+        reference = load_model(AppSettings.MODEL_NAME, "torch").encode(texts)
+    except OSError as e:
+        pytest.skip(f"Model is not available: {e}")
+    model = load_model(AppSettings.MODEL_NAME, backend, cache_dir=str(tmp_path))
+
+    threshold = 0.99 if backend == "onnx" else 0.95
+    assert cosine_agreement(reference, model.encode(texts)) >= threshold
+
+
+@pytest.mark.unit  # type: ignore[misc]
+async def test_service_loads_onnx_backend() -> None:
+    """Test that the service loads its model through the configured backend."""
+    with patch(
+        "similarity_search.services.product_similarity.load_inference_model",
+        return_value=MagicMock(),
+    ) as loader:
+        service = SimilarityService(
+            "test-model", inference_backend="onnx", model_cache_dir="/tmp/models"
+        )
+        await service.load_model()
+
+        loader.assert_called_once_with(
+            "test-model", "onnx", cache_dir="/tmp/models", quantization_config="avx2"
+        )
+        assert service.model is loader.return_value
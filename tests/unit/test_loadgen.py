@@ -0,0 +1,124 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from similarity_search.benchmarks.loadgen import (
+    LatencyHistogram,
+    LoadReport,
+    RequestMix,
+    main,
+    run_load,
+)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_histogram_percentiles_within_precision() -> None:
+    """Test that percentiles are within the relative precision of the buckets."""
+    histogram = LatencyHistogram()
+    for millis in range(1, 1001):
+        histogram.record(millis / 1000)
+
+    assert histogram.count == 1000
+    assert histogram.value_at_percentile(50) == pytest.approx(500, rel=1 / 64)
+    assert histogram.value_at_percentile(99) == pytest.approx(990, rel=1 / 64)
+    assert histogram.value_at_percentile(100) == 1000
+    assert histogram.to_dict()["min_ms"] == 1
+    assert sum(count for _, count in histogram.to_dict()["buckets"]) == 1000
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_histogram_small_values_are_exact() -> None:
+    """Test that latencies below the sub-bucket count are recorded exactly."""
+    histogram = LatencyHistogram(significant_bits=7)
+    histogram.record(0.000042)
+
+    assert histogram.value_at_percentile(50) == 0.042
+    assert LatencyHistogram().value_at_percentile(99) == 0.0
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_request_mix() -> None:
+    """Test the payload shapes and the catalogs of a mix."""
+    mix = RequestMix.parse(
+        '[{"texts": 2, "products": 5, "top_k": 3, "return_products": false},'
+        ' {"texts": 1, "catalog_id": "c1", "weight": 0}]',
+        variants=4,
+    )
+
+    payload = mix.next_payload()
+    assert len(payload["text"]) == 2
+    assert len(payload["products"]) == 5
+    assert payload["top_k"] == 3
+    assert payload["return_products"] is False
+    assert mix.catalog_ids() == ["c1"]
+
+    with pytest.raises(ValueError, match="needs products or a catalog_id"):
+        RequestMix([{"texts": 1}])
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_report_counts_errors() -> None:
+    """Test that failed requests count in the error rate, not in the latency."""
+    report = LoadReport("closed")
+    report.record("200", 0.01)
+    report.record("503", 0.001)
+    report.record("ReadTimeout", 30.0)
+    report.duration = 1.0
+
+    summary = report.to_dict()
+
+    assert summary["completed"] == 3
+    assert summary["error_rate"] == pytest.approx(2 / 3, rel=1e-3)
+    assert summary["goodput_qps"] == 1.0
+    assert summary["latency"]["count"] == 1
+    assert summary["error_latency"]["count"] == 2
+
+
+@pytest.mark.unit  # type: ignore[misc]
+async def test_closed_loop_in_process() -> None:
+    """Test a short closed-loop run against the in-process app."""
+    mix = RequestMix(
+        [{"texts": 1, "products": 10, "top_k": 3}, {"texts": 2, "catalog_id": "c1"}]
+    )
+
+    report = await run_load(mix, "closed", duration=0.3, concurrency=4)
+
+    summary = report.to_dict()
+    assert summary["completed"] == summary["sent"] > 0
+    assert summary["statuses"] == {"200": summary["completed"]}
+    assert summary["latency"]["percentiles_ms"]["p99"] > 0
+
+
+@pytest.mark.unit  # type: ignore[misc]
+async def test_open_loop_counts_rejections() -> None:
+    """Test that an open-loop run above capacity records 503s as errors."""
+    mix = RequestMix([{"texts": 1, "products": 200, "top_k": 3}])
+
+    report = await run_load(
+        mix, "open", duration=0.3, rate=400, workers=1, queue_size=0, poisson=True
+    )
+
+    summary = report.to_dict()
+    assert summary["completed"] == summary["sent"] > 0
+    assert summary["statuses"].get("503", 0) > 0
+    assert summary["error_rate"] > 0
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_main_writes_report(tmp_path: Path) -> None:
+    """Test the command line run and its JSON report."""
+    output = tmp_path / "load.json"
+
+    assert main(["--duration=0.2", "--concurrency=2", f"--output={output}"]) == 0
+
+    report = json.loads(output.read_text())
+    assert report["mode"] == "closed"
+    assert report["completed"] > 0
+
+
+@pytest.mark.unit  # type: ignore[misc]
+async def test_unknown_mode() -> None:
+    """Test that an unknown load mode is rejected."""
+    with pytest.raises(ValueError, match="Unknown load mode"):
+        await run_load(RequestMix.parse('[{"products": 2}]'), "burst", duration=0.1)
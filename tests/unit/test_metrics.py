@@ -0,0 +1,67 @@
+import pytest
+
+from similarity_search.core.metrics import REGISTRY, render_metrics, time_stage
+
+
+def _count(stage: str) -> float:
+    value = REGISTRY.get_sample_value(
+        "similarity_stage_seconds_count", {"stage": stage}
+    )
+    return value or 0.0
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_time_stage_records_on_error() -> None:
+    """Test that a stage is timed even when its block raises."""
+    before = _count("unit-test")
+
+    with pytest.raises(ValueError), time_stage("unit-test"):
+        raise ValueError("boom")
+
+    assert _count("unit-test") == before + 1
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_render_service_metrics() -> None:
+    """Test the metrics read from the service statistics at scrape time."""
+    stats = {
+        "catalogs": 2,
+        "embedding_cache": {"hits": 3, "misses": 1, "bytes": 128},
+        "executor": {
+            "in_flight": 1,
+            "queued": 4,
+            "completed": 10,
+            "rejected": 2,
+            "abandoned": 3,
+            "abandoned_seconds": 0.5,
+        },
+        "shards": {
+            "searches": 5,
+            "timeouts": 1,
+            "errors": 0,
+            "overloaded": 0,
+            "restarts": 1,
+        },
+        "result_cache": {"hits": 7, "misses": 2, "coalesced": 1, "entries": 2},
+    }
+
+    metrics = render_metrics(lambda: stats).decode()
+
+    assert "similarity_catalogs 2.0" in metrics
+    assert "embedding_cache_hit_ratio 0.75" in metrics
+    assert "embedding_cache_hits_total 3.0" in metrics
+    assert "inference_queued 4.0" in metrics
+    assert "inference_rejected_total 2.0" in metrics
+    assert "inference_abandoned_seconds_total 0.5" in metrics
+    assert "similarity_shard_timeouts_total 1.0" in metrics
+    assert "similarity_shard_restarts_total 1.0" in metrics
+    assert "result_cache_hits_total 7.0" in metrics
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_render_without_cache_or_executor() -> None:
+    """Test that optional components are skipped when disabled."""
+    metrics = render_metrics(lambda: {"catalogs": 0, "embedding_cache": None})
+
+    assert b"embedding_cache_hits" not in metrics
+    assert b"inference_queued" not in metrics
@@ -0,0 +1,126 @@
+import os
+from typing import Any, Generator, List
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from similarity_search.services.model_pool import ModelWorkerPool
+
+
+class _LengthModel:
+    """Picklable stand-in model encoding a text as [len, pid, 1]."""
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return 3
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        if "boom" in texts:
+            raise ValueError("cannot encode boom")
+        return np.array([[len(text), os.getpid(), 1.0] for text in texts])
+
+
+def _load_length_model(*args: Any, **kwargs: Any) -> _LengthModel:
+    return _LengthModel()
+
+
+def _load_broken_model() -> _LengthModel:
+    raise OSError("model not found")
+
+
+@pytest.fixture  # type: ignore[misc]
+def pool() -> Generator[ModelWorkerPool, None, None]:
+    """Fixture for a running pool of two workers."""
+    pool = ModelWorkerPool(_load_length_model, workers=2, max_texts=4)
+    pool.start()
+    yield pool
+    pool.stop()
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_encode_spreads_chunks_over_workers(pool: ModelWorkerPool) -> None:
+    """Test that embeddings come back in order, encoded by both processes."""
+    texts = ["a" * n for n in range(1, 11)]
+
+    embeddings = pool.encode(texts)
+
+    assert embeddings.dtype == np.float32
+    np.testing.assert_array_equal(embeddings[:, 0], np.arange(1, 11))
+    assert len(set(embeddings[:, 1])) == 2
+    assert os.getpid() not in set(embeddings[:, 1])
+    assert pool.get_sentence_embedding_dimension() == 3
+    assert pool.stats()["chunks"] == 3
+    assert pool.encode([]).shape == (0, 3)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_worker_errors_are_raised(pool: ModelWorkerPool) -> None:
+    """Test that an encode error in a worker fails the call but not the pool."""
+    with pytest.raises(RuntimeError, match="cannot encode boom"):
+        pool.encode(["boom"])
+
+    assert pool.encode(["ok"])[0, 0] == 2
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_exited_worker_is_restarted() -> None:
+    """Test that a worker killed between calls is replaced by a new process."""
+    pool = ModelWorkerPool(_load_length_model, workers=1, max_texts=4)
+    pool.start()
+    try:
+        pid = int(pool.encode(["a"])[0, 1])
+        pool._workers[0].process.kill()
+        pool._workers[0].process.join()
+
+        with pytest.raises(RuntimeError, match="Model worker exited"):
+            pool.encode(["a"])
+        # The next chunk waits for the replacement to be idle.
+        embeddings = pool.encode(["ab"])
+
+        assert embeddings[0, 0] == 2
+        assert int(embeddings[0, 1]) != pid
+        assert pool.stats()["restarts"] == 1
+        assert len(pool._workers) == 1
+    finally:
+        pool.stop()
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_start_fails_when_model_cannot_load() -> None:
+    """Test that a worker failing to load the model fails the start."""
+    pool = ModelWorkerPool(_load_broken_model, workers=1)
+
+    with pytest.raises(RuntimeError, match="model not found"):
+        pool.start()
+    assert not pool.running
+    with pytest.raises(RuntimeError, match="not running"):
+        pool.encode(["saw"])
+
+
+@pytest.mark.unit  # type: ignore[misc]
+async def test_service_uses_worker_pool() -> None:
+    """Test that the service encodes through the pool and stops it on cleanup."""
+    # Imported here so that worker processes unpickling the stand-in model from
+    # this module do not import sentence-transformers.
+    from similarity_search.services.product_similarity import SimilarityService
+
+    service = SimilarityService("test-model", model_workers=2)
+    with (
+        patch(
+            "similarity_search.services.product_similarity.load_inference_model",
+            _load_length_model,
+        ),
+        patch(
+            "similarity_search.services.product_similarity.partial",
+            lambda fn, *args, **kwargs: fn,
+        ),
+    ):
+        await service.load_model()
+    assert isinstance(service.model, ModelWorkerPool)
+
+    results = service.find_similar(["saw"], ["hammer", "saw"], top_k=1)
+
+    assert len(results[0]) == 1
+    assert service.stats()["model_workers"]["workers"] == 2
+    await service.cleanup()
+    assert service.model is None
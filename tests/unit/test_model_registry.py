@@ -0,0 +1,158 @@
+import asyncio
+from typing import List
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+import torch
+
+from similarity_search.core.exceptions import ModelNotFoundError
+from similarity_search.services.model_registry import ModelRegistry
+from similarity_search.services.product_similarity import SimilarityService
+
+
+class _Service(SimilarityService):
+    """Service whose model is a mock with 4-dimensional embeddings."""
+
+    async def load_model(self) -> None:
+        if self.model_name == "broken":
+            raise OSError("download failed")
+        self.model = MagicMock()
+        self.model.encode = MagicMock(
+            side_effect=lambda texts: np.ones((len(texts), 4), dtype=np.float32)
+        )
+        self.model.get_sentence_embedding_dimension.return_value = 4
+        self.model.parameters.return_value = [torch.zeros(1000)]
+        self.model.buffers.return_value = []
+
+
+def _registry(loaded: List[str], **options: object) -> ModelRegistry:
+    def factory(model_name: str) -> SimilarityService:
+        loaded.append(model_name)
+        return _Service(model_name, warmup_batch_sizes=[1])
+
+    return ModelRegistry(_Service("base", warmup_batch_sizes=[1]), factory, **options)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+async def test_routes_requests_and_loads_on_demand() -> None:
+    """Test routing by name and a single load for concurrent first requests."""
+    loaded: List[str] = []
+    registry = _registry(loaded, models={"small": "model-small"})
+    await registry.start()
+
+    default = await registry.acquire(None)
+    assert default is registry.default
+    small, again = await asyncio.gather(
+        registry.acquire("small"), registry.acquire("small")
+    )
+    assert small is again
+    assert (small.model_name, loaded) == ("model-small", ["model-small"])
+    assert small.memory_bytes == 4000
+    assert registry.memory_bytes == 8000
+    with pytest.raises(ModelNotFoundError, match="Model 'large' not found"):
+        await registry.acquire("large")
+
+    for service in (default, small, again):
+        await registry.release(service)
+    assert [info["name"] for info in registry.info()] == ["base", "small"]
+    await registry.cleanup()
+    assert list(registry.services) == ["base"]
+    assert registry.default.model is None
+
+
+@pytest.mark.unit  # type: ignore[misc]
+async def test_hot_swap_keeps_serving_until_released() -> None:
+    """Test that a swapped out service is cleaned up once its requests finish."""
+    registry = _registry([], models={"next": "base-v2"})
+    await registry.start()
+    registry.default.register_catalog("tools", ["saw", "drill"], metadata=[{}, None])
+    in_flight = await registry.acquire()
+
+    swapped = await registry.load("base", "base-v2")
+
+    assert registry.default is swapped
+    assert (registry.swaps, registry.models["base"]) == (1, "base-v2")
+    assert swapped.get_catalog("tools").products == ["saw", "drill"]
+    assert swapped.get_catalog("tools").metadata == [{}, None]
+    assert in_flight.model is not None
+    await registry.release(in_flight)
+    assert in_flight.model is None
+
+    reloaded = await registry.load("base")
+    assert reloaded.get_catalog("tools") is swapped.get_catalog("tools")
+    assert swapped.model is None
+    await registry.cleanup()
+
+
+@pytest.mark.unit  # type: ignore[misc]
+async def test_evicts_least_recently_used_models() -> None:
+    """Test that the least recently used models are unloaded over the budget."""
+    registry = _registry(
+        [],
+        models={"a": "model-a", "b": "model-b", "c": "model-c"},
+        memory_budget_bytes=12000,
+    )
+    await registry.start()
+    for name in ("a", "b", "a", "c"):
+        await registry.release(await registry.acquire(name))
+
+    assert list(registry.services) == ["base", "a", "c"]
+    assert registry.stats() == {
+        "loaded": ["base", "a", "c"],
+        "memory_bytes": 12000,
+        "memory_budget_bytes": 12000,
+        "swaps": 0,
+        "evictions": 1,
+    }
+    assert registry.info()[2] == {
+        "name": "b",
+        "model_name": "model-b",
+        "default": False,
+        "loaded": False,
+        "loading": None,
+        "memory_bytes": 0,
+    }
+
+    registry.memory_budget_bytes = 1
+    await registry.load("b")
+    assert list(registry.services) == ["base", "b"]
+
+    await registry.unload("b")
+    with pytest.raises(ModelNotFoundError):
+        await registry.unload("b")
+    with pytest.raises(ValueError, match="default model cannot be unloaded"):
+        await registry.unload("base")
+    await registry.cleanup()
+
+
+@pytest.mark.unit  # type: ignore[misc]
+async def test_failed_load_keeps_current_model() -> None:
+    """Test that a failed swap is logged and leaves the served model in place."""
+    registry = _registry([], models={"other": "broken"})
+    await registry.start()
+    default = registry.default
+
+    load = registry.load_in_background("base", "broken")
+    assert registry.info()[0]["loading"] == "broken"
+    with pytest.raises(OSError, match="download failed"):
+        await load
+
+    assert registry.default is default
+    assert registry.info()[0]["loading"] is None
+    await registry.cleanup()
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_only_configured_models_are_loaded() -> None:
+    """Test that names and models missing from the configuration are refused."""
+    loaded: List[str] = []
+    registry = _registry(loaded, models={"small": "model-small"})
+
+    with pytest.raises(ModelNotFoundError, match="Model 'large' not found"):
+        registry.load_in_background("large", "model-small")
+    with pytest.raises(ValueError, match="model '/etc/model' is not configured"):
+        registry.load_in_background("small", "/etc/model")
+
+    assert loaded == []
+    assert registry.info()[1]["loading"] is None
@@ -1,7 +1,13 @@
 import pytest
 from pydantic import ValidationError
 
-from similarity_search.api.models import Query, SimilarityMatch, SimilarityResult
+from similarity_search.api.models import (
+    CatalogCreate,
+    Query,
+    SimilarityMatch,
+    SimilarityResult,
+    VectorQuery,
+)
 
 
 @pytest.mark.unit
@@ -14,6 +20,7 @@ class TestQuery:
         assert query.text == ["sample query"]
         assert query.products == ["product 1", "product 2"]
         assert query.top_k == 2
+        assert query.return_products is True
 
     def test_empty_text_list(self) -> None:
         """Test validation error for empty text list."""
@@ -41,6 +48,44 @@ class TestQuery:
             exc_info.value
         )
 
+    def test_query_with_catalog(self) -> None:
+        """Test creating a Query that references a catalog."""
+        query = Query(text=["query"], catalog_id="tools", top_k=5)
+        assert query.products is None
+        assert query.catalog_id == "tools"
+
+    def test_products_and_catalog_exclusive(self) -> None:
+        """Test validation error when both or neither product sources are given."""
+        for kwargs in ({}, {"products": ["product"], "catalog_id": "tools"}):
+            with pytest.raises(ValidationError) as exc_info:
+                Query(text=["query"], top_k=1, **kwargs)
+            assert "exactly one of products or catalog_id" in str(exc_info.value)
+
+
+@pytest.mark.unit
+class TestCatalogCreate:
+    def test_valid_catalog(self) -> None:
+        """Test creating a valid CatalogCreate instance."""
+        catalog = CatalogCreate(catalog_id="tools", products=["saw"], ids=["sku-1"])
+        assert catalog.ids == ["sku-1"]
+
+    def test_empty_products_list(self) -> None:
+        """Test validation error for empty products list."""
+        with pytest.raises(ValidationError) as exc_info:
+            CatalogCreate(catalog_id="tools", products=[])
+        assert "products list cannot be empty" in str(exc_info.value)
+
+    def test_invalid_ids(self) -> None:
+        """Test validation errors for misaligned and duplicated ids."""
+        with pytest.raises(ValidationError) as exc_info:
+            CatalogCreate(catalog_id="tools", products=["saw"], ids=["a", "b"])
+        assert "number of ids (2) must match number of products (1)" in str(
+            exc_info.value
+        )
+        with pytest.raises(ValidationError) as exc_info:
+            CatalogCreate(catalog_id="tools", products=["saw", "axe"], ids=["a", "a"])
+        assert "ids must be unique" in str(exc_info.value)
+
 
 @pytest.mark.unit
 class TestSimilarityMatch:
@@ -73,3 +118,44 @@ class TestSimilarityResult:
         assert result.query == "test query"
         assert len(result.matches) == 2
         assert result.matches[0].score == 0.9
+
+
+@pytest.mark.unit
+class TestVectorQuery:
+    def test_valid_vector_queries(self) -> None:
+        """Test the accepted combinations of texts, vectors and catalogs."""
+        query = VectorQuery(vectors=["AAAA"], catalog_id="tools", top_k=3)
+        assert query.dtype == "float32"
+        assert query.return_products is True
+        VectorQuery(text=["q"], product_vectors=["AAAA"], products=["p"], top_k=1)
+        VectorQuery(
+            vectors=["AAAA"], product_vectors=["AAAA"], top_k=1, return_products=False
+        )
+
+    @pytest.mark.parametrize(
+        "fields, message",
+        [
+            ({"catalog_id": "tools"}, "exactly one of text or vectors"),
+            ({"text": [], "catalog_id": "tools"}, "exactly one of text or vectors"),
+            (
+                {"text": ["q"], "vectors": ["AAAA"], "catalog_id": "tools"},
+                "exactly one of text or vectors",
+            ),
+            ({"text": ["q"]}, "exactly one of products, product_vectors"),
+            (
+                {"text": ["q"], "products": ["p"], "catalog_id": "tools"},
+                "exactly one of products, product_vectors",
+            ),
+            ({"text": ["q"], "products": []}, "products cannot be empty"),
+            ({"text": ["q"], "products": ["p"], "top_k": 2}, "cannot be greater"),
+            (
+                {"text": ["q"], "products": ["p", "r"], "product_vectors": ["AAAA"]},
+                "one text per product vector",
+            ),
+            ({"text": ["q"], "product_vectors": ["AAAA"]}, "products are required"),
+        ],
+    )
+    def test_invalid_vector_queries(self, fields: dict, message: str) -> None:
+        """Test validation errors of inconsistent vector queries."""
+        with pytest.raises(ValidationError, match=message):
+            VectorQuery(**{"top_k": 1, **fields})
@@ -1,7 +1,17 @@
+from pathlib import Path
+from typing import Any, Dict, List
 from unittest.mock import MagicMock, call, patch
 
+import numpy as np
 import pytest
 
+from similarity_search.core.cancellation import CancellationToken, cancellation_scope
+from similarity_search.core.exceptions import (
+    CatalogNotFoundError,
+    EmbeddingMismatchError,
+    RequestCancelledError,
+)
+from similarity_search.services.embedding_store import EmbeddingStore
 from similarity_search.services.product_similarity import SimilarityService
 
 
@@ -9,11 +19,13 @@ from similarity_search.services.product_similarity import SimilarityService
 async def test_model_loading() -> None:
     """Test model loading."""
     with patch(
-        "similarity_search.services.product_similarity.SentenceTransformer"
+        "similarity_search.services.product_similarity.load_inference_model"
     ) as mock:
-        service = SimilarityService("test-model")
+        service = SimilarityService("test-model", warmup_batch_sizes=[])
         await service.load_model()
-        mock.assert_called_once_with("test-model")
+        mock.assert_called_once_with(
+            "test-model", "torch", cache_dir=None, quantization_config="avx2"
+        )
 
 
 @pytest.mark.unit  # type: ignore[misc]
@@ -54,6 +66,26 @@ def test_find_similar(similarity_service: SimilarityService) -> None:
     assert results[0][0]["score"] == 0.95
 
 
+@pytest.mark.unit  # type: ignore[misc]
+def test_find_similar_index_only(similarity_service: SimilarityService) -> None:
+    """Test that matches carry the product index instead of its text on request.
+
+    Args:
+        similarity_service: Fixture providing a mocked similarity service.
+    """
+    similarity_service.model.encode = MagicMock(return_value=[[1.0]])
+
+    with patch(
+        "sentence_transformers.util.semantic_search",
+        return_value=[[{"corpus_id": 1, "score": 0.95}]],
+    ):
+        results = similarity_service.find_similar(
+            ["test query"], ["saw", "drill"], 1, return_products=False
+        )
+
+    assert results == [[{"index": 1, "score": 0.95}]]
+
+
 @pytest.mark.unit  # type: ignore[misc]
 def test_find_similar_model_not_loaded(similarity_service: SimilarityService) -> None:
     """Test find similar model not loaded.
@@ -65,3 +97,779 @@ def test_find_similar_model_not_loaded(similarity_service: SimilarityService) ->
 
     with pytest.raises(RuntimeError, match="Model not loaded"):
         similarity_service.find_similar(["query"], ["product"], 1)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_register_catalog(similarity_service: SimilarityService) -> None:
+    """Test that registering a catalog encodes and stores its products once.
+
+    Args:
+        similarity_service: Fixture providing a mocked similarity service.
+    """
+    similarity_service.model.encode = MagicMock(
+        return_value=np.array([[1.0, 0.0], [0.0, 1.0]])
+    )
+
+    catalog = similarity_service.register_catalog("tools", ["saw", "hammer"])
+
+    similarity_service.model.encode.assert_called_once_with(["saw", "hammer"])
+    assert catalog.size == 2
+    assert catalog.ids == ["0", "1"]
+    assert catalog.dimension == 2
+    assert similarity_service.get_catalog("tools") is catalog
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_find_similar_with_catalog(similarity_service: SimilarityService) -> None:
+    """Test that searching a catalog only encodes the queries.
+
+    Args:
+        similarity_service: Fixture providing a mocked similarity service.
+    """
+    similarity_service.model.encode = MagicMock(
+        return_value=np.array([[1.0, 0.0], [0.0, 1.0]])
+    )
+    similarity_service.register_catalog("tools", ["saw", "hammer"], ids=["a", "b"])
+
+    similarity_service.model.encode = MagicMock(return_value=np.array([[0.0, 1.0]]))
+    results = similarity_service.find_similar(
+        ["nail it"], None, top_k=1, catalog_id="tools"
+    )
+
+    similarity_service.model.encode.assert_called_once_with(["nail it"])
+    assert results == [[{"product": "hammer", "score": 1.0}]]
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_find_similar_unknown_catalog(similarity_service: SimilarityService) -> None:
+    """Test that searching an unknown catalog raises CatalogNotFoundError.
+
+    Args:
+        similarity_service: Fixture providing a mocked similarity service.
+    """
+    with pytest.raises(CatalogNotFoundError, match="Catalog 'missing' not found"):
+        similarity_service.find_similar(["query"], None, 1, catalog_id="missing")
+
+    with pytest.raises(ValueError, match="Either products or catalog_id"):
+        similarity_service.find_similar(["query"], None, 1)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_delete_catalog(similarity_service: SimilarityService) -> None:
+    """Test that deleting a catalog removes it and unknown ids raise.
+
+    Args:
+        similarity_service: Fixture providing a mocked similarity service.
+    """
+    similarity_service.model.encode = MagicMock(return_value=np.array([[1.0]]))
+    similarity_service.register_catalog("tools", ["saw"])
+
+    similarity_service.delete_catalog("tools")
+
+    assert "tools" not in similarity_service.catalogs
+    with pytest.raises(CatalogNotFoundError):
+        similarity_service.delete_catalog("tools")
+    similarity_service.model = None
+    with pytest.raises(RuntimeError, match="Model not loaded"):
+        similarity_service.register_catalog("tools", ["saw"])
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_find_similar_uses_embedding_cache() -> None:
+    """Test that only texts missing from the embedding cache are encoded."""
+    service = SimilarityService("test-model", embedding_cache_max_bytes=1024)
+    service.model = MagicMock()
+    service.model.encode = MagicMock(
+        side_effect=lambda texts: np.array([[float(len(t)), 1.0] for t in texts])
+    )
+
+    service.find_similar(["query", "query"], ["saw", "hammer"], 1)
+    results = service.find_similar(["query", "nails"], ["saw", "hammer"], 1)
+
+    service.model.encode.assert_has_calls(
+        [call(["query"]), call(["saw", "hammer"]), call(["nails"])]
+    )
+    assert service.model.encode.call_count == 3
+    assert len(results) == 2
+    assert service.stats()["embedding_cache"]["hits"] == 3
+    assert service.stats()["embedding_cache"]["misses"] == 5
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_cancelled_encoding_stops_between_chunks() -> None:
+    """Test that texts of a cancelled request are not encoded past one chunk."""
+    service = SimilarityService("test-model", encode_chunk_size=2)
+    service.model = MagicMock()
+    token = CancellationToken()
+
+    def encode(texts: List[str]) -> np.ndarray:
+        token.cancel("disconnected")
+        return np.ones((len(texts), 2))
+
+    service.model.encode = MagicMock(side_effect=encode)
+
+    with cancellation_scope(token):
+        with pytest.raises(RequestCancelledError, match="during encoding"):
+            service.find_similar(["query"], ["saw", "hammer", "drill"], 1)
+    service.model.encode.assert_called_once_with(["query"])
+
+    service.model.encode = MagicMock(side_effect=lambda texts: np.ones((len(texts), 2)))
+    with cancellation_scope(CancellationToken()):
+        service.find_similar(["query"], ["saw", "hammer", "drill"], 1)
+    assert service.model.encode.call_args_list == [
+        call(["query"]),
+        call(["saw", "hammer"]),
+        call(["drill"]),
+    ]
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_cancellable_request_is_encoded_in_one_call() -> None:
+    """Test that requests below the chunk size keep a single encode call."""
+    service = SimilarityService("test-model")
+    service.model = MagicMock()
+    service.model.encode = MagicMock(side_effect=lambda texts: np.ones((len(texts), 2)))
+    texts = [f"query {i}" for i in range(256)]
+
+    with cancellation_scope(CancellationToken.with_timeout(60_000)):
+        embeddings = service.embed(texts)
+
+    assert embeddings.shape == (256, 2)
+    service.model.encode.assert_called_once_with(texts)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_catalogs_persist_in_embedding_store(tmp_path: Path) -> None:
+    """Test that catalogs survive a restart through the embedding store."""
+    store = EmbeddingStore(str(tmp_path))
+    service = SimilarityService("test-model", embedding_store=store)
+    service.model = MagicMock()
+    service.model.encode = MagicMock(return_value=np.array([[1.0, 0.0], [0.0, 1.0]]))
+    service.register_catalog("tools", ["saw", "hammer"])
+
+    restarted = SimilarityService("test-model", embedding_store=store)
+    restarted.load_catalogs()
+    assert isinstance(restarted.get_catalog("tools").embeddings, np.memmap)
+
+    sibling = SimilarityService("test-model", embedding_store=store)
+    assert sibling.get_catalog("tools").products == ["saw", "hammer"]
+
+    sibling.delete_catalog("tools")
+    assert store.catalog_ids("test-model") == []
+    with pytest.raises(CatalogNotFoundError):
+        sibling.delete_catalog("tools")
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_models_sharing_a_store_keep_their_catalogs(tmp_path: Path) -> None:
+    """Test that two models registering the same catalog id do not clash."""
+    store = EmbeddingStore(str(tmp_path))
+    services = {}
+    for name, products in (("model-a", ["saw", "hammer"]), ("model-b", ["drill"])):
+        service = SimilarityService(name, embedding_store=store)
+        service.model = MagicMock()
+        service.model.encode = MagicMock(
+            side_effect=lambda texts: np.ones((len(texts), 2))
+        )
+        service.register_catalog("tools", products)
+        services[name] = service
+
+    services["model-b"].delete_catalog("tools")
+
+    restarted = SimilarityService("model-a", embedding_store=store)
+    restarted.load_catalogs()
+    assert restarted.get_catalog("tools").products == ["saw", "hammer"]
+    with pytest.raises(CatalogNotFoundError):
+        SimilarityService("model-b", embedding_store=store).get_catalog("tools")
+
+
+@pytest.mark.unit  # type: ignore[misc]
+async def test_find_similar_with_micro_batching() -> None:
+    """Test that the micro-batcher runs between load_model and cleanup."""
+    with patch(
+        "similarity_search.services.product_similarity.load_inference_model"
+    ) as mock:
+        mock.return_value.encode = MagicMock(
+            side_effect=lambda texts: np.ones((len(texts), 2))
+        )
+        service = SimilarityService("test-model", batch_max_size=4)
+        await service.load_model()
+        assert service.batcher is not None and service.batcher.running
+
+        results = service.find_similar(["query"], ["saw", "hammer"], 2)
+
+        assert len(results[0]) == 2
+        assert service.stats()["batching"]["batches"] == 2
+        await service.cleanup()
+        assert not service.batcher.running
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_find_similar_with_ann_index() -> None:
+    """Test that large catalogs get an IVF index used by find_similar."""
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(500, 8)).astype(np.float32)
+    service = SimilarityService(
+        "test-model",
+        ann_index="ivf",
+        ann_min_catalog_size=100,
+        ann_params={"nlist": 16, "nprobe": 2},
+    )
+    service.model = MagicMock()
+    service.model.encode = MagicMock(return_value=embeddings)
+    catalog = service.register_catalog("big", [f"p{i}" for i in range(500)])
+    assert catalog.index is not None and catalog.index.kind == "ivf"
+
+    service.model.encode = MagicMock(return_value=embeddings[:1])
+    results = service.find_similar(["q"], None, 3, catalog_id="big", nprobe=16)
+
+    assert results[0][0] == {"product": "p0", "score": 1.0}
+    assert len(results[0]) == 3
+    assert service.evaluate_index("big", top_k=5, nprobe=16) == 1.0
+
+    index = service.build_index("big", "exact")
+    # The new index is published with a copy, the previous snapshot is unchanged.
+    assert catalog.index is not None and catalog.index.kind == "ivf"
+    assert service.get_catalog("big").index is index
+    assert service.get_catalog("big").embeddings is catalog.embeddings
+    assert service.evaluate_index("big") == 1.0
+    service.get_catalog("big").index = None
+    assert service.evaluate_index("big") == 1.0
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_find_similar_with_quantized_catalog() -> None:
+    """Test that quantized catalogs return rescored matches in the usual shape."""
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(300, 16)).astype(np.float32)
+    service = SimilarityService("test-model", quantization="int8", rescore_factor=4)
+    service.model = MagicMock()
+    service.model.encode = MagicMock(return_value=embeddings)
+    catalog = service.register_catalog("tools", [f"p{i}" for i in range(300)])
+    assert catalog.quantized is not None
+
+    service.model.encode = MagicMock(return_value=embeddings[7:8])
+    results = service.find_similar(["q"], None, 2, catalog_id="tools")
+
+    assert results[0][0] == {"product": "p7", "score": 1.0}
+    assert service.stats()["quantized_catalog_bytes"] == 300 * 16
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_indexed_catalogs_are_not_quantized() -> None:
+    """Test that only the index is built for catalogs searched through it."""
+    service = SimilarityService(
+        "test-model", ann_index="exact", ann_min_catalog_size=100, quantization="int8"
+    )
+    service.model = MagicMock()
+    service.model.encode = MagicMock(
+        side_effect=lambda texts: np.random.default_rng(0).normal(size=(len(texts), 8))
+    )
+
+    large = service.register_catalog("large", [f"p{i}" for i in range(100)])
+    small = service.register_catalog("small", [f"p{i}" for i in range(99)])
+
+    assert (large.index is not None, large.quantized) == (True, None)
+    assert (small.index, small.quantized is not None) == (None, True)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+@pytest.mark.parametrize(  # type: ignore[misc]
+    "backend", ["sentence_transformers", "numpy"]
+)
+def test_search_backends_agree(backend: str) -> None:
+    """Test that the numpy engine ranks catalogs and inline products like torch."""
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(100, 16)).astype(np.float32)
+    service = SimilarityService("test-model", search_backend=backend)
+    service.model = MagicMock()
+    service.model.encode = MagicMock(return_value=embeddings)
+    catalog = service.register_catalog("tools", [f"p{i}" for i in range(100)])
+    assert catalog.normalized == (backend == "numpy")
+
+    service.model.encode = MagicMock(return_value=embeddings[7:8] * 2)
+    results = service.find_similar(["q"], None, 3, catalog_id="tools")
+    assert results[0][0] == {"product": "p7", "score": 1.0}
+
+    service.model.encode = MagicMock(side_effect=[embeddings[7:8], embeddings[:20]])
+    inline = service.find_similar(["q"], [f"p{i}" for i in range(20)], 3)
+    assert inline[0][0] == {"product": "p7", "score": 1.0}
+    assert len(inline[0]) == 3
+
+
+@pytest.mark.unit  # type: ignore[misc]
+async def test_warmup_runs_each_batch_size() -> None:
+    """Test that warmup encodes each batch size and marks the service ready."""
+    with patch(
+        "similarity_search.services.product_similarity.load_inference_model"
+    ) as mock:
+        mock.return_value.encode = MagicMock(
+            side_effect=lambda texts: np.ones((len(texts), 2))
+        )
+        service = SimilarityService(
+            "test-model", warmup_batch_sizes=[1, 4], search_backend="numpy"
+        )
+        await service.load_model()
+        assert not service.ready
+
+        service.warmup()
+
+        assert [len(c.args[0]) for c in mock.return_value.encode.call_args_list] == [
+            1,
+            4,
+        ]
+        assert service.ready
+        assert service.startup_stats()["warmup_seconds"] >= 0
+        await service.cleanup()
+        assert not service.ready
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_warmup_model_not_loaded() -> None:
+    """Test that warmup requires a loaded model."""
+    with pytest.raises(RuntimeError, match="Model not loaded"):
+        SimilarityService("test-model").warmup()
+
+
+def _vector_service() -> SimilarityService:
+    service = SimilarityService("test-model", search_backend="numpy")
+    service.model = MagicMock()
+    service.model.get_sentence_embedding_dimension.return_value = 2
+    service.model.encode = MagicMock(
+        side_effect=lambda texts: np.array(
+            [[1.0, 0.0] if "saw" in t else [0.0, 1.0] for t in texts]
+        )
+    )
+    return service
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_embed() -> None:
+    """Test that texts are embedded as float32 rows, normalized on request."""
+    service = _vector_service()
+    service.model.encode.side_effect = lambda texts: np.full((len(texts), 2), 3.0)
+
+    embeddings = service.embed(["saw", "hammer"])
+    normalized = service.embed(["saw"], normalized=True)
+
+    assert embeddings.dtype == np.float32
+    assert embeddings.tolist() == [[3.0, 3.0], [3.0, 3.0]]
+    np.testing.assert_allclose(np.linalg.norm(normalized, axis=1), 1.0)
+    assert service.dimension == 2
+    service.model = None
+    assert service.dimension is None
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_find_similar_by_vector_skips_the_model() -> None:
+    """Test that embeddings on both sides are searched without encoding."""
+    service = _vector_service()
+    service.model = None
+
+    results = service.find_similar_by_vector(
+        1,
+        query_embeddings=[[0.9, 0.1], [0.1, 0.9]],
+        product_embeddings=[[1.0, 0.0], [0.0, 1.0]],
+        products=["saw", "hammer"],
+    )
+    index_results = service.find_similar_by_vector(
+        1,
+        query_embeddings=[[0.1, 0.9]],
+        product_embeddings=[[1.0, 0.0], [0.0, 1.0]],
+        return_products=False,
+    )
+
+    assert [r[0]["product"] for r in results] == ["saw", "hammer"]
+    assert index_results == [[{"index": 1, "score": 0.9939}]]
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_find_similar_by_vector_mixes_texts_and_embeddings() -> None:
+    """Test query embeddings against texts or a catalog, and text queries."""
+    service = _vector_service()
+    service.register_catalog("tools", ["hammer", "saw"], ["h", "s"])
+
+    by_catalog = service.find_similar_by_vector(
+        1, query_embeddings=[[1.0, 0.0]], catalog_id="tools"
+    )
+    by_catalog_id = service.find_similar_by_vector(
+        1, query_embeddings=[[1.0, 0.0]], catalog_id="tools", return_products=False
+    )
+    by_texts = service.find_similar_by_vector(
+        1, query_embeddings=[[0.0, 1.0]], products=["saw", "hammer"]
+    )
+    by_query_text = service.find_similar_by_vector(
+        1,
+        queries=["saw blade"],
+        product_embeddings=[[0.0, 1.0], [1.0, 0.0]],
+        return_products=False,
+    )
+
+    assert by_catalog == [[{"product": "saw", "score": 1.0}]]
+    assert by_catalog_id == [[{"product_id": "s", "score": 1.0}]]
+    assert by_texts == [[{"product": "hammer", "score": 1.0}]]
+    assert by_query_text == [[{"index": 1, "score": 1.0}]]
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_find_similar_by_vector_checks_embeddings() -> None:
+    """Test the model, dimension and argument checks."""
+    service = _vector_service()
+    service.register_catalog("tools", ["hammer", "saw"])
+    vectors = [[1.0, 0.0]]
+
+    with pytest.raises(EmbeddingMismatchError, match="model 'other'"):
+        service.find_similar_by_vector(
+            1, query_embeddings=vectors, catalog_id="tools", model_name="other"
+        )
+    with pytest.raises(EmbeddingMismatchError, match="dimension 3, expected 2"):
+        service.find_similar_by_vector(
+            1, query_embeddings=[[1.0, 0.0, 0.0]], catalog_id="tools"
+        )
+    with pytest.raises(EmbeddingMismatchError, match="must be a matrix"):
+        service.find_similar_by_vector(
+            1,
+            query_embeddings=vectors,
+            product_embeddings=[1.0, 0.0],
+            return_products=False,
+        )
+    with pytest.raises(ValueError, match="Exactly one of queries"):
+        service.find_similar_by_vector(1, catalog_id="tools")
+    with pytest.raises(ValueError, match="Exactly one of products"):
+        service.find_similar_by_vector(
+            1, query_embeddings=vectors, products=["saw"], catalog_id="tools"
+        )
+    with pytest.raises(ValueError, match="one text per product embedding"):
+        service.find_similar_by_vector(
+            1, query_embeddings=vectors, product_embeddings=vectors, products=[]
+        )
+    with pytest.raises(ValueError, match="required to return the product texts"):
+        service.find_similar_by_vector(
+            1, query_embeddings=vectors, product_embeddings=vectors
+        )
+
+
+def _update_service(**options: Any) -> SimilarityService:
+    vectors = {
+        "saw": [1.0, 0.0, 0.0, 0.0],
+        "hammer": [0.0, 1.0, 0.0, 0.0],
+        "mallet": [0.0, 0.9, 0.1, 0.0],
+        "drill": [0.0, 0.0, 1.0, 0.0],
+        "wrench": [0.0, 0.0, 0.0, 1.0],
+    }
+    service = SimilarityService("test-model", **options)
+    service.model = MagicMock()
+    service.model.encode = MagicMock(
+        side_effect=lambda texts: np.array([vectors[t] for t in texts])
+    )
+    service.model.get_sentence_embedding_dimension.return_value = 4
+    return service
+
+
+@pytest.mark.unit  # type: ignore[misc]
+@pytest.mark.parametrize(  # type: ignore[misc]
+    "backend", ["sentence_transformers", "numpy"]
+)
+def test_upsert_and_delete_products(backend: str) -> None:
+    """Test that updates are searchable at once and survive compaction."""
+    service = _update_service(search_backend=backend)
+    service.register_catalog("tools", ["saw", "hammer", "drill"], ["a", "b", "c"])
+
+    catalog, encoded = service.upsert_products(
+        "tools", ["hammer", "wrench", "mallet"], ["b", "d", "b"]
+    )
+    assert encoded == 2
+    assert service.model.encode.call_args.args[0] == ["mallet", "wrench"]
+    assert (catalog.version, catalog.size, catalog.pending) == (2, 4, 3)
+    assert service.upsert_products("tools", ["wrench"], ["d"]) == (catalog, 0)
+
+    catalog, deleted = service.delete_products("tools", ["a", "missing"])
+    assert (deleted, catalog.version, catalog.size) == (1, 3, 3)
+    assert service.delete_products("tools", ["a"]) == (catalog, 0)
+
+    def search() -> List[str]:
+        results = service.find_similar(["hammer"], None, 10, catalog_id="tools")
+        return [match["product"] for match in results[0]]
+
+    assert search()[0] == "mallet"
+    assert sorted(search()) == ["drill", "mallet", "wrench"]
+
+    compacted = service.compact_catalog("tools")
+    assert (compacted.version, compacted.pending) == (4, 0)
+    assert compacted.ids == ["c", "b", "d"]
+    assert len(compacted.embeddings) == 3
+    assert search()[0] == "mallet"
+    assert service.compact_catalog("tools") is compacted
+
+    with pytest.raises(ValueError, match="same length"):
+        service.upsert_products("tools", ["saw"], [])
+    with pytest.raises(CatalogNotFoundError):
+        service.delete_products("missing", ["a"])
+    service.model = None
+    with pytest.raises(RuntimeError, match="Model not loaded"):
+        service.upsert_products("tools", ["saw"], ["a"])
+
+
+@pytest.mark.unit  # type: ignore[misc]
+@pytest.mark.parametrize(  # type: ignore[misc]
+    "options",
+    [
+        {"search_backend": "sentence_transformers"},
+        {"search_backend": "numpy"},
+        {"ann_index": "ivf", "ann_params": {"nlist": 2, "nprobe": 1}},
+        {"quantization": "int8", "rescore_factor": 2},
+    ],
+)
+def test_filtered_catalog_search(options: Dict[str, Any]) -> None:
+    """Test that only products matching the filters are scored in both segments."""
+    service = _update_service(**options)
+    registered = service.register_catalog(
+        "tools",
+        ["saw", "hammer", "drill"],
+        ["a", "b", "c"],
+        metadata=[{"price": 20}, {"price": 5, "brand": "acme"}, None],
+    )
+    service.upsert_products(
+        "tools", ["mallet", "wrench"], ["m", "w"], [{"price": 8}, {"price": 30}]
+    )
+    service.delete_products("tools", ["w"])
+    # The filter columns are built with each version, the main ones shared.
+    catalog = service.get_catalog("tools")
+    assert catalog.main_filters is registered.main_filters
+    assert catalog.delta_filters.size == 2
+
+    def search(filters: Dict[str, Any]) -> List[str]:
+        results = service.find_similar(
+            ["hammer"], None, 2, catalog_id="tools", filters=filters
+        )
+        return [match["product"] for match in results[0]]
+
+    assert search({"price": {"lt": 10}}) == ["hammer", "mallet"]
+    ids = service.find_similar(
+        ["hammer"],
+        None,
+        2,
+        catalog_id="tools",
+        return_products=False,
+        filters={"price": {"lt": 10}},
+    )
+    assert [match["product_id"] for match in ids[0]] == ["b", "m"]
+    assert search({"price": {"gte": 10}}) == ["saw"]
+    assert search({"brand": {"nin": ["acme"]}}) == []
+    assert search({"price": {"gt": 100}}) == []
+
+
+@pytest.mark.unit  # type: ignore[misc]
+async def test_sharded_catalog_search() -> None:
+    """Test that sharded catalogs return the matches of an in-process search."""
+    service = _update_service(shards=2, search_backend="numpy")
+    local = _update_service(search_backend="numpy")
+    for tools in (service, local):
+        tools.register_catalog(
+            "tools",
+            ["saw", "hammer", "drill"],
+            ["a", "b", "c"],
+            metadata=[{"price": 20}, {"price": 5}, None],
+        )
+        tools.upsert_products("tools", ["mallet"], ["m"], [{"price": 8}])
+        tools.delete_products("tools", ["b"])
+
+    def search(tools: SimilarityService, **kwargs: Any) -> List[List[Dict[str, Any]]]:
+        return tools.find_similar(
+            ["hammer", "saw"], None, 2, catalog_id="tools", **kwargs
+        )
+
+    try:
+        catalog = service.get_catalog("tools")
+        assert catalog.shard_key == "tools@1"
+        assert catalog.index is None
+        assert search(service) == search(local)
+        assert search(service, filters={"price": {"gt": 6}}) == search(
+            local, filters={"price": {"gt": 6}}
+        )
+
+        compacted = service.compact_catalog("tools")
+        assert compacted.shard_key == "tools@4"
+        assert search(service) == search(local)
+        assert service.stats()["shards"]["segments"] == 2
+
+        service.delete_catalog("tools")
+        assert service.stats()["shards"]["segments"] == 0
+    finally:
+        await service.cleanup()
+    assert not service.shard_pool.running
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_small_catalogs_are_not_sharded() -> None:
+    """Test that catalogs below the sharding threshold are searched in process."""
+    service = _update_service(shards=2, shard_min_catalog_size=10)
+    catalog = service.register_catalog("tools", ["saw", "hammer"], ["a", "b"])
+
+    assert catalog.shard_key is None
+    assert not service.shard_pool.running
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_result_cache_skips_encoding_until_catalog_changes() -> None:
+    """Test that cached queries are not encoded again until the catalog changes."""
+    service = _update_service(result_cache_max_entries=10)
+    service.register_catalog("tools", ["saw", "hammer", "drill"], ["a", "b", "c"])
+    service.model.encode.reset_mock()
+
+    def search(queries: List[str], **kwargs: Any) -> List[List[str]]:
+        results = service.find_similar(queries, None, 1, catalog_id="tools", **kwargs)
+        return [[match["product"] for match in matches] for matches in results]
+
+    assert search(["hammer", "saw"]) == [["hammer"], ["saw"]]
+    assert search([" hammer", "drill", "drill"]) == [["hammer"], ["drill"], ["drill"]]
+    assert service.model.encode.call_args_list == [
+        call(["hammer", "saw"]),
+        call(["drill"]),
+    ]
+    stats = service.stats()["result_cache"]
+    assert (stats["hits"], stats["misses"], stats["coalesced"]) == (1, 3, 1)
+
+    service.upsert_products("tools", ["mallet"], ["b"])
+    assert search(["hammer"]) == [["mallet"]]
+    assert search(["hammer"], filters={"price": {"lt": 1}}) == [[]]
+    service.model.encode.reset_mock()
+    service.delete_catalog("tools")
+    service.register_catalog("tools", ["drill"], ["c"])
+    assert search(["hammer"]) == [["drill"]]
+    assert len(service.result_cache) == 1
+
+    with pytest.raises(ValueError):
+        search(["saw"], filters={"price": {"near": 1}})
+    assert search(["saw"]) == [["drill"]]
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_metadata_only_upsert_reuses_embedding() -> None:
+    """Test that changing the metadata of a product does not re-encode it."""
+    service = _update_service()
+    service.register_catalog("tools", ["saw", "hammer"], ["a", "b"], [None, None])
+    service.model.encode.reset_mock()
+
+    catalog, changed = service.upsert_products(
+        "tools", ["saw", "hammer"], ["a", "b"], [{"sale": True}, None]
+    )
+
+    assert changed == 1
+    service.model.encode.assert_not_called()
+    np.testing.assert_allclose(catalog.delta, [[1.0, 0.0, 0.0, 0.0]])
+    assert catalog.metadata_of(catalog.rows["a"]) == {"sale": True}
+    assert service.upsert_products("tools", ["saw"], ["a"]) == (catalog, 0)
+    hits = service.find_similar(
+        ["saw"], None, 1, catalog_id="tools", filters={"sale": True}
+    )
+    assert hits[0][0]["product"] == "saw"
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_filtered_inline_products() -> None:
+    """Test that only matching inline products are encoded and searched."""
+    service = _update_service()
+    metadata = [{"kind": "hand"}, {"kind": "hand"}, {"kind": "power"}]
+
+    results = service.find_similar(
+        ["hammer"],
+        ["saw", "mallet", "drill"],
+        2,
+        filters={"kind": "hand"},
+        metadata=metadata,
+    )
+
+    assert [match["product"] for match in results[0]] == ["mallet", "saw"]
+    assert service.model.encode.call_args_list[-1].args[0] == ["saw", "mallet"]
+    vectors = np.eye(4, dtype=np.float32)[:3]
+    hits = service.find_similar_by_vector(
+        2,
+        query_embeddings=vectors[1:2],
+        product_embeddings=vectors,
+        return_products=False,
+        filters={"kind": {"ne": "hand"}},
+        metadata=metadata,
+    )
+    assert [hit["index"] for hit in hits[0]] == [2]
+    assert service.find_similar(
+        ["saw"], ["saw"], 1, filters={"kind": "power"}, metadata=[None]
+    ) == [[]]
+    with pytest.raises(ValueError, match="one entry per product"):
+        service.find_similar(["saw"], ["saw"], 1, filters={"kind": "hand"})
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_deleted_products_skipped_by_index() -> None:
+    """Test that tombstoned rows never come out of an IVF index."""
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(200, 8)).astype(np.float32)
+    service = SimilarityService(
+        "test-model", ann_index="ivf", ann_params={"nlist": 8, "nprobe": 8}
+    )
+    service.model = MagicMock()
+    service.model.encode = MagicMock(return_value=embeddings)
+    service.register_catalog("big", [f"p{i}" for i in range(200)])
+    service.delete_products("big", ["0", "1"])
+
+    service.model.encode = MagicMock(return_value=embeddings[:1])
+    results = service.find_similar(["q"], None, 5, catalog_id="big")
+
+    products = [match["product"] for match in results[0]]
+    assert len(products) == 5
+    assert not {"p0", "p1"} & set(products)
+
+    service.delete_products("big", [str(i) for i in range(200)])
+    assert service.compact_catalog("big").size == 0
+    assert service.find_similar(["q"], None, 5, catalog_id="big") == [[]]
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_updates_persist_in_embedding_store(tmp_path: Path) -> None:
+    """Test that a restarted service resumes from the latest catalog version."""
+    store = EmbeddingStore(str(tmp_path))
+    service = _update_service(embedding_store=store)
+    service.register_catalog("tools", ["saw", "hammer"], ["a", "b"])
+    service.upsert_products("tools", ["drill"], ["c"])
+    service.delete_products("tools", ["a"])
+
+    restarted = SimilarityService("test-model", embedding_store=store)
+    catalog = restarted.get_catalog("tools")
+    assert (catalog.version, catalog.size, catalog.base_version) == (3, 2, 1)
+    assert sorted(catalog.rows) == ["b", "c"]
+
+    service.compact_catalog("tools")
+    catalog = SimilarityService("test-model", embedding_store=store).get_catalog(
+        "tools"
+    )
+    assert (catalog.version, catalog.pending, catalog.products) == (
+        4,
+        0,
+        ["hammer", "drill"],
+    )
+    assert isinstance(catalog.embeddings, np.memmap)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+async def test_background_compaction() -> None:
+    """Test that catalogs past the threshold are compacted in the background."""
+    service = _update_service(compaction_threshold=0.5)
+    service.register_catalog("tools", ["saw", "hammer", "drill"], ["a", "b", "c"])
+
+    service.upsert_products("tools", ["wrench"], ["d"])
+    assert "tools" not in service._compactions
+    service.delete_products("tools", ["a"])
+    service._compactions["tools"].result()
+
+    catalog = service.get_catalog("tools")
+    assert (catalog.version, catalog.pending, catalog.size) == (4, 0, 3)
+    await service.cleanup()
+    assert service._compactor is None
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_background_compaction_errors_are_logged() -> None:
+    """Test that a failed background compaction does not raise."""
+    service = _update_service()
+    with patch.object(service, "compact_catalog", side_effect=OSError("disk full")):
+        service._compact_in_background("tools")
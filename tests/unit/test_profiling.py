@@ -0,0 +1,152 @@
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from similarity_search.core.metrics import time_stage
+from similarity_search.core.profiling import (
+    PROFILE_FILE_HEADER,
+    PROFILE_HEADER,
+    PROFILE_TOKEN_HEADER,
+    ProfilingMiddleware,
+    RequestProfile,
+    StackSampler,
+    current_profile,
+)
+
+
+async def _endpoint(request: Request) -> JSONResponse:
+    with time_stage("search"):
+        time.sleep(0.02)
+    return JSONResponse({"profiled": current_profile() is not None})
+
+
+def _client(**options: Any) -> TestClient:
+    app = Starlette(routes=[Route("/search", _endpoint)])
+    app.add_middleware(ProfilingMiddleware, **options)
+    return TestClient(app)
+
+
+def _server_timing(headers: Dict[str, str]) -> Dict[str, float]:
+    metrics = [metric.split(";dur=") for metric in headers["server-timing"].split(", ")]
+    return {name: float(duration) for name, duration in metrics}
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_requests_are_not_profiled_by_default() -> None:
+    """Test that requests without the header are left untouched."""
+    response = _client(token="secret").get("/search")
+
+    assert response.json() == {"profiled": False}
+    assert "server-timing" not in response.headers
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_header_requires_token_outside_debug() -> None:
+    """Test that the profile header is ignored without a valid token."""
+    client = _client(token="secret")
+
+    for headers in (
+        {PROFILE_HEADER: "timing"},
+        {PROFILE_HEADER: "timing", PROFILE_TOKEN_HEADER: "wrong"},
+        {PROFILE_HEADER: "unknown", PROFILE_TOKEN_HEADER: "secret"},
+    ):
+        response = client.get("/search", headers=headers)
+        assert "server-timing" not in response.headers
+    assert "server-timing" not in (
+        _client().get("/search", headers={PROFILE_HEADER: "timing"}).headers
+    )
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_server_timing_header() -> None:
+    """Test the stage timings returned to an authorized caller."""
+    response = _client(token="secret").get(
+        "/search", headers={PROFILE_HEADER: "timing", PROFILE_TOKEN_HEADER: "secret"}
+    )
+
+    assert response.json() == {"profiled": True}
+    timings = _server_timing(response.headers)
+    assert timings["search"] >= 20
+    assert timings["total"] >= timings["search"]
+    assert PROFILE_FILE_HEADER not in response.headers
+
+    debug_response = _client(allow_header=True).get(
+        "/search", headers={PROFILE_HEADER: "timing"}
+    )
+    assert "search" in _server_timing(debug_response.headers)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_profile_written_on_request(tmp_path: Path) -> None:
+    """Test that the profile mode writes a stack profile of the request."""
+    response = _client(allow_header=True, output_dir=str(tmp_path), interval_ms=1).get(
+        "/search", headers={PROFILE_HEADER: "profile"}
+    )
+
+    path = tmp_path / response.headers[PROFILE_FILE_HEADER]
+    lines = path.read_text().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert "_endpoint (test_profiling.py" in path.read_text()
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_one_in_n_requests_sampled(tmp_path: Path) -> None:
+    """Test that sampled requests are profiled without changing the response."""
+    client = _client(sample_every=2, output_dir=str(tmp_path / "profiles"))
+
+    responses = [client.get("/search") for _ in range(4)]
+
+    assert [response.json()["profiled"] for response in responses] == [
+        False,
+        True,
+        False,
+        True,
+    ]
+    assert all("server-timing" not in response.headers for response in responses)
+    assert len(os.listdir(tmp_path / "profiles")) == 2
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_unwritable_profile_does_not_fail_request(tmp_path: Path) -> None:
+    """Test that an error writing the profile is logged, not raised."""
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+
+    response = _client(sample_every=1, output_dir=str(blocker / "profiles")).get(
+        "/search"
+    )
+
+    assert response.status_code == 200
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_request_profile_accumulates_stages() -> None:
+    """Test that repeated stages add up in the Server-Timing value."""
+    profile = RequestProfile()
+    profile.record("search", 0.001)
+    profile.record("search", 0.002)
+    profile.track_current_thread()
+
+    assert profile.server_timing(0.01) == "search;dur=3.000, total;dur=10.000"
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_stack_sampler_ignores_untracked_threads() -> None:
+    """Test that only the tracked threads are sampled."""
+    sampler = StackSampler(interval_ms=1)
+    sampler.start()
+    time.sleep(0.01)
+    sampler.stop()
+
+    assert sampler.samples > 0
+    assert not sampler.stacks
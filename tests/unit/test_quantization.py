@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from similarity_search.services.ann import ExactIndex, recall_at_k
+from similarity_search.services.quantization import QuantizedEmbeddings, Quantizer
+
+
+def _embeddings(n: int = 1000, dim: int = 32, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(10, dim))
+    return (centers[rng.integers(0, 10, n)] + 0.5 * rng.normal(size=(n, dim))).astype(
+        np.float32
+    )
+
+
+@pytest.mark.unit  # type: ignore[misc]
+@pytest.mark.parametrize(  # type: ignore[misc]
+    "kind, params, ratio, min_recall",
+    [
+        ("float16", {}, 2.0, 0.95),
+        ("int8", {}, 4.0, 0.9),
+        ("pq", {"subspaces": 8}, 16.0, 0.5),
+    ],
+)
+def test_compressed_search_recall(
+    kind: str, params: dict, ratio: float, min_recall: float
+) -> None:
+    """Test memory savings and recall of each quantizer without rescoring."""
+    embeddings = _embeddings()
+    queries = embeddings[:20] + 0.1
+    quantized = QuantizedEmbeddings(embeddings, kind, block_size=300, **params)
+    exact = [rows for rows, _ in ExactIndex(embeddings).search(queries, 10)]
+
+    approximate = [rows for rows, _ in quantized.search(queries, 10)]
+
+    assert quantized.compression_ratio == ratio
+    assert quantized.info()["kind"] == kind
+    assert recall_at_k(approximate, exact) >= min_recall
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_rescoring_restores_exact_scores() -> None:
+    """Test that rescoring re-ranks candidates with full precision scores."""
+    embeddings = _embeddings()
+    queries = embeddings[:20] + 0.1
+    quantized = QuantizedEmbeddings(embeddings, "pq", subspaces=8)
+    exact = ExactIndex(embeddings).search(queries, 5)
+
+    rescored = quantized.search(
+        queries, 5, rescore_factor=10, full_precision=embeddings
+    )
+
+    assert recall_at_k([r for r, _ in rescored], [r for r, _ in exact]) >= 0.95
+    rows, scores = rescored[0]
+    exact_scores = dict(zip(exact[0][0].tolist(), exact[0][1].tolist(), strict=True))
+    for row, score in zip(rows.tolist(), scores.tolist(), strict=True):
+        if row in exact_scores:
+            assert score == pytest.approx(exact_scores[row], abs=1e-5)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_invalid_quantization() -> None:
+    """Test that unknown kinds and incompatible subspaces are rejected."""
+    with pytest.raises(ValueError, match="Unknown quantization 'int4'"):
+        QuantizedEmbeddings(_embeddings(10), "int4")
+    with pytest.raises(ValueError, match="Dimension 32 is not divisible by 5"):
+        QuantizedEmbeddings(_embeddings(10), "pq", subspaces=5)
+    with pytest.raises(TypeError):
+        Quantizer()  # type: ignore[abstract]
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_search_selection() -> None:
+    """Test that compressed searches only scan and return selected rows."""
+    embeddings = _embeddings()
+    selection = np.arange(0, 1000, 5)
+    quantized = QuantizedEmbeddings(embeddings, "int8", block_size=64)
+
+    results = quantized.search(
+        embeddings[:10],
+        5,
+        rescore_factor=4,
+        full_precision=embeddings,
+        selection=selection,
+    )
+
+    exact = ExactIndex(embeddings[selection]).search(embeddings[:10], 5)
+    assert (
+        recall_at_k(
+            [rows for rows, _ in results], [selection[rows] for rows, _ in exact]
+        )
+        >= 0.9
+    )
@@ -0,0 +1,20 @@
+import json
+
+import pytest
+
+from similarity_search.api.responses import FastJSONResponse
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_fast_json_response() -> None:
+    """Test that content is serialized to the same JSON as the standard encoder."""
+    content = [{"query": "drill ü", "matches": [{"index": 3, "score": 0.9512}]}]
+
+    response = FastJSONResponse(content)
+
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == content
+    assert (
+        response.body
+        == json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+    )
@@ -0,0 +1,125 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from typing import List
+from unittest.mock import patch
+
+import pytest
+
+from similarity_search.services.result_cache import ResultCache
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_key_normalizes_query_text() -> None:
+    """Test that spacing and Unicode forms do not change the key, but case does."""
+    cache = ResultCache(max_entries=10)
+
+    key = cache.key("cordless drill", "tools", 1, 5, nprobe=None)
+
+    assert cache.key("  cordless\tdrill ", "tools", 1, 5, nprobe=None) == key
+    assert cache.key("ｃｏｒｄｌｅｓｓ drill", "tools", 1, 5, nprobe=None) == key
+    assert cache.key("Cordless drill", "tools", 1, 5, nprobe=None) != key
+    assert cache.key("cordless drill", "tools", 2, 5, nprobe=None) != key
+    assert cache.key("cordless drill", "tools", 1, 5, nprobe=4) != key
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_hits_misses_and_eviction() -> None:
+    """Test that completed results are served and the least recently used evicted."""
+    cache = ResultCache(max_entries=2)
+    keys = [cache.key(query, "tools", 1, 5) for query in ("saw", "drill", "hammer")]
+
+    for key in keys[:2]:
+        _, owner = cache.lookup(key)
+        assert owner
+        cache.complete(key, [key[-1]])
+    future, owner = cache.lookup(keys[0])
+    assert (future.result(), owner) == (["saw"], False)
+    cache.lookup(keys[2])
+    cache.complete(keys[2], ["hammer"])
+
+    _, owner = cache.lookup(keys[1])
+    assert owner
+    cache.complete(keys[1], ["drill"], store=False)
+    assert len(cache) == 2
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 4,
+        "coalesced": 0,
+        "evictions": 1,
+        "expirations": 0,
+        "entries": 2,
+        "max_entries": 2,
+        "ttl_seconds": 0.0,
+    }
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_entries_expire() -> None:
+    """Test that entries older than the time to live are computed again."""
+    cache = ResultCache(max_entries=10, ttl_seconds=60)
+    key = cache.key("saw", "tools", 1, 5)
+    cache.lookup(key)
+    cache.complete(key, ["saw"])
+
+    with patch("time.monotonic", return_value=time.monotonic() + 61):
+        _, owner = cache.lookup(key)
+
+    assert owner
+    assert cache.stats()["expirations"] == 1
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_concurrent_misses_are_computed_once() -> None:
+    """Test that callers of a key being computed wait for its result."""
+    cache = ResultCache(max_entries=10)
+    key = cache.key("saw", "tools", 1, 5)
+    claimed = Event()
+    computed: List[str] = []
+
+    def search() -> List[str]:
+        future, owner = cache.lookup(key)
+        if owner:
+            claimed.set()
+            time.sleep(0.05)
+            computed.append("saw")
+            cache.complete(key, ["saw"])
+        else:
+            claimed.wait()
+        return future.result()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: search(), range(4)))
+
+    assert results == [["saw"]] * 4
+    assert computed == ["saw"]
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_failures_and_invalidation() -> None:
+    """Test that failures reach waiting callers and invalidation drops results."""
+    cache = ResultCache(max_entries=10)
+    key = cache.key("saw", "tools", 1, 5)
+    cache.lookup(key)
+    waiting, _ = cache.lookup(key)
+    cache.fail(key, ValueError("bad filter"))
+    with pytest.raises(ValueError, match="bad filter"):
+        waiting.result()
+
+    cache.lookup(key)
+    cache.complete(key, ["saw"])
+    other = cache.key("saw", "garden", 1, 5)
+    cache.lookup(other)
+    cache.complete(other, ["rake"])
+    in_flight = cache.key("drill", "tools", 1, 5)
+    cache.lookup(in_flight)
+
+    cache.invalidate("tools")
+    cache.complete(in_flight, ["drill"])
+
+    assert len(cache) == 1
+    _, owner = cache.lookup(cache.key("saw", "tools", 1, 5))
+    assert owner
+    cache.clear()
+    assert len(cache) == 0
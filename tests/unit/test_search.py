@@ -0,0 +1,86 @@
+import time
+
+import numpy as np
+import pytest
+
+from similarity_search.core.cancellation import CancellationToken, cancellation_scope
+from similarity_search.core.exceptions import RequestCancelledError
+from similarity_search.services.search import exact_search, normalize, top_k_indices
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_top_k_indices_sorted_best_first() -> None:
+    """Test that top_k_indices returns the best positions in decreasing order."""
+    scores = np.array([0.1, 0.9, 0.5, 0.7], dtype=np.float32)
+
+    np.testing.assert_array_equal(top_k_indices(scores, 2), [1, 3])
+    np.testing.assert_array_equal(top_k_indices(scores, 10), [1, 3, 2, 0])
+
+
+@pytest.mark.unit  # type: ignore[misc]
+@pytest.mark.parametrize("block_size", [7, 64, 1000])  # type: ignore[misc]
+def test_exact_search_matches_brute_force(block_size: int) -> None:
+    """Test that the blocked merge returns the same top-k as a full scan."""
+    rng = np.random.default_rng(0)
+    corpus = normalize(rng.normal(size=(500, 16)))
+    queries = normalize(rng.normal(size=(4, 16)))
+
+    results = exact_search(queries, corpus, top_k=10, block_size=block_size)
+
+    scores = queries @ corpus.T
+    for (rows, row_scores), expected in zip(results, scores, strict=True):
+        np.testing.assert_array_equal(rows, np.argsort(-expected)[:10])
+        np.testing.assert_allclose(row_scores, np.sort(expected)[::-1][:10], rtol=1e-5)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_exact_search_normalizes_unnormalized_corpus() -> None:
+    """Test cosine scores on a corpus whose rows are not normalized."""
+    rng = np.random.default_rng(1)
+    corpus = rng.normal(size=(50, 8)).astype(np.float32) * 5
+    query = normalize(corpus[3:4])
+
+    [(rows, scores)] = exact_search(query, corpus, top_k=1, normalized=False)
+
+    assert rows[0] == 3
+    assert scores[0] == pytest.approx(1.0, rel=1e-5)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_exact_search_top_k_larger_than_corpus() -> None:
+    """Test that all rows are returned when top_k exceeds the corpus size."""
+    corpus = normalize(np.eye(3, dtype=np.float32))
+    query = normalize(np.array([[1.0, 0.5, 0.0]], dtype=np.float32))
+
+    [(rows, scores)] = exact_search(query, corpus, top_k=10, block_size=2)
+
+    np.testing.assert_array_equal(rows, [0, 1, 2])
+    assert scores[-1] == pytest.approx(0.0)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_exact_search_selection() -> None:
+    """Test that only selected rows are scored and returned by their row."""
+    rng = np.random.default_rng(2)
+    corpus = normalize(rng.normal(size=(200, 8)))
+    queries = normalize(rng.normal(size=(3, 8)))
+    selection = np.arange(1, 200, 3)
+
+    results = exact_search(queries, corpus, 5, block_size=16, selection=selection)
+
+    scores = queries @ corpus[selection].T
+    for (rows, row_scores), expected in zip(results, scores, strict=True):
+        np.testing.assert_array_equal(rows, selection[np.argsort(-expected)[:5]])
+        np.testing.assert_allclose(row_scores, np.sort(expected)[::-1][:5], rtol=1e-5)
+    [(rows, _)] = exact_search(queries[:1], corpus, 5, selection=np.array([], int))
+    assert len(rows) == 0
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_exact_search_stops_when_cancelled() -> None:
+    """Test that a cancelled request stops scoring between two blocks."""
+    corpus = normalize(np.random.default_rng(3).normal(size=(64, 8)))
+
+    with cancellation_scope(CancellationToken(time.perf_counter() - 1)):
+        with pytest.raises(RequestCancelledError, match="during search"):
+            exact_search(corpus[:1], corpus, 5, block_size=16)
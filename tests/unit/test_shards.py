@@ -0,0 +1,197 @@
+import os
+import signal
+import time
+from pathlib import Path
+from typing import Callable, Generator
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from similarity_search.services.search import exact_search, normalize
+from similarity_search.services.shards import ShardPool, track_missed_shards
+
+
+@pytest.fixture  # type: ignore[misc]
+def pool() -> Generator[ShardPool, None, None]:
+    """Fixture for a running pool of three shards."""
+    pool = ShardPool(shards=3, timeout_ms=5000, block_size=32)
+    pool.start()
+    yield pool
+    pool.stop()
+
+
+def _corpus() -> np.ndarray:
+    return normalize(np.random.default_rng(0).normal(size=(200, 16)))
+
+
+def _queries() -> np.ndarray:
+    return normalize(np.random.default_rng(1).normal(size=(3, 16)))
+
+
+def _wait_until(condition: Callable[[], bool], timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_merged_top_k_matches_single_process(pool: ShardPool) -> None:
+    """Test that merging the top-k of every shard gives the exact global top-k."""
+    corpus, queries = _corpus(), _queries()
+    pool.load("tools@1", corpus, normalized=True)
+    selection = np.arange(0, 200, 3)
+
+    with track_missed_shards() as missed:
+        results = pool.search("tools@1", queries, top_k=10)
+        selected = pool.search("tools@1", queries, top_k=10, selection=selection)
+
+    expected = exact_search(queries, corpus, 10, normalized=True)
+    expected_selected = exact_search(
+        queries, corpus, 10, normalized=True, selection=selection
+    )
+    for (rows, scores), (expected_rows, expected_scores) in zip(
+        results + selected, expected + expected_selected, strict=True
+    ):
+        np.testing.assert_array_equal(rows, expected_rows)
+        np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+    assert missed == []
+    assert "tools@1" in pool
+    assert pool.stats()["searches"] == 2
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_memory_mapped_segment_is_opened_by_shards(
+    pool: ShardPool, tmp_path: Path
+) -> None:
+    """Test that memory-mapped segments are read by the shards from their file."""
+    corpus = _corpus()
+    np.save(tmp_path / "embeddings.npy", corpus)
+    pool.load("tools@1", np.load(tmp_path / "embeddings.npy", mmap_mode="r"), True)
+
+    rows, _ = pool.search("tools@1", corpus[[150]], top_k=1)[0]
+
+    np.testing.assert_array_equal(rows, [150])
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_slow_shard_gives_partial_results(pool: ShardPool) -> None:
+    """Test that a shard missing its deadline is left out and reported."""
+    corpus = _corpus()
+    pool.load("tools@1", corpus, normalized=True)
+    pool.timeout_ms = 200
+    os.kill(pool._shards[0].process.pid, signal.SIGSTOP)
+    try:
+        with track_missed_shards() as missed:
+            rows, _ = pool.search("tools@1", corpus[[10, 150]], top_k=1)[1]
+            first, _ = pool.search("tools@1", corpus[[10]], top_k=1)[0]
+    finally:
+        os.kill(pool._shards[0].process.pid, signal.SIGCONT)
+
+    np.testing.assert_array_equal(rows, [150])
+    assert first[0] >= 66
+    assert missed == [0, 0]
+    assert pool.stats()["timeouts"] == 2
+
+    pool.timeout_ms = 5000
+    with track_missed_shards() as missed:
+        rows, _ = pool.search("tools@1", corpus[[10]], top_k=1)[0]
+    np.testing.assert_array_equal(rows, [10])
+    assert missed == []
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_failed_and_dropped_segments(pool: ShardPool) -> None:
+    """Test failing shards and that only the two latest segments of a group stay."""
+    corpus = _corpus()
+    for version in (1, 2, 3):
+        pool.load(f"tools@{version}", corpus, normalized=True, group="tools")
+    assert ("tools@1" in pool, "tools@2" in pool, "tools@3" in pool) == (
+        False,
+        True,
+        True,
+    )
+
+    pool._segments["tools@1"] = pool._segments["tools@3"]
+    with track_missed_shards() as missed:
+        results = pool.search("tools@1", corpus[[0]], top_k=1)
+    assert missed == [0, 1, 2]
+    assert len(results[0][0]) == 0
+    assert pool.stats()["errors"] == 3
+
+    pool.drop_group("tools")
+    assert pool.stats()["segments"] == 1
+    with pytest.raises(KeyError):
+        pool.search("tools@3", corpus[[0]], top_k=1)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_exited_shard_is_left_out(pool: ShardPool) -> None:
+    """Test that a shard process that exited fails its searches and loads."""
+    corpus = _corpus()
+    pool.load("tools@1", corpus, normalized=True)
+    with patch.object(ShardPool, "_respawn"):
+        pool._shards[2].process.kill()
+        pool._shards[2].process.join()
+
+    with track_missed_shards() as missed:
+        rows, _ = pool.search("tools@1", corpus[[10]], top_k=1)[0]
+
+    np.testing.assert_array_equal(rows, [10])
+    assert missed == [2]
+    with pytest.raises(RuntimeError, match="Shard 2 exited"):
+        pool.load("tools@2", corpus, normalized=True)
+    pool.stop()
+    with pytest.raises(RuntimeError, match="not running"):
+        pool.load("tools@2", corpus, normalized=True)
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_exited_shard_is_restarted(pool: ShardPool, tmp_path: Path) -> None:
+    """Test that a shard that exited is replaced and gets its segments back."""
+    corpus = _corpus()
+    np.save(tmp_path / "embeddings.npy", corpus)
+    pool.load("tools@1", corpus, normalized=True)
+    pool.load("tools@2", np.load(tmp_path / "embeddings.npy", mmap_mode="r"), True)
+    shard = pool._shards[2]
+    # A newer version replacing the file is not what the restarted shard loads.
+    np.save(tmp_path / "newer.npy", corpus[::-1])
+    os.replace(tmp_path / "newer.npy", tmp_path / "embeddings.npy")
+
+    shard.process.kill()
+    _wait_until(lambda: pool._shards[2] is not shard)
+
+    for key in ("tools@1", "tools@2"):
+        with track_missed_shards() as missed:
+            rows, _ = pool.search(key, corpus[[150]], top_k=1)[0]
+        np.testing.assert_array_equal(rows, [150])
+        assert missed == []
+    assert pool.stats()["restarts"] == 1
+
+
+@pytest.mark.unit  # type: ignore[misc]
+def test_stalled_shard_backlog_is_bounded(pool: ShardPool) -> None:
+    """Test that a stalled shard is skipped once it has max_pending searches."""
+    corpus = _corpus()
+    pool.load("tools@1", corpus, normalized=True)
+    pool.timeout_ms, pool.max_pending = 100, 2
+    shard = pool._shards[0]
+    os.kill(shard.process.pid, signal.SIGSTOP)
+    try:
+        with track_missed_shards() as missed:
+            for _ in range(3):
+                pool.search("tools@1", corpus[[10]], top_k=1)
+    finally:
+        os.kill(shard.process.pid, signal.SIGCONT)
+
+    assert missed == [0, 0, 0]
+    stats = pool.stats()
+    assert (stats["timeouts"], stats["overloaded"]) == (2, 1)
+    # The shard skips the searches that expired while it was stalled.
+    _wait_until(lambda: not shard.searching)
+    pool.timeout_ms = 5000
+    with track_missed_shards() as missed:
+        rows, _ = pool.search("tools@1", corpus[[10]], top_k=1)[0]
+    np.testing.assert_array_equal(rows, [10])
+    assert missed == []